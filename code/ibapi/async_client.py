@@ -0,0 +1,364 @@
+"""
+asyncio transport for the EClient: no EReader thread, no message queue and no
+EClient.run thread. The AsyncEClientProtocol receives straight into a
+FrameBuffer on the event loop, and every complete message is decoded right
+away by the usual Decoder, which calls the usual EWrapper methods.
+
+    client = AsyncEClient(wrapper)
+    nextOrderId = await client.connect("127.0.0.1", 7497, clientId=0)
+    client.reqMktData(1, contract, "", False, False, [])
+    await client.drain()
+    ...
+    await client.waitClosed()
+
+All the request methods of EClient are available unchanged: they write to
+the transport, which never blocks. drain() waits until the transport write
+buffer is below its high water mark again, to pace a burst of requests.
+The client must only be used from the thread running its event loop.
+
+The requests answered with an end marker also have a *Future variant that
+returns an asyncio.Future of the whole answer, instead of the callbacks:
+
+    details = await client.reqContractDetailsFuture(2, contract)
+    bars = await asyncio.wait_for(client.reqHistoricalDataFuture(
+        3, contract, "", "1 D", "1 min", "TRADES", 1, 1), timeout=10)
+
+Their answers are routed to a RequestAnswer through EClient.reqHandlers,
+the wrapper sees none of them. The future is resolved by the decoding of
+the end marker, fails with a request_futures.RequestError on an error of
+its reqId and with ConnectionError when the connection goes. Cancelling it
+(asyncio.wait_for timeout) cancels the request.
+"""
+
+import asyncio
+import logging
+
+from ibapi import comm, decoder
+from ibapi.client import EClient
+from ibapi.common import NO_VALID_ID
+from ibapi.decoder import POSITIONS_HANDLER
+from ibapi.errors import CONNECT_FAIL, NOT_CONNECTED
+from ibapi.framing import FrameBuffer
+from ibapi.message import IN
+from ibapi.request_futures import WARNING_CODES, RequestError
+from ibapi.server_versions import MIN_CLIENT_VER, MAX_CLIENT_VER
+from ibapi.utils import BadMessage
+
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncConnection:
+    """ stands in for the Connection of the EClient, over an asyncio transport """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.transport = None
+
+    def connect(self):
+        raise RuntimeError("the AsyncConnection is opened by 'await AsyncEClient.connect()'")
+
+    def disconnect(self):
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+
+    def isConnected(self):
+        return self.transport is not None and not self.transport.is_closing()
+
+    def sendMsg(self, msg):
+        if not self.isConnected():
+            logger.debug("sendMsg attempted while not connected")
+            return 0
+        self.transport.write(msg)
+        return len(msg)
+
+
+class AsyncEClientProtocol(asyncio.BufferedProtocol):
+    def __init__(self, client, recvBufSize):
+        self.client = client
+        self.recvBufSize = recvBufSize
+        self.frameBuffer = FrameBuffer(max(2 * recvBufSize, 64 * 1024))
+        self.writable = asyncio.Event()
+        self.writable.set()
+
+    def connection_made(self, transport):
+        self.client.conn.transport = transport
+
+    def get_buffer(self, sizehint):
+        return self.frameBuffer.writable(self.recvBufSize)
+
+    def buffer_updated(self, nbytes):
+        self.frameBuffer.commit(nbytes)
+        instrumentation = self.client.instrumentation
+        if instrumentation is not None:
+            instrumentation.recordRecv(nbytes)
+        msgs = self.frameBuffer.extract()
+        recorder = self.client.recorder
+        if recorder is not None and msgs:
+            recorder.record(msgs)
+        for msg in msgs:
+            self.client.onMessage(msg)
+
+    def pause_writing(self):
+        self.writable.clear()
+
+    def resume_writing(self):
+        self.writable.set()
+
+    def connection_lost(self, exc):
+        self.writable.set()
+        self.client.connectionLost(exc)
+
+
+class RequestAnswer:
+    """ collects the answer of one request, routed to it through reqHandlers,
+    and resolves its future at the end marker """
+
+    def __init__(self, client, key, future, cancel=None):
+        self.client = client
+        self.key = key              # in reqHandlers
+        self.future = future
+        self.cancel = cancel        # sends the cancel of the request
+        self.items = []
+
+    def finish(self, exc=None):
+        if self.client.answers.pop(self.key, None) is None:
+            return
+        self.client.reqHandlers.pop(self.key, None)
+        if self.future.done():
+            return
+        if exc is None:
+            self.future.set_result(self.items)
+        else:
+            self.future.set_exception(exc)
+
+    def cancelled(self, future):
+        """ done callback of the future: a cancelled request is cancelled """
+        if future.cancelled() and self.client.answers.get(self.key) is self:
+            self.finish()
+            if self.cancel is not None and self.client.isConnected():
+                self.cancel()
+
+    # the answers, called by the Decoder
+
+    def contractDetails(self, reqId, contractDetails):
+        self.items.append(contractDetails)
+
+    bondContractDetails = contractDetails
+
+    def contractDetailsEnd(self, reqId):
+        self.finish()
+
+    def historicalData(self, reqId, bar):
+        self.items.append(bar)
+
+    def historicalDataBatch(self, reqId, bars):
+        self.items = bars
+
+    def historicalDataEnd(self, reqId, start, end):
+        self.finish()
+
+    def position(self, account, contract, position, avgCost):
+        self.items.append((account, contract, position, avgCost))
+
+    def positionEnd(self):
+        self.client.cancelPositions()
+        self.finish()
+
+    def accountSummary(self, reqId, account, tag, value, currency):
+        self.items.append((account, tag, value, currency))
+
+    def accountSummaryEnd(self, reqId):
+        self.client.cancelAccountSummary(reqId)
+        self.finish()
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        if errorCode not in WARNING_CODES:
+            self.finish(exc=RequestError(reqId, errorCode, errorString))
+
+
+class AsyncEClient(EClient):
+    def __init__(self, wrapper):
+        EClient.__init__(self, wrapper)
+        self.protocol = None
+        self.onMessage = self.onHandshakeMessage
+        self.connected = None   # future: next valid order id once the API is started
+        self.closed = None      # future: done once the connection is gone
+        self.answers = {}       # reqHandlers key -> RequestAnswer of a *Future request
+
+    async def connect(self, host, port, clientId, timeout=None):
+        """Opens the connection, does the version handshake and starts the
+        API. Returns the next valid order id sent by TWS.
+
+        timeout:float - seconds to wait for the whole sequence, None for
+            no limit. Raises ConnectionError if it fails."""
+
+        loop = asyncio.get_running_loop()
+        self.host = host
+        self.port = port
+        self.clientId = clientId
+        self.conn = AsyncConnection(host, port)
+        self.connected = loop.create_future()
+        self.closed = loop.create_future()
+        self.onMessage = self.onHandshakeMessage
+        self.decoder = decoder.Decoder(self.wrapper, None,
+                                       historicalDataBatch=self.historicalDataBatch,
+                                       historicalTicksArrays=self.historicalTicksArrays,
+                                       sizeMode=self.sizeMode)
+        if self.instrumentation is not None:
+            self.decoder.setInstrumentation(self.instrumentation)
+        self.decoder.contractCache = self.contractCache
+        self.decoder.reqHandlers = self.reqHandlers
+        self.setConnState(EClient.CONNECTING)
+
+        try:
+            (_, self.protocol) = await asyncio.wait_for(loop.create_connection(
+                lambda: AsyncEClientProtocol(self, self.recvBufSize), host, port), timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.wrapper.error(NO_VALID_ID, CONNECT_FAIL.code(), CONNECT_FAIL.msg())
+            self.disconnect()
+            raise ConnectionError(CONNECT_FAIL.msg())
+
+        v100version = "v%d..%d" % (MIN_CLIENT_VER, MAX_CLIENT_VER)
+        if self.connectionOptions:
+            v100version = v100version + " " + self.connectionOptions
+        self.conn.sendMsg(b"API\0" + comm.make_msg(v100version))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(self.connected), timeout)
+        except asyncio.TimeoutError:
+            self.disconnect()
+            raise ConnectionError("no answer from %s:%d" % (host, port))
+
+    def onHandshakeMessage(self, msg):
+        fields = comm.read_fields(msg)
+        if self.serverVersion_ is None and len(fields) == 2:
+            self.onServerVersion(fields)
+            return
+
+        # sometimes news come before the server version
+        self.interpret(fields)
+        if self.serverVersion_ is not None and int(fields[0]) == IN.NEXT_VALID_ID:
+            self.onMessage = self.onApiMessage
+            if not self.connected.done():
+                self.connected.set_result(int(fields[2]))
+
+    def onServerVersion(self, fields):
+        (serverVersion, connTime) = fields
+        self.serverVersion_ = int(serverVersion)
+        self.connTime = connTime
+        logger.debug("ANSWER Version:%d time:%s", self.serverVersion_, connTime)
+        self.decoder.serverVersion = self.serverVersion()
+        self.decoder.compilePlans()
+        self.compileEncoders()
+        if self.recorder is not None:
+            self.recorder.begin(self.serverVersion(), connTime)
+        self.setConnState(EClient.CONNECTED)
+        self.startApi()
+        self.wrapper.connectAck()
+
+    def onApiMessage(self, msg):
+        self.interpret(comm.read_fields(msg))
+
+    def interpret(self, fields):
+        try:
+            self.decoder.interpret(fields)
+        except BadMessage:
+            logger.info("BadMessage")
+
+    def connectionLost(self, exc):
+        wasConnected = self.conn is not None
+        self.setConnState(EClient.DISCONNECTED)
+        self.failAnswers()
+        if self.connected is not None and not self.connected.done():
+            self.connected.set_exception(ConnectionError(
+                "connection closed during the handshake"))
+            # connect() may already have given up waiting
+            self.connected.exception()
+        if self.closed is not None and not self.closed.done():
+            self.closed.set_result(exc)
+        if wasConnected:
+            if self.recorder is not None:
+                self.recorder.close()
+            self.wrapper.connectionClosed()
+            self.reset()
+
+    def disconnect(self):
+        """ closes the connection, waitClosed() tells when it's gone """
+        self.setConnState(EClient.DISCONNECTED)
+        self.failAnswers()
+        if self.conn is not None:
+            logger.info("disconnecting")
+            self.conn.disconnect()
+            if self.recorder is not None:
+                self.recorder.close()
+            self.wrapper.connectionClosed()
+            self.reset()
+
+    def failAnswers(self):
+        for answer in list(self.answers.values()):
+            answer.finish(exc=ConnectionError("connection closed"))
+
+    def expect(self, key, cancel=None):
+        """ the future of the answer of the request key, routed to a new
+        RequestAnswer """
+        if key in self.answers:
+            raise ValueError("request %s is already pending" % (key, ))
+        future = asyncio.get_running_loop().create_future()
+        if not self.isConnected():
+            future.set_exception(ConnectionError(NOT_CONNECTED.msg()))
+            return future
+        answer = RequestAnswer(self, key, future, cancel)
+        self.answers[key] = answer
+        self.reqHandlers[key] = answer
+        future.add_done_callback(answer.cancelled)
+        return future
+
+    def reqContractDetailsFuture(self, reqId, contract):
+        """ reqContractDetails, the future of the list of ContractDetails """
+        future = self.expect(reqId)
+        if not future.done():
+            self.reqContractDetails(reqId, contract)
+        return future
+
+    def reqHistoricalDataFuture(self, reqId, contract, endDateTime, durationStr,
+                                barSizeSetting, whatToShow, useRTH, formatDate,
+                                chartOptions=None):
+        """ reqHistoricalData without keepUpToDate, the future of the list of
+        BarData, or of the columns with setHistoricalDataBatch(True) """
+        future = self.expect(reqId, lambda: self.cancelHistoricalData(reqId))
+        if not future.done():
+            self.reqHistoricalData(reqId, contract, endDateTime, durationStr, barSizeSetting,
+                                   whatToShow, useRTH, formatDate, False, chartOptions or [])
+        return future
+
+    def reqPositionsFuture(self):
+        """ reqPositions, the future of the list of (account, contract,
+        position, avgCost); cancelled once complete """
+        future = self.expect(POSITIONS_HANDLER, self.cancelPositions)
+        if not future.done():
+            self.reqPositions()
+        return future
+
+    def reqAccountSummaryFuture(self, reqId, groupName, tags):
+        """ reqAccountSummary, the future of the list of (account, tag, value,
+        currency); cancelled once complete """
+        future = self.expect(reqId, lambda: self.cancelAccountSummary(reqId))
+        if not future.done():
+            self.reqAccountSummary(reqId, groupName, tags)
+        return future
+
+    async def drain(self):
+        """ waits until the requests sent so far are (mostly) on the wire """
+        if self.protocol is not None:
+            await self.protocol.writable.wait()
+
+    async def waitClosed(self):
+        """ returns once the connection is closed, by either side """
+        if self.closed is not None:
+            await asyncio.shield(self.closed)
+
+    def run(self):
+        raise RuntimeError("the AsyncEClient is driven by its event loop, use waitClosed()")
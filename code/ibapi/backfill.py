@@ -0,0 +1,631 @@
+"""
+Resumable download of long histories of bars with reqHistoricalData.
+
+A BackfillJob (contract, barSize, whatToShow, useRTH, [start, end) in epoch
+seconds) is split into chunks the size of the longest duration TWS accepts
+for the bar size (CHUNK_SECONDS). The Backfill schedules the chunks of all
+its jobs in a priority queue: by job priority, then round robin over the
+jobs, newest chunks first. It sends them within the historical pacing
+limits of TWS (HistoricalPacer: 60 requests in any 10 minutes, no identical
+request within 15 seconds, at most 5 requests for the same contract in 2
+seconds) and with at most maxInFlight requests outstanding.
+
+    backfill = Backfill(client, "data/bars")
+    backfill.add(BackfillJob(contract, "1 min", "TRADES", start, end))
+    backfill.run()
+    bars = backfill.load(job)     # dict of numpy arrays, see columnar.BAR_COLUMNS
+
+Every chunk is written to the job directory as a .npz file of the bar
+columns, then the checkpoint.json of the job records the [start, end) range
+covered. A job added again, by the same or by a new process, only fetches
+the ranges the checkpoint does not cover: a backfill interrupted by a
+disconnect or a restart resumes where it stopped.
+
+Only the complete bars are done: the part of a chunk from the start of the
+bar still forming on (a job ending now or later) is neither written nor
+covered by the checkpoint, the job added again later fetches it.
+
+The chunks answered with a pacing violation are sent again once the pacer
+has waited for retryDelay seconds; the ones "returned no data" (week-ends,
+holidays) are covered with no bar; other errors and the chunks without an
+answer within chunkTimeout seconds are recorded in the checkpoint as
+failed and fetched again by the next run.
+
+The scheduling is in ChunkFetcher, shared with the bar_cache.BarCache: the
+subclasses decide what becomes of the bars of a chunk (chunkDone) and of its
+errors (chunkFailed).
+
+The answers of the backfill reqIds go to the Backfill through
+EClient.reqHandlers, the wrapper sees none of them. run() blocks the calling
+thread: the answers must be read by another one, EClient.run() in its
+thread. Needs numpy.
+"""
+
+import collections
+import heapq
+import itertools
+import json
+import os
+import re
+import threading
+import time
+
+from ibapi import columnar
+from ibapi.columnar import np, require_numpy
+from ibapi.common import SIZE_SCALE, UNSET_DECIMAL, SizeModeEnum
+from ibapi.request_futures import WARNING_CODES
+
+
+DAY = 86400
+
+# the seconds of each barSizeSetting
+BAR_SIZE_SECONDS = {
+    "1 secs": 1, "5 secs": 5, "10 secs": 10, "15 secs": 15, "30 secs": 30,
+    "1 min": 60, "2 mins": 120, "3 mins": 180, "5 mins": 300, "10 mins": 600,
+    "15 mins": 900, "20 mins": 1200, "30 mins": 1800,
+    "1 hour": 3600, "2 hours": 7200, "3 hours": 10800, "4 hours": 14400, "8 hours": 28800,
+    "1 day": DAY, "1 week": 7 * DAY, "1 month": 30 * DAY,
+}
+
+# the longest durationStr TWS accepts for each bar size, in seconds
+CHUNK_SECONDS = {
+    "1 secs": 1800, "5 secs": 3600, "10 secs": 14400, "15 secs": 14400, "30 secs": 28800,
+    "1 min": DAY, "2 mins": 2 * DAY, "3 mins": 7 * DAY, "5 mins": 7 * DAY,
+    "10 mins": 7 * DAY, "15 mins": 7 * DAY, "20 mins": 7 * DAY, "30 mins": 30 * DAY,
+    "1 hour": 30 * DAY, "2 hours": 30 * DAY, "3 hours": 30 * DAY, "4 hours": 30 * DAY,
+    "8 hours": 30 * DAY, "1 day": 365 * DAY, "1 week": 365 * DAY, "1 month": 365 * DAY,
+}
+
+# the historical pacing limits of TWS
+MAX_REQUESTS = 60
+MAX_REQUESTS_SECONDS = 600.
+IDENTICAL_SECONDS = 15.
+SAME_CONTRACT_REQUESTS = 5
+SAME_CONTRACT_SECONDS = 2.
+
+DEFAULT_FIRST_REQ_ID = (1 << 30) + (1 << 29)
+DEFAULT_MAX_IN_FLIGHT = 10
+DEFAULT_CHUNK_TIMEOUT = 120.
+DEFAULT_RETRY_DELAY = 30.
+
+HMDS_ERROR = 162       # pacing violations, no data, ...
+
+# the queued chunks looked at for one that the pacing allows
+MAX_SKIPPED = 32
+
+
+def duration_str(seconds):
+    """ seconds as a durationStr, in the largest unit that divides it. Not in
+    "M" nor "Y", which TWS takes as calendar months and years: "1 M" from
+    March 31 back is 31 days, more than the chunk """
+    for (unit, size) in (("W", 7 * DAY), ("D", DAY)):
+        if seconds % size == 0:
+            return "%d %s" % (seconds // size, unit)
+    return "%d S" % seconds
+
+
+def request_duration(seconds, barSize):
+    """ the durationStr of a request for seconds of bars: the seconds up to a
+    day, whole days above, at most the chunk size of barSize """
+    if seconds > DAY:
+        seconds = -(-seconds // DAY) * DAY
+    return duration_str(min(seconds, CHUNK_SECONDS[barSize]))
+
+
+def end_date_time(epoch):
+    """ an epoch as an endDateTime, in UTC """
+    return time.strftime("%Y%m%d-%H:%M:%S", time.gmtime(epoch))
+
+
+def merge_ranges(ranges):
+    """ the [start, end) ranges sorted and merged where they overlap or touch """
+    merged = []
+    for (start, end) in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [tuple(r) for r in merged]
+
+
+def subtract_ranges(start, end, covered):
+    """ the parts of [start, end) not in the merged ranges covered """
+    gaps = []
+    for (coveredStart, coveredEnd) in covered:
+        if coveredEnd <= start:
+            continue
+        if coveredStart >= end:
+            break
+        if coveredStart > start:
+            gaps.append((start, coveredStart))
+        start = max(start, coveredEnd)
+    if start < end:
+        gaps.append((start, end))
+    return gaps
+
+
+def chunk_ranges(start, end, barSize):
+    """ [start, end) split into the ranges of legal requests, newest first """
+    size = CHUNK_SECONDS[barSize]
+    chunks = []
+    while end > start:
+        chunks.append((max(start, end - size), end))
+        end -= size
+    return chunks
+
+
+def empty_bars():
+    return {name: np.empty(0, dtype=np.int64 if name in ("date", "barCount") else np.float64)
+            for name in columnar.BAR_COLUMNS}
+
+
+def concat_bars(parts):
+    """ the bars of parts, dicts of columns, sorted by date without duplicates,
+    the last part wins """
+    parts = [bars for bars in parts if len(bars["date"])]
+    if not parts:
+        return empty_bars()
+    bars = {name: np.concatenate([part[name] for part in parts]) for name in columnar.BAR_COLUMNS}
+    # the last occurrence of each date, in date order
+    dates = bars["date"][::-1]
+    (_, idx) = np.unique(dates, return_index=True)
+    idx = len(dates) - 1 - idx
+    return {name: column[idx] for (name, column) in bars.items()}
+
+
+def clip_bars(bars, start, end):
+    mask = (bars["date"] >= start) & (bars["date"] < end)
+    return {name: column[mask] for (name, column) in bars.items()}
+
+
+def bar_objects_columns(barList, sizeMode=SizeModeEnum.DECIMAL):
+    """ the BarData of historicalData() callbacks as columns, their volume
+    decoded in sizeMode """
+    # UNSET_DECIMAL, UNSET_DOUBLE, UNSET_LONG
+    unset = columnar.UNSET_DECIMAL_FLOATS + (float(UNSET_DECIMAL), )
+
+    def decimals(values, scale=1):
+        column = np.array([float(value) for value in values], dtype=np.float64)
+        column[np.isin(column, unset)] = np.nan
+        if scale != 1:
+            column /= scale
+        return column
+
+    return {
+        "date": columnar.parse_bar_dates([bar.date.encode() for bar in barList]),
+        "open": np.array([bar.open for bar in barList], dtype=np.float64),
+        "high": np.array([bar.high for bar in barList], dtype=np.float64),
+        "low": np.array([bar.low for bar in barList], dtype=np.float64),
+        "close": np.array([bar.close for bar in barList], dtype=np.float64),
+        "volume": decimals((bar.volume for bar in barList),
+                           SIZE_SCALE if sizeMode == SizeModeEnum.SCALED_INT else 1),
+        "wap": decimals(bar.wap for bar in barList),
+        "barCount": np.array([bar.barCount for bar in barList], dtype=np.int64),
+    }
+
+
+def write_atomic(path, write):
+    """ write(file) into a temporary file renamed to path once complete """
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        write(f)
+    os.replace(tmp, path)
+
+
+class HistoricalPacer:
+    def __init__(self, maxRequests=MAX_REQUESTS, seconds=MAX_REQUESTS_SECONDS,
+                 identicalSeconds=IDENTICAL_SECONDS, sameContractRequests=SAME_CONTRACT_REQUESTS,
+                 sameContractSeconds=SAME_CONTRACT_SECONDS, slack=0.5, clock=time.monotonic):
+        """maxRequests:int - requests in any seconds:float, at most
+        identicalSeconds:float - min seconds between identical requests
+        sameContractRequests:int - requests for the same contract and
+            whatToShow in any sameContractSeconds:float, at most
+        slack:float - seconds added to every wait, for the clock of TWS
+        clock - the time source, in seconds"""
+
+        self.maxRequests = maxRequests
+        self.seconds = seconds
+        self.identicalSeconds = identicalSeconds
+        self.sameContractRequests = sameContractRequests
+        self.sameContractSeconds = sameContractSeconds
+        self.slack = slack
+        self.clock = clock
+        self.times = collections.deque()    # of the last requests
+        self.contractTimes = {}             # contractKey -> deque of the last requests
+        self.requestTimes = {}              # requestKey -> time of the last one
+        self.blockedUntil = 0.
+
+    def prune(self, now):
+        while self.times and self.times[0] + self.seconds + self.slack <= now:
+            self.times.popleft()
+        for (key, times) in list(self.contractTimes.items()):
+            while times and times[0] + self.sameContractSeconds + self.slack <= now:
+                times.popleft()
+            if not times:
+                del self.contractTimes[key]
+        for (key, last) in list(self.requestTimes.items()):
+            if last + self.identicalSeconds + self.slack <= now:
+                del self.requestTimes[key]
+
+    def delay(self, contractKey=None, requestKey=None, now=None):
+        """ the seconds to wait before sending the request, 0 if it may be
+        sent now; without keys only the limits of all the requests """
+        now = self.clock() if now is None else now
+        self.prune(now)
+        wait = self.blockedUntil - now
+        if len(self.times) >= self.maxRequests:
+            wait = max(wait, self.times[-self.maxRequests] + self.seconds + self.slack - now)
+        times = self.contractTimes.get(contractKey)
+        if times is not None and len(times) >= self.sameContractRequests:
+            wait = max(wait, times[-self.sameContractRequests] + self.sameContractSeconds
+                       + self.slack - now)
+        last = self.requestTimes.get(requestKey)
+        if last is not None:
+            wait = max(wait, last + self.identicalSeconds + self.slack - now)
+        return max(wait, 0.)
+
+    def record(self, contractKey, requestKey, now=None):
+        """ counts a request sent at now """
+        now = self.clock() if now is None else now
+        self.times.append(now)
+        self.contractTimes.setdefault(contractKey, collections.deque()).append(now)
+        self.requestTimes[requestKey] = now
+
+    def block(self, seconds, now=None):
+        """ no request for seconds, after a pacing violation """
+        now = self.clock() if now is None else now
+        self.blockedUntil = max(self.blockedUntil, now + seconds)
+
+
+class BackfillJob:
+    def __init__(self, contract, barSize, whatToShow, start, end, useRTH=1, priority=0,
+                 name=None):
+        """contract - the Contract, with a conId preferably
+        barSize:str - a barSizeSetting of BAR_SIZE_SECONDS
+        whatToShow:str - TRADES, MIDPOINT, BID, ASK, ...
+        start, end:int - the range of the bars, epoch seconds
+        useRTH:int - 1 for the regular trading hours only
+        priority:int - the jobs of lower priority go first
+        name:str - the directory of the job, by default from the contract
+            and the parameters"""
+
+        if barSize not in CHUNK_SECONDS:
+            raise ValueError("unknown barSize %r" % barSize)
+        self.contract = contract
+        self.barSize = barSize
+        self.whatToShow = whatToShow
+        step = BAR_SIZE_SECONDS[barSize]
+        # whole bars
+        self.start = int(start) // step * step
+        self.end = -(-int(end) // step) * step
+        self.useRTH = useRTH
+        self.priority = priority
+        if name is None:
+            name = "%s_%s_%s_%s_%d" % (contract.conId or contract.symbol, contract.secType,
+                                       barSize.replace(" ", ""), whatToShow, useRTH)
+        self.name = re.sub(r"[^\w.-]", "_", name)
+
+    def contractKey(self):
+        """ the key of the same contract limit: contract, exchange and whatToShow """
+        contract = self.contract
+        return (contract.conId or contract.symbol, contract.secType, contract.exchange,
+                self.whatToShow)
+
+    def spec(self):
+        """ the parameters of the job, kept in its checkpoint """
+        return {"conId": self.contract.conId, "symbol": self.contract.symbol,
+                "secType": self.contract.secType, "exchange": self.contract.exchange,
+                "barSize": self.barSize, "whatToShow": self.whatToShow,
+                "useRTH": self.useRTH}
+
+
+class Chunk:
+    __slots__ = ("job", "start", "end", "reqId", "sent", "barList", "bars", "error")
+
+    def __init__(self, job, start, end):
+        self.job = job
+        self.start = start
+        self.end = end
+        self.reqId = None
+        self.sent = None            # monotonic time
+        self.barList = []           # BarData of the historicalData() calls
+        self.bars = None            # columns of historicalDataBatch()
+        self.error = None           # (errorCode, errorString)
+
+    def requestKey(self):
+        return self.job.contractKey() + (self.end, self.job.barSize, self.job.useRTH)
+
+
+class Checkpoint:
+    """ the ranges of a job already downloaded, in the checkpoint.json of its
+    directory """
+
+    def __init__(self, directory, job):
+        self.path = os.path.join(directory, "checkpoint.json")
+        self.spec = job.spec()
+        self.done = []              # merged [start, end) ranges
+        self.failed = {}            # (start, end) -> (errorCode, errorString)
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                state = json.load(f)
+            self.done = [tuple(r) for r in state["done"]]
+            self.failed = {(start, end): (code, msg)
+                           for (start, end, code, msg) in state["failed"]}
+
+    def save(self):
+        state = {"spec": self.spec, "done": self.done,
+                 "failed": [[start, end, code, msg]
+                            for ((start, end), (code, msg)) in sorted(self.failed.items())]}
+        write_atomic(self.path, lambda f: f.write(json.dumps(state, indent=1).encode()))
+
+    def addDone(self, start, end):
+        self.done = merge_ranges(self.done + [(start, end)])
+        self.failed.pop((start, end), None)
+
+    def addFailed(self, start, end, errorCode, errorString):
+        self.failed[(start, end)] = (errorCode, errorString)
+
+
+class ChunkFetcher:
+    """ the scheduling of the chunks: priority queue, pacing, reqIds, answers;
+    what is done with the bars answered is up to the subclass """
+
+    def __init__(self, client, pacer=None, maxInFlight=DEFAULT_MAX_IN_FLIGHT,
+                 chunkTimeout=DEFAULT_CHUNK_TIMEOUT, retryDelay=DEFAULT_RETRY_DELAY,
+                 firstReqId=DEFAULT_FIRST_REQ_ID, clock=time.time):
+        """client - a connected EClient, its run() going in another thread
+        pacer - a HistoricalPacer, the TWS limits by default
+        maxInFlight:int - requests sent and not answered yet, at most
+        chunkTimeout:float - seconds to wait for the answer of a chunk
+        retryDelay:float - seconds without request after a pacing violation
+        firstReqId:int - the first reqId used
+        clock - the current epoch time, in seconds"""
+
+        require_numpy(type(self).__name__)
+        self.client = client
+        self.pacer = pacer if pacer is not None else HistoricalPacer()
+        self.maxInFlight = maxInFlight
+        self.chunkTimeout = chunkTimeout
+        self.retryDelay = retryDelay
+        self.clock = clock
+        self.reqIds = itertools.count(firstReqId)
+        self.seq = itertools.count()
+        self.cond = threading.Condition()
+        self.queue = []             # heap of (priority, round, seq, Chunk)
+        self.reqId2chunk = {}       # the chunks in flight
+        self.answered = collections.deque()     # chunks answered, to store
+        self.jobs = {}              # job name -> BackfillJob
+
+    def queueGaps(self, job, gaps):
+        """ queues the chunks of the [start, end) ranges gaps of job,
+        returns their number """
+        with self.cond:
+            self.jobs[job.name] = job
+            n = 0
+            for (gapStart, gapEnd) in reversed(gaps):
+                for (start, end) in chunk_ranges(gapStart, gapEnd, job.barSize):
+                    heapq.heappush(self.queue, (job.priority, n, next(self.seq),
+                                                Chunk(job, start, end)))
+                    n += 1
+            self.cond.notify_all()
+        return n
+
+    def pending(self):
+        """ the number of chunks queued or in flight """
+        with self.cond:
+            return len(self.queue) + len(self.reqId2chunk) + len(self.answered)
+
+    def run(self, timeout=None):
+        """Downloads the queued chunks, returns True once all are done or
+        failed, False on timeout or if the client got disconnected."""
+
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self.store()
+            with self.cond:
+                if not (self.queue or self.reqId2chunk or self.answered):
+                    return True
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    return False
+                if not self.client.isConnected():
+                    self.requeueInFlight()
+                    return False
+                self.expire(now)
+                wait = self.sendAllowed(now)
+                if deadline is not None:
+                    wait = min(wait, deadline - now)
+                if not self.answered:
+                    self.cond.wait(max(wait, 0.))
+
+    def sendAllowed(self, now):
+        """ sends the chunks the pacing allows, returns the seconds until
+        something is to be done """
+        wait = 0.5
+        skipped = []
+        while self.queue and len(self.reqId2chunk) < self.maxInFlight:
+            globalWait = self.pacer.delay(now=now)
+            if globalWait > 0:
+                wait = min(wait, globalWait)
+                break
+            item = heapq.heappop(self.queue)
+            chunk = item[-1]
+            contractKey = chunk.job.contractKey()
+            chunkWait = self.pacer.delay(contractKey, chunk.requestKey(), now)
+            if chunkWait > 0:
+                # another job may go before
+                skipped.append(item)
+                wait = min(wait, chunkWait)
+                if len(skipped) >= MAX_SKIPPED:
+                    break
+                continue
+            self.pacer.record(contractKey, chunk.requestKey(), now)
+            self.send(chunk, now)
+        for item in skipped:
+            heapq.heappush(self.queue, item)
+        return wait
+
+    def send(self, chunk, now):
+        job = chunk.job
+        chunk.reqId = next(self.reqIds)
+        chunk.sent = now
+        (chunk.barList, chunk.bars, chunk.error) = ([], None, None)
+        self.reqId2chunk[chunk.reqId] = chunk
+        self.client.reqHandlers[chunk.reqId] = self
+        self.client.reqHistoricalData(
+            chunk.reqId, job.contract, end_date_time(chunk.end),
+            request_duration(chunk.end - chunk.start, job.barSize), job.barSize, job.whatToShow,
+            job.useRTH, 2, False, [])
+
+    def expire(self, now):
+        for chunk in list(self.reqId2chunk.values()):
+            if now - chunk.sent >= self.chunkTimeout:
+                self.client.cancelHistoricalData(chunk.reqId)
+                self.finish(chunk.reqId, (-1, "No answer before the timeout"))
+
+    def requeueInFlight(self):
+        for chunk in self.reqId2chunk.values():
+            self.client.reqHandlers.pop(chunk.reqId, None)
+            heapq.heappush(self.queue, (chunk.job.priority, -1, next(self.seq), chunk))
+        self.reqId2chunk.clear()
+
+    def finish(self, reqId, error=None):
+        self.client.reqHandlers.pop(reqId, None)
+        chunk = self.reqId2chunk.pop(reqId, None)
+        if chunk is None:
+            return
+        chunk.error = error
+        if error is not None and error[0] == HMDS_ERROR and "pacing" in error[1].lower():
+            self.pacer.block(self.retryDelay)
+            heapq.heappush(self.queue, (chunk.job.priority, -1, next(self.seq), chunk))
+        else:
+            self.answered.append(chunk)
+        self.cond.notify_all()
+
+    def store(self):
+        """ hands the chunks answered to chunkDone() or chunkFailed(), from run() """
+        while True:
+            with self.cond:
+                if not self.answered:
+                    return
+                chunk = self.answered.popleft()
+            error = chunk.error
+            if error is None:
+                bars = chunk.bars if chunk.bars is not None else bar_objects_columns(
+                    chunk.barList, self.client.sizeMode)
+            elif error[0] == HMDS_ERROR and "no data" in error[1].lower():
+                bars = None
+            else:
+                self.chunkFailed(chunk, error)
+                continue
+            # the bar still forming and the future are not done
+            step = BAR_SIZE_SECONDS[chunk.job.barSize]
+            end = min(chunk.end, int(self.clock()) // step * step)
+            if bars is not None and end < chunk.end:
+                self.chunkIncomplete(chunk, end, clip_bars(bars, end, chunk.end))
+            if end > chunk.start:
+                self.chunkDone(chunk, end, None if bars is None else
+                               clip_bars(bars, chunk.start, end))
+
+    def chunkDone(self, chunk, end, bars):
+        """ the bars of [chunk.start, end), the complete ones of chunk, as
+        columns, None if TWS has none """
+        raise NotImplementedError
+
+    def chunkIncomplete(self, chunk, end, bars):
+        """ the bars of chunk from end on, the one still forming; not done,
+        requested again by the next add of the range """
+
+    def chunkFailed(self, chunk, error):
+        """ chunk got error (errorCode, errorString) """
+        raise NotImplementedError
+
+    # the answers, called by the Decoder
+
+    def historicalData(self, reqId, bar):
+        with self.cond:
+            chunk = self.reqId2chunk.get(reqId)
+            if chunk is not None:
+                chunk.barList.append(bar)
+
+    def historicalDataBatch(self, reqId, bars):
+        with self.cond:
+            chunk = self.reqId2chunk.get(reqId)
+            if chunk is not None:
+                chunk.bars = bars
+
+    def historicalDataEnd(self, reqId, start, end):
+        with self.cond:
+            self.finish(reqId)
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        if errorCode in WARNING_CODES:
+            return
+        with self.cond:
+            self.finish(reqId, (errorCode, errorString))
+
+
+class Backfill(ChunkFetcher):
+    def __init__(self, client, directory, pacer=None, maxInFlight=DEFAULT_MAX_IN_FLIGHT,
+                 chunkTimeout=DEFAULT_CHUNK_TIMEOUT, retryDelay=DEFAULT_RETRY_DELAY,
+                 firstReqId=DEFAULT_FIRST_REQ_ID, clock=time.time):
+        """client, pacer, maxInFlight, chunkTimeout, retryDelay, firstReqId,
+            clock - see ChunkFetcher
+        directory - where the jobs have their directory"""
+
+        super().__init__(client, pacer, maxInFlight, chunkTimeout, retryDelay, firstReqId,
+                         clock)
+        self.directory = directory
+        self.checkpoints = {}       # job name -> Checkpoint
+
+    def jobDirectory(self, job):
+        return os.path.join(self.directory, job.name)
+
+    def add(self, job):
+        """ queues the chunks of job not downloaded yet, returns their number """
+        directory = self.jobDirectory(job)
+        os.makedirs(directory, exist_ok=True)
+        checkpoint = Checkpoint(directory, job)
+        # the failed chunks are in the gaps, queued again
+        checkpoint.failed.clear()
+        with self.cond:
+            self.checkpoints[job.name] = checkpoint
+        return self.queueGaps(job, subtract_ranges(job.start, job.end, checkpoint.done))
+
+    def chunkDone(self, chunk, end, bars):
+        """ writes the bars of chunk, then its checkpoint """
+        job = chunk.job
+        if bars is not None:
+            path = os.path.join(self.jobDirectory(job), "bars-%d-%d.npz" % (chunk.start, end))
+            write_atomic(path, lambda f: np.savez(f, **bars))
+        with self.cond:
+            checkpoint = self.checkpoints[job.name]
+            checkpoint.addDone(chunk.start, end)
+            checkpoint.save()
+
+    def chunkFailed(self, chunk, error):
+        with self.cond:
+            checkpoint = self.checkpoints[chunk.job.name]
+            checkpoint.addFailed(chunk.start, chunk.end, *error)
+            checkpoint.save()
+
+    def progress(self, job):
+        """ (covered seconds, total seconds, failed chunks) of job """
+        with self.cond:
+            checkpoint = self.checkpoints[job.name]
+            covered = sum(min(end, job.end) - max(start, job.start)
+                          for (start, end) in checkpoint.done
+                          if end > job.start and start < job.end)
+            return (covered, job.end - job.start, len(checkpoint.failed))
+
+    def load(self, job):
+        """ the bars of job downloaded so far, as a dict of columns sorted
+        by date """
+        directory = self.jobDirectory(job)
+        parts = []
+        for name in sorted(os.listdir(directory)):
+            if name.startswith("bars-") and name.endswith(".npz"):
+                with np.load(os.path.join(directory, name)) as data:
+                    parts.append({column: data[column] for column in columnar.BAR_COLUMNS})
+        return clip_bars(concat_bars(parts), job.start, job.end)
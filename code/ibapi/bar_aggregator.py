@@ -0,0 +1,162 @@
+"""
+Incremental bars from the tick-by-tick streams of reqTickByTickData, so the
+1s/1m bars of a subscription do not need extra historical or real time bar
+requests with their round trips and pacing.
+
+A TickBarAggregator takes the tickByTickAllLast, tickByTickBidAsk and
+tickByTickMidPoint callbacks (forward them from the EWrapper) and updates,
+in the same pass over each tick, the open bar of every configured interval:
+a handful of float operations per interval, whatever the length of the bar.
+A bar is complete when the first tick of a later interval arrives (or on
+flush()); it is then appended to a fixed capacity ring of columns
+(BAR_COLUMNS) and passed to the optional onBar callback.
+
+Trades (Last/AllLast) make OHLCV bars with their VWAP. The bid/ask ticks
+are aggregated on their midpoint and, like the midpoint ticks, make bars
+without volume, their count being the number of quotes.
+"""
+
+import math
+
+from ibapi.columnar import np, require_numpy
+from ibapi.common import SizeModeEnum, size_float
+from ibapi.ring import Ring
+
+
+BAR_COLUMNS = (("time", np.int64), ("open", np.float64), ("high", np.float64),
+               ("low", np.float64), ("close", np.float64), ("volume", np.float64),
+               ("wap", np.float64), ("count", np.int64)) if np is not None else None
+
+
+class OpenBar:
+    """ the bar being built, plain Python numbers for the per tick work """
+
+    __slots__ = ("start", "open", "high", "low", "close", "volume", "pv", "count")
+
+    def __init__(self, start, open_, high, low, close, volume, pv, count):
+        self.start = start
+        self.open = open_
+        self.high = high
+        self.low = low
+        self.close = close
+        self.volume = volume
+        self.pv = pv
+        self.count = count
+
+    def wap(self):
+        return self.pv / self.volume if self.volume > 0 else math.nan
+
+    def row(self):
+        return (self.start, self.open, self.high, self.low, self.close, self.volume,
+                self.wap(), self.count)
+
+
+class BarBuilder:
+    """ the bars of one interval of one stream """
+
+    def __init__(self, interval, capacity):
+        self.interval = interval
+        self.bar = None
+        self.bars = Ring(capacity, BAR_COLUMNS)
+
+    def add(self, time, price, size):
+        """ adds a tick, returns the bar it completes or None """
+        start = time - time % self.interval
+        bar = self.bar
+        if bar is not None and bar.start == start:
+            if price > bar.high:
+                bar.high = price
+            elif price < bar.low:
+                bar.low = price
+            bar.close = price
+            bar.volume += size
+            bar.pv += price * size
+            bar.count += 1
+            return None
+        self.bar = OpenBar(start, price, price, price, price, size, price * size, 1)
+        if bar is not None:
+            self.bars.append(*bar.row())
+        return bar
+
+    def flush(self):
+        """ completes the open bar, returns it or None """
+        bar = self.bar
+        if bar is not None:
+            self.bars.append(*bar.row())
+            self.bar = None
+        return bar
+
+
+class TickBarAggregator:
+    def __init__(self, intervals=(1, 60), capacity=4096, onBar=None,
+                 sizeMode=SizeModeEnum.DECIMAL):
+        """intervals - the bar lengths in seconds
+        capacity:int - completed bars kept per reqId and interval
+        onBar - called as onBar(reqId, interval, time, open, high, low,
+            close, volume, wap, count) for every completed bar, time being
+            the start of the bar in epoch seconds like realtimeBar()
+        sizeMode:SizeMode - the one of the client (EClient.setSizeMode), an
+            unset trade size counts as 0"""
+
+        require_numpy("TickBarAggregator")
+        if not intervals or min(intervals) <= 0:
+            raise ValueError("intervals must be positive")
+        self.intervals = tuple(intervals)
+        self.capacity = capacity
+        self.onBar = onBar
+        self.sizeMode = sizeMode
+        self.builders = {}      # reqId -> [BarBuilder per interval]
+
+    def streamBuilders(self, reqId):
+        builders = self.builders.get(reqId)
+        if builders is None:
+            builders = self.builders[reqId] = [BarBuilder(interval, self.capacity)
+                                               for interval in self.intervals]
+        return builders
+
+    def addTick(self, reqId, time, price, size=0.):
+        """ the tick of a stream, time in epoch seconds """
+        onBar = self.onBar
+        for builder in self.streamBuilders(reqId):
+            bar = builder.add(time, price, size)
+            if bar is not None and onBar is not None:
+                onBar(reqId, builder.interval, *bar.row())
+
+    def tickByTickAllLast(self, reqId, tickType, time, price, size, tickAttribLast=None,
+                          exchange="", specialConditions=""):
+        self.addTick(reqId, time, price, size_float(size, self.sizeMode, 0.))
+
+    def tickByTickBidAsk(self, reqId, time, bidPrice, askPrice, bidSize=None, askSize=None,
+                         tickAttribBidAsk=None):
+        self.addTick(reqId, time, (bidPrice + askPrice) / 2)
+
+    def tickByTickMidPoint(self, reqId, time, midPoint):
+        self.addTick(reqId, time, midPoint)
+
+    def flush(self, reqId=None):
+        """ completes the open bars, of reqId or of every stream; to call
+        after cancelTickByTickData or at the end of the session """
+        reqIds = list(self.builders) if reqId is None else [reqId]
+        for reqId in reqIds:
+            for builder in self.builders.get(reqId, ()):
+                bar = builder.flush()
+                if bar is not None and self.onBar is not None:
+                    self.onBar(reqId, builder.interval, *bar.row())
+
+    def bars(self, reqId, interval, n=None):
+        """ the last n (all by default) completed bars of reqId at interval,
+        oldest first, as a dict of the BAR_COLUMNS arrays """
+        for builder in self.builders.get(reqId, ()):
+            if builder.interval == interval:
+                return builder.bars.tail(n)
+        if interval not in self.intervals:
+            raise ValueError("no %s s interval" % interval)
+        return {name: np.empty(0, dtype=dtype) for (name, dtype) in BAR_COLUMNS}
+
+    def current(self, reqId, interval):
+        """ the open bar as (time, open, high, low, close, volume, wap,
+        count), None if there is none """
+        for builder in self.builders.get(reqId, ()):
+            if builder.interval == interval and builder.bar is not None:
+                return builder.bar.row()
+        return None
@@ -0,0 +1,151 @@
+"""
+Local cache of historical bars: reqHistoricalData only for what is missing.
+
+A series is the bars of one (conId, barSize, whatToShow, useRTH). The cache
+keeps, for every series, the bars downloaded so far and the [start, end)
+ranges they cover, in one .npz file of its directory: the columns of
+columnar.BAR_COLUMNS and the "covered" ranges, uncompressed numpy arrays.
+
+    cache = BarCache(client, "data/bar_cache")
+    bars = cache.get(contract, "5 mins", "TRADES", start, end, timeout=30)
+
+get() subtracts the covered ranges from [start, end) and requests only the
+gaps, in chunks paced like the backfill.Backfill does (they share the
+ChunkFetcher), merges the answers into the series, writes it and returns its
+bars in [start, end) as a dict of columns sorted by date. A second get() of
+the same range sends no request at all, a longer one only the new parts.
+The ranges TWS "returned no data" for (week-ends, holidays) are covered too.
+
+Only the complete bars are cached: the part of a range after the start of
+the current bar is in the answer but requested again by the next get().
+
+The contracts need their conId (qualifier.ContractQualifier). get() blocks
+the calling thread, the answers are read by EClient.run() in another one,
+and the calls of several threads are served one after the other. The
+chunks not answered are in the errors of the get(), the bars returned lack
+their range. Needs numpy.
+"""
+
+import os
+import threading
+import time
+
+from ibapi import columnar
+from ibapi.backfill import (DEFAULT_CHUNK_TIMEOUT, DEFAULT_MAX_IN_FLIGHT, DEFAULT_RETRY_DELAY,
+                            BackfillJob, ChunkFetcher, clip_bars, concat_bars, empty_bars,
+                            merge_ranges, subtract_ranges, write_atomic)
+from ibapi.columnar import np
+from ibapi.errors import NOT_CONNECTED
+
+
+DEFAULT_FIRST_REQ_ID = (1 << 30) + (1 << 29) + (1 << 28)
+
+
+class CachedSeries:
+    """ the bars of a series and the ranges they cover, in path """
+
+    def __init__(self, path):
+        self.path = path
+        self.bars = empty_bars()
+        self.covered = []           # merged [start, end) ranges
+        self.changed = False
+        if os.path.exists(path):
+            with np.load(path) as data:
+                self.bars = {name: data[name] for name in columnar.BAR_COLUMNS}
+                self.covered = [tuple(r) for r in data["covered"].tolist()]
+
+    def add(self, start, end, bars):
+        """ the bars of [start, end), None for none """
+        if bars is not None and len(bars["date"]):
+            self.bars = concat_bars([self.bars, bars])
+        self.covered = merge_ranges(self.covered + [(start, end)])
+        self.changed = True
+
+    def save(self):
+        if not self.changed:
+            return
+        covered = np.array(self.covered, dtype=np.int64).reshape(-1, 2)
+        write_atomic(self.path, lambda f: np.savez(f, covered=covered, **self.bars))
+        self.changed = False
+
+
+class BarCache(ChunkFetcher):
+    def __init__(self, client, directory, pacer=None, maxInFlight=DEFAULT_MAX_IN_FLIGHT,
+                 chunkTimeout=DEFAULT_CHUNK_TIMEOUT, retryDelay=DEFAULT_RETRY_DELAY,
+                 firstReqId=DEFAULT_FIRST_REQ_ID, clock=time.time):
+        """client, pacer, maxInFlight, chunkTimeout, retryDelay, firstReqId,
+            clock - see backfill.ChunkFetcher
+        directory - where the series are written"""
+
+        super().__init__(client, pacer, maxInFlight, chunkTimeout, retryDelay, firstReqId,
+                         clock)
+        self.directory = directory
+        self.lock = threading.Lock()    # one get() at a time
+        self.series = {}            # job name -> CachedSeries
+        self.uncached = []          # bars after the last complete one, of the get()
+        self.errors = []            # (start, end, errorCode, errorString) of the last get()
+        os.makedirs(directory, exist_ok=True)
+
+    def job(self, contract, barSize, whatToShow, start, end, useRTH):
+        if not contract.conId:
+            raise ValueError("%s: no conId, qualify the contract first" % contract.symbol)
+        return BackfillJob(contract, barSize, whatToShow, start, end, useRTH,
+                           name="%d_%s_%s_%d" % (contract.conId, barSize.replace(" ", ""),
+                                                 whatToShow, useRTH))
+
+    def seriesOf(self, job):
+        series = self.series.get(job.name)
+        if series is None:
+            series = self.series[job.name] = CachedSeries(
+                os.path.join(self.directory, job.name + ".npz"))
+        return series
+
+    def gaps(self, contract, barSize, whatToShow, start, end, useRTH=1):
+        """ the [start, end) ranges get() would request """
+        job = self.job(contract, barSize, whatToShow, start, end, useRTH)
+        with self.lock:
+            return subtract_ranges(job.start, job.end, self.seriesOf(job).covered)
+
+    def get(self, contract, barSize, whatToShow, start, end, useRTH=1, timeout=None):
+        """The bars of contract in [start, end), epoch seconds, as a dict of
+        columns sorted by date. Requests the gaps of the cache, waiting at
+        most timeout seconds (None for no limit) for them; the ones that
+        failed are in self.errors."""
+
+        job = self.job(contract, barSize, whatToShow, start, end, useRTH)
+        with self.lock:
+            series = self.seriesOf(job)
+            (self.uncached, self.errors) = ([], [])
+            if self.queueGaps(job, subtract_ranges(job.start, job.end, series.covered)):
+                if not self.run(timeout):
+                    self.store()
+                    self.abandon()
+                series.save()
+            return clip_bars(concat_bars([series.bars] + self.uncached), job.start, job.end)
+
+    def abandon(self):
+        """ gives up the chunks queued and in flight, after a timeout or a
+        disconnect """
+        connected = self.client.isConnected()
+        codeMsg = (-1, "No answer before the timeout") if connected else (
+            NOT_CONNECTED.code(), NOT_CONNECTED.msg())
+        with self.cond:
+            for chunk in self.reqId2chunk.values():
+                self.client.reqHandlers.pop(chunk.reqId, None)
+                if connected:
+                    self.client.cancelHistoricalData(chunk.reqId)
+            chunks = list(self.reqId2chunk.values()) + [item[-1] for item in self.queue]
+            self.reqId2chunk.clear()
+            self.queue.clear()
+        for chunk in chunks:
+            self.chunkFailed(chunk, codeMsg)
+
+    def chunkDone(self, chunk, end, bars):
+        self.seriesOf(chunk.job).add(chunk.start, end, bars)
+
+    def chunkIncomplete(self, chunk, end, bars):
+        """ keeps the bars not cached for the answer """
+        self.uncached.append(bars)
+
+    def chunkFailed(self, chunk, error):
+        self.errors.append((chunk.start, chunk.end) + tuple(error))
@@ -17,8 +17,10 @@ import logging
 import queue
 import socket
 
-from ibapi import (decoder, reader, comm)
-from ibapi.connection import Connection
+from ibapi import (decoder, reader, writer, comm, columnar)
+from ibapi.connection import Connection, SelectorConnection, DEFAULT_RECV_BUF_SIZE
+from ibapi.decode_plan import size_converter
+from ibapi.encode_plan import compile_place_order, compile_req_mkt_data
 from ibapi.message import OUT
 from ibapi.common import * # @UnusedWildImport
 from ibapi.contract import Contract
@@ -45,6 +47,19 @@ class EClient(object):
         self.msg_queue = queue.Queue()
         self.wrapper = wrapper
         self.decoder = None
+        self.useSelector = True
+        self.recvBufSize = DEFAULT_RECV_BUF_SIZE
+        self.historicalDataBatch = False
+        self.historicalTicksArrays = False
+        self.sizeMode = SizeModeEnum.DECIMAL
+        self.instrumentation = None
+        self.recorder = None
+        self.contractCache = None
+        self.reqHandlers = {}       # reqId or POSITIONS_HANDLER -> object answered instead of the wrapper
+        self.dispatchMode = DispatchModeEnum.QUEUE
+        self.writeQueue = False
+        self.msgRate = writer.DEFAULT_MSG_RATE
+        self.msgBurst = writer.DEFAULT_BURST
         self.reset()
 
 
@@ -61,9 +76,14 @@ class EClient(object):
         self.optCapab = ""
         self.asynchronous = False
         self.reader = None
+        self.writer = None
         self.decode = None
+        self.placeOrderEncoder = None
+        self.reqMktDataEncoder = None
         self.setConnState(EClient.DISCONNECTED)
         self.connectionOptions = None
+        if self.contractCache is not None:
+            self.contractCache.dropPending()
 
 
     def setConnState(self, connState):
@@ -74,8 +94,27 @@ class EClient(object):
 
     def sendMsg(self, msg):
         full_msg = comm.make_msg(msg)
-        logger.info("%s %s %s", "SENDING", current_fn_name(1), full_msg)
-        self.conn.sendMsg(full_msg)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s %s %s", "SENDING", current_fn_name(1), full_msg)
+        if self.writer is not None:
+            self.writer.put(full_msg)
+        else:
+            self.conn.sendMsg(full_msg)
+
+    def sendFramedMsg(self, full_msg):
+        """ sends a message that already has its length prefix """
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("%s %s %s", "SENDING", current_fn_name(1), full_msg)
+        if self.writer is not None:
+            self.writer.put(full_msg)
+        else:
+            self.conn.sendMsg(full_msg)
+
+    def compileEncoders(self):
+        """ specializes the encoding of the heavy requests for the server
+        version, see ibapi.encode_plan """
+        self.placeOrderEncoder = compile_place_order(self.serverVersion())
+        self.reqMktDataEncoder = compile_req_mkt_data(self.serverVersion())
 
 
     def logRequest(self, fnName, fnParams):
@@ -138,7 +177,10 @@ class EClient(object):
             self.clientId = clientId
             logger.debug("Connecting to %s:%d w/ id:%d", self.host, self.port, self.clientId)
 
-            self.conn = Connection(self.host, self.port)
+            if self.useSelector:
+                self.conn = SelectorConnection(self.host, self.port, self.recvBufSize)
+            else:
+                self.conn = Connection(self.host, self.port)
 
             self.conn.connect()
             self.setConnState(EClient.CONNECTING)
@@ -158,7 +200,14 @@ class EClient(object):
             logger.debug("REQUEST %s", msg2)
             self.conn.sendMsg(msg2)
 
-            self.decoder = decoder.Decoder(self.wrapper, self.serverVersion())
+            self.decoder = decoder.Decoder(self.wrapper, self.serverVersion(),
+                                           historicalDataBatch=self.historicalDataBatch,
+                                           historicalTicksArrays=self.historicalTicksArrays,
+                                           sizeMode=self.sizeMode)
+            if self.instrumentation is not None:
+                self.decoder.setInstrumentation(self.instrumentation)
+            self.decoder.contractCache = self.contractCache
+            self.decoder.reqHandlers = self.reqHandlers
             fields = []
 
             #sometimes I get news before the server version, thus the loop
@@ -186,13 +235,28 @@ class EClient(object):
             self.connTime = conn_time
             self.serverVersion_ = server_version
             self.decoder.serverVersion = self.serverVersion()
+            self.decoder.compilePlans()
+            self.compileEncoders()
+            if self.recorder is not None:
+                self.recorder.begin(self.serverVersion(), self.connTime)
 
             self.setConnState(EClient.CONNECTED)
 
-            self.reader = reader.EReader(self.conn, self.msg_queue)
-            self.reader.start()   # start thread
+            self.reader = reader.EReader(self.conn, self.msg_queue,
+                batch=self.dispatchMode == DispatchModeEnum.BATCH)
+            self.reader.instrumentation = self.instrumentation
+            self.reader.recorder = self.recorder
+            if self.dispatchMode == DispatchModeEnum.INLINE:
+                # run() does the reading, it must not block when idle
+                self.conn.idleTimeout = 0.2
+            else:
+                self.reader.start()   # start thread
             logger.info("sent startApi")
             self.startApi()
+            # after startApi, sent on the connection: nothing queued goes before it
+            if self.writeQueue and self.isConnected():
+                self.writer = writer.EWriter(self.conn, self.msgRate, self.msgBurst)
+                self.writer.start()
             self.wrapper.connectAck()
         except socket.error:
             if self.wrapper:
@@ -207,9 +271,13 @@ class EClient(object):
         sent."""
 
         self.setConnState(EClient.DISCONNECTED)
+        if self.writer is not None:
+            self.writer.stop()
         if self.conn is not None:
             logger.info("disconnecting")
             self.conn.disconnect()
+            if self.recorder is not None:
+                self.recorder.close()
             self.wrapper.connectionClosed()
             self.reset()
 
@@ -217,10 +285,8 @@ class EClient(object):
     def isConnected(self):
         """Call this function to check if there is a connection with TWS"""
 
-        connConnected = self.conn and self.conn.isConnected()
-        logger.debug("%s isConn: %s, connConnected: %s" % (id(self),
-            self.connState, str(connConnected)))
-        return EClient.CONNECTED == self.connState and connConnected
+        return (EClient.CONNECTED == self.connState and self.conn is not None
+                and self.conn.isConnected())
 
     def keyboardInterrupt(self):
         #intended to be overloaded
@@ -234,6 +300,156 @@ class EClient(object):
     def setConnectionOptions(self, opts):
         self.connectionOptions = opts
 
+    def setTransportOptions(self, useSelector:bool=True, recvBufSize:int=DEFAULT_RECV_BUF_SIZE):
+        """Selects the socket transport used by the next connect().
+
+        useSelector:bool - wait on a selector and recv_into() a buffer of
+            recvBufSize bytes (default) instead of polling the socket with a
+            1 second timeout and 4KB reads.
+        recvBufSize:int - max number of bytes read per system call."""
+
+        self.useSelector = useSelector
+        self.recvBufSize = recvBufSize
+
+    def setDispatchMode(self, dispatchMode:DispatchMode):
+        """Selects how run() gets the messages from the socket, effective
+        from the next connect().
+
+        dispatchMode:DispatchMode - one of
+            DispatchModeEnum.QUEUE (default): the EReader thread puts each
+                message in msg_queue, run() takes them one at a time.
+            DispatchModeEnum.BATCH: the EReader thread puts all the messages
+                of a receive in msg_queue at once, run() processes them all
+                per wakeup.
+            DispatchModeEnum.INLINE: no EReader thread and no queue, run()
+                receives and decodes in its own thread; the wrapper
+                callbacks then delay the reading of the socket."""
+
+        if dispatchMode not in (DispatchModeEnum.QUEUE, DispatchModeEnum.BATCH,
+                                DispatchModeEnum.INLINE):
+            raise ValueError("unknown dispatch mode %r" % (dispatchMode, ))
+        self.dispatchMode = dispatchMode
+
+    def setWriteQueue(self, writeQueue:bool=True, msgRate:float=writer.DEFAULT_MSG_RATE,
+                      burst:int=writer.DEFAULT_BURST):
+        """Sends the requests from an EWriter thread instead of the calling
+        thread, effective from the next connect(). The requests are sent in
+        order, except the bulk data requests (historical data, contract
+        details, scanners, ...) which wait behind all the others; they are
+        paced and coalesced into fewer system calls.
+
+        writeQueue:bool - True for the EWriter, False (default) to send
+            each request right away.
+        msgRate:float - messages per second on average, None for no pacing.
+            With the default rate and burst at most 50 messages are sent in
+            any second, the TWS limit.
+        burst:int - messages that may be sent at once after an idle time.
+
+        disconnect() drops what is still queued, see flushWriteQueue()."""
+
+        self.writeQueue = writeQueue
+        self.msgRate = msgRate
+        self.msgBurst = burst
+
+    def flushWriteQueue(self, timeout:float=None) -> bool:
+        """Waits until the EWriter has sent all the queued requests, or for
+        at most timeout seconds. Returns True if they were all sent."""
+
+        if self.writer is None:
+            return True
+        return self.writer.flush(timeout)
+
+    def setHistoricalDataBatch(self, batch:bool):
+        """Delivers each historical data answer as one historicalDataBatch()
+        call with numpy columns instead of a historicalData() call per bar.
+
+        batch:bool - True for the columnar callback, False (default) for
+            the per bar one."""
+
+        if batch:
+            columnar.require_numpy("historicalDataBatch")
+        self.historicalDataBatch = batch
+        if self.decoder is not None and self.serverVersion() is not None:
+            self.decoder.historicalDataBatch = batch
+            self.decoder.compilePlans()
+
+    def setHistoricalTicksArrays(self, arrays:bool):
+        """Delivers the ticks of historicalTicks(), historicalTicksBidAsk()
+        and historicalTicksLast() as numpy structured arrays (see the
+        HISTORICAL_TICK*_DTYPE in ibapi.columnar) instead of lists of
+        HistoricalTick* objects.
+
+        arrays:bool - True for structured arrays, False (default) for lists."""
+
+        if arrays:
+            columnar.require_numpy("historicalTicksArrays")
+        self.historicalTicksArrays = arrays
+        if self.decoder is not None and self.serverVersion() is not None:
+            self.decoder.historicalTicksArrays = arrays
+            self.decoder.compilePlans()
+
+    def setSizeMode(self, sizeMode:SizeMode):
+        """Selects the type of the sizes of the market data callbacks:
+        tickPrice/tickSize, market depth, realtimeBar and historical bar
+        volumes, tick by tick and historical ticks. Quantities of orders,
+        positions and executions stay Decimal.
+
+        sizeMode:SizeMode - SizeModeEnum.DECIMAL (default) for Decimal,
+            SizeModeEnum.FLOAT for float (UNSET_DOUBLE when unset) or
+            SizeModeEnum.SCALED_INT for int sizes times SIZE_SCALE (UNSET_LONG
+            when unset)."""
+
+        converter = size_converter(sizeMode)
+        self.sizeMode = sizeMode
+        if self.decoder is not None:
+            self.decoder.sizeMode = sizeMode
+            self.decoder.sizeConverter = converter
+            if self.serverVersion() is not None:
+                self.decoder.compilePlans()
+
+    def setInstrumentation(self, instrumentation):
+        """Starts collecting counters and timings of the incoming message
+        pipeline into instrumentation, an ibapi.instrumentation.Instrumentation,
+        which can be queried (snapshot()) and reset() while the client runs.
+        None (default) stops it; the pipeline then costs nothing extra.
+        Returns the instrumentation."""
+
+        self.instrumentation = instrumentation
+        if self.decoder is not None:
+            self.decoder.setInstrumentation(instrumentation)
+        if self.reader is not None:
+            self.reader.instrumentation = instrumentation
+        return instrumentation
+
+    def setRecorder(self, recorder):
+        """Records every message received from the next connect() on into
+        recorder, an ibapi.recording.Recorder, for replay with
+        ibapi.recording.replay(). disconnect() closes the file, a new
+        connect() starts it over. None (default) records nothing.
+        Returns the recorder."""
+
+        if self.recorder is not None and self.recorder is not recorder:
+            self.recorder.close()
+        self.recorder = recorder
+        return recorder
+
+    def setContractCache(self, contractCache):
+        """Answers reqContractDetails from contractCache, an
+        ibapi.contract_cache.ContractCache, when it holds fresh details for
+        the contract. The other requests go to TWS and their complete
+        answers are added to the cache. None (default) turns it off.
+        Returns the cache.
+
+        Beware: on a cache hit the contractDetails/bondContractDetails and
+        contractDetailsEnd callbacks are made right away from the thread
+        calling reqContractDetails, before it returns, and not from the
+        thread of run() like all the other callbacks."""
+
+        self.contractCache = contractCache
+        if self.decoder is not None:
+            self.decoder.contractCache = contractCache
+        return contractCache
+
     def msgLoopTmo( self ):
         #intended to be overloaded
         pass
@@ -243,38 +459,82 @@ class EClient(object):
         pass
 
     def run(self):
-        """This is the function that has the message loop."""
+        """This is the function that has the message loop. How it gets the
+        messages depends on the dispatch mode, see setDispatchMode()."""
 
+        if self.dispatchMode == DispatchModeEnum.INLINE:
+            self.runInline()
+            return
+
+        batch = self.dispatchMode == DispatchModeEnum.BATCH
         try:
             while self.isConnected() or not self.msg_queue.empty():
                 try:
                     try:
-                        text = self.msg_queue.get(block=True, timeout=0.2)
-                        if len(text) > MAX_MSG_LEN:
-                            self.wrapper.error(NO_VALID_ID, BAD_LENGTH.code(),
-                                "%s:%d:%s" % (BAD_LENGTH.msg(), len(text), text))
-                            break
+                        item = self.msg_queue.get(block=True, timeout=0.2)
                     except queue.Empty:
-                        logger.debug("queue.get: empty")
                         self.msgLoopTmo()
                     else:
-                        fields = comm.read_fields(text)
-                        logger.debug("fields %s", fields)
-                        self.decoder.interpret(fields)
-                        self.msgLoopRec()
+                        if self.instrumentation is not None:
+                            self.instrumentation.sampleQueue(self.msg_queue)
+                        if batch:
+                            if not self.processMsgs(item):
+                                break
+                        elif not self.processMsg(item):
+                            break
                 except (KeyboardInterrupt, SystemExit):
                     logger.info("detected KeyboardInterrupt, SystemExit")
                     self.keyboardInterrupt()
                     self.keyboardInterruptHard()
                 except BadMessage:
                     logger.info("BadMessage")
+        finally:
+            self.disconnect()
 
-                logger.debug("conn:%d queue.sz:%d",
-                             self.isConnected(),
-                             self.msg_queue.qsize())
+    def runInline(self):
+        """ the message loop of the INLINE dispatch mode: receives and decodes
+        in the calling thread """
+
+        try:
+            while self.isConnected():
+                try:
+                    self.reader.readLoop(self.dispatchInline, self.msgLoopTmo)
+                except (KeyboardInterrupt, SystemExit):
+                    logger.info("detected KeyboardInterrupt, SystemExit")
+                    self.keyboardInterrupt()
+                    self.keyboardInterruptHard()
         finally:
             self.disconnect()
 
+    def dispatchInline(self, msgs):
+        if not self.processMsgs(msgs):
+            self.disconnect()
+
+    def processMsg(self, text):
+        """ decodes one message and calls the wrapper, returns False if the
+        message is too long and the loop must stop """
+
+        if len(text) > MAX_MSG_LEN:
+            self.wrapper.error(NO_VALID_ID, BAD_LENGTH.code(),
+                "%s:%d:%s" % (BAD_LENGTH.msg(), len(text), text))
+            return False
+        fields = comm.read_fields(text)
+        self.decoder.interpret(fields)
+        self.msgLoopRec()
+        return True
+
+    def processMsgs(self, msgs):
+        """ processMsg() for each of msgs, a BadMessage only drops its own
+        message """
+
+        for text in msgs:
+            try:
+                if not self.processMsg(text):
+                    return False
+            except BadMessage:
+                logger.info("BadMessage")
+        return True
+
 
     def reqCurrentTime(self):
         """Asks the current system time on the server side."""
@@ -366,6 +626,16 @@ class EClient(object):
                                NOT_CONNECTED.msg())
             return
 
+        if self.reqMktDataEncoder is not None:
+            try:
+                full_msg = self.reqMktDataEncoder(reqId, contract, genericTickList, snapshot,
+                                                  regulatorySnapshot, mktDataOptions)
+            except ClientException as ex:
+                self.wrapper.error(reqId, ex.code, ex.msg + ex.text)
+                return
+            self.sendFramedMsg(full_msg)
+            return
+
         if self.serverVersion() < MIN_SERVER_VER_DELTA_NEUTRAL:
             if contract.deltaNeutralContract:
                 self.wrapper.error(reqId, UPDATE_TWS.code(),
@@ -911,6 +1181,15 @@ class EClient(object):
             self.wrapper.error(orderId, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
             return
 
+        if self.placeOrderEncoder is not None:
+            try:
+                full_msg = self.placeOrderEncoder(orderId, contract, order)
+            except ClientException as ex:
+                self.wrapper.error(orderId, ex.code, ex.msg + ex.text)
+                return
+            self.sendFramedMsg(full_msg)
+            return
+
         if self.serverVersion() < MIN_SERVER_VER_DELTA_NEUTRAL:
             if contract.deltaNeutralContract:
                 self.wrapper.error(orderId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
@@ -2092,35 +2371,52 @@ class EClient(object):
         reqId:int - The ID of the data request. Ensures that responses are
             make_fieldatched to requests if several requests are in process.
         contract:Contract - The summary description of the contract being looked
-            up."""
+            up.
+
+        With a contract cache (setContractCache) a cache hit is answered
+        from the calling thread, before this function returns."""
 
         self.logRequest(current_fn_name(), vars())
 
+        # the answers of the requests of a ContractQualifier go to it
+        wrapper = self.reqHandlers.get(reqId, self.wrapper)
+
+        if self.contractCache is not None:
+            cached = self.contractCache.lookupContract(contract)
+            if cached is not None:
+                for details in cached:
+                    if details.contract.secType == "BOND":
+                        wrapper.bondContractDetails(reqId, details)
+                    else:
+                        wrapper.contractDetails(reqId, details)
+                wrapper.contractDetailsEnd(reqId)
+                return
+
         if not self.isConnected():
-            self.wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
+            wrapper.error(NO_VALID_ID, NOT_CONNECTED.code(), NOT_CONNECTED.msg())
             return
 
         if self.serverVersion() < MIN_SERVER_VER_SEC_ID_TYPE:
             if contract.secIdType or contract.secId:
-                self.wrapper.error( reqId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
+                wrapper.error( reqId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
                         "  It does not support secIdType and secId parameters.")
                 return
 
         if self.serverVersion() < MIN_SERVER_VER_TRADING_CLASS:
             if contract.tradingClass:
-                self.wrapper.error( reqId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
+                wrapper.error( reqId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
                         "  It does not support tradingClass parameter in reqContractDetails.")
                 return
 
         if self.serverVersion() < MIN_SERVER_VER_LINKING:
             if contract.primaryExchange:
-                self.wrapper.error( reqId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
+                wrapper.error( reqId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
                         "  It does not support primaryExchange parameter in reqContractDetails.")
                 return
 
         if self.serverVersion() < MIN_SERVER_VER_BOND_ISSUERID:
             if contract.issuerId:
-                self.wrapper.error( reqId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
+                wrapper.error( reqId, UPDATE_TWS.code(), UPDATE_TWS.msg() +
                         "  It does not support issuerId parameter in reqContractDetails.")
                 return
 
@@ -2171,9 +2467,12 @@ class EClient(object):
             msg = "".join(flds)
         
         except ClientException as ex:
-            self.wrapper.error(reqId, ex.code, ex.msg + ex.text)
+            wrapper.error(reqId, ex.code, ex.msg + ex.text)
             return
 
+        # only once sent, the requests failing above get no answer
+        if self.contractCache is not None:
+            self.contractCache.expect(reqId, contract)
         self.sendMsg(msg)
 
 
@@ -2521,20 +2820,23 @@ class EClient(object):
 
         self.logRequest(current_fn_name(), vars())
 
+        # the answers of the requests of a Backfill go to it
+        wrapper = self.reqHandlers.get(reqId, self.wrapper)
+
         if not self.isConnected():
-            self.wrapper.error(reqId, NOT_CONNECTED.code(),
-                               NOT_CONNECTED.msg())
+            wrapper.error(reqId, NOT_CONNECTED.code(),
+                          NOT_CONNECTED.msg())
             return
 
         if self.serverVersion() < MIN_SERVER_VER_TRADING_CLASS:
             if contract.tradingClass or contract.conId > 0:
-                self.wrapper.error(reqId, UPDATE_TWS.code(),
+                wrapper.error(reqId, UPDATE_TWS.code(),
                     UPDATE_TWS.msg() + "  It does not support conId and tradingClass parameters in reqHistoricalData.")
                 return
 
         if self.serverVersion() < MIN_SERVER_VER_HISTORICAL_SCHEDULE:
             if whatToShow == "SCHEDULE":
-                self.wrapper.error(reqId, UPDATE_TWS.code(),
+                wrapper.error(reqId, UPDATE_TWS.code(),
                     UPDATE_TWS.msg() + "  It does not support requesting of historical schedule.")
                 return
 
@@ -2597,7 +2899,7 @@ class EClient(object):
             msg = "".join(flds)
             
         except ClientException as ex:
-            self.wrapper.error(reqId, ex.code, ex.msg + ex.text)
+            wrapper.error(reqId, ex.code, ex.msg + ex.text)
             return
             
         self.sendMsg(msg)
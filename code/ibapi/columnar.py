@@ -0,0 +1,251 @@
+"""
+Columnar (NumPy) decoding of the bulk historical messages: historical bars
+as a dict of arrays and historical ticks as structured (record) arrays.
+
+Instead of one object and one wrapper call per row, the repeating group of a
+message is sliced column by column out of the fields tuple and each column
+is converted in a single NumPy call. NumPy is only needed when one of the
+columnar modes is switched on.
+"""
+
+import datetime
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from zoneinfo import ZoneInfo
+except ImportError:
+    ZoneInfo = None
+
+from ibapi.decode_plan import UNSET_DECIMAL_FIELDS
+from ibapi.utils import BadMessage
+
+
+def require_numpy(feature):
+    if np is None:
+        raise ImportError("numpy is required for %s" % feature)
+
+
+def float_column(col):
+    """ col: sequence of bytes fields, empty fields mean 0 like decode(float) """
+    try:
+        return np.fromiter(map(float, col), dtype=np.float64, count=len(col))
+    except ValueError:
+        return np.fromiter((float(s or 0) for s in col), dtype=np.float64, count=len(col))
+
+
+def int_column(col):
+    try:
+        return np.fromiter(map(int, col), dtype=np.int64, count=len(col))
+    except ValueError:
+        return np.fromiter((int(s or 0) for s in col), dtype=np.int64, count=len(col))
+
+
+def str_column(col):
+    """ str fields as a numpy object array of str, any length """
+    try:
+        strs = list(map(bytes.decode, col))
+    except UnicodeDecodeError:
+        strs = [s.decode('UTF-8', errors='backslashreplace') for s in col]
+    result = np.empty(len(strs), dtype=object)
+    result[:] = strs
+    return result
+
+
+# UNSET_DECIMAL_FIELDS once converted to float; "" is mapped to the first one
+UNSET_DECIMAL_FLOATS = (2147483647., 9223372036854775807., 1.7976931348623157E308)
+
+
+def decimal_column(col):
+    """ Decimal fields as float64, the UNSET_DECIMAL values become NaN """
+    try:
+        arr = np.fromiter(map(float, col), dtype=np.float64, count=len(col))
+    except ValueError:
+        arr = np.fromiter((float(s or UNSET_DECIMAL_FLOATS[0]) for s in col),
+                          dtype=np.float64, count=len(col))
+    arr[np.isin(arr, UNSET_DECIMAL_FLOATS)] = np.nan
+    return arr
+
+
+def _zone_offsets(local, tzName):
+    """ utc offset in seconds of each local datetime64[s] in time zone tzName """
+    if ZoneInfo is None:
+        raise ImportError("zoneinfo is required to convert bar dates in %s" % tzName)
+    tz = ZoneInfo(tzName)
+    # DST switches happen on the hour, so one offset per distinct hour is enough
+    (hours, inverse) = np.unique(local.astype("datetime64[h]"), return_inverse=True)
+    offsets = np.empty(len(hours), dtype=np.int64)
+    for (i, hour) in enumerate(hours.astype(datetime.datetime)):
+        offsets[i] = hour.replace(tzinfo=tz).utcoffset().total_seconds()
+    return offsets[inverse]
+
+
+# the columns of 'yyyymmdd hh:mm:ss' holding digits
+DATE_TIME_DIGITS = (0, 1, 2, 3, 4, 5, 6, 7, 9, 10, 12, 13, 15, 16)
+
+
+def parse_bar_dates(dates):
+    """Converts the date fields (bytes) of historical bars to int64 epoch seconds.
+
+    Handles the formats TWS sends: epoch seconds (formatDate=2), 'yyyymmdd'
+    for daily and longer bars and 'yyyymmdd hh:mm:ss' (also with a '-' or
+    two spaces after the date) optionally followed by a time zone name.
+    Dates without a time zone are taken as UTC. Raises BadMessage for any
+    other layout."""
+
+    n = len(dates)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+
+    first = dates[0]
+    if first.isdigit() and len(first) != 8:
+        if not all(date.isdigit() for date in dates):
+            raise BadMessage("bad bar dates: %r" % (dates[:3], ))
+        return int_column(dates)
+
+    if first[8:10] == b"  ":
+        # 'yyyymmdd  hh:mm:ss', formatDate=1 of the older versions
+        dates = [date[:8] + date[9:] if date[8:10] == b"  " else date for date in dates]
+
+    withTime = len(first) >= 17
+    # the fixed width 'yyyymmdd hh:mm:ss ' prefix as a matrix of characters,
+    # padded with 0s
+    chars = np.array(dates, dtype="S18").view(np.uint8).reshape(n, 18)
+    if withTime:
+        digits = chars[:, :17].astype(np.int64) - 48
+        # the time, alone or followed by a space and the time zone
+        zoned = chars[:, 17] == ord(" ")
+        valid = ((chars[:, 17] == 0) | zoned) \
+            & ((chars[:, 8] == ord(" ")) | (chars[:, 8] == ord("-"))) \
+            & (chars[:, 11] == ord(":")) & (chars[:, 14] == ord(":"))
+        checked = chars[:, DATE_TIME_DIGITS]
+    else:
+        digits = chars[:, :8].astype(np.int64) - 48
+        valid = chars[:, 8] == 0
+        checked = chars[:, :8]
+    valid &= ((checked >= ord("0")) & (checked <= ord("9"))).all(axis=1)
+    year = digits[:, 0] * 1000 + digits[:, 1] * 100 + digits[:, 2] * 10 + digits[:, 3]
+    month = digits[:, 4] * 10 + digits[:, 5]
+    day = digits[:, 6] * 10 + digits[:, 7]
+    valid &= (month >= 1) & (month <= 12) & (day >= 1) & (day <= 31)
+    if not valid.all():
+        raise BadMessage("bad bar date: %r" % (dates[int(np.argmin(valid))], ))
+
+    months = (year - 1970) * 12 + month - 1
+    days = months.astype("datetime64[M]").astype("datetime64[D]").astype(np.int64) + day - 1
+    epoch = days * 86400
+    if withTime:
+        epoch += ((digits[:, 9] * 10 + digits[:, 10]) * 3600
+                  + (digits[:, 12] * 10 + digits[:, 13]) * 60
+                  + digits[:, 15] * 10 + digits[:, 16])
+
+        if zoned.any():
+            zones = np.array([date[18:] for date in dates])
+            for zone in np.unique(zones):
+                if zone:
+                    mask = zones == zone
+                    local = epoch[mask].astype("datetime64[s]")
+                    try:
+                        epoch[mask] -= _zone_offsets(local, zone.decode())
+                    except (KeyError, ValueError):      # ZoneInfoNotFoundError is a KeyError
+                        raise BadMessage("bad bar time zone: %r" % (zone, )) from None
+
+    return epoch
+
+
+BAR_COLUMNS = ("date", "open", "high", "low", "close", "volume", "wap", "barCount")
+
+
+def historical_bar_columns(fields, start, nBars, barLen, barCountIdx):
+    """Decodes the nBars bars of a HISTORICAL_DATA message starting at fields
+    index start into a dict of NumPy arrays keyed by BAR_COLUMNS."""
+
+    stop = start + nBars * barLen
+    if len(fields) < stop:
+        raise BadMessage("no more fields")
+
+    def column(idx):
+        return fields[start + idx:stop:barLen]
+
+    return {
+        "date": parse_bar_dates(column(0)),
+        "open": float_column(column(1)),
+        "high": float_column(column(2)),
+        "low": float_column(column(3)),
+        "close": float_column(column(4)),
+        "volume": decimal_column(column(5)),
+        "wap": decimal_column(column(6)),
+        "barCount": int_column(column(barCountIdx)),
+    }
+
+
+HISTORICAL_TICK_DTYPE = np.dtype([
+    ("time", np.int64), ("price", np.float64), ("size", np.float64),
+]) if np is not None else None
+
+HISTORICAL_TICK_BID_ASK_DTYPE = np.dtype([
+    ("time", np.int64), ("askPastHigh", np.bool_), ("bidPastLow", np.bool_),
+    ("priceBid", np.float64), ("priceAsk", np.float64),
+    ("sizeBid", np.float64), ("sizeAsk", np.float64),
+]) if np is not None else None
+
+HISTORICAL_TICK_LAST_DTYPE = np.dtype([
+    ("time", np.int64), ("pastLimit", np.bool_), ("unreported", np.bool_),
+    ("price", np.float64), ("size", np.float64),
+    # str objects: a fixed width would cut the longer ones silently
+    ("exchange", object), ("specialConditions", object),
+]) if np is not None else None
+
+
+def _tick_columns(fields, start, nTicks, tickLen):
+    stop = start + nTicks * tickLen
+    if len(fields) < stop:
+        raise BadMessage("no more fields")
+
+    def column(idx):
+        return fields[start + idx:stop:tickLen]
+
+    return column
+
+
+def historical_ticks_array(fields, start, nTicks):
+    """ the ticks of a HISTORICAL_TICKS message as a HISTORICAL_TICK_DTYPE
+    array, sizes as float64 (NaN when unset) """
+    column = _tick_columns(fields, start, nTicks, 4)
+    ticks = np.empty(nTicks, dtype=HISTORICAL_TICK_DTYPE)
+    ticks["time"] = int_column(column(0))
+    # column(1) is unused, it's there for consistency
+    ticks["price"] = float_column(column(2))
+    ticks["size"] = decimal_column(column(3))
+    return ticks
+
+
+def historical_ticks_bid_ask_array(fields, start, nTicks):
+    column = _tick_columns(fields, start, nTicks, 6)
+    ticks = np.empty(nTicks, dtype=HISTORICAL_TICK_BID_ASK_DTYPE)
+    ticks["time"] = int_column(column(0))
+    mask = int_column(column(1))
+    ticks["askPastHigh"] = mask & 1 != 0
+    ticks["bidPastLow"] = mask & 2 != 0
+    ticks["priceBid"] = float_column(column(2))
+    ticks["priceAsk"] = float_column(column(3))
+    ticks["sizeBid"] = decimal_column(column(4))
+    ticks["sizeAsk"] = decimal_column(column(5))
+    return ticks
+
+
+def historical_ticks_last_array(fields, start, nTicks):
+    column = _tick_columns(fields, start, nTicks, 6)
+    ticks = np.empty(nTicks, dtype=HISTORICAL_TICK_LAST_DTYPE)
+    ticks["time"] = int_column(column(0))
+    mask = int_column(column(1))
+    ticks["pastLimit"] = mask & 1 != 0
+    ticks["unreported"] = mask & 2 != 0
+    ticks["price"] = float_column(column(2))
+    ticks["size"] = decimal_column(column(3))
+    ticks["exchange"] = str_column(column(4))
+    ticks["specialConditions"] = str_column(column(5))
+    return ticks
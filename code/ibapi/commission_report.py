@@ -8,6 +8,8 @@ from ibapi.utils import intMaxString
 from ibapi.utils import floatMaxString
 
 class CommissionReport(Object):
+    __slots__ = ("execId", "commission", "currency", "realizedPNL", "yield_", "yieldRedemptionDate")
+
     def __init__(self):
         self.execId = ""
         self.commission = 0. 
@@ -36,6 +36,38 @@ MarketDataTypeEnum = Enum("N/A", "REALTIME", "FROZEN", "DELAYED", "DELAYED_FROZE
 Liquidities = int
 LiquiditiesEnum = Enum("None", "Added", "Remove", "RoudedOut")
 
+# how the Decoder delivers the sizes of the market data messages, see
+# EClient.setSizeMode; SCALED_INT sizes are multiplied by SIZE_SCALE
+SizeMode = int
+SizeModeEnum = Enum("DECIMAL", "FLOAT", "SCALED_INT")
+SIZE_SCALE = 10 ** 4
+
+# the unset size of each SizeMode
+UNSET_SIZES = {
+    SizeModeEnum.DECIMAL: UNSET_DECIMAL,
+    SizeModeEnum.FLOAT: UNSET_DOUBLE,
+    SizeModeEnum.SCALED_INT: UNSET_LONG,
+}
+
+
+def size_float(size, sizeMode=SizeModeEnum.DECIMAL, unset=math.nan):
+    """ a size of the market data callbacks, delivered in sizeMode (see
+    EClient.setSizeMode), as a float number of shares; unset if it is None
+    or the unset size of sizeMode """
+    if size is None or size == UNSET_SIZES[sizeMode]:
+        return unset
+    if sizeMode == SizeModeEnum.SCALED_INT:
+        return size / SIZE_SCALE
+    return float(size)
+
+# how EClient.run gets the messages from the EReader, see EClient.setDispatchMode
+DispatchMode = int
+DispatchModeEnum = Enum("QUEUE", "BATCH", "INLINE")
+
+# order in which the EWriter sends the queued requests, see EClient.setWriteQueue
+SendPriority = int
+SendPriorityEnum = Enum("NORMAL", "BULK")
+
 SetOfString = set
 SetOfFloat = set
 ListOfOrder = list
@@ -53,6 +85,8 @@ ListOfHistoricalSessions = list
 
 
 class BarData(Object):
+    __slots__ = ("date", "open", "high", "low", "close", "volume", "wap", "barCount")
+
     def __init__(self):
         self.date = ""
         self.open = 0.
@@ -70,6 +104,9 @@ class BarData(Object):
 
 
 class RealTimeBar(Object):
+    __slots__ = ("time", "endTime", "open_", "open", "high", "low", "close", "volume", "wap",
+                 "count")
+
     def __init__(self, time = 0, endTime = -1, open_ = 0., high = 0., low = 0., close = 0., volume = UNSET_DECIMAL, wap = UNSET_DECIMAL, count = 0):
         self.time = time
         self.endTime = endTime
@@ -89,6 +126,8 @@ class RealTimeBar(Object):
 
 
 class HistogramData(Object):
+    __slots__ = ("price", "size")
+
     def __init__(self):
         self.price = 0.
         self.size = UNSET_DECIMAL
@@ -134,6 +173,8 @@ class SmartComponent(Object):
 
 
 class TickAttrib(Object):
+    __slots__ = ("canAutoExecute", "pastLimit", "preOpen")
+
     def __init__(self):
         self.canAutoExecute = False
         self.pastLimit = False
@@ -144,6 +185,8 @@ class TickAttrib(Object):
 
 
 class TickAttribBidAsk(Object):
+    __slots__ = ("bidPastLow", "askPastHigh")
+
     def __init__(self):
         self.bidPastLow = False
         self.askPastHigh = False
@@ -153,6 +196,8 @@ class TickAttribBidAsk(Object):
 
 
 class TickAttribLast(Object):
+    __slots__ = ("pastLimit", "unreported")
+
     def __init__(self):
         self.pastLimit = False
         self.unreported = False
@@ -161,6 +206,62 @@ class TickAttribLast(Object):
         return "PastLimit: %d, Unreported: %d" % (self.pastLimit, self.unreported)
 
 
+class SharedAttrib:
+    """ mixin of the read-only attrib instances the Decoder hands out for
+    every tick with the same mask, instead of allocating one per tick; the
+    second base class gives the fields """
+
+    __slots__ = ()
+
+    def __setattr__(self, name, value):
+        raise AttributeError("%s instances are shared and read-only" % type(self).__name__)
+
+    def __delattr__(self, name):
+        raise AttributeError("%s instances are shared and read-only" % type(self).__name__)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        fields = type(self).__bases__[1].__slots__
+        return (make_shared_attrib, (type(self), tuple(getattr(self, name) for name in fields)))
+
+
+def make_shared_attrib(cls, values):
+    attrib = object.__new__(cls)
+    for (name, value) in zip(cls.__bases__[1].__slots__, values):
+        object.__setattr__(attrib, name, value)
+    return attrib
+
+
+class SharedTickAttrib(SharedAttrib, TickAttrib):
+    __slots__ = ()
+
+
+class SharedTickAttribBidAsk(SharedAttrib, TickAttribBidAsk):
+    __slots__ = ()
+
+
+class SharedTickAttribLast(SharedAttrib, TickAttribLast):
+    __slots__ = ()
+
+
+# by attrMask: canAutoExecute 1, pastLimit 2, preOpen 4
+TICK_ATTRIBS = tuple(make_shared_attrib(SharedTickAttrib, (mask & 1 != 0, mask & 2 != 0,
+                                                           mask & 4 != 0)) for mask in range(8))
+# by the mask of the tick-by-tick messages: bidPastLow 1, askPastHigh 2
+TICK_ATTRIBS_BID_ASK = tuple(make_shared_attrib(SharedTickAttribBidAsk, (mask & 1 != 0,
+                                                                         mask & 2 != 0))
+                             for mask in range(4))
+# by mask: pastLimit 1, unreported 2
+TICK_ATTRIBS_LAST = tuple(make_shared_attrib(SharedTickAttribLast, (mask & 1 != 0,
+                                                                    mask & 2 != 0))
+                          for mask in range(4))
+
+
 class FamilyCode(Object):
     def __init__(self):
         self.accountID = ""
@@ -180,6 +281,8 @@ class PriceIncrement(Object):
 
 
 class HistoricalTick(Object):
+    __slots__ = ("time", "price", "size")
+
     def __init__(self):
         self.time = 0
         self.price = 0.
@@ -190,9 +293,11 @@ class HistoricalTick(Object):
 
 
 class HistoricalTickBidAsk(Object):
+    __slots__ = ("time", "tickAttribBidAsk", "priceBid", "priceAsk", "sizeBid", "sizeAsk")
+
     def __init__(self):
         self.time = 0
-        self.tickAttribBidAsk = TickAttribBidAsk()
+        self.tickAttribBidAsk = TICK_ATTRIBS_BID_ASK[0]
         self.priceBid = 0.
         self.priceAsk = 0.
         self.sizeBid = UNSET_DECIMAL
@@ -205,9 +310,12 @@ class HistoricalTickBidAsk(Object):
 
 
 class HistoricalTickLast(Object):
+    __slots__ = ("time", "tickAttribLast", "price", "size", "exchange",
+                 "specialConditions")
+
     def __init__(self):
         self.time = 0
-        self.tickAttribLast = TickAttribLast()
+        self.tickAttribLast = TICK_ATTRIBS_LAST[0]
         self.price = 0.
         self.size = UNSET_DECIMAL
         self.exchange = ""
@@ -7,10 +7,15 @@ Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is su
 """
 Just a thin wrapper around a socket.
 It allows us to keep some other info along with it.
+
+Connection polls the socket with a 1 second timeout and small recv() calls.
+SelectorConnection waits on a selector instead, receives straight into the
+reader's FrameBuffer with recv_into() and can be woken up by disconnect().
 """
 
 
 import socket
+import selectors
 import threading
 import logging
 import sys
@@ -65,26 +70,22 @@ class Connection:
         return self.socket is not None
 
     def sendMsg(self, msg):
-        logger.debug("acquiring lock")
-        self.lock.acquire()
-        logger.debug("acquired lock")
-        if not self.isConnected():
-            logger.debug("sendMsg attempted while not connected, releasing lock")
-            self.lock.release()
-            return 0
-        try:
-            nSent = self.socket.send(msg)
-        except socket.error:
-            logger.debug("exception from sendMsg %s", sys.exc_info())
-            raise
-        finally:
-            logger.debug("releasing lock")
-            self.lock.release()
-            logger.debug("release lock")
+        return self.sendAll(msg)
 
-        logger.debug("sendMsg: sent: %d", nSent)
+    def sendAll(self, data):
+        """ sends all of data (socket.send() may send only a part of it),
+        returns the number of bytes sent, 0 when not connected """
+        with self.lock:
+            if not self.isConnected():
+                logger.debug("sendAll attempted while not connected")
+                return 0
+            try:
+                self.socket.sendall(data)
+            except socket.error:
+                logger.debug("exception from sendAll %s", sys.exc_info())
+                raise
 
-        return nSent
+        return len(data)
 
     def recvMsg(self):
         if not self.isConnected():
@@ -111,6 +112,13 @@ class Connection:
 
         return buf
 
+    def recvInto(self, frameBuffer):
+        """ receives the available data into frameBuffer (a FrameBuffer) and
+        returns the number of bytes added """
+        buf = self.recvMsg()
+        frameBuffer.write(buf)
+        return len(buf)
+
     def _recvAllMsg(self):
         cont = True
         allbuf = b""
@@ -118,10 +126,138 @@ class Connection:
         while cont and self.isConnected():
             buf = self.socket.recv(4096)
             allbuf += buf
-            logger.debug("len %d raw:%s|", len(buf), buf)
 
             if len(buf) < 4096:
                 cont = False
 
         return allbuf
 
+
+
+DEFAULT_RECV_BUF_SIZE = 256 * 1024
+
+
+class SelectorConnection(Connection):
+    def __init__(self, host, port, recvBufSize=DEFAULT_RECV_BUF_SIZE):
+        super().__init__(host, port)
+        self.recvBufSize = recvBufSize
+        self.idleTimeout = None     # seconds to wait for data before returning 0, None: no limit
+        self.selector = None
+        self.wakeupRecv = None
+        self.wakeupSend = None
+        self.waiting = False
+
+    def connect(self):
+        super().connect()
+        if self.socket is None:
+            return
+
+        # a socket pair rather than os.pipe() so it also works with the
+        # select() based selector on Windows
+        (self.wakeupRecv, self.wakeupSend) = socket.socketpair()
+        self.wakeupRecv.setblocking(False)
+        self.wakeupSend.setblocking(False)
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.socket, selectors.EVENT_READ)
+        self.selector.register(self.wakeupRecv, selectors.EVENT_READ)
+
+    def wakeup(self):
+        """ makes a reader blocked in recvMsg()/recvInto() return at once """
+        if self.wakeupSend is not None:
+            try:
+                self.wakeupSend.send(b"\0")
+            except OSError:
+                pass    # already woken up, or closed
+
+    def disconnect(self):
+        self.wakeup()
+        super().disconnect()
+        self.lock.acquire()
+        waiting = self.waiting
+        self.lock.release()
+        # closing a fd watched by a thread blocked in the selector can swallow
+        # the wake-up (epoll drops its ready events), so a waiting reader
+        # closes the selector itself once it returns
+        if not waiting:
+            self._closeSelector()
+
+    def _closeSelector(self):
+        self.lock.acquire()
+        try:
+            for sock in (self.wakeupRecv, self.wakeupSend):
+                if sock is not None:
+                    sock.close()
+            if self.selector is not None:
+                self.selector.close()
+            self.selector = self.wakeupRecv = self.wakeupSend = None
+        finally:
+            self.lock.release()
+
+    def _waitReadable(self):
+        """ blocks until the socket is readable; False if woken up """
+        self.lock.acquire()
+        selector = self.selector
+        self.waiting = selector is not None
+        self.lock.release()
+        if selector is None:
+            return False
+
+        try:
+            events = selector.select(self.idleTimeout)
+        finally:
+            self.lock.acquire()
+            self.waiting = False
+            closed = self.socket is None
+            self.lock.release()
+            if closed:
+                self._closeSelector()
+
+        for (key, _) in events:
+            if key.fileobj is self.wakeupRecv:
+                return False
+        return not closed and len(events) > 0
+
+    def _recvWith(self, recvFn):
+        sock = self.socket
+        if sock is None:
+            logger.debug("recv attempted while not connected")
+            return 0
+        try:
+            if not self._waitReadable():
+                return 0
+            n = recvFn(sock)
+            # readable but 0 bytes means the connection is either closed or broken
+            if n == 0:
+                logger.debug("socket either closed or broken, disconnecting")
+                self.disconnect()
+            return n
+        except socket.timeout:
+            return 0
+        except (OSError, ValueError):
+            # the socket/selector were closed by disconnect() while waiting
+            if self.isConnected():
+                logger.debug("socket broken, disconnecting")
+                self.disconnect()
+            return 0
+
+    def recvMsg(self):
+        chunks = []
+        def recv(sock):
+            buf = sock.recv(self.recvBufSize)
+            chunks.append(buf)
+            return len(buf)
+
+        self._recvWith(recv)
+        return chunks[0] if chunks else b""
+
+    def recvInto(self, frameBuffer):
+        def recv(sock):
+            view = frameBuffer.writable(self.recvBufSize)
+            try:
+                n = sock.recv_into(view)
+            finally:
+                view.release()
+            frameBuffer.commit(n)
+            return n
+
+        return self._recvWith(recv)
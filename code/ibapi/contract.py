@@ -60,6 +60,11 @@ class DeltaNeutralContract(Object):
 
 
 class Contract(Object):
+    __slots__ = ("conId", "symbol", "secType", "lastTradeDateOrContractMonth", "strike", "right",
+                 "multiplier", "exchange", "primaryExchange", "currency", "localSymbol",
+                 "tradingClass", "includeExpired", "secIdType", "secId", "description",
+                 "issuerId", "comboLegsDescrip", "comboLegs", "deltaNeutralContract")
+
     def __init__(self):
         self.conId = 0
         self.symbol = ""
@@ -0,0 +1,245 @@
+"""
+Local cache of the contract details answered by reqContractDetails.
+
+A ContractCache installed with EClient.setContractCache() is fed by the
+Decoder with every contractDetails/bondContractDetails answer and, on
+contractDetailsEnd, remembers the complete answer of the request. A later
+reqContractDetails of the same contract, or of a contract with a conId
+already known, is then answered from memory through the same wrapper
+callbacks, without a TWS round trip nor decoding.
+
+The entries are kept in an SQLite file (path) loaded entirely at startup
+(warm load), with an in-memory front for the lookups, and indexed by conId
+and by (symbol, secType, exchange, currency). Entries older than ttl
+seconds are not served anymore: the request goes to TWS and its answer
+refreshes them. stale() lists them for an ahead of time refresh.
+
+Threads: a cache hit is answered synchronously, the wrapper callbacks are
+made from the thread calling reqContractDetails (before it returns), NOT
+from the thread of EClient.run() that makes all the other callbacks. A
+wrapper used from several threads has to protect its state itself.
+
+The answers stored are copies of the ones given to the wrapper, and the ones
+served are copies too: the caller may modify them. A request ending in an
+error (200 "No security definition", ...) or cut by a disconnect stores
+nothing.
+"""
+
+import copy
+import pickle
+import sqlite3
+import threading
+import time
+
+from ibapi.request_futures import WARNING_CODES
+
+
+DEFAULT_TTL = 7 * 24 * 3600.
+
+QUERY_FIELDS = ("conId", "symbol", "secType", "lastTradeDateOrContractMonth", "strike",
+                "right", "multiplier", "exchange", "primaryExchange", "currency",
+                "localSymbol", "tradingClass", "includeExpired", "secIdType", "secId",
+                "issuerId")
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS details (conId INTEGER PRIMARY KEY, symbol TEXT, secType TEXT,"
+    " exchange TEXT, currency TEXT, fetched REAL, data BLOB)",
+    "CREATE TABLE IF NOT EXISTS queries (query TEXT PRIMARY KEY, conIds TEXT, fetched REAL)",
+)
+
+
+def query_key(contract):
+    """ the request contract as a string, the answers are cached per query """
+    return "|".join(str(getattr(contract, name)) for name in QUERY_FIELDS)
+
+
+def index_key(contract):
+    return (contract.symbol, contract.secType, contract.exchange, contract.currency)
+
+
+def details_copy(details):
+    """ a copy the caller can modify without changing the cache """
+    result = copy.copy(details)
+    result.contract = copy.copy(details.contract)
+    return result
+
+
+class ContractCache:
+    def __init__(self, path=None, ttl=DEFAULT_TTL, clock=time.time):
+        """path - the SQLite file, created if needed; None keeps the cache
+            in memory only
+        ttl:float - seconds an entry is served before it is requested again
+        clock - the time source, in epoch seconds"""
+
+        self.path = path
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock()
+        self.conId2entry = {}       # conId -> (ContractDetails, fetched)
+        self.key2conIds = {}        # (symbol, secType, exchange, currency) -> set of conIds
+        self.queries = {}           # query_key -> (conIds, fetched)
+        self.pending = {}           # reqId -> (query_key, [ContractDetails])
+        self.hits = 0
+        self.misses = 0
+        self.db = None
+        if path is not None:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            for statement in _SCHEMA:
+                self.db.execute(statement)
+            self.db.commit()
+            self.load()
+
+    def load(self):
+        """ reads the whole file into memory, called by the constructor """
+        with self.lock:
+            for (conId, fetched, data) in self.db.execute(
+                    "SELECT conId, fetched, data FROM details"):
+                self.index(pickle.loads(data), fetched)
+            for (query, conIds, fetched) in self.db.execute(
+                    "SELECT query, conIds, fetched FROM queries"):
+                self.queries[query] = ([int(conId) for conId in conIds.split(",") if conId],
+                                       fetched)
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
+
+    def __len__(self):
+        return len(self.conId2entry)
+
+    def index(self, details, fetched):
+        contract = details.contract
+        self.conId2entry[contract.conId] = (details, fetched)
+        self.key2conIds.setdefault(index_key(contract), set()).add(contract.conId)
+
+    def fresh(self, fetched, now):
+        return now - fetched < self.ttl
+
+    def put(self, details, now=None):
+        """ adds or refreshes a ContractDetails """
+        self.putAll([details], now)
+
+    def putAll(self, detailsList, now=None, query=None):
+        """ adds or refreshes detailsList, the complete answer to the request
+        contract query if given """
+        self.store(detailsList, now, None if query is None else query_key(query))
+
+    def store(self, detailsList, now, queryKey):
+        now = self.clock() if now is None else now
+        conIds = [details.contract.conId for details in detailsList]
+        with self.lock:
+            for details in detailsList:
+                self.index(details, now)
+            if queryKey is not None:
+                self.queries[queryKey] = (conIds, now)
+            if self.db is None:
+                return
+            self.db.executemany(
+                "INSERT OR REPLACE INTO details VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [(details.contract.conId,) + index_key(details.contract) +
+                 (now, pickle.dumps(details, pickle.HIGHEST_PROTOCOL))
+                 for details in detailsList])
+            if queryKey is not None:
+                self.db.execute("INSERT OR REPLACE INTO queries VALUES (?, ?, ?)",
+                                (queryKey, ",".join(map(str, conIds)), now))
+            self.db.commit()
+
+    def byConId(self, conId, now=None):
+        """ the fresh ContractDetails of conId, None if unknown or expired """
+        now = self.clock() if now is None else now
+        with self.lock:
+            entry = self.conId2entry.get(conId)
+        if entry is None or not self.fresh(entry[1], now):
+            return None
+        return details_copy(entry[0])
+
+    def lookup(self, symbol, secType, exchange, currency, now=None):
+        """ the fresh ContractDetails known for the key, which are all the
+        matching contracts only if a request for them went through the cache """
+        now = self.clock() if now is None else now
+        with self.lock:
+            entries = [self.conId2entry[conId] for conId in
+                       self.key2conIds.get((symbol, secType, exchange, currency), ())]
+        return [details_copy(details) for (details, fetched) in entries
+                if self.fresh(fetched, now)]
+
+    def lookupContract(self, contract, now=None):
+        """ the list of ContractDetails reqContractDetails(contract) would
+        answer, None if it has to go to TWS """
+        now = self.clock() if now is None else now
+        with self.lock:
+            query = self.queries.get(query_key(contract))
+            if query is not None and self.fresh(query[1], now):
+                entries = [self.conId2entry.get(conId) for conId in query[0]]
+            elif contract.conId:
+                entry = self.conId2entry.get(contract.conId)
+                if entry is not None and contract.exchange not in ("", entry[0].contract.exchange):
+                    entry = None    # the details on another exchange differ
+                entries = [entry]
+            else:
+                entries = [None]
+            if any(entry is None or not self.fresh(entry[1], now) for entry in entries):
+                self.misses += 1
+                return None
+            self.hits += 1
+        return [details_copy(details) for (details, _) in entries]
+
+    def stale(self, now=None):
+        """ the conIds of the expired entries """
+        now = self.clock() if now is None else now
+        with self.lock:
+            return [conId for (conId, (_, fetched)) in self.conId2entry.items()
+                    if not self.fresh(fetched, now)]
+
+    def invalidate(self, conId):
+        with self.lock:
+            entry = self.conId2entry.pop(conId, None)
+            if entry is not None:
+                self.key2conIds.get(index_key(entry[0].contract), set()).discard(conId)
+            if self.db is not None:
+                self.db.execute("DELETE FROM details WHERE conId = ?", (conId,))
+                self.db.commit()
+
+    def clear(self):
+        with self.lock:
+            self.conId2entry.clear()
+            self.key2conIds.clear()
+            self.queries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM details")
+                self.db.execute("DELETE FROM queries")
+                self.db.commit()
+
+    # the request side, called by EClient.reqContractDetails
+
+    def expect(self, reqId, contract):
+        with self.lock:
+            self.pending[reqId] = (query_key(contract), [])
+
+    # the answer side, called by the Decoder before the wrapper
+
+    def contractDetails(self, reqId, details):
+        with self.lock:
+            pending = self.pending.get(reqId)
+            if pending is not None:
+                pending[1].append(details_copy(details))
+
+    def contractDetailsEnd(self, reqId):
+        with self.lock:
+            pending = self.pending.pop(reqId, None)
+        if pending is not None and pending[1]:
+            (queryKey, detailsList) = pending
+            self.store(detailsList, None, queryKey)
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        """ a failed request is not cached, its partial answer is dropped """
+        if errorCode not in WARNING_CODES:
+            with self.lock:
+                self.pending.pop(reqId, None)
+
+    def dropPending(self):
+        """ forgets the requests in flight, called when the connection is reset """
+        with self.lock:
+            self.pending.clear()
@@ -0,0 +1,134 @@
+"""
+Building blocks for the precompiled decode plans of the Decoder.
+
+utils.decode() handles one field at a time and finds out on every call what
+it has to do. A decode plan instead knows the layout of a message for the
+negotiated server version up front: the converters below work directly on
+the raw bytes fields and compile_layout() turns a flat list of them into a
+function converting a whole message (or a repeating group of it) at once.
+The messages dispatched on the EWrapper method signature get their converter
+tuples from signature_converters() the same way.
+"""
+
+from decimal import Decimal
+
+from ibapi.common import (UNSET_DECIMAL, UNSET_DOUBLE, UNSET_LONG, SizeModeEnum,
+    SIZE_SCALE)
+from ibapi.utils import BadMessage
+
+
+# the values decode(Decimal, ...) maps to UNSET_DECIMAL, compared as bytes
+UNSET_DECIMAL_FIELDS = frozenset((b"", b"2147483647", b"9223372036854775807",
+                                  b"1.7976931348623157E308"))
+
+
+def to_int(s: bytes) -> int:
+    return int(s or 0)
+
+
+def to_float(s: bytes) -> float:
+    # float() also understands b"Infinity"
+    return float(s or 0)
+
+
+def to_bool(s: bytes) -> bool:
+    return int(s or 0) != 0
+
+
+def to_str(s: bytes) -> str:
+    return s.decode('UTF-8', errors='backslashreplace')
+
+
+def to_decimal(s: bytes) -> Decimal:
+    if s in UNSET_DECIMAL_FIELDS:
+        return UNSET_DECIMAL
+    return Decimal(s.decode())
+
+
+def to_float_size(s: bytes) -> float:
+    """ size for SizeModeEnum.FLOAT, UNSET_DOUBLE when unset """
+    if s in UNSET_DECIMAL_FIELDS:
+        return UNSET_DOUBLE
+    return float(s)
+
+
+def to_scaled_int_size(s: bytes) -> int:
+    """ size for SizeModeEnum.SCALED_INT: the size times SIZE_SCALE, exact for
+    up to 4 decimals, UNSET_LONG when unset """
+    if s in UNSET_DECIMAL_FIELDS:
+        return UNSET_LONG
+    try:
+        return int(s) * SIZE_SCALE
+    except ValueError:
+        # fractional sizes (crypto, fractional shares) are rare
+        return int(Decimal(s.decode()) * SIZE_SCALE)
+
+
+SIZE_CONVERTERS = {
+    SizeModeEnum.DECIMAL: to_decimal,
+    SizeModeEnum.FLOAT: to_float_size,
+    SizeModeEnum.SCALED_INT: to_scaled_int_size,
+}
+
+
+def size_converter(sizeMode):
+    try:
+        return SIZE_CONVERTERS[sizeMode]
+    except KeyError:
+        raise ValueError("unknown size mode %r" % (sizeMode, )) from None
+
+
+def to_str_or_latin1(s: bytes) -> str:
+    """ str argument of the signature based dispatch """
+    try:
+        return s.decode('UTF-8')
+    except UnicodeDecodeError:
+        return s.decode('latin-1')
+
+
+def to_str_unicode_escape(s: bytes) -> str:
+    """ str argument of the signature based dispatch from
+    MIN_SERVER_VER_ENCODE_MSG_ASCII7 on """
+    # plain ascii without escapes is by far the most common case
+    if s.isascii() and b"\\" not in s:
+        return s.decode('ascii')
+    try:
+        return s.decode('unicode-escape')
+    except UnicodeDecodeError:
+        return s.decode('latin-1')
+
+
+def signature_converters(params, useUnicode):
+    """ the converters for the parameters (but self) of a wrapper method,
+    chosen from their annotations like Decoder.interpretWithSignature did """
+    strConv = to_str_unicode_escape if useUnicode else to_str_or_latin1
+    converters = []
+    for (pname, param) in params.items():
+        if pname == "self":
+            continue
+        if param.annotation is int:
+            converters.append(int)
+        elif param.annotation is float:
+            converters.append(float)
+        elif param.annotation is Decimal:
+            converters.append(to_decimal)
+        else:
+            converters.append(strConv)
+    return tuple(converters)
+
+
+def compile_layout(layout):
+    """ layout is the flat list of converters for consecutive fields, None
+    meaning the field is skipped. Returns convert(fields, offset=0) giving the
+    list of converted values; len(layout) is the number of fields consumed. """
+
+    steps = tuple((idx, conv) for (idx, conv) in enumerate(layout) if conv is not None)
+    nFields = len(layout)
+
+    def convert(fields, offset=0):
+        if len(fields) - offset < nFields:
+            raise BadMessage("no more fields")
+        return [conv(fields[offset + idx]) for (idx, conv) in steps]
+
+    convert.nFields = nFields
+    return convert
@@ -10,6 +10,8 @@ It will call the corresponding method from the EWrapper so that customer's code
 (eg: class derived from EWrapper) can make further use of the data.
 """
 
+import time
+
 from ibapi.message import IN
 from ibapi.wrapper import * # @UnusedWildImport
 from ibapi.contract import ContractDescription
@@ -22,15 +24,31 @@ from ibapi.scanner import ScanData
 from ibapi.errors import BAD_MESSAGE
 from ibapi.common import * # @UnusedWildImport
 from ibapi.orderdecoder import OrderDecoder
+from ibapi.decode_plan import (compile_layout, signature_converters, to_int, to_float,
+    to_bool, to_str, to_decimal, size_converter)
+from ibapi import columnar
+from ibapi.instrumentation import TimedWrapper
 
 logger = logging.getLogger(__name__)
 
 
+# HandleInfo.route: the callback goes to reqHandlers[its reqId argument]
+BY_REQ_ID = object()
+
+# the reqHandlers key of the answers of reqPositions, which have no reqId
+POSITIONS_HANDLER = "positions"
+
+
 class HandleInfo(Object):
-    def __init__(self, wrap=None, proc=None):
+    def __init__(self, wrap=None, proc=None, plan=None, route=None):
+        """route - for wrap, the reqHandlers key of the handler called instead
+            of the wrapper if there is one: BY_REQ_ID or a fixed key"""
         self.wrapperMeth = wrap
         self.wrapperParams = None
+        self.wrapperConverters = None   # useUnicode -> converters, see discoverParams
         self.processMeth = proc
+        self.planMeth = plan
+        self.route = route
         if wrap is None and proc is None:
             raise ValueError("both wrap and proc can't be None")
 
@@ -41,10 +59,33 @@ class HandleInfo(Object):
 
 
 class Decoder(Object):
-    def __init__(self, wrapper, serverVersion):
+    def __init__(self, wrapper, serverVersion, historicalDataBatch=False,
+                 historicalTicksArrays=False, sizeMode=SizeModeEnum.DECIMAL):
         self.wrapper = wrapper
         self.serverVersion = serverVersion
+        self.historicalDataBatch = historicalDataBatch
+        self.historicalTicksArrays = historicalTicksArrays
+        self.sizeMode = sizeMode
+        self.sizeConverter = size_converter(sizeMode)
+        self.msgId2plan = {}
+        self.useUnicode = False
+        self.instrumentation = None
+        self.contractCache = None
+        self.reqHandlers = {}       # reqId or POSITIONS_HANDLER -> object answered instead of the wrapper
         self.discoverParams()
+        if serverVersion is not None:
+            self.compilePlans()
+
+
+    def decodeSize(self, fields):
+        """ the size of a market data message (tick, depth, bar volume, tick
+        by tick) in the type chosen by sizeMode. Quantities of orders,
+        positions and executions are always decoded as Decimal. """
+        try:
+            s = next(fields)
+        except StopIteration:
+            raise BadMessage("no more fields")
+        return self.sizeConverter(s)
 
 
     def processTickPriceMsg(self, fields):
@@ -54,18 +95,15 @@ class Decoder(Object):
         reqId = decode(int, fields)
         tickType = decode(int, fields)
         price = decode(float, fields)
-        size = decode(Decimal, fields) # ver 2 field
+        size = self.decodeSize(fields) # ver 2 field
         attrMask = decode(int, fields) # ver 3 field
 
-        attrib = TickAttrib()
-
-        attrib.canAutoExecute = attrMask == 1
-
-        if self.serverVersion >= MIN_SERVER_VER_PAST_LIMIT:
-            attrib.canAutoExecute = attrMask & 1 != 0
-            attrib.pastLimit = attrMask & 2 != 0
-            if self.serverVersion >= MIN_SERVER_VER_PRE_OPEN_BID_ASK:
-                attrib.preOpen = attrMask & 4 != 0
+        if self.serverVersion >= MIN_SERVER_VER_PRE_OPEN_BID_ASK:
+            attrib = TICK_ATTRIBS[attrMask & 7]
+        elif self.serverVersion >= MIN_SERVER_VER_PAST_LIMIT:
+            attrib = TICK_ATTRIBS[attrMask & 3]
+        else:
+            attrib = TICK_ATTRIBS[1 if attrMask == 1 else 0]
 
         self.wrapper.tickPrice(reqId, tickType, price, attrib)
 
@@ -94,7 +132,7 @@ class Decoder(Object):
 
         reqId = decode(int, fields)
         sizeTickType = decode(int, fields)
-        size = decode(Decimal, fields)
+        size = self.decodeSize(fields)
 
         if sizeTickType != TickTypeEnum.NOT_SET:
             self.wrapper.tickSize(reqId, sizeTickType, size)
@@ -340,8 +378,19 @@ class Decoder(Object):
             contract.sizeIncrement = decode(Decimal, fields)
             contract.suggestedSizeIncrement = decode(Decimal, fields)
 
-        self.wrapper.contractDetails(reqId, contract)
+        if self.contractCache is not None:
+            self.contractCache.contractDetails(reqId, contract)
+        self.reqHandlers.get(reqId, self.wrapper).contractDetails(reqId, contract)
+
+
+    def processContractDataEndMsg(self, fields):
+        next(fields)
+        decode(int, fields)
+        reqId = decode(int, fields)
 
+        if self.contractCache is not None:
+            self.contractCache.contractDetailsEnd(reqId)
+        self.reqHandlers.get(reqId, self.wrapper).contractDetailsEnd(reqId)
 
     def processBondContractDataMsg(self, fields):
 
@@ -408,7 +457,9 @@ class Decoder(Object):
             contract.sizeIncrement = decode(Decimal, fields)
             contract.suggestedSizeIncrement = decode(Decimal, fields)
 
-        self.wrapper.bondContractDetails(reqId, contract)
+        if self.contractCache is not None:
+            self.contractCache.contractDetails(reqId, contract)
+        self.reqHandlers.get(reqId, self.wrapper).bondContractDetails(reqId, contract)
 
     def processScannerDataMsg(self, fields):
         next(fields)
@@ -515,6 +566,7 @@ class Decoder(Object):
         endDateStr = decode(str, fields) # ver 2 field
 
         itemCount = decode(int, fields)
+        wrapper = self.reqHandlers.get(reqId, self.wrapper)
 
         for _ in range(itemCount):
             bar = BarData()
@@ -523,7 +575,7 @@ class Decoder(Object):
             bar.high = decode(float, fields)
             bar.low = decode(float, fields)
             bar.close = decode(float, fields)
-            bar.volume = decode(Decimal, fields)
+            bar.volume = self.decodeSize(fields)
             bar.wap = decode(Decimal, fields)
 
             if self.serverVersion < MIN_SERVER_VER_SYNT_REALTIME_BARS:
@@ -531,10 +583,10 @@ class Decoder(Object):
 
             bar.barCount = decode(int, fields) # ver 3 field
 
-            self.wrapper.historicalData(reqId, bar)
+            wrapper.historicalData(reqId, bar)
 
         # send end of dataset marker
-        self.wrapper.historicalDataEnd(reqId, startDateStr, endDateStr)
+        wrapper.historicalDataEnd(reqId, startDateStr, endDateStr)
 
     def processHistoricalDataUpdateMsg(self, fields):
         next(fields)
@@ -547,7 +599,7 @@ class Decoder(Object):
         bar.high = decode(float, fields)
         bar.low = decode(float, fields)
         bar.wap = decode(Decimal, fields)
-        bar.volume = decode(Decimal, fields)
+        bar.volume = self.decodeSize(fields)
         self.wrapper.historicalDataUpdate(reqId, bar)
 
     def processRealTimeBarMsg(self, fields):
@@ -561,7 +613,7 @@ class Decoder(Object):
         bar.high = decode(float, fields)
         bar.low = decode(float, fields)
         bar.close = decode(float, fields)
-        bar.volume = decode(Decimal, fields)
+        bar.volume = self.decodeSize(fields)
         bar.wap = decode(Decimal, fields)
         bar.count = decode(int, fields)
 
@@ -691,7 +743,8 @@ class Decoder(Object):
         if version >= 3:
             avgCost = decode(float, fields)
 
-        self.wrapper.position(account, contract, position, avgCost)
+        self.reqHandlers.get(POSITIONS_HANDLER, self.wrapper).position(
+            account, contract, position, avgCost)
 
 
     def processPositionMultiMsg(self, fields):
@@ -913,7 +966,7 @@ class Decoder(Object):
         for _ in range(numPoints):
             dataPoint = HistogramData()
             dataPoint.price = decode(float,fields)
-            dataPoint.size = decode(Decimal,fields)
+            dataPoint.size = self.decodeSize(fields)
             histogram.append(dataPoint)
 
         self.wrapper.histogramData(reqId, histogram)
@@ -995,7 +1048,7 @@ class Decoder(Object):
             historicalTick.time = decode(int, fields)
             next(fields) # for consistency
             historicalTick.price = decode(float, fields)
-            historicalTick.size = decode(Decimal, fields)
+            historicalTick.size = self.decodeSize(fields)
             ticks.append(historicalTick)
 
         done = decode(bool, fields)
@@ -1013,14 +1066,13 @@ class Decoder(Object):
             historicalTickBidAsk = HistoricalTickBidAsk()
             historicalTickBidAsk.time = decode(int, fields)
             mask = decode(int, fields)
-            tickAttribBidAsk = TickAttribBidAsk()
-            tickAttribBidAsk.askPastHigh = mask & 1 != 0
-            tickAttribBidAsk.bidPastLow = mask & 2 != 0
-            historicalTickBidAsk.tickAttribBidAsk = tickAttribBidAsk
+            # askPastHigh 1, bidPastLow 2 here, the other way round in TICK_ATTRIBS_BID_ASK
+            historicalTickBidAsk.tickAttribBidAsk = TICK_ATTRIBS_BID_ASK[
+                (mask & 1) << 1 | (mask & 2) >> 1]
             historicalTickBidAsk.priceBid = decode(float, fields)
             historicalTickBidAsk.priceAsk = decode(float, fields)
-            historicalTickBidAsk.sizeBid = decode(Decimal, fields)
-            historicalTickBidAsk.sizeAsk = decode(Decimal, fields)
+            historicalTickBidAsk.sizeBid = self.decodeSize(fields)
+            historicalTickBidAsk.sizeAsk = self.decodeSize(fields)
             ticks.append(historicalTickBidAsk)
 
         done = decode(bool, fields)
@@ -1038,12 +1090,9 @@ class Decoder(Object):
             historicalTickLast = HistoricalTickLast()
             historicalTickLast.time = decode(int, fields)
             mask = decode(int, fields)
-            tickAttribLast = TickAttribLast()
-            tickAttribLast.pastLimit = mask & 1 != 0
-            tickAttribLast.unreported = mask & 2 != 0
-            historicalTickLast.tickAttribLast = tickAttribLast
+            historicalTickLast.tickAttribLast = TICK_ATTRIBS_LAST[mask & 3]
             historicalTickLast.price = decode(float, fields)
-            historicalTickLast.size = decode(Decimal, fields)
+            historicalTickLast.size = self.decodeSize(fields)
             historicalTickLast.exchange = decode(str, fields)
             historicalTickLast.specialConditions = decode(str, fields)
             ticks.append(historicalTickLast)
@@ -1064,12 +1113,10 @@ class Decoder(Object):
         elif tickType == 1 or tickType == 2:
             # Last or AllLast
             price = decode(float, fields)
-            size = decode(Decimal, fields)
+            size = self.decodeSize(fields)
             mask = decode(int, fields)
 
-            tickAttribLast = TickAttribLast()
-            tickAttribLast.pastLimit = mask & 1 != 0
-            tickAttribLast.unreported = mask & 2 != 0
+            tickAttribLast = TICK_ATTRIBS_LAST[mask & 3]
             exchange = decode(str, fields)
             specialConditions = decode(str, fields)
 
@@ -1079,12 +1126,10 @@ class Decoder(Object):
             # BidAsk
             bidPrice = decode(float, fields)
             askPrice = decode(float, fields)
-            bidSize = decode(Decimal, fields)
-            askSize = decode(Decimal, fields)
+            bidSize = self.decodeSize(fields)
+            askSize = self.decodeSize(fields)
             mask = decode(int, fields)
-            tickAttribBidAsk = TickAttribBidAsk()
-            tickAttribBidAsk.bidPastLow = mask & 1 != 0
-            tickAttribBidAsk.askPastHigh = mask & 2 != 0
+            tickAttribBidAsk = TICK_ATTRIBS_BID_ASK[mask & 3]
 
             self.wrapper.tickByTickBidAsk(reqId, time, bidPrice, askPrice, bidSize,
                                           askSize, tickAttribBidAsk)
@@ -1111,7 +1156,7 @@ class Decoder(Object):
         operation = decode(int, fields)
         side = decode(int, fields)
         price = decode(float, fields)
-        size = decode(Decimal, fields)
+        size = self.decodeSize(fields)
 
         self.wrapper.updateMktDepth(reqId, position, operation, side, price, size)
 
@@ -1125,7 +1170,7 @@ class Decoder(Object):
         operation = decode(int, fields)
         side = decode(int, fields)
         price = decode(float, fields)
-        size = decode(Decimal, fields)
+        size = self.decodeSize(fields)
         isSmartDepth = False
 
         if self.serverVersion >= MIN_SERVER_VER_SMART_DEPTH:
@@ -1274,7 +1319,10 @@ class Decoder(Object):
         if self.serverVersion >= MIN_SERVER_VER_ADVANCED_ORDER_REJECT:
             advancedOrderRejectJson = decode(str, fields, False, True)
 
-        self.wrapper.error(reqId, errorCode, errorString, advancedOrderRejectJson)
+        if self.contractCache is not None:
+            self.contractCache.error(reqId, errorCode, errorString, advancedOrderRejectJson)
+        self.reqHandlers.get(reqId, self.wrapper).error(reqId, errorCode, errorString,
+                                                       advancedOrderRejectJson)
 
     ######################################################################
 
@@ -1300,21 +1348,133 @@ class Decoder(Object):
 
     ######################################################################
 
+    def compilePlans(self):
+        """Specializes the decoding of the messages it pays off for (see
+        benchmarks/bench_decoder.py) and of the columnar modes, for the current
+        serverVersion and decoding modes. Must be called again if any of them
+        changes. A plan compiler returning None leaves the message to its
+        process*Msg method."""
+
+        self.useUnicode = self.serverVersion >= MIN_SERVER_VER_ENCODE_MSG_ASCII7
+        self.sizeConverter = size_converter(self.sizeMode)
+        self.msgId2plan = {}
+        for (msgId, handleInfo) in self.msgId2handleInfo.items():
+            if handleInfo.planMeth is not None:
+                plan = handleInfo.planMeth(self)
+                if plan is not None:
+                    self.msgId2plan[msgId] = plan
+
+    def compileOrderStatusPlan(self):
+        layout = [None]
+        if self.serverVersion < MIN_SERVER_VER_MARKET_CAP_PRICE:
+            layout.append(None)
+        layout += [to_int, to_str, to_decimal, to_decimal, to_float,
+                   to_int, to_int, to_float, to_int, to_str]
+        hasMktCapPrice = self.serverVersion >= MIN_SERVER_VER_MARKET_CAP_PRICE
+        if hasMktCapPrice:
+            layout.append(to_float)
+        convert = compile_layout(layout)
+        wrapper = self.wrapper
+
+        def plan(fields):
+            values = convert(fields)
+            if not hasMktCapPrice:
+                values.append(None)
+            wrapper.orderStatus(*values)
+
+        return plan
+
+    def compileHistoricalDataPlan(self):
+        """ the historicalDataBatch mode only, the bars one by one are
+        decoded by processHistoricalDataMsg """
+        if not self.historicalDataBatch:
+            return None
+        columnar.require_numpy("historicalDataBatch")
+
+        header = [None]
+        if self.serverVersion < MIN_SERVER_VER_SYNT_REALTIME_BARS:
+            header.append(None)
+        header += [to_int, to_str, to_str, to_int]
+        barLen = 8
+        if self.serverVersion < MIN_SERVER_VER_SYNT_REALTIME_BARS:
+            barLen += 1
+        convertHeader = compile_layout(header)
+        barStart = convertHeader.nFields
+        barCountIdx = barLen - 1
+        wrapper = self.wrapper
+        decoder = self          # reqHandlers may be replaced after compiling
+
+        def batchPlan(fields):
+            (reqId, startDateStr, endDateStr, itemCount) = convertHeader(fields)
+            bars = columnar.historical_bar_columns(fields, barStart, itemCount,
+                                                   barLen, barCountIdx)
+            handler = decoder.reqHandlers.get(reqId, wrapper)
+            handler.historicalDataBatch(reqId, bars)
+            handler.historicalDataEnd(reqId, startDateStr, endDateStr)
+
+        return batchPlan
+
+    def compileHistoricalTicksPlan(self, toArray, tickLen, wrapperMeth):
+        """ the ticks are delivered as a numpy structured array instead of a
+        list of objects once historicalTicksArrays is set """
+        if not self.historicalTicksArrays:
+            return None
+        columnar.require_numpy("historicalTicksArrays")
+        convertHeader = compile_layout((None, to_int, to_int))
+        convertDone = compile_layout((to_bool, ))
+        tickStart = convertHeader.nFields
+        method = getattr(self.wrapper, wrapperMeth)
+
+        def plan(fields):
+            (reqId, tickCount) = convertHeader(fields)
+            ticks = toArray(fields, tickStart, tickCount)
+            (done, ) = convertDone(fields, tickStart + tickCount * tickLen)
+            method(reqId, ticks, done)
+
+        return plan
+
+    def compileHistoricalTicksMidPointPlan(self):
+        return self.compileHistoricalTicksPlan(columnar.historical_ticks_array, 4,
+                                               "historicalTicks")
+
+    def compileHistoricalTicksBidAskPlan(self):
+        return self.compileHistoricalTicksPlan(columnar.historical_ticks_bid_ask_array, 6,
+                                               "historicalTicksBidAsk")
+
+    def compileHistoricalTicksLastPlan(self):
+        return self.compileHistoricalTicksPlan(columnar.historical_ticks_last_array, 6,
+                                               "historicalTicksLast")
+
+    def compileRealTimeBarPlan(self):
+        convert = compile_layout((None, None, to_int, to_int, to_float, to_float,
+                                  to_float, to_float, self.sizeConverter, to_decimal, to_int))
+        wrapper = self.wrapper
+
+        def plan(fields):
+            wrapper.realtimeBar(*convert(fields))
+
+        return plan
+
+    ######################################################################
+
+    paramsDiscovered = False
+
     def discoverParams(self):
-        meth2handleInfo = {}
-        for handleInfo in self.msgId2handleInfo.values():
-            meth2handleInfo[handleInfo.wrapperMeth] = handleInfo
+        """Builds the converters of the messages dispatched by signature.
+        The HandleInfo's are shared, so this is only done once per process."""
 
-        methods = inspect.getmembers(EWrapper, inspect.isfunction)
-        for (_, meth) in methods:
-            #logger.debug("meth %s", name)
-            sig = inspect.signature(meth)
-            handleInfo = meth2handleInfo.get(meth, None)
-            if handleInfo is not None:
-                handleInfo.wrapperParams = sig.parameters
+        if Decoder.paramsDiscovered:
+            return
 
-            #for (pname, param) in sig.parameters.items():
-            #     logger.debug("\tparam %s %s %s", pname, param.name, param.annotation)
+        for handleInfo in self.msgId2handleInfo.values():
+            if handleInfo.wrapperMeth is not None:
+                params = inspect.signature(handleInfo.wrapperMeth).parameters
+                handleInfo.wrapperConverters = {
+                    useUnicode: signature_converters(params, useUnicode)
+                    for useUnicode in (False, True)}
+                handleInfo.wrapperParams = params
+
+        Decoder.paramsDiscovered = True
 
 
     def printParams(self):
@@ -1331,62 +1491,75 @@ class Decoder(Object):
             logger.debug("%s: no param info in %s", fields, handleInfo)
             return
 
+        converters = handleInfo.wrapperConverters[self.useUnicode]
         nIgnoreFields = 2 #bypass msgId and versionId faster this way
-        if len(fields) - nIgnoreFields != len(handleInfo.wrapperParams) - 1:
+        if len(fields) - nIgnoreFields != len(converters):
             logger.error("diff len fields and params %d %d for fields: %s and handleInfo: %s",
                          len(fields), len(handleInfo.wrapperParams), fields,
                          handleInfo)
             return
 
-        fieldIdx = nIgnoreFields
-        args = []
-        for (pname, param) in handleInfo.wrapperParams.items():
-            if pname != "self":
-                logger.debug("field %s ", fields[fieldIdx])
-                try:
-                    arg = fields[fieldIdx].decode('unicode-escape' if self.serverVersion >= MIN_SERVER_VER_ENCODE_MSG_ASCII7 else 'UTF-8')
-                except UnicodeDecodeError:
-                    arg = fields[fieldIdx].decode('latin-1')
-                logger.debug("arg %s type %s", arg, param.annotation)
-                if param.annotation is int:
-                    arg = int(arg)
-                elif param.annotation is float:
-                    arg = float(arg)
-                elif param.annotation is Decimal:
-                    if arg is None or len(arg) == 0:
-                        return UNSET_DECIMAL
-                    else:
-                        return Decimal(arg)
-
-                args.append(arg)
-                fieldIdx += 1
-
-        method = getattr(self.wrapper, handleInfo.wrapperMeth.__name__)
-        logger.debug("calling %s with %s %s", method, self.wrapper, args)
+        args = [conv(field) for (conv, field) in zip(converters, fields[nIgnoreFields:])]
+
+        wrapper = self.wrapper
+        if handleInfo.route is not None:
+            key = args[0] if handleInfo.route is BY_REQ_ID else handleInfo.route
+            wrapper = self.reqHandlers.get(key, wrapper)
+        method = getattr(wrapper, handleInfo.wrapperMeth.__name__)
         method(*args)
 
+    def setInstrumentation(self, instrumentation):
+        """Counts and times every interpreted message and every wrapper
+        callback in instrumentation (an ibapi.instrumentation.Instrumentation),
+        None turns it off again. The interpret() of an uninstrumented Decoder
+        is not affected at all."""
+
+        if isinstance(self.wrapper, TimedWrapper):
+            self.wrapper = self.wrapper.wrapped
+        self.__dict__.pop("interpret", None)
+        self.instrumentation = instrumentation
+        if instrumentation is not None:
+            self.wrapper = TimedWrapper(self.wrapper, instrumentation)
+            self.interpret = self.interpretInstrumented
+        if self.serverVersion is not None:
+            self.compilePlans()
+
+    def interpretInstrumented(self, fields):
+        instrumentation = self.instrumentation
+        instrumentation.callbackNs = 0
+        t0 = time.perf_counter_ns()
+        try:
+            Decoder.interpret(self, fields)
+        finally:
+            elapsed = time.perf_counter_ns() - t0
+            if len(fields) > 0:
+                # the bytes of the fields and their terminating NULs
+                nBytes = sum(map(len, fields)) + len(fields)
+                instrumentation.recordMessage(int(fields[0]), nBytes,
+                                              elapsed - instrumentation.callbackNs)
+
     def interpret(self, fields):
         if len(fields) == 0:
-            logger.debug("no fields")
             return
 
         sMsgId = fields[0]
         nMsgId = int(sMsgId)
 
+        plan = self.msgId2plan.get(nMsgId, None)
         handleInfo = self.msgId2handleInfo.get(nMsgId, None)
 
         if handleInfo is None:
-            logger.debug("%s: no handleInfo", fields)
             return
 
         try:
-            if handleInfo.wrapperMeth is not None:
-                logger.debug("In interpret(), handleInfo: %s", handleInfo)
+            if plan is not None:
+                plan(fields)
+            elif handleInfo.wrapperMeth is not None:
                 self.interpretWithSignature(fields, handleInfo)
             elif handleInfo.processMeth is not None:
                 handleInfo.processMeth(self, iter(fields))
         except BadMessage:
-                theBadMsg = ",".join(fields)
+                theBadMsg = b",".join(fields).decode(errors='backslashreplace')
                 self.wrapper.error(NO_VALID_ID, BAD_MESSAGE.code(),
                                    BAD_MESSAGE.msg() + theBadMsg)
                 raise
@@ -1395,7 +1568,7 @@ class Decoder(Object):
     msgId2handleInfo = {
         IN.TICK_PRICE: HandleInfo(proc=processTickPriceMsg),
         IN.TICK_SIZE: HandleInfo(proc=processTickSizeMsg),
-        IN.ORDER_STATUS: HandleInfo(proc=processOrderStatusMsg),
+        IN.ORDER_STATUS: HandleInfo(proc=processOrderStatusMsg, plan=compileOrderStatusPlan),
         IN.ERR_MSG: HandleInfo(proc=processErrorMsg),
         IN.OPEN_ORDER: HandleInfo(proc=processOpenOrder),
         IN.ACCT_VALUE: HandleInfo(wrap=EWrapper.updateAccountValue),
@@ -1409,7 +1582,7 @@ class Decoder(Object):
         IN.NEWS_BULLETINS: HandleInfo(wrap=EWrapper.updateNewsBulletin),
         IN.MANAGED_ACCTS: HandleInfo(wrap=EWrapper.managedAccounts),
         IN.RECEIVE_FA: HandleInfo(wrap=EWrapper.receiveFA),
-        IN.HISTORICAL_DATA: HandleInfo(proc=processHistoricalDataMsg),
+        IN.HISTORICAL_DATA: HandleInfo(proc=processHistoricalDataMsg, plan=compileHistoricalDataPlan),
         IN.HISTORICAL_DATA_UPDATE: HandleInfo(proc=processHistoricalDataUpdateMsg),
         IN.BOND_CONTRACT_DATA: HandleInfo(proc=processBondContractDataMsg),
         IN.SCANNER_PARAMETERS: HandleInfo(wrap=EWrapper.scannerParameters),
@@ -1419,9 +1592,9 @@ class Decoder(Object):
         IN.TICK_STRING: HandleInfo(wrap=EWrapper.tickString),
         IN.TICK_EFP: HandleInfo(wrap=EWrapper.tickEFP),
         IN.CURRENT_TIME: HandleInfo(wrap=EWrapper.currentTime),
-        IN.REAL_TIME_BARS: HandleInfo(proc=processRealTimeBarMsg),
+        IN.REAL_TIME_BARS: HandleInfo(proc=processRealTimeBarMsg, plan=compileRealTimeBarPlan),
         IN.FUNDAMENTAL_DATA: HandleInfo(wrap=EWrapper.fundamentalData),
-        IN.CONTRACT_DATA_END: HandleInfo(wrap=EWrapper.contractDetailsEnd),
+        IN.CONTRACT_DATA_END: HandleInfo(proc=processContractDataEndMsg),
         IN.OPEN_ORDER_END: HandleInfo(wrap=EWrapper.openOrderEnd),
         IN.ACCT_DOWNLOAD_END: HandleInfo(wrap=EWrapper.accountDownloadEnd),
         IN.EXECUTION_DATA_END: HandleInfo(wrap=EWrapper.execDetailsEnd),
@@ -1430,9 +1603,9 @@ class Decoder(Object):
         IN.MARKET_DATA_TYPE: HandleInfo(wrap=EWrapper.marketDataType),
         IN.COMMISSION_REPORT: HandleInfo(proc=processCommissionReportMsg),
         IN.POSITION_DATA: HandleInfo(proc=processPositionDataMsg),
-        IN.POSITION_END: HandleInfo(wrap=EWrapper.positionEnd),
-        IN.ACCOUNT_SUMMARY: HandleInfo(wrap=EWrapper.accountSummary),
-        IN.ACCOUNT_SUMMARY_END: HandleInfo(wrap=EWrapper.accountSummaryEnd),
+        IN.POSITION_END: HandleInfo(wrap=EWrapper.positionEnd, route=POSITIONS_HANDLER),
+        IN.ACCOUNT_SUMMARY: HandleInfo(wrap=EWrapper.accountSummary, route=BY_REQ_ID),
+        IN.ACCOUNT_SUMMARY_END: HandleInfo(wrap=EWrapper.accountSummaryEnd, route=BY_REQ_ID),
         IN.VERIFY_MESSAGE_API: HandleInfo(wrap=EWrapper.verifyMessageAPI),
         IN.VERIFY_COMPLETED: HandleInfo(wrap=EWrapper.verifyCompleted),
         IN.DISPLAY_GROUP_LIST: HandleInfo(wrap=EWrapper.displayGroupList),
@@ -1463,9 +1636,9 @@ class Decoder(Object):
         IN.MARKET_RULE: HandleInfo(proc=processMarketRuleMsg),
         IN.PNL: HandleInfo(proc=processPnLMsg),
         IN.PNL_SINGLE: HandleInfo(proc=processPnLSingleMsg),
-        IN.HISTORICAL_TICKS: HandleInfo(proc=processHistoricalTicks),
-        IN.HISTORICAL_TICKS_BID_ASK: HandleInfo(proc=processHistoricalTicksBidAsk),
-        IN.HISTORICAL_TICKS_LAST: HandleInfo(proc=processHistoricalTicksLast),
+        IN.HISTORICAL_TICKS: HandleInfo(proc=processHistoricalTicks, plan=compileHistoricalTicksMidPointPlan),
+        IN.HISTORICAL_TICKS_BID_ASK: HandleInfo(proc=processHistoricalTicksBidAsk, plan=compileHistoricalTicksBidAskPlan),
+        IN.HISTORICAL_TICKS_LAST: HandleInfo(proc=processHistoricalTicksLast, plan=compileHistoricalTicksLastPlan),
         IN.TICK_BY_TICK: HandleInfo(proc=processTickByTickMsg),
         IN.ORDER_BOUND: HandleInfo(proc=processOrderBoundMsg),
         IN.COMPLETED_ORDER: HandleInfo(proc=processCompletedOrderMsg),
@@ -0,0 +1,452 @@
+"""
+Precompiled encoders for the heavy outbound requests, the counterpart of the
+decode plans.
+
+EClient.placeOrder() and reqMktData() check the server version before
+almost every field and send each value through comm.make_field(), which
+scans strings character by character. The encoders below are compiled once
+for the negotiated server version: the version checks are resolved up front,
+the field values are collected in a list, converted in one pass, validated
+together and framed with a single join and encode. They produce exactly the
+bytes of the generic methods, and fail like them: a request the generic
+method refuses raises the same exception, for the same field.
+
+Only server versions from MIN_SERVER_VER_ORDER_CONTAINER on (TWS 974 and
+newer) get an encoder, for older ones the compilers return None and the
+generic methods are used.
+"""
+
+import struct
+
+from ibapi import comm
+from ibapi.common import UNSET_INTEGER, UNSET_DOUBLE, DOUBLE_INFINITY, INFINITY_STR
+from ibapi.errors import UPDATE_TWS
+from ibapi.message import OUT
+from ibapi.order import COMPETE_AGAINST_BEST_OFFSET_UP_TO_MID
+from ibapi.server_versions import (MIN_SERVER_VER_ORDER_CONTAINER,
+    MIN_SERVER_VER_D_PEG_ORDERS, MIN_SERVER_VER_PRICE_MGMT_ALGO, MIN_SERVER_VER_DURATION,
+    MIN_SERVER_VER_POST_TO_ATS, MIN_SERVER_VER_AUTO_CANCEL_PARENT,
+    MIN_SERVER_VER_ADVANCED_ORDER_REJECT, MIN_SERVER_VER_MANUAL_ORDER_TIME,
+    MIN_SERVER_VER_PEGBEST_PEGMID_OFFSETS)
+from ibapi.utils import ClientException
+
+
+_SIZE_PREFIX = struct.Struct("!I")
+
+
+def handle_empty(val):
+    """ the value comm.make_field_handle_empty() would send for val, None
+    stays None for frame() to refuse in its turn """
+    if val is None:
+        return None
+    if UNSET_INTEGER == val or UNSET_DOUBLE == val:
+        return ""
+    if DOUBLE_INFINITY == val:
+        return INFINITY_STR
+    return val
+
+
+BOOL_STR = {False: "0", True: "1"}
+# formatting the float is slow and most orders carry it in a few fields
+UNSET_DOUBLE_STR = str(UNSET_DOUBLE)
+
+
+def frame(vals) -> bytes:
+    """Converts vals like comm.make_field() does and returns them as a length
+    prefixed message.
+
+    Numbers and bools always give printable ascii, so the strings are
+    validated all at once on the joined text. Only when that fails the
+    values go one by one through make_field(), which decides and raises,
+    on the first bad field like the generic methods (None included)."""
+
+    if None not in vals:
+        flds = [val if type(val) is str
+                else UNSET_DOUBLE_STR if val is UNSET_DOUBLE
+                else BOOL_STR[val] if type(val) is bool
+                else str(val)
+                for val in vals]
+        text = "".join(flds)
+        if text.isascii() and text.isprintable():
+            flds.append("")     # for the terminator of the last field
+            payload = "\0".join(flds).encode()
+            return _SIZE_PREFIX.pack(len(payload)) + payload
+    payload = "".join([comm.make_field(val) for val in vals]).encode()
+    return _SIZE_PREFIX.pack(len(payload)) + payload
+
+
+def check_sent(flds):
+    """The generic methods convert each field as they go: when collecting
+    the fields fails, the error of a field before wins. Raises it, if any."""
+
+    for val in flds:
+        comm.make_field(val)
+
+
+def update_tws(text):
+    return ClientException(UPDATE_TWS.code(), UPDATE_TWS.msg(), text)
+
+
+def compile_req_mkt_data(serverVersion):
+    """ encode(reqId, contract, genericTickList, snapshot, regulatorySnapshot,
+    mktDataOptions) giving the framed REQ_MKT_DATA message """
+
+    if serverVersion < MIN_SERVER_VER_ORDER_CONTAINER:
+        return None
+
+    VERSION = 11
+    header = [str(OUT.REQ_MKT_DATA), str(VERSION)]
+
+    def encode(reqId, contract, genericTickList, snapshot, regulatorySnapshot,
+               mktDataOptions):
+        flds = list(header)
+        try:
+            collect(flds, reqId, contract, genericTickList, snapshot, regulatorySnapshot,
+                    mktDataOptions)
+        except Exception:
+            check_sent(flds)
+            raise
+        return frame(flds)
+
+    def collect(flds, reqId, contract, genericTickList, snapshot, regulatorySnapshot,
+                mktDataOptions):
+        flds += [
+            reqId,
+            contract.conId,
+            contract.symbol,
+            contract.secType,
+            contract.lastTradeDateOrContractMonth,
+            contract.strike,
+            contract.right,
+            contract.multiplier,
+            contract.exchange,
+            contract.primaryExchange,
+            contract.currency,
+            contract.localSymbol,
+            contract.tradingClass,
+        ]
+
+        if contract.secType == "BAG":
+            comboLegsCount = len(contract.comboLegs) if contract.comboLegs else 0
+            flds.append(comboLegsCount)
+            for comboLeg in contract.comboLegs:
+                flds += [comboLeg.conId, comboLeg.ratio,
+                         comboLeg.action, comboLeg.exchange]
+
+        deltaNeutralContract = contract.deltaNeutralContract
+        if deltaNeutralContract:
+            flds += ["1", deltaNeutralContract.conId,
+                     deltaNeutralContract.delta, deltaNeutralContract.price]
+        else:
+            flds.append("0")
+
+        flds += [genericTickList, snapshot, regulatorySnapshot]
+        if mktDataOptions:
+            raise NotImplementedError("not supported")
+        flds.append("")
+
+    return encode
+
+
+def compile_place_order(serverVersion):
+    """ encode(orderId, contract, order) giving the framed PLACE_ORDER message.
+    Raises ClientException for the order attributes this server version
+    does not support, like the checks of EClient.placeOrder(). """
+
+    if serverVersion < MIN_SERVER_VER_ORDER_CONTAINER:
+        return None
+
+    hasDPegOrders = serverVersion >= MIN_SERVER_VER_D_PEG_ORDERS
+    hasPriceMgmtAlgo = serverVersion >= MIN_SERVER_VER_PRICE_MGMT_ALGO
+    hasDuration = serverVersion >= MIN_SERVER_VER_DURATION
+    hasPostToAts = serverVersion >= MIN_SERVER_VER_POST_TO_ATS
+    hasAutoCancelParent = serverVersion >= MIN_SERVER_VER_AUTO_CANCEL_PARENT
+    hasAdvancedOrderReject = serverVersion >= MIN_SERVER_VER_ADVANCED_ORDER_REJECT
+    hasManualOrderTime = serverVersion >= MIN_SERVER_VER_MANUAL_ORDER_TIME
+    hasPegBestPegMidOffsets = serverVersion >= MIN_SERVER_VER_PEGBEST_PEGMID_OFFSETS
+    header = [str(OUT.PLACE_ORDER)]
+
+    def check(contract, order):
+        if not hasPriceMgmtAlgo and order.usePriceMgmtAlgo:
+            raise update_tws(" It does not support Use price management algo requests")
+        if not hasDuration and order.duration != UNSET_INTEGER:
+            raise update_tws(" It does not support duration attribute")
+        if not hasPostToAts and order.postToAts != UNSET_INTEGER:
+            raise update_tws(" It does not support postToAts attribute")
+        if not hasAutoCancelParent and order.autoCancelParent:
+            raise update_tws(" It does not support autoCancelParent attribute")
+        if not hasAdvancedOrderReject and order.advancedErrorOverride:
+            raise update_tws("  It does not support advanced error override attribute")
+        if not hasManualOrderTime and order.manualOrderTime:
+            raise update_tws("  It does not support manual order time attribute")
+        if not hasPegBestPegMidOffsets:
+            if order.minTradeQty != UNSET_INTEGER \
+                    or order.minCompeteSize != UNSET_INTEGER \
+                    or order.competeAgainstBestOffset != UNSET_DOUBLE \
+                    or order.midOffsetAtWhole != UNSET_DOUBLE \
+                    or order.midOffsetAtHalf != UNSET_DOUBLE:
+                raise update_tws(
+                    "  It does not support PEG BEST / PEG MID order parameters: minTradeQty, minCompeteSize, " +
+                    "competeAgainstBestOffset, midOffsetAtWhole and midOffsetAtHalf")
+
+    needsCheck = not hasPegBestPegMidOffsets
+
+    def encode(orderId, contract, order):
+        if needsCheck:
+            check(contract, order)
+        flds = list(header)
+        try:
+            collect(flds, orderId, contract, order)
+        except Exception:
+            check_sent(flds)
+            raise
+        return frame(flds)
+
+    def collect(flds, orderId, contract, order):
+        flds += [
+            orderId,
+
+            # contract fields
+            contract.conId,
+            contract.symbol,
+            contract.secType,
+            contract.lastTradeDateOrContractMonth,
+            contract.strike,
+            contract.right,
+            contract.multiplier,
+            contract.exchange,
+            contract.primaryExchange,
+            contract.currency,
+            contract.localSymbol,
+            contract.tradingClass,
+            contract.secIdType,
+            contract.secId,
+
+            # main order fields
+            order.action,
+            order.totalQuantity,
+            order.orderType,
+            handle_empty(order.lmtPrice),
+            handle_empty(order.auxPrice),
+
+            # extended order fields
+            order.tif,
+            order.ocaGroup,
+            order.account,
+            order.openClose,
+            order.origin,
+            order.orderRef,
+            order.transmit,
+            order.parentId,
+            order.blockOrder,
+            order.sweepToFill,
+            order.displaySize,
+            order.triggerMethod,
+            order.outsideRth,
+            order.hidden,
+        ]
+
+        if contract.secType == "BAG":
+            comboLegsCount = len(contract.comboLegs) if contract.comboLegs else 0
+            flds.append(comboLegsCount)
+            if comboLegsCount > 0:
+                for comboLeg in contract.comboLegs:
+                    assert comboLeg
+                    flds += [comboLeg.conId,
+                             comboLeg.ratio,
+                             comboLeg.action,
+                             comboLeg.exchange,
+                             comboLeg.openClose,
+                             comboLeg.shortSaleSlot,
+                             comboLeg.designatedLocation,
+                             comboLeg.exemptCode]
+
+            orderComboLegsCount = len(order.orderComboLegs) if order.orderComboLegs else 0
+            flds.append(orderComboLegsCount)
+            if orderComboLegsCount:
+                for orderComboLeg in order.orderComboLegs:
+                    assert orderComboLeg
+                    flds.append(handle_empty(orderComboLeg.price))
+
+            smartComboRoutingParamsCount = len(order.smartComboRoutingParams) \
+                if order.smartComboRoutingParams else 0
+            flds.append(smartComboRoutingParamsCount)
+            if smartComboRoutingParamsCount > 0:
+                for tagValue in order.smartComboRoutingParams:
+                    flds += [tagValue.tag, tagValue.value]
+
+        flds += [
+            "",     # deprecated sharesAllocation field
+            order.discretionaryAmt,
+            order.goodAfterTime,
+            order.goodTillDate,
+            order.faGroup,
+            order.faMethod,
+            order.faPercentage,
+            order.faProfile,
+            order.modelCode,
+
+            # institutional short saleslot data
+            order.shortSaleSlot,
+            order.designatedLocation,
+            order.exemptCode,
+
+            order.ocaType,
+            order.rule80A,
+            order.settlingFirm,
+            order.allOrNone,
+            handle_empty(order.minQty),
+            handle_empty(order.percentOffset),
+            "0",
+            "0",
+            "",
+            order.auctionStrategy,
+            handle_empty(order.startingPrice),
+            handle_empty(order.stockRefPrice),
+            handle_empty(order.delta),
+            handle_empty(order.stockRangeLower),
+            handle_empty(order.stockRangeUpper),
+            order.overridePercentageConstraints,
+
+            # volatility orders
+            handle_empty(order.volatility),
+            handle_empty(order.volatilityType),
+            order.deltaNeutralOrderType,
+            handle_empty(order.deltaNeutralAuxPrice),
+        ]
+
+        if order.deltaNeutralOrderType:
+            flds += [order.deltaNeutralConId,
+                     order.deltaNeutralSettlingFirm,
+                     order.deltaNeutralClearingAccount,
+                     order.deltaNeutralClearingIntent,
+                     order.deltaNeutralOpenClose,
+                     order.deltaNeutralShortSale,
+                     order.deltaNeutralShortSaleSlot,
+                     order.deltaNeutralDesignatedLocation]
+
+        flds += [order.continuousUpdate,
+                 handle_empty(order.referencePriceType),
+                 handle_empty(order.trailStopPrice),
+                 handle_empty(order.trailingPercent),
+
+                 # scale orders
+                 handle_empty(order.scaleInitLevelSize),
+                 handle_empty(order.scaleSubsLevelSize),
+                 handle_empty(order.scalePriceIncrement)]
+
+        if order.scalePriceIncrement != UNSET_DOUBLE and order.scalePriceIncrement > 0.0:
+            flds += [handle_empty(order.scalePriceAdjustValue),
+                     handle_empty(order.scalePriceAdjustInterval),
+                     handle_empty(order.scaleProfitOffset),
+                     order.scaleAutoReset,
+                     handle_empty(order.scaleInitPosition),
+                     handle_empty(order.scaleInitFillQty),
+                     order.scaleRandomPercent]
+
+        flds += [order.scaleTable,
+                 order.activeStartTime,
+                 order.activeStopTime,
+
+                 # hedge orders
+                 order.hedgeType]
+        if order.hedgeType:
+            flds.append(order.hedgeParam)
+
+        flds += [order.optOutSmartRouting,
+                 order.clearingAccount,
+                 order.clearingIntent,
+                 order.notHeld]
+
+        deltaNeutralContract = contract.deltaNeutralContract
+        if deltaNeutralContract:
+            flds += ["1", deltaNeutralContract.conId,
+                     deltaNeutralContract.delta, deltaNeutralContract.price]
+        else:
+            flds.append("0")
+
+        flds.append(order.algoStrategy)
+        if order.algoStrategy:
+            algoParamsCount = len(order.algoParams) if order.algoParams else 0
+            flds.append(algoParamsCount)
+            if algoParamsCount > 0:
+                for algoParam in order.algoParams:
+                    flds += [algoParam.tag, algoParam.value]
+
+        miscOptionsStr = ""
+        if order.orderMiscOptions:
+            for tagValue in order.orderMiscOptions:
+                miscOptionsStr += str(tagValue)
+        flds += [order.algoId,
+                 order.whatIf,
+                 miscOptionsStr,
+                 order.solicited,
+                 order.randomizeSize,
+                 order.randomizePrice]
+
+        if order.orderType == "PEG BENCH":
+            flds += [order.referenceContractId,
+                     order.isPeggedChangeAmountDecrease,
+                     order.peggedChangeAmount,
+                     order.referenceChangeAmount,
+                     order.referenceExchangeId]
+
+        flds.append(len(order.conditions))
+        if len(order.conditions) > 0:
+            for cond in order.conditions:
+                flds.append(cond.type())
+                # the conditions make their own NULL terminated fields
+                flds += [condField[:-1] for condField in cond.make_fields()]
+            flds += [order.conditionsIgnoreRth,
+                     order.conditionsCancelOrder]
+
+        flds += [order.adjustedOrderType,
+                 order.triggerPrice,
+                 order.lmtPriceOffset,
+                 order.adjustedStopPrice,
+                 order.adjustedStopLimitPrice,
+                 order.adjustedTrailingAmount,
+                 order.adjustableTrailingUnit,
+                 order.extOperator,
+                 order.softDollarTier.name,
+                 order.softDollarTier.val,
+                 order.cashQty,
+                 order.mifid2DecisionMaker,
+                 order.mifid2DecisionAlgo,
+                 order.mifid2ExecutionTrader,
+                 order.mifid2ExecutionAlgo,
+                 order.dontUseAutoPriceForHedge,
+                 order.isOmsContainer]
+
+        if hasDPegOrders:
+            flds.append(order.discretionaryUpToLimitPrice)
+        if hasPriceMgmtAlgo:
+            flds.append(handle_empty(UNSET_INTEGER if order.usePriceMgmtAlgo == None
+                                     else 1 if order.usePriceMgmtAlgo else 0))
+        if hasDuration:
+            flds.append(order.duration)
+        if hasPostToAts:
+            flds.append(order.postToAts)
+        if hasAutoCancelParent:
+            flds.append(order.autoCancelParent)
+        if hasAdvancedOrderReject:
+            flds.append(order.advancedErrorOverride)
+        if hasManualOrderTime:
+            flds.append(order.manualOrderTime)
+
+        if hasPegBestPegMidOffsets:
+            sendMidOffsets = False
+            if contract.exchange == "IBKRATS":
+                flds.append(handle_empty(order.minTradeQty))
+            if order.orderType == "PEG BEST":
+                flds.append(handle_empty(order.minCompeteSize))
+                flds.append(handle_empty(order.competeAgainstBestOffset))
+                if order.competeAgainstBestOffset == COMPETE_AGAINST_BEST_OFFSET_UP_TO_MID:
+                    sendMidOffsets = True
+            elif order.orderType == "PEG MID":
+                sendMidOffsets = True
+            if sendMidOffsets:
+                flds.append(handle_empty(order.midOffsetAtWhole))
+                flds.append(handle_empty(order.midOffsetAtHalf))
+
+    return encode
@@ -12,6 +12,10 @@ from ibapi.utils import floatMaxString
 
 
 class Execution(Object):
+    __slots__ = ("execId", "time", "acctNumber", "exchange", "side", "shares", "price", "permId",
+                 "clientId", "orderId", "liquidation", "cumQty", "avgPrice", "orderRef",
+                 "evRule", "evMultiplier", "modelCode", "lastLiquidity")
+
     def __init__(self):
         self.execId = ""
         self.time =  ""
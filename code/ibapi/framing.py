@@ -0,0 +1,99 @@
+"""
+Incremental framing of the length-prefixed messages sent by TWS/IBGW.
+
+The FrameBuffer owns a single reusable bytearray. The reader appends the raw
+socket data to it (or receives straight into it) and extract() walks every
+complete message in one pass, copying each payload out exactly once. Only the
+trailing partial message, if any, is ever moved back to the front of the
+buffer, so the cost of a burst is linear in its size.
+"""
+
+import struct
+
+
+_SIZE_PREFIX = struct.Struct("!I")
+HEADER_LEN = _SIZE_PREFIX.size
+DEFAULT_CAPACITY = 64 * 1024
+
+
+class FrameBuffer:
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self._buf = bytearray(capacity)
+        self._start = 0     # first byte not yet consumed
+        self._end = 0       # first free byte
+
+    def __len__(self):
+        """ number of pending (received but not yet extracted) bytes """
+        return self._end - self._start
+
+    def capacity(self):
+        return len(self._buf)
+
+    def clear(self):
+        self._start = 0
+        self._end = 0
+
+    def reserve(self, n):
+        """ makes sure n bytes can be written after the pending data """
+        if self._end + n <= len(self._buf):
+            return
+
+        pending = self._end - self._start
+        if pending + n <= len(self._buf):
+            # compact: move the partial message back to the front
+            view = memoryview(self._buf)
+            view[:pending] = view[self._start:self._end]
+            view.release()
+        else:
+            # grow into a new array so views handed out earlier stay valid
+            newBuf = bytearray(max(2 * len(self._buf), pending + n))
+            newBuf[:pending] = memoryview(self._buf)[self._start:self._end]
+            self._buf = newBuf
+        self._start = 0
+        self._end = pending
+
+    def write(self, data):
+        """ appends raw bytes received from the socket """
+        n = len(data)
+        if n == 0:
+            return
+        self.reserve(n)
+        self._buf[self._end:self._end + n] = data
+        self._end += n
+
+    def writable(self, n):
+        """ returns a writable view of n free bytes, eg: for socket.recv_into().
+        Call commit() with the number of bytes actually written. """
+        self.reserve(n)
+        return memoryview(self._buf)[self._end:self._end + n]
+
+    def commit(self, n):
+        if n < 0 or self._end + n > len(self._buf):
+            raise ValueError("cannot commit %d bytes" % n)
+        self._end += n
+
+    def extract(self):
+        """ returns the payloads of all the complete messages, oldest first """
+        msgs = []
+        pos = self._start
+        end = self._end
+        unpack = _SIZE_PREFIX.unpack_from
+        view = memoryview(self._buf)
+        try:
+            while end - pos >= HEADER_LEN:
+                (size, ) = unpack(view, pos)
+                stop = pos + HEADER_LEN + size
+                if stop > end:
+                    break
+                msgs.append(view[pos + HEADER_LEN:stop].tobytes())
+                pos = stop
+        finally:
+            view.release()
+
+        if pos == end:
+            # everything consumed, next write starts at the front again
+            self._start = self._end = 0
+        else:
+            self._start = pos
+
+        return msgs
@@ -0,0 +1,179 @@
+"""
+Counters and timing histograms of the incoming message pipeline:
+EReader (bytes and recv calls), the EClient.run queue (depth samples) and
+Decoder.interpret (per msgId counts, bytes and decode time, callback time
+per EWrapper method).
+
+Nothing of this runs unless an Instrumentation is installed with
+EClient.setInstrumentation(); the disabled pipeline pays at most an
+attribute check per message. The counters are plain ints updated from the
+reader and the decoding threads without locking, reset() and snapshot() may
+be called from any thread and are exact enough for monitoring.
+"""
+
+import collections
+import time
+
+from ibapi.message import IN
+
+
+MSG_ID_NAMES = {val: name for (name, val) in vars(IN).items() if isinstance(val, int)}
+
+N_BUCKETS = 48
+
+
+class Histogram:
+    """Log2 bucketed histogram of non negative ints (nanoseconds, queue
+    depths): bucket i counts the values v with v.bit_length() == i, i.e.
+    2**(i-1) <= v < 2**i. Quantiles are the upper bound of their bucket."""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.buckets = [0] * N_BUCKETS
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, val):
+        if val < 0:
+            val = 0
+        self.buckets[min(val.bit_length(), N_BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += val
+        if self.min is None or val < self.min:
+            self.min = val
+        if val > self.max:
+            self.max = val
+
+    def mean(self):
+        return self.total / self.count if self.count else 0.
+
+    def quantile(self, q):
+        if not self.count:
+            return 0
+        rank = q * self.count
+        seen = 0
+        for (idx, n) in enumerate(self.buckets):
+            seen += n
+            if seen >= rank and n:
+                return min((1 << idx) - 1, self.max)
+        return self.max
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "mean": self.mean(),
+            "min": self.min or 0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class TimedWrapper:
+    """Stands in for the EWrapper of an instrumented Decoder and times each
+    callback. The timing function of a method is created on first use and
+    cached as an attribute, so later lookups don't go through __getattr__."""
+
+    def __init__(self, wrapped, instrumentation):
+        self.wrapped = wrapped
+        self.instrumentation = instrumentation
+
+    def __getattr__(self, name):
+        method = getattr(self.wrapped, name)
+        if not callable(method):
+            return method
+        instrumentation = self.instrumentation
+        hist = instrumentation.callbackHistogram(name)
+        clock = time.perf_counter_ns
+
+        def timed(*args):
+            t0 = clock()
+            try:
+                return method(*args)
+            finally:
+                elapsed = clock() - t0
+                hist.record(elapsed)
+                instrumentation.callbackNs += elapsed
+
+        setattr(self, name, timed)
+        return timed
+
+
+class Instrumentation:
+    def __init__(self, queueSampleInterval=64, nQueueSamples=1024):
+        """queueSampleInterval:int - the queue depth is sampled every so
+            many messages (qsize() takes the queue lock).
+        nQueueSamples:int - number of (time, depth) samples kept."""
+
+        self.queueSampleInterval = queueSampleInterval
+        self.queueSamples = collections.deque(maxlen=nQueueSamples)
+        self.callbackTime = {}      # EWrapper method name -> Histogram of ns
+        self.reset()
+
+    def reset(self):
+        self.bytesReceived = 0
+        self.recvCalls = 0
+        self.msgCounts = collections.Counter()
+        self.msgBytes = collections.Counter()
+        self.decodeTime = {}        # msgId -> Histogram of ns spent decoding
+        # reset in place, the TimedWrapper holds on to them
+        for hist in self.callbackTime.values():
+            hist.reset()
+        self.queueDepth = Histogram()
+        self.queueSamples.clear()
+        self.callbackNs = 0         # callback time of the message being decoded
+        self.nUnsampled = 0
+        self.resetTime = time.time()
+
+    def callbackHistogram(self, name):
+        hist = self.callbackTime.get(name)
+        if hist is None:
+            hist = self.callbackTime[name] = Histogram()
+        return hist
+
+    def recordRecv(self, nBytes):
+        self.recvCalls += 1
+        self.bytesReceived += nBytes
+
+    def recordMessage(self, msgId, nBytes, decodeNs):
+        self.msgCounts[msgId] += 1
+        self.msgBytes[msgId] += nBytes
+        hist = self.decodeTime.get(msgId)
+        if hist is None:
+            hist = self.decodeTime[msgId] = Histogram()
+        hist.record(decodeNs)
+
+    def sampleQueue(self, msg_queue, force=False):
+        """ called for each message taken off msg_queue, records its depth
+        every queueSampleInterval calls (or right away if force) """
+        self.nUnsampled += 1
+        if force or self.nUnsampled >= self.queueSampleInterval:
+            self.nUnsampled = 0
+            depth = msg_queue.qsize()
+            self.queueDepth.record(depth)
+            self.queueSamples.append((time.time(), depth))
+
+    def snapshot(self):
+        """ a plain dict of everything recorded since the last reset() """
+        messages = {}
+        for (msgId, count) in list(self.msgCounts.items()):
+            hist = self.decodeTime.get(msgId)
+            messages[msgId] = {
+                "name": MSG_ID_NAMES.get(msgId, str(msgId)),
+                "count": count,
+                "bytes": self.msgBytes[msgId],
+                "decodeNs": hist.summary() if hist is not None else None,
+            }
+        return {
+            "elapsed": time.time() - self.resetTime,
+            "bytesReceived": self.bytesReceived,
+            "recvCalls": self.recvCalls,
+            "messages": messages,
+            "callbacks": {name: hist.summary()
+                          for (name, hist) in list(self.callbackTime.items()) if hist.count},
+            "queueDepth": self.queueDepth.summary(),
+        }
@@ -0,0 +1,496 @@
+"""
+A local stand-in for TWS/IBGW to test and benchmark clients without a
+logged-in TWS.
+
+MockTws listens on a local socket, does the handshake of EClient.connect()
+and answers a few requests with synthetic data built with comm.make_msg:
+
+- startApi: nextValidId and managedAccounts
+- reqAccountSummary: accountSummaryRows rows per account, then the end
+- reqPnL: one pnl
+- reqPositions: nPositions positions, then the end
+- reqHistoricalData: historicalBars one minute bars, or with historicalRange
+  the bars of the requested range and bar size, after historicalDelay
+  seconds; error 162 when the range has no bars or when over the
+  historicalPacing limit, error 200 for symbols starting with "BAD"
+- reqContractDetails: one contract, its conId derived from the symbol, after
+  contractDetailsDelay seconds; symbols starting with "BAD" get error 200
+- reqMktData: TICK_PRICE/TICK_SIZE pairs at tickRate messages per second,
+  until cancelMktData
+
+The other requests are counted and ignored. Each client connection is served
+by its own thread, the market data by one more per connection.
+
+Run from the code/ directory:
+    python -m ibapi.mock_tws --port 7497 --tick-rate 1000
+"""
+
+import argparse
+import collections
+import datetime
+import logging
+import socket
+import threading
+import time
+import zlib
+
+from ibapi import comm
+from ibapi.framing import FrameBuffer
+from ibapi.message import IN, OUT
+from ibapi.server_versions import (MAX_CLIENT_VER, MIN_SERVER_VER_SYNT_REALTIME_BARS,
+    MIN_SERVER_VER_UNREALIZED_PNL, MIN_SERVER_VER_REALIZED_PNL)
+from ibapi.ticktype import TickTypeEnum
+
+
+logger = logging.getLogger(__name__)
+
+
+# market data messages pre-built per subscription and sent round robin
+N_TICK_MSGS = 1024
+
+
+def make_msg(*vals) -> bytes:
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))
+
+
+SPAN_UNITS = {"S": 1, "D": 86400, "W": 7 * 86400, "M": 30 * 86400, "Y": 365 * 86400,
+              "sec": 1, "secs": 1, "min": 60, "mins": 60, "hour": 3600, "hours": 3600,
+              "day": 86400, "days": 86400, "week": 7 * 86400, "month": 30 * 86400}
+
+
+def span_seconds(span):
+    """ the seconds of a durationStr ("2 D") or of a barSizeSetting ("5 mins") """
+    (n, unit) = span.split()
+    return int(n) * SPAN_UNITS[unit]
+
+
+class MockTws:
+    def __init__(self, host="127.0.0.1", port=0, serverVersion=MAX_CLIENT_VER,
+                 accounts=("DU1234567", ), nextOrderId=1, accountSummaryRows=None,
+                 nPositions=10, historicalBars=390, tickRate=1000., contractDetailsDelay=0.,
+                 historicalRange=False, historicalDelay=0., historicalPacing=None):
+        """port:int - 0 picks a free port, see self.port after start()
+        serverVersion:int - the version answered in the handshake
+        accounts - the managed accounts
+        accountSummaryRows:int - rows per account answered to
+            reqAccountSummary, None for one per requested tag
+        nPositions:int - positions answered to reqPositions
+        historicalBars:int - bars answered to reqHistoricalData
+        tickRate:float - market data messages per second per reqMktData
+        contractDetailsDelay:float - seconds before a reqContractDetails is
+            answered, the requests overlap like with TWS
+        historicalRange:bool - answer reqHistoricalData with synthetic bars
+            of the requested endDateTime (UTC "yyyymmdd-hh:mm:ss"),
+            durationStr and barSizeSetting, dated in epoch seconds, the
+            same bars for every request of a time
+        historicalDelay:float - seconds before a historicalRange request is
+            answered
+        historicalPacing - (maxRequests, seconds): the historicalRange
+            requests over maxRequests in any seconds get a pacing violation,
+            None for no limit"""
+
+        self.host = host
+        self.port = port
+        self.serverVersion = serverVersion
+        self.accounts = list(accounts)
+        self.nextOrderId = nextOrderId
+        self.accountSummaryRows = accountSummaryRows
+        self.nPositions = nPositions
+        self.historicalBars = historicalBars
+        self.tickRate = tickRate
+        self.contractDetailsDelay = contractDetailsDelay
+        self.historicalRange = historicalRange
+        self.historicalDelay = historicalDelay
+        self.historicalPacing = historicalPacing
+        self.historicalTimes = collections.deque()  # monotonic time of the recent requests
+        self.pacingViolations = 0
+        self.server = None
+        self.acceptThread = None
+        self.sessions = []
+        self.requests = collections.Counter()     # OUT msgId -> count, all sessions
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """ starts listening, returns self """
+        self.server = socket.socket()
+        self.server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.server.bind((self.host, self.port))
+        self.server.listen(8)
+        self.port = self.server.getsockname()[1]
+        self.acceptThread = threading.Thread(target=self.acceptLoop, daemon=True)
+        self.acceptThread.start()
+        return self
+
+    def stop(self):
+        """ stops listening and hangs up on the clients """
+        server = self.server
+        self.server = None
+        if server is not None:
+            # shutdown() wakes up the blocked accept(), close() alone does not
+            try:
+                server.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+            server.close()
+        with self.lock:
+            sessions = list(self.sessions)
+        for session in sessions:
+            session.close()
+        for session in sessions:
+            session.join()
+
+    def acceptLoop(self):
+        while self.server is not None:
+            try:
+                (sock, _) = self.server.accept()
+            except OSError:
+                return
+            session = MockTwsSession(self, sock)
+            with self.lock:
+                self.sessions.append(session)
+            session.start()
+
+    def countRequest(self, msgId):
+        with self.lock:
+            self.requests[msgId] += 1
+
+    def paceHistorical(self):
+        """ records a historical request, False if it is over historicalPacing """
+        if self.historicalPacing is None:
+            return True
+        (maxRequests, seconds) = self.historicalPacing
+        now = time.monotonic()
+        with self.lock:
+            while self.historicalTimes and self.historicalTimes[0] <= now - seconds:
+                self.historicalTimes.popleft()
+            if len(self.historicalTimes) >= maxRequests:
+                self.pacingViolations += 1
+                return False
+            self.historicalTimes.append(now)
+            return True
+
+
+class MockTwsSession(threading.Thread):
+    """ serves one client connection """
+
+    def __init__(self, tws, sock):
+        super().__init__(daemon=True)
+        self.tws = tws
+        self.sock = sock
+        self.serverVersion = tws.serverVersion
+        self.sendLock = threading.Lock()
+        self.subscriptions = {}             # reqId -> pre-built market data messages
+        self.barsText = None
+        self.subscriptionsChanged = threading.Condition()
+        self.closed = False
+        self.streamer = threading.Thread(target=self.streamLoop, daemon=True)
+        self.handlers = {
+            OUT.START_API: self.startApi,
+            OUT.REQ_ACCOUNT_SUMMARY: self.reqAccountSummary,
+            OUT.REQ_PNL: self.reqPnL,
+            OUT.REQ_POSITIONS: self.reqPositions,
+            OUT.REQ_HISTORICAL_DATA: self.reqHistoricalData,
+            OUT.REQ_MKT_DATA: self.reqMktData,
+            OUT.CANCEL_MKT_DATA: self.cancelMktData,
+            OUT.REQ_CONTRACT_DATA: self.reqContractDetails,
+        }
+
+    def send(self, data):
+        with self.sendLock:
+            self.sock.sendall(data)
+
+    def close(self):
+        self.closed = True
+        with self.subscriptionsChanged:
+            self.subscriptionsChanged.notify_all()
+        try:
+            self.sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+    def run(self):
+        try:
+            self.serve()
+        except OSError:
+            pass        # the client hung up
+        except:
+            logger.exception("unhandled exception in MockTwsSession")
+        finally:
+            self.close()
+            self.sock.close()
+            if self.streamer.is_alive():
+                self.streamer.join()
+            with self.tws.lock:
+                self.tws.sessions.remove(self)
+
+    def serve(self):
+        buf = FrameBuffer()
+
+        # "API\0" and the length prefixed "v100..176" version range
+        prefix = b""
+        while len(prefix) < 4:
+            data = self.sock.recv(4096)
+            if not data:
+                return
+            prefix += data
+        buf.write(prefix[4:])
+        msgs = buf.extract()
+        while not msgs:
+            data = self.sock.recv(4096)
+            if not data:
+                return
+            buf.write(data)
+            msgs = buf.extract()
+        connTime = datetime.datetime.now().strftime("%Y%m%d %H:%M:%S") + " UTC"
+        self.send(make_msg(self.serverVersion, connTime))
+        self.streamer.start()
+
+        while not self.closed:
+            data = self.sock.recv(64 * 1024)
+            if not data:
+                return
+            buf.write(data)
+            for msg in buf.extract():
+                self.handle(comm.read_fields(msg))
+
+    def handle(self, fields):
+        msgId = int(fields[0])
+        self.tws.countRequest(msgId)
+        handler = self.handlers.get(msgId)
+        if handler is not None:
+            handler(fields)
+
+    def startApi(self, fields):
+        accounts = ",".join(self.tws.accounts)
+        self.send(make_msg(IN.NEXT_VALID_ID, 1, self.tws.nextOrderId)
+                  + make_msg(IN.MANAGED_ACCTS, 1, accounts))
+
+    def reqAccountSummary(self, fields):
+        (_, _, reqId, _, tags) = fields[:5]
+        reqId = int(reqId)
+        tags = tags.decode().split(",")
+        nRows = self.tws.accountSummaryRows or len(tags)
+        msgs = []
+        for account in self.tws.accounts:
+            for i in range(nRows):
+                tag = tags[i % len(tags)]
+                if i >= len(tags):
+                    tag += "-%d" % i
+                msgs.append(make_msg(IN.ACCOUNT_SUMMARY, 1, reqId, account, tag,
+                                     "%.2f" % (100000. + i), "USD"))
+        msgs.append(make_msg(IN.ACCOUNT_SUMMARY_END, 1, reqId))
+        self.send(b"".join(msgs))
+
+    def reqPnL(self, fields):
+        reqId = int(fields[1])
+        vals = [IN.PNL, reqId, 1234.5]
+        if self.serverVersion >= MIN_SERVER_VER_UNREALIZED_PNL:
+            vals.append(5678.25)
+        if self.serverVersion >= MIN_SERVER_VER_REALIZED_PNL:
+            vals.append(-12.75)
+        self.send(make_msg(*vals))
+
+    def reqPositions(self, fields):
+        msgs = []
+        account = self.tws.accounts[0]
+        for i in range(self.tws.nPositions):
+            symbol = "SYM%d" % i
+            msgs.append(make_msg(IN.POSITION_DATA, 3, account, 100000 + i, symbol, "STK",
+                                 "", 0., "", "", "NASDAQ", "USD", symbol, "NMS",
+                                 100 * (i + 1), 50. + i))
+        msgs.append(make_msg(IN.POSITION_END, 1))
+        self.send(b"".join(msgs))
+
+    def reqHistoricalData(self, fields):
+        if self.tws.historicalRange:
+            self.reqHistoricalRange(fields)
+            return
+        reqIdIdx = 1 if self.serverVersion >= MIN_SERVER_VER_SYNT_REALTIME_BARS else 2
+        reqId = int(fields[reqIdIdx])
+        nBars = self.tws.historicalBars
+        start = datetime.datetime(2025, 1, 2, 9, 30)
+        end = start + datetime.timedelta(minutes=nBars)
+        vals = [IN.HISTORICAL_DATA]
+        if self.serverVersion < MIN_SERVER_VER_SYNT_REALTIME_BARS:
+            vals.append(3)
+        vals += [reqId, start.strftime("%Y%m%d  %H:%M:%S"), end.strftime("%Y%m%d  %H:%M:%S"),
+                 nBars]
+        if self.barsText is None:
+            self.barsText = self.makeBarsText(start, nBars)
+        self.send(comm.make_msg("".join(comm.make_field(val) for val in vals) + self.barsText))
+
+    def makeBarsText(self, start, nBars):
+        """ the bar fields of the HISTORICAL_DATA answers, the same for all
+        the requests so that the client and not the mock is measured """
+        vals = []
+        price = 100.
+        for i in range(nBars):
+            date = start + datetime.timedelta(minutes=i)
+            (open_, close) = (price, price + (0.05 if i % 3 else -0.04))
+            vals += [date.strftime("%Y%m%d  %H:%M:%S"), open_, max(open_, close) + 0.02,
+                     min(open_, close) - 0.02, close, 1000 + i, round((open_ + close) / 2, 4)]
+            if self.serverVersion < MIN_SERVER_VER_SYNT_REALTIME_BARS:
+                vals.append("false")
+            vals.append(10 + i % 7)
+            price = close
+        return "".join(comm.make_field(val) for val in vals)
+
+    def reqHistoricalRange(self, fields):
+        """ answers at the current server versions only (no version field) """
+        reqId = int(fields[1])
+        (endDateTime, barSize, durationStr) = (field.decode() for field in fields[15:18])
+        if fields[3].startswith(b"BAD"):
+            self.sendLater(self.tws.historicalDelay, make_msg(
+                IN.ERR_MSG, 2, reqId, 200,
+                "No security definition has been found for the request", ""))
+            return
+        if not self.tws.paceHistorical():
+            self.sendLater(self.tws.historicalDelay, make_msg(
+                IN.ERR_MSG, 2, reqId, 162,
+                "Historical Market Data Service error message:Historical data request pacing violation", ""))
+            return
+        if endDateTime:
+            end = int(datetime.datetime.strptime(endDateTime, "%Y%m%d-%H:%M:%S").replace(
+                tzinfo=datetime.timezone.utc).timestamp())
+        else:
+            end = int(time.time())
+        step = span_seconds(barSize)
+        first = -(-(end - span_seconds(durationStr)) // step) * step
+        times = range(first, end, step)
+        if not times:
+            self.sendLater(self.tws.historicalDelay, make_msg(
+                IN.ERR_MSG, 2, reqId, 162,
+                "Historical Market Data Service error message:HMDS query returned no data", ""))
+            return
+        vals = [IN.HISTORICAL_DATA, reqId, first, end, len(times)]
+        for t in times:
+            # a price that only depends on the time, the same in every answer
+            open_ = 100. + (t // step) % 97 / 10.
+            close = open_ + 0.05
+            vals += [t, open_, close + 0.02, open_ - 0.02, close, 1000 + t % 1000,
+                     round(open_ + 0.025, 4), 10 + t % 7]
+        self.sendLater(self.tws.historicalDelay,
+                       comm.make_msg("".join(comm.make_field(val) for val in vals)))
+
+    def reqMktData(self, fields):
+        reqId = int(fields[2])
+        msgs = []
+        for i in range(N_TICK_MSGS // 2):
+            tickType = (TickTypeEnum.BID, TickTypeEnum.ASK, TickTypeEnum.LAST)[i % 3]
+            price = 100. + (i % 50) / 100
+            msgs.append(make_msg(IN.TICK_PRICE, 6, reqId, tickType, price, 100 + i % 10, 0))
+            msgs.append(make_msg(IN.TICK_SIZE, 6, reqId, TickTypeEnum.VOLUME, 10000 + i))
+        with self.subscriptionsChanged:
+            self.subscriptions[reqId] = msgs
+            self.subscriptionsChanged.notify_all()
+
+    def cancelMktData(self, fields):
+        reqId = int(fields[2])
+        with self.subscriptionsChanged:
+            self.subscriptions.pop(reqId, None)
+
+    def reqContractDetails(self, fields):
+        """ answers at the current server versions only (no version field) """
+        (reqId, conId, symbol, secType) = fields[2:6]
+        (exchange, primaryExchange, currency) = (field.decode() for field in fields[10:13])
+        reqId = int(reqId)
+        (symbol, secType) = (symbol.decode(), secType.decode())
+        if symbol.startswith("BAD"):
+            data = make_msg(IN.ERR_MSG, 2, reqId, 200,
+                            "No security definition has been found for the request", "")
+        else:
+            conId = int(conId) or zlib.crc32(symbol.encode()) & 0x7fffffff
+            data = make_msg(
+                IN.CONTRACT_DATA, reqId, symbol, secType, "", 0., "", exchange or "SMART",
+                currency or "USD", symbol, "NMS", "NMS", conId, 0.01, "",
+                "ACTIVETIM,AD,ADJUST,ALERT,ALGO,LMT,MKT,STP", "SMART,NASDAQ,ARCA", 1, 0,
+                symbol + " INC", primaryExchange or "NASDAQ", "", "Technology",
+                "Computers", "Computers", "US/Eastern", "20250102:0930-20250102:1600",
+                "20250102:0930-20250102:1600", "", 0, 0, 1, "", "", "26", "", "COMMON",
+                "0.0001", "0.0001", "100") + make_msg(IN.CONTRACT_DATA_END, 1, reqId)
+        self.sendLater(self.tws.contractDetailsDelay, data)
+
+    def sendLater(self, delay, data):
+        """ sends data after delay seconds, from a timer thread, so that the
+        requests overlap like with TWS """
+        if delay > 0:
+            timer = threading.Timer(delay, self.sendQuietly, (data, ))
+            timer.daemon = True
+            timer.start()
+        else:
+            self.send(data)
+
+    def sendQuietly(self, data):
+        try:
+            self.send(data)
+        except OSError:
+            pass        # the client hung up in the meantime
+
+    def streamLoop(self):
+        """ sends the market data of the subscriptions at tickRate messages
+        per second each, what is due every millisecond at once """
+        rate = self.tws.tickRate
+        positions = {}          # reqId -> index of the next message
+        start = time.monotonic()
+        sent = 0                # messages sent per subscription since start
+        while not self.closed:
+            with self.subscriptionsChanged:
+                if not self.subscriptions:
+                    self.subscriptionsChanged.wait()
+                    start = time.monotonic()
+                    sent = 0
+                    continue
+                subscriptions = list(self.subscriptions.items())
+            due = int((time.monotonic() - start) * rate) - sent
+            if due <= 0:
+                time.sleep(0.001)
+                continue
+            chunks = []
+            for (reqId, msgs) in subscriptions:
+                pos = positions.get(reqId, 0)
+                for _ in range(due):
+                    chunks.append(msgs[pos])
+                    pos = (pos + 1) % len(msgs)
+                positions[reqId] = pos
+            sent += due
+            try:
+                self.send(b"".join(chunks))
+            except OSError:
+                return
+
+
+def main():
+    parser = argparse.ArgumentParser(description="local mock TWS")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=7497)
+    parser.add_argument("--server-version", type=int, default=MAX_CLIENT_VER)
+    parser.add_argument("--account-summary-rows", type=int, default=None)
+    parser.add_argument("--positions", type=int, default=10)
+    parser.add_argument("--bars", type=int, default=390)
+    parser.add_argument("--tick-rate", type=float, default=1000.,
+                        help="market data messages per second per subscription")
+    args = parser.parse_args()
+
+    tws = MockTws(args.host, args.port, args.server_version,
+                  accountSummaryRows=args.account_summary_rows, nPositions=args.positions,
+                  historicalBars=args.bars, tickRate=args.tick_rate)
+    tws.start()
+    print("mock TWS listening on %s:%d, server version %d" % (
+        args.host, tws.port, args.server_version))
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        tws.stop()
+
+
+if "__main__" == __name__:
+    main()
@@ -5,6 +5,8 @@ Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is su
 
 
 class Object(object):
+    __slots__ = ()     # the subclasses without __slots__ keep their __dict__
+
     def __str__(self):
         return "Object"
 
@@ -0,0 +1,186 @@
+"""
+Array-backed market depth books, maintained from the updateMktDepth and
+updateMktDepthL2 callbacks of reqMktDepth (forward them from the EWrapper).
+
+Each reqId has a book with its bid and ask levels in preallocated NumPy
+arrays sized by numRows. An update writes one level in place; an insert or
+a delete moves the levels below it with one slice assignment, a memmove of
+at most numRows elements, so no Python object is created per operation.
+snapshot() hands out read-only views of the arrays instead of copies, valid
+until the next update of the book, and
+the optional onTopOfBook callback reports the changes of the best bid/ask,
+so a consumer only interested in the top does not have to read the book.
+"""
+
+import math
+
+from ibapi.columnar import np, require_numpy
+from ibapi.common import SizeModeEnum, size_float
+
+
+DEPTH_INSERT = 0
+DEPTH_UPDATE = 1
+DEPTH_DELETE = 2
+
+SIDE_ASK = 0
+SIDE_BID = 1
+
+
+class BookSide:
+    """ the levels of one side, best first """
+
+    def __init__(self, numRows):
+        self.prices = np.full(numRows, math.nan)
+        self.sizes = np.zeros(numRows)
+        self.marketMakers = [""] * numRows
+        self.depth = 0
+
+    def grow(self, numRows):
+        extra = numRows - len(self.prices)
+        self.prices = np.concatenate((self.prices, np.full(extra, math.nan)))
+        self.sizes = np.concatenate((self.sizes, np.zeros(extra)))
+        self.marketMakers += [""] * extra
+
+    def apply(self, position, operation, price, size, marketMaker):
+        """ returns False for an operation outside of the book """
+        depth = self.depth
+        if operation == DEPTH_UPDATE:
+            if position >= depth:
+                if position != depth:
+                    return False
+                operation = DEPTH_INSERT    # an update of the row after the last adds it
+            else:
+                self.prices[position] = price
+                self.sizes[position] = size
+                self.marketMakers[position] = marketMaker
+                return True
+
+        if operation == DEPTH_INSERT:
+            if position > depth:
+                return False
+            if depth == len(self.prices):
+                self.grow(max(1, 2 * depth))
+            prices = self.prices
+            sizes = self.sizes
+            if position < depth:
+                prices[position + 1:depth + 1] = prices[position:depth]
+                sizes[position + 1:depth + 1] = sizes[position:depth]
+                self.marketMakers.insert(position, marketMaker)
+                self.marketMakers.pop()
+            else:
+                self.marketMakers[position] = marketMaker
+            prices[position] = price
+            sizes[position] = size
+            self.depth = depth + 1
+            return True
+
+        if operation == DEPTH_DELETE:
+            if position >= depth:
+                return False
+            prices = self.prices
+            sizes = self.sizes
+            prices[position:depth - 1] = prices[position + 1:depth]
+            sizes[position:depth - 1] = sizes[position + 1:depth]
+            prices[depth - 1] = math.nan
+            sizes[depth - 1] = 0.
+            del self.marketMakers[position]
+            self.marketMakers.append("")
+            self.depth = depth - 1
+            return True
+
+        return False
+
+    def top(self):
+        if not self.depth:
+            return (math.nan, 0.)
+        return (self.prices[0].item(), self.sizes[0].item())
+
+
+class Book:
+    def __init__(self, numRows):
+        self.sides = (BookSide(numRows), BookSide(numRows))     # by SIDE_ASK, SIDE_BID
+        self.nUpdates = 0
+        self.nRejected = 0
+
+
+def read_only(arr):
+    view = arr.view()
+    view.flags.writeable = False
+    return view
+
+
+class OrderBook:
+    def __init__(self, numRows=10, onTopOfBook=None, sizeMode=SizeModeEnum.DECIMAL):
+        """numRows:int - the numRows of the reqMktDepth requests, the books
+            grow if a stream has more levels (SMART depth for instance)
+        onTopOfBook - called as onTopOfBook(reqId, bidPrice, bidSize,
+            askPrice, askSize) when the best bid or ask price/size changes;
+            a missing side has a NaN price and a 0 size
+        sizeMode:SizeMode - the one of the client (EClient.setSizeMode), the
+            sizes are kept as float numbers of shares, 0 if unset"""
+
+        require_numpy("OrderBook")
+        self.numRows = numRows
+        self.onTopOfBook = onTopOfBook
+        self.sizeMode = sizeMode
+        self.books = {}
+
+    def book(self, reqId):
+        book = self.books.get(reqId)
+        if book is None:
+            book = self.books[reqId] = Book(self.numRows)
+        return book
+
+    def apply(self, reqId, position, marketMaker, operation, side, price, size):
+        book = self.book(reqId)
+        bookSide = book.sides[side]
+        size = size_float(size, self.sizeMode, 0.)
+        if self.onTopOfBook is None or position > 0:
+            applied = bookSide.apply(position, operation, price, size, marketMaker)
+        else:
+            before = bookSide.top()
+            applied = bookSide.apply(position, operation, price, size, marketMaker)
+            if applied and bookSide.top() != before:
+                (bidPrice, bidSize) = book.sides[SIDE_BID].top()
+                (askPrice, askSize) = book.sides[SIDE_ASK].top()
+                self.onTopOfBook(reqId, bidPrice, bidSize, askPrice, askSize)
+        if applied:
+            book.nUpdates += 1
+        else:
+            book.nRejected += 1
+        return applied
+
+    def updateMktDepth(self, reqId, position, operation, side, price, size):
+        return self.apply(reqId, position, "", operation, side, price, size)
+
+    def updateMktDepthL2(self, reqId, position, marketMaker, operation, side, price, size,
+                         isSmartDepth=False):
+        return self.apply(reqId, position, marketMaker, operation, side, price, size)
+
+    def top(self, reqId):
+        """ (bidPrice, bidSize, askPrice, askSize) """
+        book = self.book(reqId)
+        return book.sides[SIDE_BID].top() + book.sides[SIDE_ASK].top()
+
+    def snapshot(self, reqId):
+        """ {"bidPrice", "bidSize", "askPrice", "askSize"} read-only views of
+        the current levels, best first. They are only valid until the next
+        update of the book: the updates change them in place, and once the
+        book grows past its rows they are detached from it and stay as they
+        were. Copy them to keep a snapshot. """
+        book = self.book(reqId)
+        bid = book.sides[SIDE_BID]
+        ask = book.sides[SIDE_ASK]
+        return {"bidPrice": read_only(bid.prices[:bid.depth]),
+                "bidSize": read_only(bid.sizes[:bid.depth]),
+                "askPrice": read_only(ask.prices[:ask.depth]),
+                "askSize": read_only(ask.sizes[:ask.depth])}
+
+    def marketMakers(self, reqId, side):
+        """ the market makers of the levels of side, for the L2 books """
+        bookSide = self.book(reqId).sides[side]
+        return bookSide.marketMakers[:bookSide.depth]
+
+    def clear(self, reqId):
+        """ drops the book, to call after cancelMktDepth """
+        self.books.pop(reqId, None)
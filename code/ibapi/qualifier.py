@@ -0,0 +1,164 @@
+"""
+Bulk contract qualification: resolves a list of contracts with
+reqContractDetails, many requests in flight at once.
+
+    qualifier = ContractQualifier(client)
+    for result in qualifier.qualify(contracts, timeout=60):
+        if result.errorCode:
+            print(result.contract.symbol, result.errorCode, result.errorString)
+        else:
+            useContract(result.details[0].contract)
+
+qualify() allocates the reqIds (from firstReqId on, out of the way of the
+application's), keeps up to maxInFlight requests outstanding and paces them
+at msgRate messages per second, unless the EWriter of the client
+(EClient.setWriteQueue) already paces everything. The contractDetails,
+bondContractDetails, contractDetailsEnd and error answers of these reqIds
+are routed to the qualifier through EClient.reqHandlers instead of the
+wrapper, so the application sees none of them, not even the late answers of
+the requests given up at the timeout. Warnings (codes 2100-2199) don't end a
+request. Contracts the ContractCache
+of the client knows are answered without a request, and the answers of the
+others are added to it.
+
+qualify() blocks the calling thread: the answers must be read by another
+one, EClient.run() in its thread, like for main.TradingApp. It can't be used
+from the event loop of an AsyncEClient.
+"""
+
+import collections
+import itertools
+import threading
+import time
+
+from ibapi.errors import CodeMsgPair, NOT_CONNECTED
+from ibapi.object_implem import Object
+from ibapi.request_futures import WARNING_CODES
+from ibapi.writer import DEFAULT_BURST, DEFAULT_MSG_RATE, TokenBucket
+
+
+DEFAULT_FIRST_REQ_ID = 1 << 30
+DEFAULT_MAX_IN_FLIGHT = 50
+
+NO_ANSWER = CodeMsgPair(-1, "No answer before the timeout")
+
+
+class QualifyResult(Object):
+    __slots__ = ("contract", "details", "errorCode", "errorString")
+
+    def __init__(self, contract):
+        self.contract = contract    # as given to qualify()
+        self.details = []           # the ContractDetails answered, more than one if ambiguous
+        self.errorCode = 0
+        self.errorString = ""
+
+    def __str__(self):
+        if self.errorCode:
+            return "%s: error %d %s" % (self.contract.symbol, self.errorCode, self.errorString)
+        return "%s: %s" % (self.contract.symbol, ",".join(
+            str(details.contract.conId) for details in self.details))
+
+
+class ContractQualifier:
+    def __init__(self, client, maxInFlight=DEFAULT_MAX_IN_FLIGHT, msgRate=DEFAULT_MSG_RATE,
+                 burst=DEFAULT_BURST, firstReqId=DEFAULT_FIRST_REQ_ID):
+        """client - a connected EClient, its run() going in another thread
+        maxInFlight:int - requests sent and not answered yet, at most
+        msgRate:float - requests per second when the client has no EWriter,
+            None for no pacing
+        burst:int - requests that may be sent at once after an idle time
+        firstReqId:int - the first reqId used"""
+
+        self.client = client
+        self.maxInFlight = maxInFlight
+        self.msgRate = msgRate
+        self.burst = burst
+        self.reqIds = itertools.count(firstReqId)
+        self.cond = threading.Condition()
+        self.reqId2result = {}      # the requests in flight
+
+    def qualify(self, contracts, timeout=None):
+        """Resolves contracts, returns one QualifyResult per contract, in
+        the same order. The contracts not answered within timeout seconds
+        (None for no limit) get the error NO_ANSWER, or NOT_CONNECTED if
+        the client got disconnected."""
+
+        results = [QualifyResult(contract) for contract in contracts]
+        todo = collections.deque(results)
+        bucket = None
+        if self.client.writer is None and self.msgRate:
+            bucket = TokenBucket(self.msgRate, self.burst)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        codeMsg = NO_ANSWER
+        with self.cond:
+            while todo or self.reqId2result:
+                now = time.monotonic()
+                if deadline is not None and now >= deadline:
+                    break
+                if not self.client.isConnected():
+                    codeMsg = NOT_CONNECTED
+                    break
+                wait = None
+                while todo and len(self.reqId2result) < self.maxInFlight:
+                    if bucket is not None:
+                        if bucket.available(now) == 0:
+                            wait = bucket.delay()
+                            break
+                        bucket.take(1)
+                    self.send(todo.popleft())
+                if deadline is not None:
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                if self.reqId2result or wait is not None:
+                    # woken up by every answer, checks the connection once in a while
+                    self.cond.wait(0.5 if wait is None else min(wait, 0.5))
+            self.fail(todo, codeMsg)
+            self.fail(self.reqId2result.values(), codeMsg)
+            if codeMsg is NOT_CONNECTED:
+                for reqId in self.reqId2result:
+                    self.client.reqHandlers.pop(reqId, None)
+            # else the handlers stay to swallow the late answers, removed by
+            # their contractDetailsEnd or error
+            self.reqId2result.clear()
+        return results
+
+    def send(self, result):
+        reqId = next(self.reqIds)
+        self.reqId2result[reqId] = result
+        self.client.reqHandlers[reqId] = self
+        # answered right away, from this thread, if the ContractCache knows it
+        self.client.reqContractDetails(reqId, result.contract)
+
+    @staticmethod
+    def fail(results, codeMsg):
+        for result in results:
+            result.errorCode = codeMsg.code()
+            result.errorString = codeMsg.msg()
+
+    def done(self, reqId):
+        self.client.reqHandlers.pop(reqId, None)
+        result = self.reqId2result.pop(reqId, None)
+        self.cond.notify_all()
+        return result
+
+    # the answers, called by the Decoder, or by reqContractDetails
+
+    def contractDetails(self, reqId, contractDetails):
+        with self.cond:
+            result = self.reqId2result.get(reqId)
+            if result is not None:
+                result.details.append(contractDetails)
+
+    bondContractDetails = contractDetails
+
+    def contractDetailsEnd(self, reqId):
+        with self.cond:
+            self.done(reqId)
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        if errorCode in WARNING_CODES:
+            return
+        with self.cond:
+            result = self.done(reqId)
+            if result is not None:
+                result.errorCode = errorCode
+                result.errorString = errorString
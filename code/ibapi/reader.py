@@ -7,48 +7,59 @@ Copyright (C) 2019 Interactive Brokers LLC. All rights reserved. This code is su
 """
 The EReader runs in a separate threads and is responsible for receiving the
 incoming messages.
-It will read the packets from the wire, use the low level IB messaging to
-remove the size prefix and put the rest in a Queue.
+It will read the packets from the wire into a FrameBuffer, use it to remove
+the size prefix and put the rest in a Queue.
 """
 
 import logging
 from threading import Thread
 
-from ibapi import comm
+from ibapi.framing import FrameBuffer
 
 
 logger = logging.getLogger(__name__)
 
 
 class EReader(Thread):
-    def __init__(self, conn, msg_queue):
+    def __init__(self, conn, msg_queue, batch=False):
+        """batch:bool - put the list of all the messages extracted after each
+            receive in msg_queue at once, instead of one message at a time"""
         super().__init__()
         self.conn = conn
         self.msg_queue = msg_queue
+        self.batch = batch
+        self.instrumentation = None     # see EClient.setInstrumentation
+        self.recorder = None            # see EClient.setRecorder
 
     def run(self):
         try:
             logger.debug("EReader thread started")
-            buf = b""
-            while self.conn.isConnected():
+            self.readLoop(self.msg_queue.put if self.batch else self.putEach)
+            logger.debug("EReader thread finished")
+        except:
+            logger.exception('unhandled exception in EReader thread')
 
-                data = self.conn.recvMsg()
-                logger.debug("reader loop, recvd size %d", len(data))
-                buf += data
+    def putEach(self, msgs):
+        for msg in msgs:
+            self.msg_queue.put(msg)
 
-                while len(buf) > 0:
-                    (size, msg, buf) = comm.read_msg(buf)
-                    #logger.debug("resp %s", buf.decode('ascii'))
-                    logger.debug("size:%d msg.size:%d msg:|%s| buf:%s|", size,
-                        len(msg), buf, "|")
+    def readLoop(self, dispatch, idle=None):
+        """Receives until the connection is closed and calls dispatch with
+        the list of complete messages after each receive. idle, if given, is
+        called when a receive returned without data.
+        EClient.run calls it directly in the INLINE dispatch mode."""
 
-                    if msg:
-                        self.msg_queue.put(msg)
-                    else:
-                        logger.debug("more incoming packet(s) are needed ")
-                        break
+        buf = FrameBuffer()
+        while self.conn.isConnected():
 
-            logger.debug("EReader thread finished")
-        except:
-            logger.exception('unhandled exception in EReader thread')
+            n = self.conn.recvInto(buf)
+            if self.instrumentation is not None:
+                self.instrumentation.recordRecv(n)
 
+            msgs = buf.extract()
+            if msgs:
+                if self.recorder is not None:
+                    self.recorder.record(msgs)
+                dispatch(msgs)
+            elif n == 0 and idle is not None:
+                idle()
@@ -0,0 +1,185 @@
+"""
+Wire-level recording and replay of TWS/IBGW sessions.
+
+A Recorder installed with EClient.setRecorder() appends every message the
+EReader extracts from the socket to a file, with its receive time. A
+recording replays into a Decoder, at the original pace or as fast as
+possible, so that a busy session can be profiled offline through the same
+Decoder -> EWrapper path, e.g. into a main.TradingApp.
+
+File layout, all big endian:
+    header:  b"IBAPIREC", version:H, serverVersion:I, startTime:d (epoch
+             seconds), connTime length:H, connTime (utf-8)
+    records: receive time:Q (ns since startTime), payload length:I, payload
+             (the message without its size prefix)
+"""
+
+import argparse
+import collections
+import struct
+import threading
+import time
+
+from ibapi import comm
+from ibapi.decoder import Decoder
+from ibapi.instrumentation import MSG_ID_NAMES
+from ibapi.utils import BadMessage
+from ibapi.wrapper import EWrapper
+
+
+MAGIC = b"IBAPIREC"
+FORMAT_VERSION = 1
+_HEADER = struct.Struct("!8sHIdH")
+_RECORD = struct.Struct("!QI")
+
+
+class Recorder:
+    def __init__(self, path):
+        """path - the file the recording goes to, created by begin()"""
+
+        self.path = path
+        self.file = None
+        self.startNs = None
+        self.nMsgs = 0
+        self.nBytes = 0
+        self.lock = threading.Lock()
+
+    def begin(self, serverVersion, connTime):
+        """ creates the file, called by EClient.connect() once the server
+        version is known """
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+            if isinstance(connTime, bytes):
+                connTime = connTime.decode()
+            connTime = (connTime or "").encode()
+            self.file = open(self.path, "wb")
+            self.file.write(_HEADER.pack(MAGIC, FORMAT_VERSION, serverVersion, time.time(),
+                                         len(connTime)))
+            self.file.write(connTime)
+            self.startNs = time.monotonic_ns()
+
+    def record(self, msgs, now=None):
+        """ appends msgs, the messages of one receive, with the receive time
+        now (time.monotonic_ns(), the current time by default) """
+        if now is None:
+            now = time.monotonic_ns()
+        with self.lock:
+            if self.file is None:
+                return
+            ts = now - self.startNs
+            chunks = []
+            for msg in msgs:
+                chunks.append(_RECORD.pack(ts, len(msg)))
+                chunks.append(msg)
+                self.nBytes += len(msg)
+            self.nMsgs += len(msgs)
+            self.file.write(b"".join(chunks))
+
+    def close(self):
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class Recording:
+    """ a recording file, its header attributes and its records """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            if len(header) < _HEADER.size:
+                raise ValueError("%s: not a recording" % path)
+            (magic, formatVersion, self.serverVersion, self.startTime, connTimeLen) = \
+                _HEADER.unpack(header)
+            if magic != MAGIC:
+                raise ValueError("%s: not a recording" % path)
+            if formatVersion != FORMAT_VERSION:
+                raise ValueError("%s: unsupported recording version %d" % (path, formatVersion))
+            self.connTime = f.read(connTimeLen).decode()
+            self.dataOffset = f.tell()
+
+    def __iter__(self):
+        """ the (receive time in ns since the start, payload) records """
+        with open(self.path, "rb") as f:
+            f.seek(self.dataOffset)
+            data = f.read()
+        pos = 0
+        end = len(data) - _RECORD.size
+        unpack = _RECORD.unpack_from
+        while pos <= end:
+            (ts, size) = unpack(data, pos)
+            pos += _RECORD.size
+            if pos + size > len(data):
+                break       # truncated by a crash, the rest is lost
+            yield (ts, data[pos:pos + size])
+            pos += size
+
+    def messages(self):
+        """ the payloads only """
+        return [msg for (_, msg) in self]
+
+    def makeDecoder(self, wrapper, **options):
+        """ a Decoder for the server version of the recording, options are
+        the optional arguments of the Decoder """
+        return Decoder(wrapper, self.serverVersion, **options)
+
+
+def replay(recording, decoder, paced=False, speed=1.):
+    """Feeds the messages of recording into decoder, like EClient.run()
+    does (a BadMessage only drops its own message).
+
+    paced:bool - keep the original pacing, divided by speed, instead of
+        going as fast as possible.
+    Returns (number of messages, seconds spent)."""
+
+    interpret = decoder.interpret
+    read_fields = comm.read_fields
+    nMsgs = 0
+    t0 = time.perf_counter()
+    for (ts, msg) in recording:
+        if paced:
+            delay = ts / 1e9 / speed - (time.perf_counter() - t0)
+            if delay > 0:
+                time.sleep(delay)
+        try:
+            interpret(read_fields(msg))
+        except BadMessage:
+            pass
+        nMsgs += 1
+    return (nMsgs, time.perf_counter() - t0)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="summary and replay of a recording")
+    parser.add_argument("path")
+    parser.add_argument("--replay", action="store_true",
+                        help="replay into an EWrapper at max speed and time it")
+    parser.add_argument("--paced", action="store_true", help="keep the original pacing")
+    parser.add_argument("--speed", type=float, default=1.)
+    args = parser.parse_args()
+
+    recording = Recording(args.path)
+    counts = collections.Counter()
+    nBytes = 0
+    duration = 0
+    for (ts, msg) in recording:
+        counts[int(msg[:msg.find(b"\0")] or -1)] += 1
+        nBytes += len(msg)
+        duration = ts
+    print("server version %d, connected %s, %.1f s, %d messages, %d bytes" % (
+        recording.serverVersion, recording.connTime, duration / 1e9,
+        sum(counts.values()), nBytes))
+    for (msgId, count) in counts.most_common():
+        print("  %-28s %9d" % (MSG_ID_NAMES.get(msgId, str(msgId)), count))
+
+    if args.replay or args.paced:
+        decoder = recording.makeDecoder(EWrapper())
+        (nMsgs, elapsed) = replay(recording, decoder, args.paced, args.speed)
+        print("replayed %d messages in %.3f s, %.0f msgs/s" % (nMsgs, elapsed, nMsgs / elapsed))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,101 @@
+"""
+Futures of the pending requests, to wait for their answers instead of
+sleeping a fixed time.
+
+A wrapper keeps a RequestFutures, creates the future of a request with
+expect() before sending it, and resolves it from the callback that ends the
+answer: accountSummaryEnd(reqId), the first pnl(reqId), ... The requests
+without a reqId use the name of their end marker as key ("positionEnd",
+"nextValidId"). error() fails the future of its reqId with a RequestError,
+cancelAll() all of them, from connectionClosed().
+
+    futures = RequestFutures()
+    (summary, pnl) = (futures.expect(1), futures.expect(2))
+    client.reqAccountSummary(1, "All", "$LEDGER:BASE")
+    client.reqPnL(2, account, "")
+    gather([summary, pnl], timeout=10)
+
+The futures are concurrent.futures.Future: resolved from the thread running
+EClient.run(), waited for from any other.
+"""
+
+import concurrent.futures
+import threading
+
+
+# the warnings TWS sends with a reqId, the request goes on
+WARNING_CODES = range(2100, 2200)
+
+
+class RequestError(Exception):
+    def __init__(self, reqId, errorCode, errorString):
+        super().__init__("request %s: error %d %s" % (reqId, errorCode, errorString))
+        self.reqId = reqId
+        self.errorCode = errorCode
+        self.errorString = errorString
+
+
+class RequestFutures:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.key2future = {}
+
+    def __len__(self):
+        return len(self.key2future)
+
+    def expect(self, key):
+        """ the future of the answer to the request key, a reqId or the name
+        of an end marker; the same future while it is pending """
+        with self.lock:
+            future = self.key2future.get(key)
+            if future is None:
+                future = self.key2future[key] = concurrent.futures.Future()
+            return future
+
+    def pop(self, key):
+        with self.lock:
+            return self.key2future.pop(key, None)
+
+    def resolve(self, key, result=None):
+        """ completes the future of key with result, returns False if none
+        was pending, e.g. for the pnl updates after the first one """
+        future = self.pop(key)
+        if future is None or not future.set_running_or_notify_cancel():
+            return False    # or cancelled by the caller
+        future.set_result(result)
+        return True
+
+    def fail(self, key, exc):
+        future = self.pop(key)
+        if future is None or not future.set_running_or_notify_cancel():
+            return False
+        future.set_exception(exc)
+        return True
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        """ the EWrapper.error callback: fails the future of reqId with a
+        RequestError, unless it is a warning """
+        if errorCode in WARNING_CODES:
+            return False
+        return self.fail(reqId, RequestError(reqId, errorCode, errorString))
+
+    def cancelAll(self, exc=None):
+        """ fails all the pending futures, with ConnectionError by default """
+        with self.lock:
+            futures = list(self.key2future.values())
+            self.key2future.clear()
+        for future in futures:
+            if future.set_running_or_notify_cancel():
+                future.set_exception(exc or ConnectionError("connection closed"))
+
+
+def gather(futures, timeout=None):
+    """The results of futures, waited for together. Raises TimeoutError if
+    they are not all done within timeout seconds (None for no limit), or the
+    exception of the first one that failed."""
+
+    (_, notDone) = concurrent.futures.wait(futures, timeout)
+    if notDone:
+        raise concurrent.futures.TimeoutError(
+            "%d of %d requests not answered within %s s" % (len(notDone), len(futures), timeout))
+    return [future.result() for future in futures]
@@ -0,0 +1,217 @@
+"""
+Multi-timeframe resampling of the 5 seconds bars of reqRealTimeBars, for
+many symbols at once.
+
+A RealTimeBarResampler takes the realtimeBar callback (forward it from the
+EWrapper) and rolls every bar into the open bar of each configured interval
+(1m/5m/15m/1h by default). The open bars of all the symbols live in NumPy
+accumulator arrays, one slot per reqId, so update() can also roll the bars
+of all the symbols for the same time in one vectorized step.
+
+A higher timeframe bar is complete with the last 5 seconds bar of its
+interval, or when a bar of a later interval arrives if that one was missed.
+Completed bars are passed to onBar, one call per bar, and/or to onBatch as
+columns (a dict of arrays, BATCH_COLUMNS) of all the bars completed by the
+same update.
+"""
+
+import math
+
+from ibapi.columnar import np, require_numpy
+from ibapi.common import SizeModeEnum, size_float
+
+
+REAL_TIME_BAR_SIZE = 5
+DEFAULT_INTERVALS = (60, 300, 900, 3600)
+NO_BAR = -1
+
+BATCH_COLUMNS = (("reqId", np.int64), ("time", np.int64), ("open", np.float64),
+                 ("high", np.float64), ("low", np.float64), ("close", np.float64),
+                 ("volume", np.float64), ("wap", np.float64), ("count", np.int64)) \
+    if np is not None else None
+
+
+class Accumulator:
+    """ the open bars of one interval, one slot per symbol """
+
+    def __init__(self, interval, nSlots):
+        self.interval = interval
+        self.start = np.full(nSlots, NO_BAR, dtype=np.int64)
+        self.open = np.zeros(nSlots)
+        self.high = np.zeros(nSlots)
+        self.low = np.zeros(nSlots)
+        self.close = np.zeros(nSlots)
+        self.volume = np.zeros(nSlots)
+        self.pv = np.zeros(nSlots)
+        self.count = np.zeros(nSlots, dtype=np.int64)
+
+    ARRAYS = ("start", "open", "high", "low", "close", "volume", "pv", "count")
+
+    def grow(self, nSlots):
+        for name in self.ARRAYS:
+            arr = getattr(self, name)
+            fill = NO_BAR if name == "start" else 0
+            extra = np.full(nSlots - len(arr), fill, dtype=arr.dtype)
+            setattr(self, name, np.concatenate((arr, extra)))
+
+    def take(self, slots, slot2reqId):
+        """ the completed bars of slots as columns, and frees the slots """
+        volume = self.volume[slots]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            wap = np.where(volume > 0, self.pv[slots] / volume, math.nan)
+        batch = {"reqId": slot2reqId[slots], "time": self.start[slots],
+                 "open": self.open[slots], "high": self.high[slots], "low": self.low[slots],
+                 "close": self.close[slots], "volume": volume, "wap": wap,
+                 "count": self.count[slots]}
+        self.start[slots] = NO_BAR
+        return batch
+
+
+class RealTimeBarResampler:
+    def __init__(self, intervals=DEFAULT_INTERVALS, onBar=None, onBatch=None,
+                 barSize=REAL_TIME_BAR_SIZE, nSlots=64, sizeMode=SizeModeEnum.DECIMAL):
+        """intervals - the bar lengths in seconds, multiples of barSize
+        onBar - called as onBar(reqId, interval, time, open, high, low,
+            close, volume, wap, count) for every completed bar, time being
+            the start of the bar in epoch seconds like realtimeBar()
+        onBatch - called as onBatch(interval, columns) with the bars
+            completed together, columns being a dict of BATCH_COLUMNS arrays
+        barSize:int - the seconds of the incoming bars
+        nSlots:int - the initial number of symbols, grown as needed
+        sizeMode:SizeMode - the one of the client (EClient.setSizeMode), an
+            unset volume counts as 0"""
+
+        require_numpy("RealTimeBarResampler")
+        for interval in intervals:
+            if interval <= 0 or interval % barSize:
+                raise ValueError("interval %s is not a multiple of %s s" % (interval, barSize))
+        self.intervals = tuple(intervals)
+        self.onBar = onBar
+        self.onBatch = onBatch
+        self.barSize = barSize
+        self.sizeMode = sizeMode
+        self.reqId2slot = {}
+        self.slot2reqId = np.zeros(nSlots, dtype=np.int64)
+        self.accumulators = [Accumulator(interval, nSlots) for interval in self.intervals]
+
+    def slot(self, reqId):
+        slot = self.reqId2slot.get(reqId)
+        if slot is None:
+            slot = len(self.reqId2slot)
+            if slot == len(self.slot2reqId):
+                nSlots = 2 * slot
+                self.slot2reqId = np.concatenate(
+                    (self.slot2reqId, np.zeros(nSlots - slot, dtype=np.int64)))
+                for acc in self.accumulators:
+                    acc.grow(nSlots)
+            self.slot2reqId[slot] = reqId
+            self.reqId2slot[reqId] = slot
+        return slot
+
+    def emit(self, acc, slots):
+        batch = acc.take(slots, self.slot2reqId)
+        if self.onBatch is not None:
+            self.onBatch(acc.interval, batch)
+        if self.onBar is not None:
+            columns = [batch[name].tolist() for (name, _) in BATCH_COLUMNS]
+            for row in zip(*columns):
+                self.onBar(row[0], acc.interval, *row[1:])
+
+    def realtimeBar(self, reqId, time, open_, high, low, close, volume, wap, count):
+        """ rolls one 5 seconds bar in """
+        slot = self.slot(reqId)
+        volume = size_float(volume, self.sizeMode, 0.)
+        # the wap stays a Decimal whatever the size mode
+        pv = size_float(wap, unset=0.) * volume
+        for acc in self.accumulators:
+            interval = acc.interval
+            bucket = time - time % interval
+            start = acc.start[slot]
+            if start != bucket:
+                if start != NO_BAR:
+                    self.emit(acc, [slot])
+                acc.start[slot] = bucket
+                acc.open[slot] = open_
+                acc.high[slot] = high
+                acc.low[slot] = low
+                acc.volume[slot] = volume
+                acc.pv[slot] = pv
+                acc.count[slot] = count
+            else:
+                if high > acc.high[slot]:
+                    acc.high[slot] = high
+                if low < acc.low[slot]:
+                    acc.low[slot] = low
+                acc.volume[slot] += volume
+                acc.pv[slot] += pv
+                acc.count[slot] += count
+            acc.close[slot] = close
+            if time + self.barSize == bucket + interval:
+                self.emit(acc, [slot])
+
+    def update(self, reqIds, time, open_, high, low, close, volume, wap, count):
+        """ rolls in the 5 seconds bars of several symbols for the same time,
+        each argument but time being a sequence (or array) with one value per
+        reqId """
+        slots = np.fromiter((self.slot(reqId) for reqId in reqIds), dtype=np.int64,
+                            count=len(reqIds))
+        open_ = np.asarray(open_, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        low = np.asarray(low, dtype=np.float64)
+        close = np.asarray(close, dtype=np.float64)
+        sizeMode = self.sizeMode
+        volume = np.fromiter((size_float(size, sizeMode, 0.) for size in volume),
+                             dtype=np.float64, count=len(slots))
+        pv = np.fromiter((size_float(price, unset=0.) for price in wap),
+                         dtype=np.float64, count=len(slots)) * volume
+        count = np.asarray(count, dtype=np.int64)
+        for acc in self.accumulators:
+            interval = acc.interval
+            bucket = time - time % interval
+            start = acc.start[slots]
+            stale = (start != NO_BAR) & (start != bucket)
+            if stale.any():
+                self.emit(acc, slots[stale])
+            new = start != bucket
+            if new.any():
+                newSlots = slots[new]
+                acc.start[newSlots] = bucket
+                acc.open[newSlots] = open_[new]
+                acc.high[newSlots] = high[new]
+                acc.low[newSlots] = low[new]
+                acc.volume[newSlots] = volume[new]
+                acc.pv[newSlots] = pv[new]
+                acc.count[newSlots] = count[new]
+            old = ~new
+            if old.any():
+                oldSlots = slots[old]
+                acc.high[oldSlots] = np.maximum(acc.high[oldSlots], high[old])
+                acc.low[oldSlots] = np.minimum(acc.low[oldSlots], low[old])
+                acc.volume[oldSlots] += volume[old]
+                acc.pv[oldSlots] += pv[old]
+                acc.count[oldSlots] += count[old]
+            acc.close[slots] = close
+            if time + self.barSize == bucket + interval:
+                self.emit(acc, slots)
+
+    def flush(self):
+        """ completes the open bars of every symbol, e.g. at the end of the
+        session """
+        nSlots = len(self.reqId2slot)
+        for acc in self.accumulators:
+            slots = np.flatnonzero(acc.start[:nSlots] != NO_BAR)
+            if len(slots):
+                self.emit(acc, slots)
+
+    def current(self, reqId, interval):
+        """ the open bar as (time, open, high, low, close, volume, wap,
+        count), None if there is none """
+        slot = self.reqId2slot.get(reqId)
+        for acc in self.accumulators:
+            if acc.interval == interval and slot is not None and acc.start[slot] != NO_BAR:
+                volume = acc.volume[slot].item()
+                wap = acc.pv[slot].item() / volume if volume > 0 else math.nan
+                return (acc.start[slot].item(), acc.open[slot].item(), acc.high[slot].item(),
+                        acc.low[slot].item(), acc.close[slot].item(), volume, wap,
+                        acc.count[slot].item())
+        return None
@@ -0,0 +1,73 @@
+"""
+Fixed capacity ring buffers of NumPy columns: appending is O(1), memory is
+bounded by the capacity and the content is read back in insertion order as
+arrays, without a copy as long as it does not wrap around.
+"""
+
+from ibapi.columnar import np, require_numpy
+
+
+class Ring:
+    def __init__(self, capacity, columns):
+        """capacity:int - rows kept, the oldest are overwritten
+        columns - (name, numpy dtype) pairs"""
+
+        require_numpy("Ring")
+        if capacity < 1:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.names = tuple(name for (name, _) in columns)
+        self.columns = {name: np.empty(capacity, dtype=dtype) for (name, dtype) in columns}
+        self.count = 0          # rows appended so far, count % capacity is the next slot
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def nbytes(self):
+        return sum(col.nbytes for col in self.columns.values())
+
+    def clear(self):
+        self.count = 0
+
+    def append(self, *vals):
+        """ appends a row, vals in the order of the columns """
+        idx = self.count % self.capacity
+        columns = self.columns
+        for (name, val) in zip(self.names, vals):
+            columns[name][idx] = val
+        self.count += 1
+
+    def lastIndex(self):
+        """ the slot of the newest row, None when empty """
+        return (self.count - 1) % self.capacity if self.count else None
+
+    def latest(self, name):
+        """ the newest value of column name, None when empty """
+        if not self.count:
+            return None
+        return self.columns[name][(self.count - 1) % self.capacity].item()
+
+    def set(self, name, val):
+        """ overwrites column name of the newest row """
+        self.columns[name][(self.count - 1) % self.capacity] = val
+
+    def tail(self, n=None):
+        """ the newest n rows (all by default), oldest first, as a dict of
+        arrays; views into the ring unless they wrap around """
+        size = len(self)
+        n = size if n is None else min(n, size)
+        end = self.count % self.capacity
+        if end == 0 and self.count:
+            end = self.capacity
+        start = end - n
+        if start >= 0:
+            return {name: col[start:end] for (name, col) in self.columns.items()}
+        return {name: np.concatenate((col[start:], col[:end]))
+                for (name, col) in self.columns.items()}
+
+    def since(self, name, threshold):
+        """ the rows with column name >= threshold, name being a column that
+        increases with the insertion order (a time) """
+        rows = self.tail()
+        idx = np.searchsorted(rows[name], threshold, side="left")
+        return {col: arr[idx:] for (col, arr) in rows.items()}
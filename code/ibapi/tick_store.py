@@ -0,0 +1,177 @@
+"""
+Per-instrument columnar store of the streamed market data ticks.
+
+A TickStore takes the tickPrice/tickSize callbacks of reqMktData (forward
+them from the EWrapper) and appends every tick to fixed capacity ring
+buffers of NumPy columns, per instrument and per tick type, with its
+receive time. The latest value of a tick type is O(1) and the window
+queries (the ticks of the last N seconds, VWAP, spread statistics) are
+vectorized over array views, so the memory stays bounded by the capacity
+however long the stream runs, unlike a DataFrame grown by one row per tick.
+
+Besides one ring per tick type, each instrument has:
+- trades: (time, price, size) of the LAST ticks, the size being the one of
+  the tickSize the decoder sends right after the tickPrice of a LAST.
+- quotes: (time, bid, ask) after every BID or ASK tick.
+"""
+
+import math
+import time
+
+from ibapi.columnar import np, require_numpy
+from ibapi.common import UNSET_DOUBLE, SizeModeEnum, size_float
+from ibapi.ring import Ring
+from ibapi.ticktype import TickTypeEnum
+
+
+VALUE_COLUMNS = (("time", np.float64), ("value", np.float64)) if np is not None else None
+TRADE_COLUMNS = (("time", np.float64), ("price", np.float64), ("size", np.float64)) \
+    if np is not None else None
+QUOTE_COLUMNS = (("time", np.float64), ("bid", np.float64), ("ask", np.float64)) \
+    if np is not None else None
+
+BID_TICKS = (TickTypeEnum.BID, TickTypeEnum.DELAYED_BID)
+ASK_TICKS = (TickTypeEnum.ASK, TickTypeEnum.DELAYED_ASK)
+LAST_TICKS = (TickTypeEnum.LAST, TickTypeEnum.DELAYED_LAST)
+LAST_SIZE_TICKS = (TickTypeEnum.LAST_SIZE, TickTypeEnum.DELAYED_LAST_SIZE)
+
+
+class Instrument:
+    """ the rings of one instrument """
+
+    def __init__(self, key, capacity):
+        self.key = key
+        self.capacity = capacity
+        self.ticks = {}             # tickType -> Ring of VALUE_COLUMNS
+        self.trades = Ring(capacity, TRADE_COLUMNS)
+        self.quotes = Ring(capacity, QUOTE_COLUMNS)
+        self.bid = math.nan
+        self.ask = math.nan
+        self.pendingLast = False    # a LAST waiting for its LAST_SIZE
+
+    def ring(self, tickType):
+        ring = self.ticks.get(tickType)
+        if ring is None:
+            ring = self.ticks[tickType] = Ring(self.capacity, VALUE_COLUMNS)
+        return ring
+
+    def nbytes(self):
+        return self.trades.nbytes() + self.quotes.nbytes() + \
+            sum(ring.nbytes() for ring in self.ticks.values())
+
+
+class TickStore:
+    def __init__(self, capacity=4096, clock=time.time, sizeMode=SizeModeEnum.DECIMAL):
+        """capacity:int - ticks kept per tick type and instrument
+        clock - the receive time source, in seconds
+        sizeMode:SizeMode - the one of the client (EClient.setSizeMode), the
+            sizes are kept as float numbers of shares, NaN if unset"""
+
+        require_numpy("TickStore")
+        self.capacity = capacity
+        self.clock = clock
+        self.sizeMode = sizeMode
+        self.reqId2key = {}
+        self.instruments = {}
+
+    def register(self, reqId, key):
+        """ stores the ticks of reqId under key (a conId for instance), so
+        they survive a resubscription with another reqId. By default the
+        key is the reqId itself. """
+        self.reqId2key[reqId] = key
+
+    def instrument(self, key):
+        instrument = self.instruments.get(key)
+        if instrument is None:
+            instrument = self.instruments[key] = Instrument(key, self.capacity)
+        return instrument
+
+    def tickPrice(self, reqId, tickType, price, attrib=None):
+        if price == UNSET_DOUBLE:
+            return
+        now = self.clock()
+        instrument = self.instrument(self.reqId2key.get(reqId, reqId))
+        instrument.ring(tickType).append(now, price)
+        if tickType in LAST_TICKS:
+            instrument.trades.append(now, price, math.nan)
+            instrument.pendingLast = True
+        elif tickType in BID_TICKS:
+            instrument.bid = price
+            instrument.quotes.append(now, price, instrument.ask)
+        elif tickType in ASK_TICKS:
+            instrument.ask = price
+            instrument.quotes.append(now, instrument.bid, price)
+
+    def tickSize(self, reqId, tickType, size):
+        now = self.clock()
+        instrument = self.instrument(self.reqId2key.get(reqId, reqId))
+        size = size_float(size, self.sizeMode)
+        instrument.ring(tickType).append(now, size)
+        if tickType in LAST_SIZE_TICKS and instrument.pendingLast:
+            instrument.trades.set("size", size)
+            instrument.pendingLast = False
+
+    def latest(self, key, tickType):
+        """ the last value of tickType, None if none was received """
+        instrument = self.instruments.get(key)
+        if instrument is None or tickType not in instrument.ticks:
+            return None
+        return instrument.ticks[tickType].latest("value")
+
+    def latestTime(self, key, tickType):
+        instrument = self.instruments.get(key)
+        if instrument is None or tickType not in instrument.ticks:
+            return None
+        return instrument.ticks[tickType].latest("time")
+
+    def now(self, now=None):
+        return self.clock() if now is None else now
+
+    def window(self, key, tickType, seconds, now=None):
+        """ the {"time", "value"} arrays of the tickType ticks of the last
+        seconds, oldest first """
+        instrument = self.instruments.get(key)
+        if instrument is None or tickType not in instrument.ticks:
+            return {name: np.empty(0) for (name, _) in VALUE_COLUMNS}
+        return instrument.ticks[tickType].since("time", self.now(now) - seconds)
+
+    def trades(self, key, seconds, now=None):
+        """ the {"time", "price", "size"} arrays of the last seconds """
+        instrument = self.instruments.get(key)
+        if instrument is None:
+            return {name: np.empty(0) for (name, _) in TRADE_COLUMNS}
+        return instrument.trades.since("time", self.now(now) - seconds)
+
+    def quotes(self, key, seconds, now=None):
+        """ the {"time", "bid", "ask"} arrays of the last seconds """
+        instrument = self.instruments.get(key)
+        if instrument is None:
+            return {name: np.empty(0) for (name, _) in QUOTE_COLUMNS}
+        return instrument.quotes.since("time", self.now(now) - seconds)
+
+    def vwap(self, key, seconds, now=None):
+        """ the volume weighted average price of the trades of the last
+        seconds, None without volume """
+        trades = self.trades(key, seconds, now)
+        size = trades["size"]
+        valid = ~np.isnan(size)
+        volume = size[valid].sum()
+        if volume <= 0:
+            return None
+        return float(np.dot(trades["price"][valid], size[valid]) / volume)
+
+    def spreadStats(self, key, seconds, now=None):
+        """ {"count", "mean", "min", "max", "last"} of the ask - bid spread
+        over the quotes of the last seconds, None without a two sided quote """
+        quotes = self.quotes(key, seconds, now)
+        spread = quotes["ask"] - quotes["bid"]
+        spread = spread[~np.isnan(spread)]
+        if not len(spread):
+            return None
+        return {"count": len(spread), "mean": float(spread.mean()),
+                "min": float(spread.min()), "max": float(spread.max()),
+                "last": float(spread[-1])}
+
+    def memory(self):
+        """ bytes held by the ring buffers, bounded by the capacity """
+        return sum(instrument.nbytes() for instrument in self.instruments.values())
@@ -71,8 +71,6 @@ def decode(the_type, fields, show_unset = False, use_unicode = False):
     except StopIteration:
         raise BadMessage("no more fields")
 
-    logger.debug("decode %s %s", the_type, s)
-    
     if the_type is Decimal:
         if s is None or len(s) == 0 or s.decode() == "2147483647" or s.decode() == "9223372036854775807" or s.decode() == "1.7976931348623157E308":
             return UNSET_DECIMAL
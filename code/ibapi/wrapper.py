@@ -346,6 +346,20 @@ class EWrapper:
         self.logAnswer(current_fn_name(), vars())
 
 
+    def historicalDataBatch(self, reqId:int, bars:dict):
+        """ returns all the bars of a historical data answer at once, in place
+        of the historicalData() calls, once EClient.setHistoricalDataBatch(True)
+        was called. Needs numpy.
+
+        reqId - the request's identifier
+        bars  - dict of numpy arrays, one entry per bar:
+            date     - int64 epoch seconds (dates without time zone taken as UTC)
+            open, high, low, close - float64
+            volume, wap - float64, NaN when not available
+            barCount - int64 """
+        self.logAnswer(current_fn_name(), vars())
+
+
     def historicalDataEnd(self, reqId:int, start:str, end:str):
         """ Marks the ending of the historical bars reception. """
         self.logAnswer(current_fn_name(), vars())
@@ -670,7 +684,11 @@ class EWrapper:
         self.logAnswer(current_fn_name(), vars())
 
     def historicalTicks(self, reqId: int, ticks: ListOfHistoricalTick, done: bool):
-        """returns historical tick data when whatToShow=MIDPOINT"""
+        """returns historical tick data when whatToShow=MIDPOINT
+
+        ticks is a numpy structured array instead of a list once
+        EClient.setHistoricalTicksArrays(True) was called, the same goes for
+        historicalTicksBidAsk() and historicalTicksLast()"""
         self.logAnswer(current_fn_name(), vars())
 
     def historicalTicksBidAsk(self, reqId: int, ticks: ListOfHistoricalTickBidAsk, done: bool):
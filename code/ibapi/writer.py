@@ -0,0 +1,221 @@
+"""
+The EWriter runs in a separate thread and is responsible for sending the
+outgoing messages, the counterpart of the EReader.
+
+The EClient requests put their framed messages in one queue per
+SendPriority. The writer sends them highest priority first, paced by a
+token bucket (TWS disconnects clients going over 50 messages per second),
+and coalesces all the messages it may send at once into a single sendall().
+Only the bulk data requests yield: orders, cancels and all the other
+messages stay in the order they were sent in, ahead of the queued bulk
+requests, so that an order never overtakes an earlier cancel.
+"""
+
+import collections
+import logging
+import threading
+import time
+
+from ibapi.common import SendPriority, SendPriorityEnum
+from ibapi.instrumentation import Histogram
+from ibapi.message import OUT
+
+
+logger = logging.getLogger(__name__)
+
+
+# at most DEFAULT_MSG_RATE + DEFAULT_BURST = 50 messages in any second
+DEFAULT_MSG_RATE = 45.
+DEFAULT_BURST = 5
+
+# the cancels of the bulk requests stay behind their requests
+BULK_MSG_IDS = (OUT.REQ_CONTRACT_DATA, OUT.REQ_HISTORICAL_DATA, OUT.CANCEL_HISTORICAL_DATA,
+                OUT.REQ_SCANNER_SUBSCRIPTION, OUT.CANCEL_SCANNER_SUBSCRIPTION,
+                OUT.REQ_SCANNER_PARAMETERS, OUT.REQ_FUNDAMENTAL_DATA,
+                OUT.CANCEL_FUNDAMENTAL_DATA, OUT.REQ_SEC_DEF_OPT_PARAMS,
+                OUT.REQ_MATCHING_SYMBOLS, OUT.REQ_NEWS_ARTICLE, OUT.REQ_HISTORICAL_NEWS,
+                OUT.REQ_HEAD_TIMESTAMP, OUT.CANCEL_HEAD_TIMESTAMP, OUT.REQ_HISTOGRAM_DATA,
+                OUT.CANCEL_HISTOGRAM_DATA, OUT.REQ_HISTORICAL_TICKS)
+
+MSG_PRIORITY = {msgId: SendPriorityEnum.BULK for msgId in BULK_MSG_IDS}
+
+
+def msg_priority(msg) -> SendPriority:
+    """ the priority of the framed message msg, from its message id """
+    end = msg.find(b"\0", 4)
+    try:
+        msgId = int(msg[4:end])
+    except ValueError:
+        return SendPriorityEnum.NORMAL
+    return MSG_PRIORITY.get(msgId, SendPriorityEnum.NORMAL)
+
+
+class TokenBucket:
+    """ allows rate messages per second on average and up to burst at once """
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last = time.monotonic()
+
+    def available(self, now):
+        """ the number of messages that may be sent at time now """
+        self.tokens = min(self.burst, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+        return int(self.tokens)
+
+    def take(self, n):
+        self.tokens -= n
+
+    def delay(self):
+        """ seconds until the next message may be sent """
+        return max(0., (1. - self.tokens) / self.rate)
+
+
+class EWriter(threading.Thread):
+    def __init__(self, conn, msgRate=DEFAULT_MSG_RATE, burst=DEFAULT_BURST, maxBatch=None):
+        """msgRate:float - messages per second, None for no pacing
+        burst:int - messages that may be sent at once after an idle time
+        maxBatch:int - max messages per sendall(), None for no limit"""
+
+        super().__init__()
+        self.conn = conn
+        self.bucket = TokenBucket(msgRate, burst) if msgRate else None
+        self.maxBatch = maxBatch
+        self.queues = [collections.deque() for _ in SendPriorityEnum.idx2name]
+        self.cond = threading.Condition()
+        self.inFlight = 0           # messages taken off the queues, not sent yet
+        self.stopped = False
+        self.reset()
+
+    def reset(self):
+        """ resets the counters of snapshot() """
+        with self.cond:
+            self.msgsSent = 0
+            self.bytesSent = 0
+            self.batches = Histogram()      # messages per sendall()
+            self.waitTime = Histogram()     # ns from put() to sendall()
+            self.maxDepth = 0
+            self.resetTime = time.time()
+
+    def depth(self):
+        """ the number of queued messages """
+        return sum(len(q) for q in self.queues)
+
+    def put(self, msg, priority:SendPriority=None):
+        """Queues the framed message msg, the priority by default follows
+        from its message id. Returns the size of msg, 0 once stopped."""
+
+        if priority is None:
+            priority = msg_priority(msg)
+        with self.cond:
+            if self.stopped:
+                return 0
+            self.queues[priority].append((time.monotonic_ns(), msg))
+            depth = self.depth()
+            if depth > self.maxDepth:
+                self.maxDepth = depth
+            self.cond.notify_all()
+        return len(msg)
+
+    def flush(self, timeout=None):
+        """ waits until all the queued messages are sent, returns False on
+        timeout or if the writer stopped before """
+        with self.cond:
+            return self.cond.wait_for(
+                lambda: self.stopped or (self.inFlight == 0 and self.depth() == 0),
+                timeout) and not self.stopped
+
+    def stop(self):
+        """ stops the thread, the messages still queued are dropped """
+        with self.cond:
+            self.stopped = True
+            dropped = self.depth()
+            for q in self.queues:
+                q.clear()
+            self.cond.notify_all()
+        if dropped:
+            logger.warning("EWriter stopped, %d queued messages dropped", dropped)
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join()
+
+    def run(self):
+        try:
+            logger.debug("EWriter thread started")
+            self.writeLoop()
+            logger.debug("EWriter thread finished")
+        except:
+            logger.exception('unhandled exception in EWriter thread')
+        finally:
+            with self.cond:
+                self.stopped = True
+                self.cond.notify_all()
+
+    def nextBatch(self):
+        """ waits for messages and for the pacing to allow them, then takes
+        them off the queues; None when stopped """
+        with self.cond:
+            while True:
+                if self.stopped:
+                    return None
+                depth = self.depth()
+                if depth == 0:
+                    self.cond.wait(0.5)
+                    if not self.conn.isConnected():
+                        self.stopped = True
+                    continue
+                n = depth
+                if self.bucket is not None:
+                    n = min(n, self.bucket.available(time.monotonic()))
+                    if n == 0:
+                        self.cond.wait(self.bucket.delay())
+                        continue
+                if self.maxBatch is not None:
+                    n = min(n, self.maxBatch)
+                if self.bucket is not None:
+                    self.bucket.take(n)
+                batch = []
+                for q in self.queues:
+                    while q and len(batch) < n:
+                        batch.append(q.popleft())
+                self.inFlight = len(batch)
+                return batch
+
+    def writeLoop(self):
+        while True:
+            batch = self.nextBatch()
+            if batch is None:
+                return
+            data = b"".join([msg for (_, msg) in batch])
+            try:
+                if not self.conn.sendAll(data):
+                    return      # disconnected
+            except OSError:
+                logger.exception("EWriter could not send, disconnecting")
+                self.conn.disconnect()
+                return
+            now = time.monotonic_ns()
+            with self.cond:
+                for (queued, _) in batch:
+                    self.waitTime.record(now - queued)
+                self.batches.record(len(batch))
+                self.msgsSent += len(batch)
+                self.bytesSent += len(data)
+                self.inFlight = 0
+                self.cond.notify_all()
+
+    def snapshot(self):
+        """ a plain dict of the queue depths and of what was sent since the
+        last reset() """
+        with self.cond:
+            return {
+                "elapsed": time.time() - self.resetTime,
+                "depth": {SendPriorityEnum.to_str(priority): len(q)
+                          for (priority, q) in enumerate(self.queues)},
+                "maxDepth": self.maxDepth,
+                "msgsSent": self.msgsSent,
+                "bytesSent": self.bytesSent,
+                "batchSize": self.batches.summary(),
+                "waitNs": self.waitTime.summary(),
+            }
@@ -1,35 +1,65 @@
-import time
 import pandas as pd
 from send_email import send_email
 from ibapi.client import *
 from ibapi.wrapper import *
+from ibapi.request_futures import RequestFutures, gather
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from threading import Thread , Lock
 import datetime as dt
 import warnings
 from logger import logger
 
 class TradingApp(EWrapper, EClient):
-    def __init__(self, host, port, client_id):
-        EWrapper.__init__(self, self)
+    def __init__(self, host, port, client_id, timeout=10.):
+        """Connect to TWS and wait until the API is ready.
+
+        Args:
+            host (str): TWS host
+            port (int): TWS port
+            client_id (int): API client id
+            timeout (float): seconds to wait for the connection and for the answers of the requests
+        """
+        EWrapper.__init__(self)
         EClient.__init__(self, self)
-        self.connect(host, port, client_id)
-        self.thread = Thread(target=self.run)
-        self.thread.start()
+        self.timeout = timeout
+        # futures of the pending requests, by reqId or end marker
+        self.pending = RequestFutures()
 
-        time.sleep(1)  # Give some time to establish connection
-        # Check connection
-        if self.isConnected():
-            logger.info("Successfully connected to IB API")
-        else:
-            raise ConnectionError("Failed to connect to IB API, did you login to the IBKR TWS Application?")
-        
         #Dataframes to store relevant information about current portfolio
         self.dataframes = {
             "acc_summary": pd.DataFrame(columns=['Date','reqId', 'Account','Tag', 'Value', 'Currency']),
             "pnl_summary": pd.DataFrame(columns=['Date','reqId', 'DailyPnL','UnrealizedPnL', 'RealizedPnL']),
             "pos_summary": pd.DataFrame(columns=['Date','account', 'contract', 'position', 'avgCost'])
             }
-        
+
+        # TWS sends nextValidId once the API is started
+        ready = self.pending.expect("nextValidId")
+        self.connect(host, port, client_id)
+        if not self.isConnected():
+            raise ConnectionError("Failed to connect to IB API, did you login to the IBKR TWS Application?")
+        self.thread = Thread(target=self.run)
+        self.thread.start()
+        try:
+            ready.result(timeout)
+        except (FutureTimeoutError, ConnectionError):
+            self.disconnect_api()
+            raise ConnectionError("IB API not ready within %s s" % timeout)
+        logger.info("Successfully connected to IB API")
+
+    def nextValidId(self, orderId: int):
+        super().nextValidId(orderId)
+        self.pending.resolve("nextValidId", orderId)
+
+    def error(self, reqId, errorCode: int, errorString: str, advancedOrderRejectJson=""):
+        """Fail the future of the request reqId, warnings and messages without reqId are only logged."""
+        super().error(reqId, errorCode, errorString, advancedOrderRejectJson)
+        if not self.pending.error(reqId, errorCode, errorString):
+            logger.debug("Error. reqId: %s, code: %s, %s", reqId, errorCode, errorString)
+
+    def connectionClosed(self):
+        super().connectionClosed()
+        self.pending.cancelAll()
+
     def accountSummary(self, reqId: int, account: str, tag: str, value: str,currency: str):
         """Receive summary of the current acount by providing the requested tag, their respective value and currency.
 
@@ -54,8 +84,8 @@ class TradingApp(EWrapper, EClient):
         self._append_to_dataframe("acc_summary", data) 
     
     def accountSummaryEnd(self, reqId: int):
-        # unsubscribe from account summary
         logger.debug("AccountSummaryEnd. reqId: %s", reqId)
+        self.pending.resolve(reqId)
     
     def pnl(self, reqId, dailyPnL, unrealizedPnL, realizedPnL):
         """Receive current profit and loss of the current portfolio. Taking the request ID and receiving daily profit and loss, unrealized PnL and realized PnL.
@@ -77,6 +107,8 @@ class TradingApp(EWrapper, EClient):
               "RealizedPnL": realizedPnL
               }
         self._append_to_dataframe("pnl_summary", data) 
+        # the first update answers the request, the next ones keep coming until cancelPnL
+        self.pending.resolve(reqId)
 
     def position(self, account: str, contract: Contract, position: Decimal, avgCost: float):
         warnings.filterwarnings("ignore", category=FutureWarning)
@@ -93,6 +125,7 @@ class TradingApp(EWrapper, EClient):
     
     def positionEnd(self):
         logger.debug("PositionEnd")
+        self.pending.resolve("positionEnd")
 
     def _append_to_dataframe(self, df_key: str, data: dict):
         """Append new data to the selected DataFrame."""
@@ -110,32 +143,37 @@ class TradingApp(EWrapper, EClient):
             
 def daily_update(client):
     """Call daily update by receiving portfolio information and sending out email.
+    The account summary and the PnL are requested together and the email is sent as soon as both are in.
 
     Args:
         client (Class): connection to IBKR api
     """
+    acc_summary = client.pending.expect(1)
+    pnl = client.pending.expect(2)
     client.reqAccountSummary(1, "All", "$LEDGER:BASE")
-    time.sleep(2)
-    df_acc_summary = client.dataframes["acc_summary"]
-    client.accountSummaryEnd(1)
-        
     client.reqPnL(2, "U14552292", "")
-    time.sleep(2)
-    df_pnl_summary = client.dataframes["pnl_summary"]
-    client.cancelPnL(2)
-    logger.info('account pnl request canceled')
-    send_email(df_acc_summary, df_pnl_summary)
+    try:
+        gather([acc_summary, pnl], client.timeout)
+    finally:
+        client.cancelAccountSummary(1)
+        client.cancelPnL(2)
+        logger.info('account summary and pnl requests canceled')
+    send_email(client.dataframes["acc_summary"], client.dataframes["pnl_summary"])
 
 def portfolio_positions_overview(client):
+    positions = client.pending.expect("positionEnd")
     client.reqPositions()
-    time.sleep(1)
-    client.cancelPositions()
-    logger.info("Position summary: %s", getattr(client, 'position_summary', None))
+    try:
+        positions.result(client.timeout)
+    finally:
+        client.cancelPositions()
+    logger.info("Position summary: %s", client.dataframes["pos_summary"])
     return
 
 
 
 def main():
+    client = None
     try:
         client = TradingApp('127.0.0.1', 7496, 1)
         daily_update(client)
@@ -143,7 +181,8 @@ def main():
     except Exception as e: 
         logger.exception('An error occurred in main: %s', e)
     finally:
-        client.disconnect_api()
+        if client is not None:
+            client.disconnect_api()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+"""
+Throughput of the Backfill of ibapi.backfill against the local mock TWS
+answering the requested ranges: chunks and bars per second fetched, decoded
+and written as .npz files with the pacing switched off, the time the same
+backfill takes within the TWS pacing limits (60 requests in 10 minutes),
+and the time to load the result back.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_backfill --symbols 20 --days 30
+"""
+
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+from ibapi.backfill import CHUNK_SECONDS, Backfill, BackfillJob, HistoricalPacer
+from ibapi.client import EClient
+from ibapi.contract import Contract
+from ibapi.mock_tws import MockTws
+from ibapi.wrapper import EWrapper
+
+
+END = 1700006400        # 2023-11-15 00:00 UTC
+DAY = 86400
+
+
+def stock(symbol, conId):
+    contract = Contract()
+    contract.conId = conId
+    contract.symbol = symbol
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.currency = "USD"
+    return contract
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--bar-size", default="1 min")
+    parser.add_argument("--batch", action="store_true", help="historicalDataBatch answers")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    jobs = [BackfillJob(stock("SYM%03d" % i, 1000 + i), args.bar_size, "TRADES",
+                        END - args.days * DAY, END) for i in range(args.symbols)]
+    try:
+        with MockTws(historicalRange=True) as tws:
+            client = EClient(EWrapper())
+            client.setHistoricalDataBatch(args.batch)
+            client.connect("127.0.0.1", tws.port, 0)
+            thread = threading.Thread(target=client.run)
+            thread.start()
+            try:
+                backfill = Backfill(client, directory, pacer=HistoricalPacer(
+                    maxRequests=10 ** 9, sameContractRequests=10 ** 9), maxInFlight=50)
+                nChunks = sum(backfill.add(job) for job in jobs)
+                t0 = time.perf_counter()
+                backfill.run()
+                dt = time.perf_counter() - t0
+            finally:
+                client.disconnect()
+                thread.join()
+
+        t0 = time.perf_counter()
+        nBars = sum(len(backfill.load(job)["date"]) for job in jobs)
+        loadTime = time.perf_counter() - t0
+        print("%d chunks of %d s, %d bars in %.2f s: %.0f chunks/s, %.0f bars/s" % (
+            nChunks, CHUNK_SECONDS[args.bar_size], nBars, dt, nChunks / dt, nBars / dt))
+        print("within the TWS pacing: %.0f s" % (max(0, nChunks - 60) / 60 * 600))
+        print("load %.3f s, %.0f bars/s" % (loadTime, nBars / loadTime))
+    finally:
+        shutil.rmtree(directory)
+
+
+if "__main__" == __name__:
+    main()
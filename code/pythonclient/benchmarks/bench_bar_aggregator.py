@@ -0,0 +1,77 @@
+"""
+Ticks per second aggregated by ibapi.bar_aggregator.TickBarAggregator into
+bars of several intervals, against the pandas resample() of the same ticks
+collected in a DataFrame.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_bar_aggregator --ticks 500000
+"""
+
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from ibapi.bar_aggregator import TickBarAggregator
+
+
+N_STREAMS = 20
+
+
+def ticks(n):
+    """ (reqId, time, price, size), about 20 trades per second per stream """
+    rnd = random.Random(7)
+    t0 = 1700000000
+    return [(i % N_STREAMS, t0 + i // (20 * N_STREAMS), 100. + rnd.randrange(-50, 50) / 100,
+             Decimal(rnd.randrange(1, 500))) for i in range(n)]
+
+
+def bench_aggregator(stream, intervals):
+    nBars = [0]
+
+    def onBar(*bar):
+        nBars[0] += 1
+    agg = TickBarAggregator(intervals, onBar=onBar)
+    tick = agg.tickByTickAllLast
+    t0 = time.perf_counter()
+    for (reqId, t, price, size) in stream:
+        tick(reqId, 1, t, price, size, None, "", "")
+    agg.flush()
+    dt = time.perf_counter() - t0
+    print("TickBarAggregator %-14s %10.0f ticks/s  %d bars" % (
+        intervals, len(stream) / dt, nBars[0]))
+
+
+def bench_pandas(stream, intervals):
+    import pandas as pd
+
+    t0 = time.perf_counter()
+    df = pd.DataFrame([(reqId, t, price, float(size)) for (reqId, t, price, size) in stream],
+                      columns=["reqId", "time", "price", "size"])
+    df["time"] = pd.to_datetime(df["time"], unit="s")
+    df["pv"] = df["price"] * df["size"]
+    for interval in intervals:
+        grouped = df.groupby(["reqId", pd.Grouper(key="time", freq="%ds" % interval)])
+        bars = grouped["price"].ohlc()
+        sums = grouped[["size", "pv"]].sum()
+        bars["wap"] = sums["pv"] / sums["size"]
+    dt = time.perf_counter() - t0
+    print("pandas batch     %-14s %10.0f ticks/s" % (intervals, len(stream) / dt))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ticks", type=int, default=500000)
+    args = parser.parse_args()
+
+    stream = ticks(args.ticks)
+    for intervals in ((1,), (1, 60), (1, 5, 60, 300)):
+        bench_aggregator(stream, intervals)
+    try:
+        bench_pandas(stream, (1, 5, 60, 300))
+    except ImportError:
+        print("pandas not installed")
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,77 @@
+"""
+Latency of BarCache.get of ibapi.bar_cache against the local mock TWS
+answering the requested ranges: a chart of every symbol fetched cold, the
+same chart one day later (only the new day is requested) and again (served
+from the cache), with the requests sent and the time each round takes.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_bar_cache --symbols 20 --days 30
+"""
+
+import argparse
+import shutil
+import tempfile
+import threading
+import time
+
+from ibapi.backfill import HistoricalPacer
+from ibapi.bar_cache import BarCache
+from ibapi.client import EClient
+from ibapi.contract import Contract
+from ibapi.message import OUT
+from ibapi.mock_tws import MockTws
+from ibapi.wrapper import EWrapper
+
+
+END = 1700006400        # 2023-11-15 00:00 UTC
+DAY = 86400
+
+
+def stock(symbol, conId):
+    contract = Contract()
+    contract.conId = conId
+    contract.symbol = symbol
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.currency = "USD"
+    return contract
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--symbols", type=int, default=20)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--bar-size", default="5 mins")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    contracts = [stock("SYM%03d" % i, 1000 + i) for i in range(args.symbols)]
+    rounds = (("cold", END - DAY), ("one day later", END), ("cached", END))
+    try:
+        with MockTws(historicalRange=True) as tws:
+            client = EClient(EWrapper())
+            client.connect("127.0.0.1", tws.port, 0)
+            thread = threading.Thread(target=client.run)
+            thread.start()
+            try:
+                cache = BarCache(client, directory, pacer=HistoricalPacer(
+                    maxRequests=10 ** 9, sameContractRequests=10 ** 9))
+                for (name, end) in rounds:
+                    sent = tws.requests[OUT.REQ_HISTORICAL_DATA]
+                    t0 = time.perf_counter()
+                    nBars = sum(len(cache.get(contract, args.bar_size, "TRADES",
+                                              end - args.days * DAY, end)["date"])
+                                for contract in contracts)
+                    dt = time.perf_counter() - t0
+                    print("%-14s %5d requests, %d bars in %.3f s: %.2f ms per chart" % (
+                        name, tws.requests[OUT.REQ_HISTORICAL_DATA] - sent, nBars, dt,
+                        dt / len(contracts) * 1000))
+            finally:
+                client.disconnect()
+                thread.join()
+    finally:
+        shutil.rmtree(directory)
+
+
+if "__main__" == __name__:
+    main()
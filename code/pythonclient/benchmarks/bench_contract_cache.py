@@ -0,0 +1,91 @@
+"""
+Time to resolve a universe of contracts with reqContractDetails against the
+local mock TWS, one request at a time, cold and then answered by the
+ContractCache of ibapi.contract_cache, in memory and after a warm load of
+its SQLite file by a new process.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_contract_cache --symbols 500 --delay 0.005
+"""
+
+import argparse
+import os
+import tempfile
+import threading
+import time
+
+from ibapi.client import EClient
+from ibapi.contract import Contract
+from ibapi.contract_cache import ContractCache
+from ibapi.mock_tws import MockTws
+from ibapi.wrapper import EWrapper
+
+
+class ResolveWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.answered = threading.Event()
+
+    def contractDetailsEnd(self, reqId):
+        self.answered.set()
+
+
+def stock(symbol):
+    contract = Contract()
+    contract.symbol = symbol
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.currency = "USD"
+    return contract
+
+
+def resolve(tws, cache, symbols):
+    """ seconds to resolve symbols one after the other """
+    wrapper = ResolveWrapper()
+    client = EClient(wrapper)
+    client.setContractCache(cache)
+    client.connect("127.0.0.1", tws.port, 0)
+    thread = threading.Thread(target=client.run)
+    thread.start()
+    try:
+        t0 = time.perf_counter()
+        for (reqId, symbol) in enumerate(symbols):
+            wrapper.answered.clear()
+            client.reqContractDetails(reqId, stock(symbol))
+            wrapper.answered.wait()
+        return time.perf_counter() - t0
+    finally:
+        client.disconnect()
+        thread.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.005,
+                        help="seconds the mock TWS takes per reqContractDetails")
+    args = parser.parse_args()
+
+    symbols = ["SYM%04d" % i for i in range(args.symbols)]
+    path = os.path.join(tempfile.mkdtemp(), "contracts.db")
+    with MockTws(contractDetailsDelay=args.delay) as tws:
+        cache = ContractCache(path)
+        for name in ("cold", "cached"):
+            before = tws.requests.copy()
+            dt = resolve(tws, cache, symbols)
+            sent = sum(tws.requests.values()) - sum(before.values())
+            print("%-10s %8.3f s %10.0f us/contract  %5d requests to TWS" % (
+                name, dt, dt / len(symbols) * 1e6, sent))
+        cache.close()
+
+        t0 = time.perf_counter()
+        cache = ContractCache(path)
+        print("warm load  %8.3f s for %d contracts" % (time.perf_counter() - t0, len(cache)))
+        dt = resolve(tws, cache, symbols)
+        print("%-10s %8.3f s %10.0f us/contract" % ("warm", dt, dt / len(symbols) * 1e6))
+        cache.close()
+    os.remove(path)
+
+
+if "__main__" == __name__:
+    main()
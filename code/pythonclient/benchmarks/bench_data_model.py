@@ -0,0 +1,129 @@
+"""
+Memory and allocations of a large historical download with the slotted data
+model of ibapi.common (BarData, HistoricalTickLast, ...) against the same
+classes with a per-instance __dict__, as they were before: bytes retained
+per object kept by the wrapper, allocated blocks per object and decode
+time. Also the number of distinct TickAttrib objects a tick stream makes
+now that the Decoder shares one per attrMask.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_data_model --bars 200000
+"""
+
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from ibapi import comm, common, decoder
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+from ibapi.object_implem import Object
+
+
+SERVER_VERSION = 176
+PAGE = 1000
+
+
+class KeepingWrapper:
+    """ keeps every object, like a wrapper collecting a download """
+    def __init__(self):
+        self.kept = []
+
+    def historicalData(self, reqId, bar):
+        self.kept.append(bar)
+
+    def historicalDataEnd(self, reqId, start, end):
+        pass
+
+    def historicalTicksLast(self, reqId, ticks, done):
+        self.kept.extend(ticks)
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        self.kept.append(attrib)
+
+    def tickSize(self, reqId, tickType, size):
+        pass
+
+
+def make_fields(*vals):
+    return comm.read_fields("".join(comm.make_field(val) for val in vals))
+
+
+def bars_page():
+    vals = [IN.HISTORICAL_DATA, 7, "20250101 09:30:00", "20250102 09:30:00", PAGE]
+    for i in range(PAGE):
+        vals += ["20250101 %02d:%02d:00" % (9 + i // 60 % 8, i % 60), 187.25, 187.75,
+                 187.0, 187.5, 12000 + i, "187.41", 35]
+    return make_fields(*vals)
+
+
+def ticks_page():
+    vals = [IN.HISTORICAL_TICKS_LAST, 7, PAGE]
+    for i in range(PAGE):
+        vals += [1700000000 + i, i % 4, "187.%02d" % (i % 100), 100 + i % 7, "NASDAQ", ""]
+    vals.append(1)
+    return make_fields(*vals)
+
+
+def dict_class(cls):
+    """ cls with a per-instance __dict__ instead of its __slots__ """
+    return type(cls.__name__, (Object,), {"__init__": cls.__init__, "__str__": cls.__str__})
+
+
+def measure(name, page, nPages):
+    wrapper = KeepingWrapper()
+    dec = Decoder(wrapper, SERVER_VERSION)
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    t0 = time.perf_counter()
+    for _ in range(nPages):
+        dec.interpret(page)
+    dt = time.perf_counter() - t0
+    gc.collect()
+    retained = tracemalloc.get_traced_memory()[0]
+    nBlocks = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+    n = len(wrapper.kept)
+    print("%-34s %8.0f bytes/obj %6.1f blocks/obj %10.0f objs/s" % (
+        name, retained / n, nBlocks / n, n / dt))
+
+
+def compare(label, page, nPages, classes):
+    measure(label + " slots", page, nPages)
+    saved = {cls.__name__: getattr(decoder, cls.__name__) for cls in classes}
+    try:
+        for cls in classes:
+            setattr(decoder, cls.__name__, dict_class(cls))
+        measure(label + " __dict__", page, nPages)
+    finally:
+        for (name, cls) in saved.items():
+            setattr(decoder, name, cls)
+
+
+def tick_attribs(nTicks):
+    wrapper = KeepingWrapper()
+    dec = Decoder(wrapper, SERVER_VERSION)
+    msgs = [make_fields(IN.TICK_PRICE, 6, 7, 1, 187.25, 300, mask) for mask in range(8)]
+    for i in range(nTicks):
+        dec.interpret(msgs[i % 8])
+    print("%d ticks: %d distinct TickAttrib objects" % (
+        nTicks, len({id(attrib) for attrib in wrapper.kept})))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bars", type=int, default=200000)
+    parser.add_argument("--ticks", type=int, default=200000)
+    args = parser.parse_args()
+
+    compare("BarData", bars_page(), args.bars // PAGE, (common.BarData,))
+    compare("HistoricalTickLast", ticks_page(), args.ticks // PAGE,
+            (common.HistoricalTickLast,))
+    tick_attribs(args.ticks)
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,107 @@
+"""
+Throughput and latency of the dispatch modes of EClient.run (QUEUE, BATCH,
+INLINE) on a high rate TICK_SIZE stream sent by a fake TWS in another
+process. Each message carries its send time (time.monotonic_ns(), a system
+wide clock on Linux) in its size field.
+
+- burst: all the messages are sent at once, reported is the rate at which
+  the wrapper got them.
+- paced: batches of --batch messages every millisecond, reported are the
+  send to callback latency percentiles.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_dispatch --n 200000
+"""
+
+import argparse
+import multiprocessing
+import socket
+import time
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.common import DispatchModeEnum
+from ibapi.message import IN
+from ibapi.wrapper import EWrapper
+
+
+SERVER_VERSION = 176
+
+
+def make_msg(*vals):
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))
+
+
+def serve(server, n, batch):
+    """ the fake TWS: handshake, then the burst (batch == 0) or paced stream """
+    (peer, _) = server.accept()
+    server.close()
+    peer.recv(4096)                     # "API\0" and the version range
+    peer.sendall(make_msg(SERVER_VERSION, "20250101 09:30:00 UTC"))
+    peer.recv(4096)                     # startApi
+
+    if batch == 0:
+        stamp = time.monotonic_ns()
+        peer.sendall(make_msg(IN.TICK_SIZE, 6, 7, 8, stamp) * n)
+    else:
+        nextSend = time.monotonic_ns()
+        for _ in range(0, n, batch):
+            while time.monotonic_ns() < nextSend:
+                pass
+            peer.sendall(make_msg(IN.TICK_SIZE, 6, 7, 8, time.monotonic_ns()) * batch)
+            nextSend += 1000000
+    peer.recv(1)                        # wait for the client to hang up
+    peer.close()
+
+
+class LatencyWrapper(EWrapper):
+    def __init__(self, client, n):
+        super().__init__()
+        self.client = client
+        self.n = n
+        self.latencies = []
+
+    def tickSize(self, reqId, tickType, size):
+        self.latencies.append(time.monotonic_ns() - int(size))
+        if len(self.latencies) == self.n:
+            self.client.disconnect()
+
+
+def run_mode(dispatchMode, n, batch):
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    tws = multiprocessing.Process(target=serve, args=(server, n, batch))
+    tws.start()
+
+    client = EClient(None)
+    wrapper = client.wrapper = LatencyWrapper(client, n)
+    client.setDispatchMode(dispatchMode)
+    client.connect("127.0.0.1", server.getsockname()[1], 0)
+    server.close()
+    client.run()
+    tws.join()
+    return sorted(wrapper.latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=200000, help="messages per run")
+    parser.add_argument("--batch", type=int, default=20,
+                        help="messages per millisecond in the paced run")
+    args = parser.parse_args()
+
+    modes = (DispatchModeEnum.QUEUE, DispatchModeEnum.BATCH, DispatchModeEnum.INLINE)
+    for dispatchMode in modes:
+        name = DispatchModeEnum.to_str(dispatchMode)
+        burst = run_mode(dispatchMode, args.n, 0)
+        paced = run_mode(dispatchMode, args.n // 4, args.batch)
+        pct = lambda q: paced[int(q * (len(paced) - 1))] / 1000
+        print("%-7s burst %9.0f msgs/s   paced %d msgs/s: latency p50 %7.1f us  "
+              "p99 %8.1f us  max %8.1f us" % (
+                  name, args.n / (burst[-1] / 1e9), args.batch * 1000,
+                  pct(0.5), pct(0.99), pct(1.)))
+
+
+if "__main__" == __name__:
+    main()
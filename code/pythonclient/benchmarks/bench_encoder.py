@@ -0,0 +1,95 @@
+"""
+Orders encoded per second by EClient.placeOrder() and subscriptions per
+second by reqMktData(), with the generic make_field() based methods and with
+the encoders of ibapi.encode_plan compiled at connect time. The connection
+only collects the messages.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_encoder --n 50000
+"""
+
+import argparse
+import time
+from decimal import Decimal
+
+from ibapi.client import EClient
+from ibapi.contract import Contract
+from ibapi.order import Order
+from ibapi.tag_value import TagValue
+from ibapi.wrapper import EWrapper
+
+
+SERVER_VERSION = 176
+
+
+class NullConnection:
+    def isConnected(self):
+        return True
+
+    def sendMsg(self, msg):
+        return len(msg)
+
+
+def make_client(compiled):
+    client = EClient(EWrapper())
+    client.conn = NullConnection()
+    client.serverVersion_ = SERVER_VERSION
+    client.setConnState(EClient.CONNECTED)
+    if compiled:
+        client.compileEncoders()
+    return client
+
+
+def basket(n):
+    """ n limit orders over a few hundred symbols, some of them adaptive """
+    orders = []
+    for i in range(n):
+        contract = Contract()
+        contract.symbol = "SYM%d" % (i % 500)
+        contract.secType = "STK"
+        contract.exchange = "SMART"
+        contract.currency = "USD"
+        order = Order()
+        order.action = "BUY" if i % 2 else "SELL"
+        order.totalQuantity = Decimal(100 + i % 10)
+        order.orderType = "LMT"
+        order.lmtPrice = 100. + (i % 1000) / 100
+        order.tif = "DAY"
+        if i % 4 == 0:
+            order.algoStrategy = "Adaptive"
+            order.algoParams = [TagValue("adaptivePriority", "Normal")]
+        orders.append((i + 1, contract, order))
+    return orders
+
+
+def timed(fn, items):
+    t0 = time.perf_counter()
+    for item in items:
+        fn(*item)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=50000, help="orders per run")
+    args = parser.parse_args()
+
+    orders = basket(args.n)
+    subscriptions = [(orderId, contract, "", False, False, [])
+                     for (orderId, contract, _) in orders]
+
+    legacy = make_client(compiled=False)
+    compiled = make_client(compiled=True)
+    tLegacy = timed(legacy.placeOrder, orders)
+    tCompiled = timed(compiled.placeOrder, orders)
+    print("placeOrder  make_field %9.0f orders/s   compiled %9.0f orders/s   x%.1f" % (
+        args.n / tLegacy, args.n / tCompiled, tLegacy / tCompiled))
+
+    tLegacy = timed(legacy.reqMktData, subscriptions)
+    tCompiled = timed(compiled.reqMktData, subscriptions)
+    print("reqMktData  make_field %9.0f reqs/s     compiled %9.0f reqs/s     x%.1f" % (
+        args.n / tLegacy, args.n / tCompiled, tLegacy / tCompiled))
+
+
+if "__main__" == __name__:
+    main()
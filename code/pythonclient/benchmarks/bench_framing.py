@@ -0,0 +1,79 @@
+"""
+Compares the FrameBuffer used by EReader with the previous
+'buf += data; comm.read_msg(buf)' loop on multi-megabyte bursts.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_framing --mb 4
+"""
+
+import argparse
+import time
+
+from ibapi import comm
+from ibapi.framing import FrameBuffer
+
+
+def make_burst(nbytes):
+    """ a burst of TICK_PRICE-like messages of roughly nbytes """
+    msg = comm.make_msg("1\x006\x001234\x001\x00187.25\x00300\x003\x00")
+    return msg * (nbytes // len(msg) + 1)
+
+
+def chunked(burst, chunk):
+    return [burst[i:i + chunk] for i in range(0, len(burst), chunk)]
+
+
+def run_read_msg(chunks):
+    n = 0
+    buf = b""
+    for data in chunks:
+        buf += data
+        while len(buf) > 0:
+            (size, msg, buf) = comm.read_msg(buf)
+            if msg:
+                n += 1
+            else:
+                break
+    return n
+
+
+def run_frame_buffer(chunks):
+    n = 0
+    buf = FrameBuffer()
+    for data in chunks:
+        buf.write(data)
+        n += len(buf.extract())
+    return n
+
+
+def timed(fn, chunks, repeat):
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        n = fn(chunks)
+        dt = time.perf_counter() - t0
+        best = dt if best is None else min(best, dt)
+    return n, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mb", type=float, default=4., help="burst size in MB")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    burst = make_burst(int(args.mb * 1024 * 1024))
+    print("burst: %d bytes" % len(burst))
+    # 4KB is what the legacy Connection hands over per recv, the larger
+    # chunks are what _recvAllMsg concatenates during a burst
+    for chunk in (4096, 256 * 1024, len(burst)):
+        chunks = chunked(burst, chunk)
+        for (name, fn) in (("read_msg", run_read_msg),
+                           ("FrameBuffer", run_frame_buffer)):
+            (n, dt) = timed(fn, chunks, args.repeat)
+            print("chunk %9d %-12s %8d msgs %8.3f s %10.0f msgs/s" % (
+                chunk, name, n, dt, n / dt))
+
+
+if "__main__" == __name__:
+    main()
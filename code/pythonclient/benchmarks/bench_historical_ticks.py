@@ -0,0 +1,74 @@
+"""
+Ticks decoded per second for HISTORICAL_TICKS, HISTORICAL_TICKS_BID_ASK and
+HISTORICAL_TICKS_LAST: lists of HistoricalTick* objects (default) against
+the numpy structured arrays of EClient.setHistoricalTicksArrays(True).
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_historical_ticks --pages 200
+"""
+
+import argparse
+import time
+
+from ibapi import comm
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+
+
+SERVER_VERSION = 176
+TICKS_PER_PAGE = 1000
+
+
+class NullWrapper:
+    def historicalTicks(self, reqId, ticks, done): pass
+    def historicalTicksBidAsk(self, reqId, ticks, done): pass
+    def historicalTicksLast(self, reqId, ticks, done): pass
+
+
+def make_fields(*vals):
+    return comm.read_fields("".join(comm.make_field(val) for val in vals))
+
+
+def page(msgId, tick):
+    vals = [msgId, 7, TICKS_PER_PAGE]
+    for i in range(TICKS_PER_PAGE):
+        vals += [1700000000 + i] + tick(i)
+    vals.append(1)
+    return make_fields(*vals)
+
+
+PAGES = {
+    "MIDPOINT": page(IN.HISTORICAL_TICKS,
+                     lambda i: [0, "187.%02d" % (i % 100), 0]),
+    "BID_ASK": page(IN.HISTORICAL_TICKS_BID_ASK,
+                    lambda i: [i % 4, "187.%02d" % (i % 100), "187.%02d" % (i % 100 + 1),
+                               100 + i % 7, 200 + i % 5]),
+    "TRADES": page(IN.HISTORICAL_TICKS_LAST,
+                   lambda i: [i % 4, "187.%02d" % (i % 100), 100 + i % 7, "NASDAQ", ""]),
+}
+
+
+def timed(decoder, fields, nPages):
+    t0 = time.perf_counter()
+    for _ in range(nPages):
+        decoder.interpret(fields)
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--pages", type=int, default=200, help="pages of 1000 ticks per run")
+    args = parser.parse_args()
+
+    objects = Decoder(NullWrapper(), SERVER_VERSION)
+    arrays = Decoder(NullWrapper(), SERVER_VERSION, historicalTicksArrays=True)
+    nTicks = args.pages * TICKS_PER_PAGE
+    for (name, fields) in PAGES.items():
+        tObjects = timed(objects, fields, args.pages)
+        tArrays = timed(arrays, fields, args.pages)
+        print("%-9s objects %10.0f ticks/s   arrays %10.0f ticks/s   x%.1f" % (
+            name, nTicks / tObjects, nTicks / tArrays, tObjects / tArrays))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,85 @@
+"""
+Cost of the instrumentation on the EClient.run message loop: a queue of
+tick messages drained without instrumentation and with an Instrumentation
+installed, and the per message debug logging the loop used to do.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_instrumentation --n 200000
+"""
+
+import argparse
+import logging
+import pprint
+import time
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.decoder import Decoder
+from ibapi.instrumentation import Instrumentation
+from ibapi.message import IN
+from ibapi.wrapper import EWrapper
+
+
+SERVER_VERSION = 176
+
+
+class NullWrapper(EWrapper):
+    def tickPrice(self, reqId, tickType, price, attrib): pass
+    def tickSize(self, reqId, tickType, size): pass
+
+
+def make_text(*vals):
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))[4:]
+
+
+MSGS = (make_text(IN.TICK_PRICE, 6, 7, 1, "187.25", 300, 3),
+        make_text(IN.TICK_SIZE, 6, 7, 8, "1234567"))
+
+
+class LoggingClient(EClient):
+    """ the former per message logging of run(), with DEBUG disabled """
+    logger = logging.getLogger("ibapi.client")
+
+    def isConnected(self):
+        connConnected = self.conn and self.conn.isConnected()
+        self.logger.debug("%s isConn: %s, connConnected: %s" % (id(self),
+            self.connState, str(connConnected)))
+        return EClient.CONNECTED == self.connState and connConnected
+
+    def msgLoopRec(self):
+        self.logger.debug("fields %s", None)
+        self.logger.debug("conn:%d queue.sz:%d", self.isConnected(), self.msg_queue.qsize())
+
+
+def drain(clientClass, n, instrumentation=None):
+    wrapper = NullWrapper()
+    client = clientClass(wrapper)
+    client.decoder = Decoder(wrapper, SERVER_VERSION)
+    client.setInstrumentation(instrumentation)
+    for i in range(n):
+        client.msg_queue.put(MSGS[i % 2])
+    t0 = time.perf_counter()
+    client.run()
+    return time.perf_counter() - t0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=200000, help="messages per run")
+    parser.add_argument("--show", action="store_true", help="print the snapshot")
+    args = parser.parse_args()
+
+    instrumentation = Instrumentation()
+    runs = (("debug logging", LoggingClient, None),
+            ("disabled", EClient, None),
+            ("enabled", EClient, instrumentation))
+    for (name, clientClass, instr) in runs:
+        elapsed = drain(clientClass, args.n, instr)
+        print("%-14s %10.0f msgs/s  %6.0f ns/msg" % (name, args.n / elapsed,
+                                                      elapsed / args.n * 1e9))
+    if args.show:
+        pprint.pprint(instrumentation.snapshot())
+
+
+if "__main__" == __name__:
+    main()
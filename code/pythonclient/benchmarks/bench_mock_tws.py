@@ -0,0 +1,138 @@
+"""
+End to end numbers against the local mock TWS of ibapi.mock_tws: connect
+time, request to answer round trips of the requests TradingApp makes and the
+market data rate the client keeps up with.
+
+With --app the account summary rows are also fed to main.TradingApp, which
+stores them in pandas DataFrames (needs the dependencies of main.py).
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_mock_tws --rounds 200 --tick-rate 100000
+"""
+
+import argparse
+import threading
+import time
+
+from ibapi.client import EClient
+from ibapi.contract import Contract
+from ibapi.mock_tws import MockTws
+from ibapi.wrapper import EWrapper
+
+
+class RoundTripWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.answered = threading.Event()
+        self.nTicks = 0
+
+    def accountSummaryEnd(self, reqId):
+        self.answered.set()
+
+    def pnl(self, reqId, dailyPnL, unrealizedPnL, realizedPnL):
+        self.answered.set()
+
+    def positionEnd(self):
+        self.answered.set()
+
+    def historicalDataEnd(self, reqId, start, end):
+        self.answered.set()
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        self.nTicks += 1
+
+    def tickSize(self, reqId, tickType, size):
+        self.nTicks += 1
+
+
+def stock():
+    contract = Contract()
+    contract.symbol = "AAPL"
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.currency = "USD"
+    return contract
+
+
+def round_trips(client, wrapper, request, rounds):
+    """ the round trip times of request in microseconds, sorted """
+    times = []
+    for reqId in range(rounds):
+        wrapper.answered.clear()
+        t0 = time.perf_counter()
+        request(reqId)
+        wrapper.answered.wait()
+        times.append((time.perf_counter() - t0) * 1e6)
+    return sorted(times)
+
+
+def bench_client(tws, rounds, seconds):
+    wrapper = RoundTripWrapper()
+    client = EClient(wrapper)
+    t0 = time.perf_counter()
+    client.connect("127.0.0.1", tws.port, 0)
+    print("connect                  %8.0f us" % ((time.perf_counter() - t0) * 1e6))
+    thread = threading.Thread(target=client.run)
+    thread.start()
+
+    contract = stock()
+    requests = (
+        ("reqAccountSummary", lambda reqId: client.reqAccountSummary(
+            reqId, "All", "$LEDGER:BASE")),
+        ("reqPnL", lambda reqId: client.reqPnL(reqId, "DU1234567", "")),
+        ("reqPositions", lambda reqId: client.reqPositions()),
+        ("reqHistoricalData", lambda reqId: client.reqHistoricalData(
+            reqId, contract, "", "1 D", "1 min", "TRADES", 1, 1, False, [])),
+    )
+    for (name, request) in requests:
+        times = round_trips(client, wrapper, request, rounds)
+        print("%-20s p50 %8.0f us  p99 %8.0f us" % (
+            name, times[len(times) // 2], times[int(0.99 * (len(times) - 1))]))
+
+    client.reqMktData(1, contract, "", False, False, [])
+    time.sleep(seconds)
+    client.cancelMktData(1)
+    # a TICK_PRICE makes a tickPrice and a tickSize, a TICK_SIZE a tickSize
+    print("market data              %8.0f msgs/s of %.0f" % (
+        wrapper.nTicks / 1.5 / seconds, tws.tickRate))
+
+    client.disconnect()
+    thread.join()
+
+
+def bench_app(tws, rows):
+    from main import TradingApp
+
+    app = TradingApp("127.0.0.1", tws.port, 1)
+    try:
+        t0 = time.perf_counter()
+        app.reqAccountSummary(1, "All", "$LEDGER:BASE")
+        while len(app.dataframes["acc_summary"]) < rows:
+            time.sleep(0.001)
+        dt = time.perf_counter() - t0
+        print("TradingApp account summary %d rows in %.3f s, %.0f rows/s" % (
+            rows, dt, rows / dt))
+    finally:
+        app.disconnect_api()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--rounds", type=int, default=200, help="round trips per request")
+    parser.add_argument("--rows", type=int, default=100, help="account summary rows")
+    parser.add_argument("--bars", type=int, default=390, help="bars per historical request")
+    parser.add_argument("--tick-rate", type=float, default=100000.,
+                        help="market data messages per second")
+    parser.add_argument("--seconds", type=float, default=2., help="market data duration")
+    parser.add_argument("--app", action="store_true", help="also run main.TradingApp")
+    args = parser.parse_args()
+
+    with MockTws(accountSummaryRows=args.rows, historicalBars=args.bars,
+                 tickRate=args.tick_rate) as tws:
+        bench_client(tws, args.rounds, args.seconds)
+        if args.app:
+            bench_app(tws, args.rows)
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,95 @@
+"""
+Depth updates applied per second by ibapi.order_book.OrderBook, without and
+with a top of book callback, against a book kept in Python lists the way
+updateMktDepth handlers usually do.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_order_book --updates 500000
+"""
+
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from ibapi.order_book import DEPTH_DELETE, DEPTH_INSERT, DEPTH_UPDATE, OrderBook
+
+
+def updates(n, numRows, nBooks):
+    """ (reqId, position, operation, side, price, size), mostly updates
+    like a real depth stream, the depth staying around numRows """
+    rnd = random.Random(7)
+    depths = {}
+    out = []
+    for _ in range(n):
+        reqId = rnd.randrange(nBooks)
+        side = rnd.randrange(2)
+        depth = depths.get((reqId, side), 0)
+        r = rnd.random()
+        if depth and r < 0.8:
+            (operation, position) = (DEPTH_UPDATE, rnd.randrange(depth))
+        elif depth < numRows and (r < 0.9 or not depth):
+            (operation, position) = (DEPTH_INSERT, rnd.randrange(depth + 1))
+            depth += 1
+        else:
+            (operation, position) = (DEPTH_DELETE, rnd.randrange(depth))
+            depth -= 1
+        depths[(reqId, side)] = depth
+        out.append((reqId, position, operation, side, 100. + rnd.randrange(100) / 100,
+                    Decimal(rnd.randrange(1, 500))))
+    return out
+
+
+class ListBook:
+    """ the list based book of the usual updateMktDepth handler """
+
+    def __init__(self):
+        self.books = {}
+
+    def updateMktDepth(self, reqId, position, operation, side, price, size):
+        rows = self.books.setdefault(reqId, ([], []))[side]
+        if operation == DEPTH_INSERT:
+            rows.insert(position, [price, size])
+        elif operation == DEPTH_UPDATE:
+            rows[position] = [price, size]
+        elif operation == DEPTH_DELETE:
+            del rows[position]
+
+
+def run(name, book, stream):
+    update = book.updateMktDepth
+    t0 = time.perf_counter()
+    for args in stream:
+        update(*args)
+    dt = time.perf_counter() - t0
+    print("%-24s %10.0f updates/s" % (name, len(stream) / dt))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--updates", type=int, default=500000)
+    parser.add_argument("--rows", type=int, default=10, help="numRows of the books")
+    parser.add_argument("--books", type=int, default=20)
+    args = parser.parse_args()
+
+    stream = updates(args.updates, args.rows, args.books)
+    run("lists", ListBook(), stream)
+    run("OrderBook", OrderBook(args.rows), stream)
+    nTops = [0]
+
+    def onTopOfBook(reqId, bidPrice, bidSize, askPrice, askSize):
+        nTops[0] += 1
+    run("OrderBook onTopOfBook", OrderBook(args.rows, onTopOfBook), stream)
+    print("%d top of book changes" % nTops[0])
+
+    book = OrderBook(args.rows)
+    for update in stream:
+        book.updateMktDepth(*update)
+    t0 = time.perf_counter()
+    for _ in range(100000):
+        book.snapshot(0)
+    print("%-24s %10.2f us" % ("snapshot", (time.perf_counter() - t0) / 100000 * 1e6))
+
+
+if "__main__" == __name__:
+    main()
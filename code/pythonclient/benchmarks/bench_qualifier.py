@@ -0,0 +1,93 @@
+"""
+Time to qualify a universe of stocks against the local mock TWS, which
+answers every reqContractDetails after --delay seconds like a remote TWS:
+one request at a time, waiting for each contractDetailsEnd, against the
+ContractQualifier of ibapi.qualifier with its requests in flight at once,
+paced by itself or by the EWriter (EClient.setWriteQueue).
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_qualifier --symbols 500 --delay 0.1
+"""
+
+import argparse
+import threading
+import time
+
+from ibapi.client import EClient
+from ibapi.contract import Contract
+from ibapi.mock_tws import MockTws
+from ibapi.qualifier import ContractQualifier
+from ibapi.wrapper import EWrapper
+
+
+class SequentialWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.answered = threading.Event()
+
+    def contractDetailsEnd(self, reqId):
+        self.answered.set()
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        if reqId != -1:
+            self.answered.set()
+
+
+def stock(symbol):
+    contract = Contract()
+    contract.symbol = symbol
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.currency = "USD"
+    return contract
+
+
+def connect(tws, writeQueue):
+    wrapper = SequentialWrapper()
+    client = EClient(wrapper)
+    client.setWriteQueue(writeQueue)
+    client.connect("127.0.0.1", tws.port, 0)
+    thread = threading.Thread(target=client.run)
+    thread.start()
+    return (client, wrapper, thread)
+
+
+def sequential(client, wrapper, contracts):
+    for (reqId, contract) in enumerate(contracts):
+        wrapper.answered.clear()
+        client.reqContractDetails(reqId, contract)
+        wrapper.answered.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--delay", type=float, default=0.1,
+                        help="seconds the mock TWS takes per reqContractDetails")
+    parser.add_argument("--sequential", type=int, default=50,
+                        help="symbols resolved one at a time, extrapolated to --symbols")
+    args = parser.parse_args()
+
+    contracts = [stock("SYM%04d" % i) for i in range(args.symbols)]
+    with MockTws(contractDetailsDelay=args.delay) as tws:
+        runs = (
+            ("one at a time", False, lambda c, w: sequential(c, w, contracts[:args.sequential])),
+            ("qualifier", False, lambda c, w: ContractQualifier(c).qualify(contracts)),
+            ("qualifier+EWriter", True, lambda c, w: ContractQualifier(c).qualify(contracts)),
+        )
+        for (name, writeQueue, run) in runs:
+            (client, wrapper, thread) = connect(tws, writeQueue)
+            try:
+                t0 = time.perf_counter()
+                run(client, wrapper)
+                dt = time.perf_counter() - t0
+            finally:
+                client.disconnect()
+                thread.join()
+            if name == "one at a time":
+                dt *= args.symbols / args.sequential
+            print("%-18s %8.2f s for %d contracts" % (name, dt, args.symbols))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,96 @@
+"""
+5 seconds bars per second rolled into 1m/5m/15m/1h bars by
+ibapi.resampler.RealTimeBarResampler, one realtimeBar() call per bar and in
+batches of all the symbols with update(), against appending every bar to a
+pandas DataFrame per symbol.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_resampler --symbols 500 --hours 2
+"""
+
+import argparse
+import random
+import time
+from decimal import Decimal
+
+from ibapi.resampler import RealTimeBarResampler
+
+
+T0 = 1700000000 - 1700000000 % 3600
+
+
+def make_bars(nSymbols, hours):
+    """ per time, the (reqIds, time, open, high, low, close, volume, wap,
+    count) of all the symbols """
+    rnd = random.Random(7)
+    reqIds = list(range(nSymbols))
+    out = []
+    for i in range(hours * 720):
+        prices = [100. + rnd.randrange(100) / 100 for _ in reqIds]
+        out.append((reqIds, T0 + 5 * i, prices, [p + 0.1 for p in prices],
+                    [p - 0.1 for p in prices], prices, [Decimal(100)] * nSymbols,
+                    [Decimal("100.5")] * nSymbols, [10] * nSymbols))
+    return out
+
+
+def bench_single(stream, nBars):
+    counter = [0]
+
+    def onBar(*bar):
+        counter[0] += 1
+    resampler = RealTimeBarResampler(onBar=onBar)
+    realtimeBar = resampler.realtimeBar
+    t0 = time.perf_counter()
+    for (reqIds, t, open_, high, low, close, volume, wap, count) in stream:
+        for i in range(len(reqIds)):
+            realtimeBar(reqIds[i], t, open_[i], high[i], low[i], close[i], volume[i],
+                        wap[i], count[i])
+    dt = time.perf_counter() - t0
+    print("realtimeBar()        %10.0f bars/s  %d completed" % (nBars / dt, counter[0]))
+
+
+def bench_batch(stream, nBars):
+    counter = [0]
+
+    def onBatch(interval, batch):
+        counter[0] += len(batch["reqId"])
+    resampler = RealTimeBarResampler(onBatch=onBatch)
+    t0 = time.perf_counter()
+    for args in stream:
+        resampler.update(*args)
+    dt = time.perf_counter() - t0
+    print("update()             %10.0f bars/s  %d completed" % (nBars / dt, counter[0]))
+
+
+def bench_pandas(stream, nBars):
+    import pandas as pd
+
+    t0 = time.perf_counter()
+    frames = {}
+    for (reqIds, t, open_, high, low, close, volume, wap, count) in stream[:120]:
+        for i in range(len(reqIds)):
+            df = frames.setdefault(reqIds[i], pd.DataFrame(
+                columns=["time", "open", "high", "low", "close", "volume"]))
+            df.loc[len(df)] = [t, open_[i], high[i], low[i], close[i], float(volume[i])]
+    dt = time.perf_counter() - t0
+    n = 120 * len(stream[0][0])
+    print("DataFrame appends    %10.0f bars/s (resampling not included)" % (n / dt))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--hours", type=int, default=1)
+    parser.add_argument("--pandas", action="store_true", help="also time the DataFrame appends")
+    args = parser.parse_args()
+
+    stream = make_bars(args.symbols, args.hours)
+    nBars = len(stream) * args.symbols
+    bench_single(stream, nBars)
+    bench_batch(stream, nBars)
+    if args.pandas:
+        bench_pandas(stream, nBars)
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,99 @@
+"""
+Decoding time and allocations of a synthetic market data stream (TICK_PRICE,
+TICK_SIZE, MARKET_DEPTH and REAL_TIME_BARS) for each size mode of
+EClient.setSizeMode: Decimal (default), float and scaled int.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_size_mode --n 200000
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from ibapi import comm
+from ibapi.common import SizeModeEnum
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+
+
+SERVER_VERSION = 176
+
+
+class KeepingWrapper:
+    """ keeps every size like a tick history would, so the retained memory
+    per message shows the cost of the size objects """
+    def __init__(self):
+        self.sizes = []
+
+    def tickPrice(self, reqId, tickType, price, attrib): pass
+
+    def tickSize(self, reqId, tickType, size):
+        self.sizes.append(size)
+
+    def updateMktDepth(self, reqId, position, operation, side, price, size):
+        self.sizes.append(size)
+
+    def realtimeBar(self, reqId, time, open_, high, low, close, volume, wap, count):
+        self.sizes.append(volume)
+
+
+def make_fields(*vals):
+    return comm.read_fields("".join(comm.make_field(val) for val in vals))
+
+
+def stream(n):
+    """ n messages cycling over a realistic mix of the tick path """
+    templates = (
+        lambda i: make_fields(IN.TICK_PRICE, 6, 7, 1, "187.%02d" % (i % 100), 300 + i % 50, 3),
+        lambda i: make_fields(IN.TICK_PRICE, 6, 7, 2, "187.%02d" % (i % 100 + 1), 200 + i % 30, 3),
+        lambda i: make_fields(IN.TICK_SIZE, 6, 7, 8, 1234567 + i),
+        lambda i: make_fields(IN.TICK_SIZE, 6, 7, 0, 100 + i % 10),
+        lambda i: make_fields(IN.MARKET_DEPTH, 1, 7, i % 10, 1, i % 2, "99.5", 200 + i % 99),
+        lambda i: make_fields(IN.REAL_TIME_BARS, 3, 7, 1700000000 + i, "1.5", "2.5", "1.0",
+                              "2.0", 1000 + i, "1.75", 12),
+    )
+    # a few thousand distinct messages replayed, so building them is not timed
+    distinct = [templates[i % len(templates)](i) for i in range(min(n, 6000))]
+    return [distinct[i % len(distinct)] for i in range(n)]
+
+
+def timed(decoder, msgs):
+    interpret = decoder.interpret
+    t0 = time.perf_counter()
+    for fields in msgs:
+        interpret(fields)
+    return time.perf_counter() - t0
+
+
+def allocations(decoder, msgs):
+    """ (number of blocks, bytes) allocated while decoding msgs """
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    for fields in msgs:
+        decoder.interpret(fields)
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    stats = after.compare_to(before, "filename")
+    return (sum(stat.count_diff for stat in stats), sum(stat.size_diff for stat in stats))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=200000, help="messages per run")
+    args = parser.parse_args()
+
+    msgs = stream(args.n)
+    allocMsgs = msgs[:10000]
+    for sizeMode in (SizeModeEnum.DECIMAL, SizeModeEnum.FLOAT, SizeModeEnum.SCALED_INT):
+        decoder = Decoder(KeepingWrapper(), SERVER_VERSION, sizeMode=sizeMode)
+        elapsed = timed(decoder, msgs)
+        decoder.wrapper.sizes.clear()
+        (nBlocks, nBytes) = allocations(decoder, allocMsgs)
+        print("%-10s %10.0f msgs/s  %6.0f ns/msg  retained %5.2f blocks %6.1f bytes per msg" % (
+            SizeModeEnum.to_str(sizeMode), len(msgs) / elapsed, elapsed / len(msgs) * 1e9,
+            nBlocks / len(allocMsgs), nBytes / len(allocMsgs)))
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,97 @@
+"""
+Ticks stored per second by ibapi.tick_store.TickStore against the pattern of
+example/stream_data.py, a pandas DataFrame updated with df.loc[...] = per
+tick, and the time of the window queries over a full store.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_tick_store --ticks 200000
+"""
+
+import argparse
+import time
+from decimal import Decimal
+
+from ibapi.ticktype import TickTypeEnum
+from ibapi.tick_store import TickStore
+
+
+N_SYMBOLS = 50
+
+
+def ticks(n):
+    """ (reqId, is price, tickType, value) like a TICK_PRICE stream """
+    out = []
+    kinds = ((True, TickTypeEnum.BID), (False, TickTypeEnum.BID_SIZE),
+             (True, TickTypeEnum.ASK), (False, TickTypeEnum.ASK_SIZE),
+             (True, TickTypeEnum.LAST), (False, TickTypeEnum.LAST_SIZE))
+    for i in range(n):
+        (isPrice, tickType) = kinds[i % len(kinds)]
+        value = 187. + (i % 100) / 100 if isPrice else Decimal(100 + i % 7)
+        out.append((i // len(kinds) % N_SYMBOLS, isPrice, tickType, value))
+    return out
+
+
+def bench_store(stream, capacity):
+    store = TickStore(capacity)
+    tickPrice = store.tickPrice
+    tickSize = store.tickSize
+    t0 = time.perf_counter()
+    for (reqId, isPrice, tickType, value) in stream:
+        if isPrice:
+            tickPrice(reqId, tickType, value, None)
+        else:
+            tickSize(reqId, tickType, value)
+    dt = time.perf_counter() - t0
+    print("TickStore           %10.0f ticks/s  %8.1f MB" % (
+        len(stream) / dt, store.memory() / 1e6))
+    return store
+
+
+def bench_pandas(stream):
+    import pandas as pd
+
+    df = pd.DataFrame(columns=["bid", "ask", "last", "bidSize", "askSize", "lastSize"])
+    names = {TickTypeEnum.BID: "bid", TickTypeEnum.ASK: "ask", TickTypeEnum.LAST: "last",
+             TickTypeEnum.BID_SIZE: "bidSize", TickTypeEnum.ASK_SIZE: "askSize",
+             TickTypeEnum.LAST_SIZE: "lastSize"}
+    t0 = time.perf_counter()
+    for (reqId, _, tickType, value) in stream:
+        df.loc[reqId, names[tickType]] = float(value)
+    dt = time.perf_counter() - t0
+    print("DataFrame.loc       %10.0f ticks/s" % (len(stream) / dt))
+
+
+def bench_queries(store, rounds):
+    now = time.time()
+    queries = (
+        ("latest", lambda key: store.latest(key, TickTypeEnum.LAST)),
+        ("window 60s", lambda key: store.window(key, TickTypeEnum.BID, 60., now)),
+        ("vwap 60s", lambda key: store.vwap(key, 60., now)),
+        ("spreadStats 60s", lambda key: store.spreadStats(key, 60., now)),
+    )
+    for (name, query) in queries:
+        t0 = time.perf_counter()
+        for i in range(rounds):
+            query(i % N_SYMBOLS)
+        print("%-18s %10.1f us" % (name, (time.perf_counter() - t0) / rounds * 1e6))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--ticks", type=int, default=200000)
+    parser.add_argument("--pandas-ticks", type=int, default=20000,
+                        help="ticks for the (slow) DataFrame pattern")
+    parser.add_argument("--capacity", type=int, default=4096)
+    parser.add_argument("--rounds", type=int, default=10000, help="calls per query")
+    args = parser.parse_args()
+
+    store = bench_store(ticks(args.ticks), args.capacity)
+    try:
+        bench_pandas(ticks(args.pandas_ticks))
+    except ImportError:
+        print("DataFrame.loc       pandas not installed")
+    bench_queries(store, args.rounds)
+
+
+if "__main__" == __name__:
+    main()
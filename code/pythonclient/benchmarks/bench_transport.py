@@ -0,0 +1,93 @@
+"""
+Compares the legacy Connection (1s socket timeout, 4KB recv) with the
+SelectorConnection (selector + recv_into) as used by EReader: reader thread
+CPU time and wall time to drain a burst, and disconnect latency of an idle
+reader.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_transport --mb 16
+"""
+
+import argparse
+import queue
+import socket
+import threading
+import time
+
+from ibapi import comm
+from ibapi.connection import Connection, SelectorConnection
+from ibapi.reader import EReader
+
+
+class TimedReader(EReader):
+    def run(self):
+        t0 = time.thread_time()
+        super().run()
+        self.cpu = time.thread_time() - t0
+
+
+def open_pair(connClass):
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(1)
+    conn = connClass("127.0.0.1", server.getsockname()[1])
+    conn.connect()
+    (peer, _) = server.accept()
+    server.close()
+    return conn, peer
+
+
+def bench_burst(connClass, payload, nMsgs):
+    (conn, peer) = open_pair(connClass)
+    msg_queue = queue.Queue()
+    reader = TimedReader(conn, msg_queue)
+    reader.start()
+
+    t0 = time.perf_counter()
+    sender = threading.Thread(target=peer.sendall, args=(payload, ))
+    sender.start()
+    for _ in range(nMsgs):
+        msg_queue.get()
+    wall = time.perf_counter() - t0
+
+    sender.join()
+    conn.disconnect()
+    reader.join()
+    peer.close()
+    return wall, reader.cpu
+
+
+def bench_disconnect(connClass):
+    (conn, peer) = open_pair(connClass)
+    reader = EReader(conn, queue.Queue())
+    reader.start()
+    time.sleep(0.3)     # let the reader block on the idle socket
+
+    t0 = time.perf_counter()
+    conn.disconnect()
+    reader.join()
+    latency = time.perf_counter() - t0
+    peer.close()
+    return latency
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--mb", type=float, default=16., help="burst size in MB")
+    args = parser.parse_args()
+
+    msg = comm.make_msg("1\x006\x001234\x001\x00187.25\x00300\x003\x00")
+    nMsgs = int(args.mb * 1024 * 1024) // len(msg)
+    payload = msg * nMsgs
+    print("burst: %d msgs, %d bytes" % (nMsgs, len(payload)))
+
+    for connClass in (Connection, SelectorConnection):
+        (wall, cpu) = bench_burst(connClass, payload, nMsgs)
+        latency = bench_disconnect(connClass)
+        print("%-18s drain %7.3f s  %10.0f msgs/s  reader cpu %7.3f s  "
+              "disconnect %7.1f ms" % (connClass.__name__, wall, nMsgs / wall,
+                                       cpu, latency * 1000))
+
+
+if "__main__" == __name__:
+    main()
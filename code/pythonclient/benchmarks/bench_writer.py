@@ -0,0 +1,132 @@
+"""
+Cost of the outbound requests sent right away by the calling thread versus
+queued for the EWriter, over a local socket drained by a thread.
+
+- unpaced: a burst of --n reqMktData, reported are the requests per second
+  the calling thread manages and the number of send system calls.
+- paced: --n-paced historical data requests queued at once, followed by a
+  placeOrder; reported are the most messages sent in a second, the wait
+  times and when the order went out.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.bench_writer --n 100000
+"""
+
+import argparse
+import socket
+import threading
+import time
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.connection import Connection
+from ibapi.contract import Contract
+from ibapi.message import OUT
+from ibapi.order import Order
+from ibapi.writer import EWriter
+from ibapi.wrapper import EWrapper
+
+
+SERVER_VERSION = 176
+
+
+class CountingConnection(Connection):
+    """ a Connection on one end of a socket pair, counts the sends """
+    def __init__(self, sock):
+        super().__init__(None, None)
+        self.socket = sock
+        self.recordIds = False
+        self.sendTimes = []
+        self.msgIds = []
+
+    def sendAll(self, data):
+        now = time.monotonic()
+        self.sendTimes.append(now)
+        if self.recordIds:
+            rest = data
+            while rest:
+                (_, msg, rest) = comm.read_msg(rest)
+                self.msgIds.append((now, int(comm.read_fields(msg)[0])))
+        return super().sendAll(data)
+
+
+def drain(sock):
+    while sock.recv(1 << 20):
+        pass
+
+
+def make_client(writeQueue, msgRate=None):
+    (ours, theirs) = socket.socketpair()
+    threading.Thread(target=drain, args=(theirs, ), daemon=True).start()
+    client = EClient(EWrapper())
+    client.conn = CountingConnection(ours)
+    client.serverVersion_ = SERVER_VERSION
+    client.setConnState(EClient.CONNECTED)
+    client.compileEncoders()
+    if writeQueue:
+        client.writer = EWriter(client.conn, msgRate)
+        client.writer.start()
+    return client
+
+
+def stock():
+    contract = Contract()
+    contract.symbol = "AAPL"
+    contract.secType = "STK"
+    contract.exchange = "SMART"
+    contract.currency = "USD"
+    return contract
+
+
+def unpaced(n):
+    contract = stock()
+    for writeQueue in (False, True):
+        client = make_client(writeQueue)
+        t0 = time.perf_counter()
+        for reqId in range(n):
+            client.reqMktData(reqId, contract, "", False, False, [])
+        dt = time.perf_counter() - t0
+        client.flushWriteQueue()
+        print("%-12s %9.0f reqs/s in the calling thread   %6d sends" % (
+            "write queue" if writeQueue else "direct", n / dt, len(client.conn.sendTimes)))
+        client.disconnect()
+
+
+def paced(n):
+    client = make_client(True, msgRate=45.)
+    client.conn.recordIds = True
+    contract = stock()
+    for reqId in range(n):
+        client.reqHistoricalData(reqId, contract, "", "1 D", "1 min", "TRADES", 1, 1, False, [])
+    order = Order()
+    order.action = "BUY"
+    order.orderType = "MKT"
+    client.placeOrder(n, contract, order)
+    client.flushWriteQueue()
+    snapshot = client.writer.snapshot()
+
+    sent = client.conn.msgIds
+    msgTimes = [t for (t, _) in sent]
+    perSecond = max(sum(1 for u in msgTimes[i:] if u - t < 1.) for (i, t) in enumerate(msgTimes))
+    orderPos = [msgId for (_, msgId) in sent].index(OUT.PLACE_ORDER)
+    print("paced        %d requests in %.1f s, at most %d sent in a second, "
+          "wait p50 %.0f ms  max %.0f ms" % (
+              snapshot["msgsSent"], msgTimes[-1] - msgTimes[0], perSecond,
+              snapshot["waitNs"]["p50"] / 1e6, snapshot["waitNs"]["max"] / 1e6))
+    print("             the placeOrder queued last was sent as #%d after %.0f ms" % (
+        orderPos + 1, (sent[orderPos][0] - msgTimes[0]) * 1000))
+    client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=100000, help="requests of the unpaced run")
+    parser.add_argument("--n-paced", type=int, default=100, help="requests of the paced run")
+    args = parser.parse_args()
+
+    unpaced(args.n)
+    paced(args.n_paced)
+
+
+if "__main__" == __name__:
+    main()
@@ -0,0 +1,386 @@
+"""
+Benchmark suite of the incoming message path, per high rate message type and
+per stage:
+
+- frame: FrameBuffer.extract() of a burst of the framed message
+- read_msg: comm.read_msg() of the framed message
+- read_fields: comm.read_fields() of the payload
+- decode: utils.decode() of every field with its type
+- interpret: Decoder.interpret() with the decode plans
+- process: Decoder.interpret() with the decode plans off, through the
+  process*Msg methods; only for the messages which have a plan (the others
+  take the same path in both stages)
+
+Reported are the msgs/s and ns/field of each stage and, for interpret, the
+memory it allocates per message. CPython does not count the transient
+allocations, so that is the traced peak above the baseline (bytes/msg) and
+the blocks still allocated afterwards (blocks/msg, 0 unless something
+leaks or is retained).
+
+Recordings made with ibapi.recording (--recording) are replayed as one
+more case each, in their recorded message mix.
+
+Each stage runs --repeat times, every run followed by a fixed calibration
+loop, and the best of each counts: the rate of a stage is normalized by the
+calibration measured alongside it, so a busier period of the machine or a
+baseline taken on another one stays comparable. The interpreter and the CPU
+are stored with the baseline and a different one is reported.
+
+A stage more than --tolerance slower than its baseline is measured again
+--confirm times and is a regression only if it stays that slow every time,
+then the exit status is 1. Shared or frequency scaled machines still swing
+by about 40%, hence the default tolerance. --save-baseline stores the
+current run instead.
+
+Run from the code/ directory:
+    python -m pythonclient.benchmarks.suite
+    python -m pythonclient.benchmarks.suite --recording session.ibrec --only TICK
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from decimal import Decimal
+
+from ibapi import comm
+from ibapi.decoder import Decoder
+from ibapi.framing import FrameBuffer
+from ibapi.message import IN
+from ibapi.recording import Recording
+from ibapi.utils import decode
+
+
+SERVER_VERSION = 176
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+STAGES = ("frame", "read_msg", "read_fields", "decode", "interpret", "process")
+
+
+class NullWrapper:
+    """ swallows every callback so only the decoding is measured """
+    def __getattr__(self, name):
+        def callback(*args):
+            pass
+        setattr(self, name, callback)
+        return callback
+
+
+def historical_data(nBars):
+    vals = [IN.HISTORICAL_DATA, 7, "20250101 09:30:00", "20250102 09:30:00", nBars]
+    for i in range(nBars):
+        vals += ["20250101 %02d:%02d:00" % (9 + i // 60 % 8, i % 60), 187.25, 187.75,
+                 187.0, 187.5, Decimal(12000 + i), Decimal("187.41"), 35]
+    return vals
+
+
+# the field values of a message at SERVER_VERSION, their types are the ones
+# utils.decode() is called with
+CASES = {
+    "TICK_PRICE": [IN.TICK_PRICE, 6, 7, 1, 187.25, Decimal(300), 3],
+    "TICK_SIZE": [IN.TICK_SIZE, 6, 7, 8, Decimal(1234567)],
+    "TICK_GENERIC": [IN.TICK_GENERIC, 6, 7, 49, 0.5],
+    "TICK_STRING": [IN.TICK_STRING, 6, 7, 45, "1700000000"],
+    "TICK_BY_TICK_LAST": [IN.TICK_BY_TICK, 7, 1, 1700000000, 187.25, Decimal(100), 0,
+                          "NASDAQ", ""],
+    "TICK_BY_TICK_BIDASK": [IN.TICK_BY_TICK, 7, 3, 1700000000, 187.2, 187.3,
+                            Decimal(100), Decimal(200), 0],
+    "TICK_BY_TICK_MIDPOINT": [IN.TICK_BY_TICK, 7, 4, 1700000000, 187.25],
+    "MARKET_DEPTH": [IN.MARKET_DEPTH, 1, 7, 0, 1, 1, 187.25, Decimal(300)],
+    "MARKET_DEPTH_L2": [IN.MARKET_DEPTH_L2, 1, 7, 0, "NSDQ", 1, 1, 187.25, Decimal(300), True],
+    "REAL_TIME_BARS": [IN.REAL_TIME_BARS, 3, 7, 1700000000, 187.2, 187.5, 187.1, 187.4,
+                       Decimal(1200), Decimal("187.3"), 35],
+    "ORDER_STATUS": [IN.ORDER_STATUS, 11, "Filled", Decimal(100), Decimal(0), 12.5, 1234,
+                     0, 12.5, 1, "", 0.],
+    "ACCOUNT_SUMMARY": [IN.ACCOUNT_SUMMARY, 1, 7, "U1234567", "NetLiquidation",
+                        "102345.67", "EUR"],
+    "ACCT_VALUE": [IN.ACCT_VALUE, 2, "CashBalance", "12.5", "USD", "U1234567"],
+    "PNL": [IN.PNL, 7, 1234.5, 5678.25, -12.75],
+    "PNL_SINGLE": [IN.PNL_SINGLE, 7, Decimal(100), 1234.5, 5678.25, -12.75, 18725.],
+    "HISTORICAL_DATA": historical_data(100),
+}
+
+
+class Case:
+    def __init__(self, name, msgs, types=None):
+        """msgs - the payloads of the case, replayed in turn
+        types - the decode() type of each field of the single payload"""
+
+        self.name = name
+        self.msgs = msgs
+        self.framed = [comm.make_msg(msg.decode("latin-1")) for msg in msgs]
+        self.fields = [comm.read_fields(msg) for msg in msgs]
+        self.nFields = sum(len(fields) for fields in self.fields) / len(msgs)
+        self.types = types
+
+
+def synthetic_case(name, vals):
+    text = "".join(comm.make_field(val) for val in vals)
+    types = [type(val) for val in vals]
+    return Case(name, [text.encode()], types)
+
+
+def recorded_case(path):
+    recording = Recording(path)
+    msgs = recording.messages()
+    if not msgs:
+        raise ValueError("%s: no messages" % path)
+    case = Case("recorded:" + os.path.basename(path), msgs)
+    case.serverVersion = recording.serverVersion
+    return case
+
+
+def timed(fn, n):
+    """ seconds spent by fn(n) """
+    gc.collect()
+    t0 = time.perf_counter()
+    fn(n)
+    return time.perf_counter() - t0
+
+
+def has_plan(case, decoder):
+    """ whether the decode plans of decoder change the path of a message of case """
+    return any(int(fields[0]) in decoder.msgId2plan for fields in case.fields)
+
+
+def stage_fns(case, serverVersion):
+    """ stage -> fn(n), processing n messages of case """
+    msgs = case.msgs
+    framed = case.framed
+    allFields = case.fields
+    nMsgs = len(msgs)
+    fns = {}
+
+    def frame(n):
+        burst = b"".join(framed)
+        buf = FrameBuffer()
+        done = 0
+        while done < n:
+            buf.write(burst)
+            done += len(buf.extract())
+    fns["frame"] = frame
+
+    def read_msg(n):
+        for i in range(n):
+            comm.read_msg(framed[i % nMsgs])
+    fns["read_msg"] = read_msg
+
+    def read_fields(n):
+        for i in range(n):
+            comm.read_fields(msgs[i % nMsgs])
+    fns["read_fields"] = read_fields
+
+    if case.types is not None:
+        types = case.types
+        fields = allFields[0][:len(types)]
+
+        def decode_fields(n):
+            for _ in range(n):
+                it = iter(fields)
+                for the_type in types:
+                    decode(the_type, it)
+        fns["decode"] = decode_fields
+
+    withPlans = Decoder(NullWrapper(), serverVersion)
+    legacy = Decoder(NullWrapper(), serverVersion)
+    legacy.msgId2plan = {}
+
+    def interpreter(decoder):
+        interpret = decoder.interpret
+
+        def run(n):
+            for i in range(n):
+                interpret(allFields[i % nMsgs])
+        return run
+    fns["interpret"] = interpreter(withPlans)
+    if has_plan(case, withPlans):
+        fns["process"] = interpreter(legacy)
+    return fns
+
+
+def allocations(fn, n):
+    """ (peak traced bytes, blocks still allocated) per call of fn(1) """
+    fn(n)       # warm up the caches
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    blocks = sys.getallocatedblocks()
+    peak = 0
+    for _ in range(n):
+        tracemalloc.reset_peak()
+        fn(1)
+        peak = max(peak, tracemalloc.get_traced_memory()[1] - base)
+    gc.collect()
+    retained = sys.getallocatedblocks() - blocks
+    tracemalloc.stop()
+    return (peak, retained / n)
+
+
+def calibration_loop(n):
+    """ a fixed pure Python workload """
+    total = 0
+    fields = (b"1", b"6", b"7", b"187.25")
+    for i in range(n):
+        total += float(fields[i & 3]) + len(str(i))
+    return total
+
+
+CALIBRATION_N = 50000
+
+
+def measure(fn, n, repeat):
+    """ (best seconds of fn(n), best calibration loops per second), the
+    runs of both interleaved """
+    seconds = []
+    calibration = []
+    for _ in range(repeat):
+        seconds.append(timed(fn, n))
+        calibration.append(CALIBRATION_N / timed(calibration_loop, CALIBRATION_N))
+    return (min(seconds), max(calibration))
+
+
+def environment():
+    """ what the rates depend on besides the code """
+    cpu = platform.processor() or platform.machine()
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("model name"):
+                    cpu = line.split(":", 1)[1].strip()
+                    break
+    except OSError:
+        pass
+    return {"python": "%s %s" % (platform.python_implementation(), platform.python_version()),
+            "cpu": cpu}
+
+
+def stage_n(case, n):
+    return max(1, int(n / max(1., case.nFields / 10)))
+
+
+def run_stage(case, fn, n, repeat):
+    stageN = stage_n(case, n)
+    (seconds, calibration) = measure(fn, stageN, repeat)
+    return {"msgsPerSec": stageN / seconds,
+            "nsPerField": seconds / stageN / case.nFields * 1e9,
+            "calibration": calibration}
+
+
+def run_case(case, n, serverVersion, repeat):
+    results = {}
+    fns = stage_fns(case, serverVersion)
+    for stage in STAGES:
+        fn = fns.get(stage)
+        if fn is None:
+            continue
+        result = run_stage(case, fn, n, repeat)
+        if stage == "interpret":
+            (peak, retained) = allocations(fn, min(stage_n(case, n), 200))
+            result["bytesPerMsg"] = peak
+            result["blocksPerMsg"] = retained
+        results[stage] = result
+    return results
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def ratio(result, base):
+    """ the normalized rate of result against the one of base """
+    return (result["msgsPerSec"] / result["calibration"]) / (
+        base["msgsPerSec"] / base["calibration"])
+
+
+def compare(cases, results, baseline, args):
+    """ prints the stages slower than the baseline by more than the
+    tolerance every time they are measured, returns their number """
+    regressions = 0
+    for case in cases:
+        for (stage, result) in results[case.name].items():
+            base = baseline["results"].get(case.name, {}).get(stage)
+            if base is None:
+                continue
+            ratios = [ratio(result, base)]
+            fn = None
+            while ratios[-1] < 1. - args.tolerance and len(ratios) <= args.confirm:
+                if fn is None:
+                    serverVersion = getattr(case, "serverVersion", SERVER_VERSION)
+                    fn = stage_fns(case, serverVersion)[stage]
+                ratios.append(ratio(run_stage(case, fn, args.n, args.repeat), base))
+            if len(ratios) == 1:
+                continue
+            text = " ".join("%.0f%%" % (r * 100) for r in ratios)
+            if ratios[-1] < 1. - args.tolerance:
+                regressions += 1
+                print("REGRESSION %-24s %-12s %s of the baseline" % (case.name, stage, text))
+            else:
+                print("noise      %-24s %-12s %s of the baseline" % (case.name, stage, text))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--n", type=int, default=50000, help="messages per stage")
+    parser.add_argument("--repeat", type=int, default=5, help="runs per stage, the best counts")
+    parser.add_argument("--recording", action="append", default=[],
+                        help="a recording file to replay as one more case")
+    parser.add_argument("--only", default="", help="only the cases containing this")
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true",
+                        help="store this run as the baseline")
+    parser.add_argument("--tolerance", type=float, default=0.45,
+                        help="slowdown against the baseline reported as a regression")
+    parser.add_argument("--confirm", type=int, default=2,
+                        help="measurements of a slower stage before it is a regression")
+    args = parser.parse_args()
+
+    cases = [synthetic_case(name, vals) for (name, vals) in CASES.items()]
+    cases += [recorded_case(path) for path in args.recording]
+    cases = [case for case in cases if args.only in case.name]
+
+    results = {}
+    print("%-24s %-12s %12s %10s %10s %8s" % (
+        "case", "stage", "msgs/s", "ns/field", "bytes/msg", "blocks"))
+    for case in cases:
+        serverVersion = getattr(case, "serverVersion", SERVER_VERSION)
+        results[case.name] = run_case(case, args.n, serverVersion, args.repeat)
+        for (stage, result) in results[case.name].items():
+            print("%-24s %-12s %12.0f %10.1f %10s %8s" % (
+                case.name, stage, result["msgsPerSec"], result["nsPerField"],
+                "%.0f" % result["bytesPerMsg"] if "bytesPerMsg" in result else "",
+                "%.2f" % result["blocksPerMsg"] if "blocksPerMsg" in result else ""))
+
+    if args.save_baseline:
+        baseline = load_baseline(args.baseline) or {"results": {}}
+        baseline.update(environment())
+        baseline["results"].update(results)
+        with open(args.baseline, "w") as f:
+            json.dump(baseline, f, indent=1, sort_keys=True)
+        print("baseline saved to %s" % args.baseline)
+        return
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None:
+        print("no baseline at %s, see --save-baseline" % args.baseline)
+        return
+    current = environment()
+    for (key, value) in current.items():
+        if baseline.get(key) != value:
+            print("the baseline was taken with %s %s, this run with %s" % (
+                key, baseline.get(key), value))
+    regressions = compare(cases, results, baseline, args)
+    print("%d regressions against the baseline (tolerance %.0f%%)" % (
+        regressions, args.tolerance * 100))
+    if regressions:
+        sys.exit(1)
+
+
+if "__main__" == __name__:
+    main()
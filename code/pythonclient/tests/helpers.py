@@ -0,0 +1,69 @@
+"""
+Helpers shared by the unit tests
+"""
+
+import threading
+
+from ibapi.client import EClient
+from ibapi.contract import Contract
+from ibapi.wrapper import EWrapper
+
+
+def stock(symbol="AAPL", conId=0, exchange="SMART"):
+    contract = Contract()
+    contract.conId = conId
+    contract.symbol = symbol
+    contract.secType = "STK"
+    contract.exchange = exchange
+    contract.currency = "USD"
+    return contract
+
+
+class FakeClock:
+    """ the time source of the classes taking a clock, set self.now """
+    def __init__(self):
+        self.now = 1000.
+
+    def __call__(self):
+        return self.now
+
+
+class RecordingWrapper(EWrapper):
+    """ records the (callback, reqId) of the answers that reach the wrapper,
+    the errors not bound to a request apart """
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+
+    def contractDetails(self, reqId, contractDetails):
+        self.calls.append(("contractDetails", reqId))
+
+    def contractDetailsEnd(self, reqId):
+        self.calls.append(("contractDetailsEnd", reqId))
+
+    def historicalData(self, reqId, bar):
+        self.calls.append(("historicalData", reqId))
+
+    def historicalDataEnd(self, reqId, start, end):
+        self.calls.append(("historicalDataEnd", reqId))
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        if reqId != -1:
+            self.calls.append(("error", reqId))
+
+
+class MockTwsClient:
+    """ TestCase mixin: self.client, connected to a MockTws and read by
+    self.thread """
+    def connect(self, tws, wrapper=None, historicalDataBatch=False):
+        self.wrapper = RecordingWrapper() if wrapper is None else wrapper
+        self.client = EClient(self.wrapper)
+        self.client.setHistoricalDataBatch(historicalDataBatch)
+        self.client.connect("127.0.0.1", tws.port, 0)
+        self.thread = threading.Thread(target=self.client.run)
+        self.thread.start()
+        return self.client
+
+    def disconnect(self):
+        self.client.disconnect()
+        self.thread.join()
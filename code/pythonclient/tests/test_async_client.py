@@ -0,0 +1,231 @@
+"""
+Unit tests for ibapi.async_client
+"""
+
+import asyncio
+import unittest
+
+from ibapi import comm
+from ibapi.async_client import AsyncEClient
+from ibapi.contract import Contract
+from ibapi.framing import FrameBuffer
+from ibapi.message import IN, OUT
+from ibapi.mock_tws import MockTws
+from ibapi.request_futures import RequestError
+from ibapi.wrapper import EWrapper
+
+from helpers import stock
+
+
+SERVER_VERSION = 176
+
+
+def make_msg(*vals):
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))
+
+
+class RecordingWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.ticks = []
+        self.nConnectAck = 0
+        self.nClosed = 0
+
+    def connectAck(self):
+        self.nConnectAck += 1
+
+    def connectionClosed(self):
+        self.nClosed += 1
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        self.ticks.append((reqId, tickType, price))
+
+
+class FakeTws:
+    """ answers the handshake, then sends three ticks for each reqMktData """
+
+    def __init__(self):
+        self.requests = []
+
+    async def start(self):
+        self.server = await asyncio.start_server(self.serve, "127.0.0.1", 0)
+        return self.server.sockets[0].getsockname()[1]
+
+    async def serve(self, reader, writer):
+        prefix = await reader.readexactly(4)
+        assert prefix == b"API\0"
+        size = int.from_bytes(await reader.readexactly(4), "big")
+        await reader.readexactly(size)      # the supported version range
+        writer.write(make_msg(SERVER_VERSION, "20250101 09:30:00 UTC"))
+        buf = FrameBuffer()
+        while True:
+            data = await reader.read(4096)
+            if not data:
+                break
+            buf.write(data)
+            for msg in buf.extract():
+                fields = comm.read_fields(msg)
+                self.requests.append(int(fields[0]))
+                if int(fields[0]) == OUT.START_API:
+                    writer.write(make_msg(IN.NEXT_VALID_ID, 1, 42))
+                elif int(fields[0]) == OUT.REQ_MKT_DATA:
+                    reqId = int(fields[2])
+                    for i in range(3):
+                        writer.write(make_msg(IN.TICK_PRICE, 6, reqId, 1, "187.%d" % i, 300, 3))
+                    await writer.drain()
+        writer.close()
+
+    def close(self):
+        self.server.close()
+
+
+class AsyncEClientTestCase(unittest.TestCase):
+    def run_async(self, coro):
+        return asyncio.run(asyncio.wait_for(coro, 10))
+
+    def test_connect_and_stream(self):
+        async def scenario():
+            tws = FakeTws()
+            port = await tws.start()
+            wrapper = RecordingWrapper()
+            client = AsyncEClient(wrapper)
+
+            nextOrderId = await client.connect("127.0.0.1", port, 0)
+            self.assertEqual(nextOrderId, 42)
+            self.assertTrue(client.isConnected())
+            self.assertEqual(client.serverVersion(), SERVER_VERSION)
+            self.assertEqual(wrapper.nConnectAck, 1)
+
+            contract = Contract()
+            contract.symbol = "AAPL"
+            contract.secType = "STK"
+            contract.exchange = "SMART"
+            contract.currency = "USD"
+            client.reqMktData(7, contract, "", False, False, [])
+            client.reqMktData(8, contract, "", False, False, [])
+            await client.drain()
+            while len(wrapper.ticks) < 6:
+                await asyncio.sleep(0.01)
+
+            client.disconnect()
+            await client.waitClosed()
+            tws.close()
+            return (wrapper, tws)
+
+        (wrapper, tws) = self.run_async(scenario())
+        self.assertEqual(wrapper.ticks[:3], [(7, 1, 187.0), (7, 1, 187.1), (7, 1, 187.2)])
+        self.assertEqual([tick[0] for tick in wrapper.ticks[3:]], [8, 8, 8])
+        self.assertEqual(tws.requests, [OUT.START_API, OUT.REQ_MKT_DATA, OUT.REQ_MKT_DATA])
+        self.assertEqual(wrapper.nClosed, 1)
+
+
+    def test_peer_close(self):
+        async def scenario():
+            tws = FakeTws()
+            port = await tws.start()
+            wrapper = RecordingWrapper()
+            client = AsyncEClient(wrapper)
+            await client.connect("127.0.0.1", port, 0)
+
+            # closing the write side makes the fake TWS close its end
+            client.conn.transport.write_eof()
+            await client.waitClosed()
+            tws.close()
+            return (client, wrapper)
+
+        (client, wrapper) = self.run_async(scenario())
+        self.assertFalse(client.isConnected())
+        self.assertEqual(wrapper.nClosed, 1)
+
+
+    def test_connect_refused(self):
+        async def scenario():
+            server = await asyncio.start_server(lambda r, w: None, "127.0.0.1", 0)
+            port = server.sockets[0].getsockname()[1]
+            server.close()
+            await server.wait_closed()
+
+            wrapper = RecordingWrapper()
+            client = AsyncEClient(wrapper)
+            with self.assertRaises(ConnectionError):
+                await client.connect("127.0.0.1", port, 0, timeout=2)
+            return client
+
+        client = self.run_async(scenario())
+        self.assertFalse(client.isConnected())
+
+
+class RequestFuturesTestCase(unittest.TestCase):
+    def run_scenario(self, scenario, **kwargs):
+        async def run():
+            with MockTws(**kwargs) as tws:
+                self.wrapper = RecordingWrapper()
+                client = AsyncEClient(self.wrapper)
+                await client.connect("127.0.0.1", tws.port, 0, timeout=5)
+                try:
+                    return (await scenario(client), tws, client)
+                finally:
+                    client.disconnect()
+                    await client.waitClosed()
+
+        return asyncio.run(asyncio.wait_for(run(), 10))
+
+    def test_concurrent_requests(self):
+        async def scenario(client):
+            contract = stock("AAPL")
+            return await asyncio.gather(
+                client.reqContractDetailsFuture(1, contract),
+                client.reqHistoricalDataFuture(2, contract, "", "1 D", "1 min", "TRADES", 1, 1),
+                client.reqPositionsFuture(),
+                client.reqAccountSummaryFuture(3, "All", "NetLiquidation,BuyingPower"))
+
+        ((details, bars, positions, summary), tws, client) = self.run_scenario(
+            scenario, historicalBars=30, nPositions=4)
+        self.assertEqual([d.contract.symbol for d in details], ["AAPL"])
+        self.assertEqual(len(bars), 30)
+        self.assertEqual([position[1].symbol for position in positions],
+                         ["SYM0", "SYM1", "SYM2", "SYM3"])
+        self.assertEqual([row[1] for row in summary], ["NetLiquidation", "BuyingPower"])
+        self.assertEqual(client.reqHandlers, {})
+        self.assertEqual(tws.requests[OUT.CANCEL_ACCOUNT_SUMMARY], 1)
+        self.assertEqual(tws.requests[OUT.CANCEL_POSITIONS], 1)
+
+    def test_error(self):
+        async def scenario(client):
+            with self.assertRaises(RequestError) as cm:
+                await client.reqContractDetailsFuture(1, stock("BADSYM"))
+            return cm.exception
+
+        (exc, _, client) = self.run_scenario(scenario)
+        self.assertEqual((exc.reqId, exc.errorCode), (1, 200))
+        self.assertEqual(client.reqHandlers, {})
+
+    def test_timeout_cancels(self):
+        async def scenario(client):
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(client.reqHistoricalDataFuture(
+                    5, stock("AAPL"), "20231115-00:00:00", "1 D", "1 hour", "TRADES", 1, 2), 0.1)
+            await client.drain()
+            # the answer coming after the cancel goes nowhere
+            await asyncio.sleep(0.5)
+            return client.reqHandlers.copy()
+
+        (handlers, tws, _) = self.run_scenario(scenario, historicalRange=True,
+                                               historicalDelay=0.3)
+        self.assertEqual(handlers, {})
+        self.assertEqual(tws.requests[OUT.CANCEL_HISTORICAL_DATA], 1)
+
+    def test_connection_lost(self):
+        async def scenario(client):
+            future = client.reqContractDetailsFuture(1, stock("AAPL"))
+            client.disconnect()
+            with self.assertRaises(ConnectionError):
+                await future
+            with self.assertRaises(ConnectionError):
+                await client.reqPositionsFuture()
+
+        self.run_scenario(scenario, contractDetailsDelay=1.)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,241 @@
+"""
+Unit tests for ibapi.backfill
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from ibapi.columnar import np
+from ibapi.message import OUT
+from ibapi.mock_tws import MockTws
+
+from helpers import FakeClock, MockTwsClient, stock
+
+
+T0 = 1699920000         # 2023-11-14 00:00 UTC
+DAY = 86400
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class RangesTestCase(unittest.TestCase):
+    def setUp(self):
+        from ibapi import backfill
+        self.backfill = backfill
+
+    def test_chunks(self):
+        bf = self.backfill
+        self.assertEqual(bf.duration_str(DAY), "1 D")
+        self.assertEqual(bf.duration_str(7 * DAY), "1 W")
+        self.assertEqual(bf.duration_str(1800), "1800 S")
+        # not the calendar "1 M"/"1 Y", longer than the chunk for some end dates
+        self.assertEqual(bf.request_duration(30 * DAY, "1 hour"), "30 D")
+        self.assertEqual(bf.request_duration(400 * DAY, "1 day"), "365 D")
+        self.assertEqual(bf.end_date_time(T0 + 3661), "20231114-01:01:01")
+        self.assertEqual(bf.chunk_ranges(T0, T0 + 2 * DAY + 60, "1 min"),
+                         [(T0 + DAY + 60, T0 + 2 * DAY + 60), (T0 + 60, T0 + DAY + 60),
+                          (T0, T0 + 60)])
+
+    def test_ranges(self):
+        bf = self.backfill
+        covered = bf.merge_ranges([(50, 60), (0, 10), (10, 20), (15, 30)])
+        self.assertEqual(covered, [(0, 30), (50, 60)])
+        self.assertEqual(bf.subtract_ranges(-5, 100, covered), [(-5, 0), (30, 50), (60, 100)])
+        self.assertEqual(bf.subtract_ranges(5, 25, covered), [])
+        self.assertEqual(bf.subtract_ranges(25, 55, covered), [(30, 50)])
+
+    def test_concat(self):
+        bf = self.backfill
+
+        def bars(dates, closes):
+            result = {name: np.zeros(len(dates), dtype=column.dtype)
+                      for (name, column) in bf.empty_bars().items()}
+            result["date"][:] = dates
+            result["close"][:] = closes
+            return result
+
+        merged = bf.concat_bars([bars([120, 180], [3., 4.]), bars([60, 120], [1., 2.]),
+                                 bf.empty_bars()])
+        self.assertEqual(merged["date"].tolist(), [60, 120, 180])
+        self.assertEqual(merged["close"].tolist(), [1., 2., 4.])
+        clipped = bf.clip_bars(merged, 100, 180)
+        self.assertEqual(clipped["date"].tolist(), [120])
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class HistoricalPacerTestCase(unittest.TestCase):
+    def setUp(self):
+        from ibapi.backfill import HistoricalPacer
+        self.clock = FakeClock()
+        self.pacer = HistoricalPacer(slack=0., clock=self.clock)
+
+    def test_max_requests(self):
+        for i in range(60):
+            self.assertEqual(self.pacer.delay(("C%d" % i, ), ("R%d" % i, )), 0.)
+            self.pacer.record(("C%d" % i, ), ("R%d" % i, ))
+            self.clock.now += 1.
+        self.assertEqual(self.pacer.delay(), 540.)
+        self.clock.now += 540.
+        self.assertEqual(self.pacer.delay(), 0.)
+
+    def test_same_contract_and_identical(self):
+        for i in range(5):
+            self.pacer.record(("AAPL", ), ("AAPL", i))
+        self.assertEqual(self.pacer.delay(("AAPL", ), ("AAPL", 5)), 2.)
+        self.assertEqual(self.pacer.delay(("MSFT", ), ("MSFT", 0)), 0.)
+        self.clock.now += 2.
+        self.assertEqual(self.pacer.delay(("AAPL", ), ("AAPL", 5)), 0.)
+        self.assertEqual(self.pacer.delay(("AAPL", ), ("AAPL", 0)), 13.)
+        self.pacer.block(30.)
+        self.assertEqual(self.pacer.delay(), 30.)
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class BackfillTestCase(MockTwsClient, unittest.TestCase):
+    def setUp(self):
+        from ibapi import backfill
+        self.bf = backfill
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def backfill(self, **kwargs):
+        pacer = self.bf.HistoricalPacer(**kwargs.pop("pacing", {"maxRequests": 1000}))
+        return self.bf.Backfill(self.client, self.dir, pacer=pacer, **kwargs)
+
+    def check_bars(self, bars, start, end):
+        self.assertEqual(bars["date"].tolist(), list(range(start, end, 60)))
+        self.assertFalse(np.isnan(bars["volume"]).any())
+
+    def run_jobs(self, batch):
+        with MockTws(historicalRange=True, historicalDelay=0.01) as tws:
+            self.connect(tws, historicalDataBatch=batch)
+            try:
+                backfill = self.backfill()
+                jobs = [self.bf.BackfillJob(stock(symbol, conId), "1 min", "TRADES",
+                                            T0, T0 + 3 * DAY)
+                        for (symbol, conId) in (("AAPL", 265598), ("MSFT", 272093))]
+                self.assertEqual([backfill.add(job) for job in jobs], [3, 3])
+                self.assertTrue(backfill.run(timeout=10))
+            finally:
+                self.disconnect()
+        self.assertEqual(tws.requests[OUT.REQ_HISTORICAL_DATA], 6)
+        self.assertEqual(self.wrapper.calls, [])
+        self.assertEqual(self.client.reqHandlers, {})
+        for job in jobs:
+            self.check_bars(backfill.load(job), T0, T0 + 3 * DAY)
+            self.assertEqual(backfill.progress(job), (3 * DAY, 3 * DAY, 0))
+
+    def test_backfill(self):
+        self.run_jobs(batch=False)
+
+    def test_backfill_batch(self):
+        self.run_jobs(batch=True)
+
+    def test_resume(self):
+        contract = stock("AAPL", 265598)
+        with MockTws(historicalRange=True) as tws:
+            self.connect(tws)
+            try:
+                backfill = self.backfill()
+                job = self.bf.BackfillJob(contract, "1 hour", "MIDPOINT", T0, T0 + 45 * DAY)
+                self.assertEqual(backfill.add(job), 2)
+                self.assertTrue(backfill.run(timeout=10))
+
+                # a new process, with a longer range
+                backfill = self.backfill()
+                longer = self.bf.BackfillJob(contract, "1 hour", "MIDPOINT", T0 - 10 * DAY,
+                                             T0 + 50 * DAY)
+                self.assertEqual(backfill.add(longer), 2)
+                self.assertTrue(backfill.run(timeout=10))
+            finally:
+                self.disconnect()
+        self.assertEqual(tws.requests[OUT.REQ_HISTORICAL_DATA], 4)
+        bars = backfill.load(longer)
+        self.assertEqual(bars["date"].tolist(), list(range(T0 - 10 * DAY, T0 + 50 * DAY, 3600)))
+        with open(os.path.join(self.dir, longer.name, "checkpoint.json")) as f:
+            self.assertEqual(json.load(f)["done"], [[T0 - 10 * DAY, T0 + 50 * DAY]])
+
+    def test_pacing(self):
+        jobs = [self.bf.BackfillJob(stock("SYM%d" % i, 1000 + i), "30 secs", "TRADES",
+                                    T0, T0 + DAY) for i in range(2)]
+        # TWS allows 4 requests in any 0.5 s, the pacer knows it
+        with MockTws(historicalRange=True, historicalPacing=(4, 0.5)) as tws:
+            self.connect(tws)
+            try:
+                backfill = self.backfill(pacing={"maxRequests": 4, "seconds": 0.5,
+                                                 "slack": 0.05})
+                for job in jobs:
+                    backfill.add(job)
+                self.assertTrue(backfill.run(timeout=10))
+            finally:
+                self.disconnect()
+        self.assertEqual(tws.pacingViolations, 0)
+        self.assertEqual(tws.requests[OUT.REQ_HISTORICAL_DATA], 6)
+
+        # it does not: the violations are sent again
+        shutil.rmtree(self.dir)
+        with MockTws(historicalRange=True, historicalPacing=(4, 0.5)) as tws:
+            self.connect(tws)
+            try:
+                backfill = self.backfill(pacing={"maxRequests": 1000, "identicalSeconds": 0.1},
+                                         retryDelay=0.5)
+                for job in jobs:
+                    backfill.add(job)
+                self.assertTrue(backfill.run(timeout=10))
+            finally:
+                self.disconnect()
+        self.assertGreater(tws.pacingViolations, 0)
+        for job in jobs:
+            self.assertEqual(backfill.progress(job), (DAY, DAY, 0))
+            self.assertEqual(len(backfill.load(job)["date"]), DAY // 30)
+
+    def test_resume_after_now(self):
+        contract = stock("AAPL", 265598)
+        clock = FakeClock()
+        clock.now = T0 + DAY + 90
+        job = self.bf.BackfillJob(contract, "1 min", "TRADES", T0, T0 + 2 * DAY)
+        with MockTws(historicalRange=True) as tws:
+            self.connect(tws)
+            try:
+                backfill = self.backfill(clock=clock)
+                self.assertEqual(backfill.add(job), 2)
+                self.assertTrue(backfill.run(timeout=10))
+                # the bar still forming and the future are not covered
+                self.check_bars(backfill.load(job), T0, T0 + DAY + 60)
+                self.assertEqual(backfill.progress(job), (DAY + 60, 2 * DAY, 0))
+
+                # a day later, a new process fetches the rest
+                clock.now = T0 + 2 * DAY + 30
+                backfill = self.backfill(clock=clock)
+                self.assertEqual(backfill.add(job), 1)
+                self.assertTrue(backfill.run(timeout=10))
+            finally:
+                self.disconnect()
+        self.assertEqual(tws.requests[OUT.REQ_HISTORICAL_DATA], 3)
+        self.check_bars(backfill.load(job), T0, T0 + 2 * DAY)
+        with open(os.path.join(self.dir, job.name, "checkpoint.json")) as f:
+            self.assertEqual(json.load(f)["done"], [[T0, T0 + 2 * DAY]])
+
+    def test_errors(self):
+        with MockTws(historicalRange=True) as tws:
+            self.connect(tws)
+            try:
+                backfill = self.backfill()
+                job = self.bf.BackfillJob(stock("BADSYM", 0), "1 day", "TRADES",
+                                          T0 - 400 * DAY, T0)
+                self.assertEqual(backfill.add(job), 2)
+                self.assertTrue(backfill.run(timeout=10))
+                self.assertEqual(backfill.progress(job), (0, 400 * DAY, 2))
+                # the failed chunks are fetched again
+                self.assertEqual(self.backfill().add(job), 2)
+            finally:
+                self.disconnect()
+        self.assertEqual(len(backfill.load(job)["date"]), 0)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,83 @@
+"""
+Unit tests for ibapi.bar_aggregator
+"""
+
+import math
+import unittest
+from decimal import Decimal
+
+from ibapi.columnar import np
+from ibapi.common import SIZE_SCALE, UNSET_DOUBLE, UNSET_LONG, SizeModeEnum
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TickBarAggregatorTestCase(unittest.TestCase):
+    def setUp(self):
+        from ibapi.bar_aggregator import TickBarAggregator
+        self.completed = []
+        self.agg = TickBarAggregator(intervals=(1, 60), capacity=16,
+                                     onBar=lambda *bar: self.completed.append(bar))
+
+    def test_trades(self):
+        agg = self.agg
+        t0 = 1700000040
+        agg.tickByTickAllLast(1, 1, t0, 100., Decimal(10), None, "NASDAQ", "")
+        agg.tickByTickAllLast(1, 1, t0, 101., Decimal(30), None, "NASDAQ", "")
+        agg.tickByTickAllLast(1, 1, t0, 99.5, Decimal(10), None, "NASDAQ", "")
+        self.assertEqual(agg.current(1, 1), (t0, 100., 101., 99.5, 99.5, 50., 100.5, 3))
+        self.assertEqual(self.completed, [])
+
+        agg.tickByTickAllLast(1, 1, t0 + 2, 102., Decimal(50), None, "NASDAQ", "")
+        self.assertEqual(self.completed, [(1, 1, t0, 100., 101., 99.5, 99.5, 50., 100.5, 3)])
+        agg.tickByTickAllLast(1, 1, t0 + 20, 98., Decimal(100), None, "NASDAQ", "")
+        agg.tickByTickAllLast(1, 1, t0 + 60, 97., Decimal(1), None, "NASDAQ", "")
+
+        bars = agg.bars(1, 1)
+        self.assertEqual(list(bars["time"]), [t0, t0 + 2, t0 + 20])
+        self.assertEqual(list(bars["close"]), [99.5, 102., 98.])
+        minute = agg.bars(1, 60)
+        self.assertEqual(list(minute["time"]), [t0])
+        self.assertEqual(minute["high"][0], 102.)
+        self.assertEqual(minute["low"][0], 98.)
+        self.assertEqual(minute["volume"][0], 200.)
+        self.assertEqual(minute["count"][0], 5)
+
+        agg.flush(1)
+        self.assertEqual(len(agg.bars(1, 60)["time"]), 2)
+        self.assertIsNone(agg.current(1, 60))
+
+    def test_quotes(self):
+        self.agg.tickByTickBidAsk(2, 1700000000, 100., 100.5, Decimal(1), Decimal(2), None)
+        self.agg.tickByTickMidPoint(2, 1700000000, 100.75)
+        bar = self.agg.current(2, 1)
+        self.assertEqual(bar[1:5], (100.25, 100.75, 100.25, 100.75))
+        self.assertEqual(bar[5], 0.)
+        self.assertTrue(math.isnan(bar[6]))
+        self.assertEqual(bar[7], 2)
+
+    def check_size_mode(self, sizeMode, size, unset):
+        from ibapi.bar_aggregator import TickBarAggregator
+        agg = TickBarAggregator(intervals=(60, ), sizeMode=sizeMode)
+        t0 = 1700000040
+        agg.tickByTickAllLast(1, 1, t0, 100., size(10), None, "NASDAQ", "")
+        agg.tickByTickAllLast(1, 1, t0 + 1, 101., unset, None, "NASDAQ", "")
+        agg.tickByTickAllLast(1, 1, t0 + 2, 102., size(30), None, "NASDAQ", "")
+        self.assertEqual(agg.current(1, 60), (t0, 100., 102., 100., 102., 40., 101.5, 3))
+
+    def test_float_sizes(self):
+        self.check_size_mode(SizeModeEnum.FLOAT, float, UNSET_DOUBLE)
+
+    def test_scaled_int_sizes(self):
+        self.check_size_mode(SizeModeEnum.SCALED_INT, lambda qty: qty * SIZE_SCALE, UNSET_LONG)
+
+    def test_bounded(self):
+        for t in range(100):
+            self.agg.addTick(1, 1700000000 + t, 100., 1.)
+        self.assertEqual(len(self.agg.bars(1, 1)["time"]), 16)
+        self.assertEqual(len(self.agg.bars(1, 1, 4)["time"]), 4)
+        with self.assertRaises(ValueError):
+            self.agg.bars(1, 5)
+
+
+if "__main__" == __name__:
+    unittest.main()
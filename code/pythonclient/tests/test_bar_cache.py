@@ -0,0 +1,118 @@
+"""
+Unit tests for ibapi.bar_cache
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from ibapi.columnar import np
+from ibapi.message import OUT
+from ibapi.mock_tws import MockTws
+
+from helpers import MockTwsClient, stock
+
+
+T0 = 1699920000         # 2023-11-14 00:00 UTC
+DAY = 86400
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class BarCacheTestCase(MockTwsClient, unittest.TestCase):
+    def setUp(self):
+        from ibapi import backfill, bar_cache
+        self.bf = backfill
+        self.bc = bar_cache
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def cache(self, **kwargs):
+        pacer = self.bf.HistoricalPacer(maxRequests=1000)
+        return self.bc.BarCache(self.client, self.dir, pacer=pacer, **kwargs)
+
+    def test_gaps(self):
+        contract = stock("AAPL", 265598)
+        with MockTws(historicalRange=True) as tws:
+            self.connect(tws)
+            try:
+                cache = self.cache()
+                first = cache.get(contract, "5 mins", "TRADES", T0, T0 + DAY, timeout=10)
+                self.assertEqual(tws.requests[OUT.REQ_HISTORICAL_DATA], 1)
+                self.assertEqual(cache.gaps(contract, "5 mins", "TRADES", T0 - DAY, T0 + 2 * DAY),
+                                 [(T0 - DAY, T0), (T0 + DAY, T0 + 2 * DAY)])
+                # only the new day is requested
+                second = cache.get(contract, "5 mins", "TRADES", T0 + DAY // 2, T0 + 2 * DAY,
+                                   timeout=10)
+                self.assertEqual(tws.requests[OUT.REQ_HISTORICAL_DATA], 2)
+                inside = cache.get(contract, "5 mins", "TRADES", T0 + 3600, T0 + 7200, timeout=10)
+                # another process, from the files
+                again = self.cache().get(contract, "5 mins", "TRADES", T0, T0 + 2 * DAY,
+                                         timeout=10)
+                # another series
+                midpoint = self.cache().get(contract, "5 mins", "MIDPOINT", T0, T0 + DAY,
+                                            timeout=10)
+            finally:
+                self.disconnect()
+        self.assertEqual(tws.requests[OUT.REQ_HISTORICAL_DATA], 3)
+        self.assertEqual(self.wrapper.calls, [])
+        self.assertEqual(self.client.reqHandlers, {})
+        self.assertEqual(first["date"].tolist(), list(range(T0, T0 + DAY, 300)))
+        self.assertEqual(second["date"].tolist(), list(range(T0 + DAY // 2, T0 + 2 * DAY, 300)))
+        self.assertEqual(inside["date"].tolist(), list(range(T0 + 3600, T0 + 7200, 300)))
+        self.assertEqual(again["date"].tolist(), list(range(T0, T0 + 2 * DAY, 300)))
+        np.testing.assert_array_equal(again["close"][:len(first["close"])], first["close"])
+        self.assertEqual(len(midpoint["date"]), DAY // 300)
+        self.assertEqual(len(os.listdir(self.dir)), 2)
+
+    def test_current_bar(self):
+        contract = stock("AAPL", 265598)
+        now = T0 + DAY + 90
+        with MockTws(historicalRange=True) as tws:
+            self.connect(tws)
+            try:
+                cache = self.cache(clock=lambda: now)
+                bars = cache.get(contract, "1 min", "TRADES", T0 + DAY - 3600, T0 + DAY + 3600,
+                                 timeout=10)
+                gaps = cache.gaps(contract, "1 min", "TRADES", T0, T0 + DAY + 3600)
+            finally:
+                self.disconnect()
+        # answered, the bars from the current one on are not cached
+        self.assertEqual(bars["date"].tolist(), list(range(T0 + DAY - 3600, T0 + DAY + 3600, 60)))
+        self.assertEqual(gaps, [(T0, T0 + DAY - 3600), (T0 + DAY + 60, T0 + DAY + 3600)])
+
+    def test_errors(self):
+        with MockTws(historicalRange=True) as tws:
+            self.connect(tws)
+            try:
+                cache = self.cache()
+                bars = cache.get(stock("BADSYM", 1), "1 hour", "TRADES", T0, T0 + DAY, timeout=10)
+                self.assertEqual(len(bars["date"]), 0)
+                self.assertEqual([error[2] for error in cache.errors], [200])
+                # not cached, requested again
+                self.assertEqual(cache.gaps(stock("BADSYM", 1), "1 hour", "TRADES", T0, T0 + DAY),
+                                 [(T0, T0 + DAY)])
+            finally:
+                self.disconnect()
+        with self.assertRaises(ValueError):
+            cache.get(stock("AAPL", 0), "1 hour", "TRADES", T0, T0 + DAY)
+
+    def test_timeout(self):
+        with MockTws(historicalRange=True, historicalDelay=1.) as tws:
+            self.connect(tws)
+            try:
+                cache = self.cache()
+                bars = cache.get(stock("AAPL", 265598), "1 hour", "TRADES", T0 - 60 * DAY, T0,
+                                 timeout=0.2)
+            finally:
+                self.disconnect()
+        self.assertEqual(len(bars["date"]), 0)
+        self.assertEqual([error[2] for error in cache.errors], [-1, -1])
+        self.assertEqual(cache.pending(), 0)
+        self.assertEqual(self.client.reqHandlers, {})
+
+
+if "__main__" == __name__:
+    unittest.main()
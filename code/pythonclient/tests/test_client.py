@@ -0,0 +1,114 @@
+"""
+Unit tests for the dispatch modes of ibapi.client.EClient
+"""
+
+import socket
+import threading
+import unittest
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.common import DispatchModeEnum
+from ibapi.message import IN, OUT
+from ibapi.wrapper import EWrapper
+
+
+SERVER_VERSION = 176
+
+
+def make_msg(*vals):
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))
+
+
+class TickWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.sizes = []
+        self.errors = []
+
+    def tickSize(self, reqId, tickType, size):
+        self.sizes.append(int(size))
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        self.errors.append(errorCode)
+
+
+class FakeTws(threading.Thread):
+    """ does the handshake, waits for startApi, sends msgs and hangs up """
+
+    def __init__(self, msgs):
+        super().__init__()
+        self.msgs = msgs
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.received = None
+
+    def run(self):
+        (peer, _) = self.server.accept()
+        self.server.close()
+        peer.recv(4096)                     # "API\0" and the version range
+        peer.sendall(make_msg(SERVER_VERSION, "20250101 09:30:00 UTC"))
+        self.received = peer.recv(4096)     # startApi
+        peer.sendall(b"".join(self.msgs))
+        peer.close()
+
+
+class DispatchModeTestCase(unittest.TestCase):
+    def run_mode(self, dispatchMode, msgs, writeQueue=False):
+        tws = FakeTws(msgs)
+        tws.start()
+        wrapper = TickWrapper()
+        client = EClient(wrapper)
+        client.setDispatchMode(dispatchMode)
+        client.setWriteQueue(writeQueue)
+        client.connect("127.0.0.1", tws.port, 0)
+        self.assertTrue(client.isConnected())
+        client.run()
+        tws.join()
+        self.assertFalse(client.isConnected())
+        return wrapper
+
+    def test_modes(self):
+        msgs = [make_msg(IN.TICK_SIZE, 6, 7, 8, i) for i in range(5000)]
+        for dispatchMode in (DispatchModeEnum.QUEUE, DispatchModeEnum.BATCH,
+                             DispatchModeEnum.INLINE):
+            wrapper = self.run_mode(dispatchMode, msgs)
+            self.assertEqual(wrapper.sizes, list(range(5000)),
+                             DispatchModeEnum.to_str(dispatchMode))
+
+    def test_bad_message_in_batch(self):
+        msgs = [make_msg(IN.TICK_SIZE, 6, 7, 8, 1),
+                make_msg(IN.TICK_SIZE, 6, 7),         # too short
+                make_msg(IN.TICK_SIZE, 6, 7, 8, 3)]
+        for dispatchMode in (DispatchModeEnum.BATCH, DispatchModeEnum.INLINE):
+            wrapper = self.run_mode(dispatchMode, msgs)
+            self.assertEqual(wrapper.sizes, [1, 3])
+            self.assertEqual(len(wrapper.errors), 1)
+
+    def test_write_queue(self):
+        msgs = [make_msg(IN.TICK_SIZE, 6, 7, 8, i) for i in range(5000)]
+        wrapper = self.run_mode(DispatchModeEnum.QUEUE, msgs, writeQueue=True)
+        self.assertEqual(wrapper.sizes, list(range(5000)))
+
+    def test_start_api_first(self):
+        # sent on the connection before the EWriter starts, no request overtakes it
+        tws = FakeTws([])
+        tws.start()
+        client = EClient(TickWrapper())
+        client.setWriteQueue(True, msgRate=None)
+        client.connect("127.0.0.1", tws.port, 0)
+        client.reqGlobalCancel()
+        client.run()
+        tws.join()
+        (_, msg, _) = comm.read_msg(tws.received)
+        self.assertEqual(int(comm.read_fields(msg)[0]), OUT.START_API)
+
+    def test_unknown_mode(self):
+        client = EClient(TickWrapper())
+        self.assertRaises(ValueError, client.setDispatchMode, 3)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,155 @@
+"""
+Unit tests for ibapi.columnar
+"""
+
+import math
+import unittest
+
+from ibapi import comm
+from ibapi.columnar import np, parse_bar_dates
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+from ibapi.utils import BadMessage
+
+
+class RecordingWrapper:
+    def __init__(self):
+        self.bars = []
+        self.batches = []
+        self.ends = []
+
+    def historicalData(self, reqId, bar):
+        self.bars.append(bar)
+
+    def historicalDataBatch(self, reqId, bars):
+        self.batches.append((reqId, bars))
+
+    def historicalDataEnd(self, reqId, start, end):
+        self.ends.append((reqId, start, end))
+
+    def historicalTicks(self, reqId, ticks, done):
+        self.ticks = (reqId, ticks, done)
+
+    historicalTicksBidAsk = historicalTicks
+    historicalTicksLast = historicalTicks
+
+
+def make_fields(*vals):
+    return comm.read_fields("".join(comm.make_field(val) for val in vals))
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class ColumnarTestCase(unittest.TestCase):
+    def test_parse_bar_dates(self):
+        self.assertEqual(list(parse_bar_dates([b"20250101", b"20241231"])),
+                         [1735689600, 1735603200])
+        self.assertEqual(list(parse_bar_dates([b"1700000000", b"1700000060"])),
+                         [1700000000, 1700000060])
+        self.assertEqual(list(parse_bar_dates([b"20250310 09:30:00", b"20240229 23:59:59"])),
+                         [1741599000, 1709251199])
+        # the US switched to DST on 2025-03-09
+        self.assertEqual(list(parse_bar_dates([b"20250307 09:30:00 US/Eastern",
+                                               b"20250310 09:30:00 US/Eastern",
+                                               b"20250310 09:30:00 Europe/Amsterdam"])),
+                         [1741357800, 1741613400, 1741595400])
+        self.assertEqual(len(parse_bar_dates([])), 0)
+
+    def test_parse_bar_date_layouts(self):
+        # formatDate=1 of the older versions, and the UTC form of the requests
+        self.assertEqual(list(parse_bar_dates([b"20250310  09:30:00", b"20240229  23:59:59"])),
+                         [1741599000, 1709251199])
+        self.assertEqual(list(parse_bar_dates([b"20250310-09:30:00"])), [1741599000])
+        self.assertEqual(list(parse_bar_dates([b"20250310  09:30:00 US/Eastern"])),
+                         [1741613400])
+        for dates in ([b"20250310 09:30"], [b"20250310T09:30:00"], [b"20250310 09:30:00",
+                      b"2025031"], [b"20251310"], [b"1700000000", b"17000000x0"],
+                      [b"20250310 09:30:00US/Eastern"], [b"20250310 09:30:00 Nowhere/Else"]):
+            with self.assertRaises(BadMessage, msg=dates):
+                parse_bar_dates(dates)
+
+
+    def test_batch_matches_bars(self):
+        vals = [IN.HISTORICAL_DATA, 7, "20250101", "20250103", 2,
+                "20250101", "1.5", "2.5", "1.0", "2.0", 1000, "1.75", 12,
+                "20250102", "2.0", "3.0", "", "2.5", "", "9223372036854775807", 0]
+        fields = make_fields(*vals)
+
+        perBar = Decoder(RecordingWrapper(), 176)
+        perBar.interpret(fields)
+        batch = Decoder(RecordingWrapper(), 176, historicalDataBatch=True)
+        batch.interpret(fields)
+
+        self.assertEqual(batch.wrapper.bars, [])
+        self.assertEqual(batch.wrapper.ends, perBar.wrapper.ends)
+        ((reqId, bars), ) = batch.wrapper.batches
+        self.assertEqual(reqId, 7)
+        self.assertEqual(list(bars["date"]), [1735689600, 1735776000])
+        for (i, bar) in enumerate(perBar.wrapper.bars):
+            for name in ("open", "high", "low", "close"):
+                self.assertEqual(bars[name][i], getattr(bar, name))
+            self.assertEqual(bars["barCount"][i], bar.barCount)
+        self.assertEqual(bars["volume"][0], 1000.)
+        self.assertTrue(math.isnan(bars["volume"][1]))
+        self.assertTrue(math.isnan(bars["wap"][1]))
+        self.assertEqual(bars["open"].dtype, np.float64)
+        self.assertEqual(bars["date"].dtype, np.int64)
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class HistoricalTicksArraysTestCase(unittest.TestCase):
+    def decode_both(self, fields):
+        objects = Decoder(RecordingWrapper(), 176)
+        objects.interpret(fields)
+        arrays = Decoder(RecordingWrapper(), 176, historicalTicksArrays=True)
+        arrays.interpret(fields)
+
+        (reqId, ticks, done) = objects.wrapper.ticks
+        (reqId2, arr, done2) = arrays.wrapper.ticks
+        self.assertEqual((reqId, done), (reqId2, done2))
+        self.assertEqual(len(ticks), len(arr))
+        self.assertIsInstance(arr, np.ndarray)
+        return ticks, arr
+
+
+    def test_midpoint(self):
+        (ticks, arr) = self.decode_both(make_fields(IN.HISTORICAL_TICKS, 7, 2,
+            1700000000, 0, "1.5", 10, 1700000001, 0, "1.25", "", 1))
+        for (tick, row) in zip(ticks, arr):
+            self.assertEqual((tick.time, tick.price), (row["time"], row["price"]))
+        self.assertEqual(arr["size"][0], 10.)
+        self.assertTrue(math.isnan(arr["size"][1]))
+
+
+    def test_bid_ask(self):
+        (ticks, arr) = self.decode_both(make_fields(IN.HISTORICAL_TICKS_BID_ASK, 7, 2,
+            1700000000, 1, "1.5", "1.6", 10, 20, 1700000001, 2, "1.4", "1.7", 30, 40, 0))
+        for (tick, row) in zip(ticks, arr):
+            self.assertEqual((tick.time, tick.priceBid, tick.priceAsk, float(tick.sizeBid),
+                              float(tick.sizeAsk), tick.tickAttribBidAsk.askPastHigh,
+                              tick.tickAttribBidAsk.bidPastLow),
+                             tuple(row[name] for name in ("time", "priceBid", "priceAsk",
+                                   "sizeBid", "sizeAsk", "askPastHigh", "bidPastLow")))
+
+
+    def test_last(self):
+        (ticks, arr) = self.decode_both(make_fields(IN.HISTORICAL_TICKS_LAST, 7, 2,
+            1700000000, 1, "1.5", 100, "NASDAQ", "", 1700000001, 2, "1.4", 200, "ARCA", " I", 1))
+        for (tick, row) in zip(ticks, arr):
+            self.assertEqual((tick.time, tick.price, float(tick.size), tick.exchange,
+                              tick.specialConditions, tick.tickAttribLast.pastLimit,
+                              tick.tickAttribLast.unreported),
+                             tuple(row[name] for name in ("time", "price", "size", "exchange",
+                                   "specialConditions", "pastLimit", "unreported")))
+
+
+    def test_last_long_strings(self):
+        conditions = "".join(chr(ord("A") + i) for i in range(26))
+        (ticks, arr) = self.decode_both(make_fields(IN.HISTORICAL_TICKS_LAST, 7, 1,
+            1700000000, 0, "1.5", 100, "EXCHANGE_NAME_LONGER_THAN_16", conditions, 1))
+        self.assertEqual(arr["exchange"][0], "EXCHANGE_NAME_LONGER_THAN_16")
+        self.assertEqual(arr["specialConditions"][0], conditions)
+        self.assertEqual(arr["specialConditions"][0], ticks[0].specialConditions)
+
+
+if "__main__" == __name__:
+    unittest.main()
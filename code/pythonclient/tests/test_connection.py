@@ -0,0 +1,92 @@
+"""
+Unit tests for ibapi.connection
+"""
+
+import socket
+import threading
+import time
+import unittest
+
+from ibapi import comm
+from ibapi.connection import Connection, SelectorConnection
+from ibapi.framing import FrameBuffer
+
+
+class SelectorConnectionTestCase(unittest.TestCase):
+    def setUp(self):
+        self.server = socket.socket()
+        self.server.bind(("127.0.0.1", 0))
+        self.server.listen(1)
+        self.conn = SelectorConnection("127.0.0.1", self.server.getsockname()[1],
+                                       recvBufSize=1024)
+        self.conn.connect()
+        (self.peer, _) = self.server.accept()
+
+
+    def tearDown(self):
+        self.conn.disconnect()
+        self.peer.close()
+        self.server.close()
+
+
+    def test_recv_into(self):
+        texts = ["msg%d" % i for i in range(500)]
+        self.peer.sendall(b"".join(comm.make_msg(text) for text in texts))
+
+        buf = FrameBuffer()
+        msgs = []
+        while len(msgs) < len(texts):
+            self.assertGreater(self.conn.recvInto(buf), 0)
+            msgs.extend(buf.extract())
+
+        self.assertEqual([m.decode() for m in msgs], texts)
+
+
+    def test_recv_msg(self):
+        self.peer.sendall(b"ABCD")
+        self.assertEqual(self.conn.recvMsg(), b"ABCD")
+
+
+    def test_peer_close(self):
+        self.peer.close()
+        self.assertEqual(self.conn.recvInto(FrameBuffer()), 0)
+        self.assertFalse(self.conn.isConnected())
+
+
+    def test_disconnect_wakes_reader(self):
+        result = []
+        reader = threading.Thread(target=lambda: result.append(
+            self.conn.recvInto(FrameBuffer())))
+        reader.start()
+        time.sleep(0.05)
+
+        t0 = time.perf_counter()
+        self.conn.disconnect()
+        reader.join(1)
+
+        self.assertFalse(reader.is_alive(), "reader still blocked")
+        self.assertEqual(result, [0])
+        self.assertLess(time.perf_counter() - t0, 0.5)
+
+
+class ConnectionTestCase(unittest.TestCase):
+    def test_recv_into(self):
+        server = socket.socket()
+        server.bind(("127.0.0.1", 0))
+        server.listen(1)
+        conn = Connection("127.0.0.1", server.getsockname()[1])
+        conn.connect()
+        (peer, _) = server.accept()
+        try:
+            peer.sendall(comm.make_msg("ABCD"))
+            buf = FrameBuffer()
+            self.assertEqual(conn.recvInto(buf), 8)
+            self.assertEqual(buf.extract(), [b"ABCD"])
+        finally:
+            conn.disconnect()
+            peer.close()
+            server.close()
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,174 @@
+"""
+Unit tests for ibapi.contract_cache
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from ibapi.contract import ContractDetails
+from ibapi.contract_cache import ContractCache
+from ibapi.errors import UPDATE_TWS
+from ibapi.message import OUT
+from ibapi.mock_tws import MockTws
+from ibapi.server_versions import MIN_SERVER_VER_BOND_ISSUERID
+
+from helpers import FakeClock, MockTwsClient, RecordingWrapper, stock
+
+
+def details(symbol, conId):
+    result = ContractDetails()
+    result.contract = stock(symbol, conId)
+    result.longName = symbol + " INC"
+    return result
+
+
+class ContractCacheTestCase(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "contracts.db")
+        self.clock = FakeClock()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_lookups(self):
+        cache = ContractCache(clock=self.clock)
+        cache.putAll([details("AAPL", 265598)], query=stock("AAPL"))
+        self.assertEqual(cache.byConId(265598).longName, "AAPL INC")
+        self.assertEqual([d.contract.conId for d in cache.lookup("AAPL", "STK", "SMART", "USD")],
+                         [265598])
+        self.assertEqual(len(cache.lookupContract(stock("AAPL"))), 1)
+        self.assertEqual(len(cache.lookupContract(stock("", conId=265598))), 1)
+        self.assertIsNone(cache.lookupContract(stock("", conId=265598, exchange="ARCA")))
+        self.assertIsNone(cache.lookupContract(stock("MSFT")))
+        self.assertEqual((cache.hits, cache.misses), (2, 2))
+
+        # the answers are copies
+        cache.byConId(265598).contract.exchange = "ARCA"
+        self.assertEqual(cache.byConId(265598).contract.exchange, "SMART")
+
+    def test_ttl(self):
+        cache = ContractCache(ttl=60., clock=self.clock)
+        cache.putAll([details("AAPL", 265598)], query=stock("AAPL"))
+        self.clock.now += 61.
+        self.assertIsNone(cache.byConId(265598))
+        self.assertIsNone(cache.lookupContract(stock("AAPL")))
+        self.assertEqual(cache.stale(), [265598])
+        cache.putAll([details("AAPL", 265598)], query=stock("AAPL"))
+        self.assertEqual(cache.stale(), [])
+        self.assertIsNotNone(cache.lookupContract(stock("AAPL")))
+
+    def test_warm_load(self):
+        cache = ContractCache(self.path, clock=self.clock)
+        cache.putAll([details("AAPL", 265598), details("MSFT", 272093)], query=stock("AAPL"))
+        cache.put(details("IBM", 8314))
+        cache.invalidate(8314)
+        cache.close()
+
+        cache = ContractCache(self.path, clock=self.clock)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual([d.longName for d in cache.lookupContract(stock("AAPL"))],
+                         ["AAPL INC", "MSFT INC"])
+        self.assertIsNone(cache.byConId(8314))
+        cache.close()
+
+    def test_pending(self):
+        cache = ContractCache(clock=self.clock)
+        cache.expect(1, stock("AAPL"))
+        answer = details("AAPL", 265598)
+        cache.contractDetails(1, answer)
+        answer.longName = "CHANGED"
+        cache.contractDetailsEnd(1)
+        self.assertEqual(cache.byConId(265598).longName, "AAPL INC")
+
+        cache.expect(2, stock("MSFT"))
+        cache.contractDetails(2, details("MSFT", 272093))
+        cache.error(2, 2104, "Market data farm connection is OK")
+        self.assertIn(2, cache.pending)
+        cache.error(2, 200, "No security definition has been found for the request")
+        self.assertEqual(cache.pending, {})
+        cache.contractDetailsEnd(2)
+        self.assertIsNone(cache.byConId(272093))
+
+        cache.expect(3, stock("IBM"))
+        cache.dropPending()
+        self.assertEqual(cache.pending, {})
+
+
+class AnswerWrapper(RecordingWrapper):
+    """ also signals the end of each answer """
+    def __init__(self):
+        super().__init__()
+        self.details = []
+        self.errors = []
+        self.ends = threading.Semaphore(0)
+
+    def contractDetails(self, reqId, contractDetails):
+        super().contractDetails(reqId, contractDetails)
+        self.details.append((reqId, contractDetails.contract.conId))
+
+    def contractDetailsEnd(self, reqId):
+        super().contractDetailsEnd(reqId)
+        self.ends.release()
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        super().error(reqId, errorCode, errorString, advancedOrderRejectJson)
+        self.errors.append((reqId, errorCode))
+        self.ends.release()
+
+
+class ClientContractCacheTestCase(MockTwsClient, unittest.TestCase):
+    def test_answered_locally(self):
+        with MockTws() as tws:
+            client = self.connect(tws, AnswerWrapper())
+            cache = client.setContractCache(ContractCache())
+            try:
+                client.reqContractDetails(1, stock("AAPL"))
+                self.assertTrue(self.wrapper.ends.acquire(timeout=5))
+                client.reqContractDetails(2, stock("AAPL"))
+                self.assertTrue(self.wrapper.ends.acquire(timeout=0))
+            finally:
+                self.disconnect()
+        conId = self.wrapper.details[0][1]
+        self.assertEqual(self.wrapper.details, [(1, conId), (2, conId)])
+        self.assertEqual(tws.requests[OUT.REQ_CONTRACT_DATA], 1)
+        self.assertEqual(cache.byConId(conId).contract.symbol, "AAPL")
+
+    def test_error_not_cached(self):
+        # the AAPL answer comes after the disconnect
+        with MockTws(contractDetailsDelay=1.) as tws:
+            client = self.connect(tws, AnswerWrapper())
+            cache = client.setContractCache(ContractCache())
+            try:
+                client.reqContractDetails(1, stock("BADSYM"))
+                self.assertTrue(self.wrapper.ends.acquire(timeout=5))
+                self.assertEqual(cache.pending, {})
+                client.reqContractDetails(2, stock("AAPL"))
+                self.assertIn(2, cache.pending)
+            finally:
+                self.disconnect()
+        self.assertEqual(self.wrapper.errors, [(1, 200)])
+        self.assertEqual(cache.pending, {})
+        self.assertEqual(len(cache), 0)
+
+    def test_rejected_not_pending(self):
+        # refused before sending, no answer will come from TWS
+        with MockTws(serverVersion=MIN_SERVER_VER_BOND_ISSUERID - 1) as tws:
+            client = self.connect(tws, AnswerWrapper())
+            cache = client.setContractCache(ContractCache())
+            try:
+                contract = stock("AAPL")
+                contract.issuerId = "e1234567"
+                client.reqContractDetails(1, contract)
+                self.assertEqual(cache.pending, {})
+            finally:
+                self.disconnect()
+        self.assertEqual(self.wrapper.errors, [(1, UPDATE_TWS.code())])
+        self.assertEqual(tws.requests[OUT.REQ_CONTRACT_DATA], 0)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,105 @@
+"""
+Unit tests for the slotted data model of ibapi.common and the shared tick
+attribs of the Decoder
+"""
+
+import copy
+import pickle
+import unittest
+from decimal import Decimal
+
+from ibapi import comm
+from ibapi.commission_report import CommissionReport
+from ibapi.common import (BarData, HistogramData, HistoricalTick, HistoricalTickBidAsk,
+                          HistoricalTickLast, RealTimeBar, TickAttrib, TICK_ATTRIBS,
+                          TICK_ATTRIBS_BID_ASK, TICK_ATTRIBS_LAST)
+from ibapi.contract import Contract
+from ibapi.decoder import Decoder
+from ibapi.execution import Execution
+from ibapi.message import IN
+
+
+class RecordingWrapper:
+    def __init__(self):
+        self.calls = []
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        self.calls.append(attrib)
+
+    def tickSize(self, reqId, tickType, size):
+        pass
+
+    def historicalTicksBidAsk(self, reqId, ticks, done):
+        self.calls.extend(ticks)
+
+    def tickByTickBidAsk(self, reqId, time, bidPrice, askPrice, bidSize, askSize, attrib):
+        self.calls.append(attrib)
+
+
+def make_fields(*vals):
+    return comm.read_fields("".join(comm.make_field(val) for val in vals))
+
+
+class DataModelTestCase(unittest.TestCase):
+    def test_no_dict(self):
+        for cls in (BarData, RealTimeBar, HistogramData, TickAttrib, HistoricalTick,
+                    HistoricalTickBidAsk, HistoricalTickLast, Execution, CommissionReport,
+                    Contract):
+            obj = cls()
+            self.assertFalse(hasattr(obj, "__dict__"), cls.__name__)
+            with self.assertRaises(AttributeError):
+                obj.notAField = 1
+
+    def test_str(self):
+        bar = BarData()
+        bar.date = "20250102 09:30:00"
+        (bar.open, bar.high, bar.low, bar.close) = (187.25, 187.75, 187., 187.5)
+        bar.volume = Decimal(1200)
+        bar.wap = Decimal("187.41")
+        bar.barCount = 35
+        self.assertEqual(str(bar), "Date: 20250102 09:30:00, Open: 187.25, High: 187.75, "
+                         "Low: 187, Close: 187.5, Volume: 1200, WAP: 187.41, BarCount: 35")
+
+        tick = HistoricalTickLast()
+        self.assertEqual(str(tick), "Time: 0, TickAttribLast: PastLimit: 0, Unreported: 0, "
+                         "Price: 0, Size: , Exchange: , SpecialConditions: ")
+
+        contract = Contract()
+        contract.symbol = "AAPL"
+        self.assertEqual(str(contract), "0,AAPL,,,0,,,,,,,,False,,,,combo:")
+
+    def test_shared_attribs(self):
+        attrib = TICK_ATTRIBS[5]
+        self.assertIsInstance(attrib, TickAttrib)
+        self.assertEqual(str(attrib), "CanAutoExecute: 1, PastLimit: 0, PreOpen: 1")
+        with self.assertRaises(AttributeError):
+            attrib.pastLimit = True
+        self.assertIs(copy.copy(attrib), attrib)
+        self.assertIs(copy.deepcopy(attrib), attrib)
+        clone = pickle.loads(pickle.dumps(attrib))
+        self.assertEqual(str(clone), str(attrib))
+        self.assertEqual(str(TICK_ATTRIBS_LAST[2]), "PastLimit: 0, Unreported: 1")
+
+    def test_decoder_shares_attribs(self):
+        wrapper = RecordingWrapper()
+        decoder = Decoder(wrapper, 176)
+        for _ in range(2):
+            decoder.interpret(make_fields(IN.TICK_PRICE, 6, 7, 1, 187.25, 300, 3))
+        self.assertIs(wrapper.calls[0], wrapper.calls[1])
+        self.assertIs(wrapper.calls[0], TICK_ATTRIBS[3])
+
+        decoder.interpret(make_fields(IN.TICK_BY_TICK, 7, 3, 1700000000, 187.2, 187.3,
+                                      100, 200, 1))
+        self.assertIs(wrapper.calls[-1], TICK_ATTRIBS_BID_ASK[1])
+        self.assertTrue(wrapper.calls[-1].bidPastLow)
+
+        # the historical bid/ask mask has askPastHigh first
+        decoder.interpret(make_fields(IN.HISTORICAL_TICKS_BID_ASK, 7, 1, 1700000000, 1,
+                                      187.2, 187.3, 100, 200, 1))
+        attrib = wrapper.calls[-1].tickAttribBidAsk
+        self.assertTrue(attrib.askPastHigh)
+        self.assertFalse(attrib.bidPastLow)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,198 @@
+"""
+Unit tests for the precompiled decode plans of ibapi.decoder
+"""
+
+import unittest
+from decimal import Decimal
+
+from ibapi import comm
+from ibapi.common import SizeModeEnum, UNSET_DECIMAL, UNSET_DOUBLE, UNSET_LONG
+from ibapi.decoder import Decoder
+from ibapi.message import IN
+from ibapi.server_versions import (MIN_SERVER_VER_PAST_LIMIT,
+    MIN_SERVER_VER_MARKET_CAP_PRICE, MIN_SERVER_VER_REALIZED_PNL)
+from ibapi.utils import BadMessage
+
+
+SERVER_VERSIONS = (MIN_SERVER_VER_PAST_LIMIT - 1, MIN_SERVER_VER_MARKET_CAP_PRICE - 1, 176)
+
+
+class RecordingWrapper:
+    """ records every wrapper call with the str() of its arguments """
+    def __init__(self):
+        self.calls = []
+
+    def __getattr__(self, name):
+        def record(*args):
+            self.calls.append((name, ) + tuple(str(arg) for arg in args))
+        return record
+
+
+class SizeWrapper:
+    def __init__(self):
+        self.sizes = []
+
+    def tickSize(self, reqId, tickType, size):
+        self.sizes.append(size)
+
+
+def make_fields(*vals):
+    return comm.read_fields(comm.make_msg("".join(comm.make_field(val) for val in vals))[4:])
+
+
+def sample_msgs(serverVersion):
+    msgs = [
+        make_fields(IN.TICK_PRICE, 6, 7, 1, "187.25", 300, 3),
+        make_fields(IN.TICK_PRICE, 6, 7, 9, "186.5", 2147483647, 0),
+        make_fields(IN.TICK_PRICE, 6, 7, 67, "Infinity", "", 1),
+        make_fields(IN.TICK_SIZE, 6, 7, 8, "1234567"),
+        make_fields(IN.MARKET_DEPTH, 1, 7, 0, 1, 1, "99.5", 200),
+        make_fields(IN.REAL_TIME_BARS, 3, 7, 1700000000, "1.5", "2.5", "1.0", "2.0", 1000, "1.75", 12),
+    ]
+
+    orderStatus = [IN.ORDER_STATUS]
+    if serverVersion < MIN_SERVER_VER_MARKET_CAP_PRICE:
+        orderStatus.append(6)
+    orderStatus += [11, "Filled", 100, 0, "12.5", 1234, 0, "12.5", 1, "", ]
+    if serverVersion >= MIN_SERVER_VER_MARKET_CAP_PRICE:
+        orderStatus.append("0")
+    msgs.append(make_fields(*orderStatus))
+
+    histData = [IN.HISTORICAL_DATA]
+    if serverVersion < 124:
+        histData.append(3)
+    histData += [7, "20250101 00:00:00", "20250102 00:00:00", 2]
+    for i in range(2):
+        histData += ["2025010%d" % (i + 1), "1.5", "2.5", "1.0", "2.0", 1000 + i, "1.75"]
+        if serverVersion < 124:
+            histData.append("false")
+        histData.append(12)
+    msgs.append(make_fields(*histData))
+
+    depthL2 = [IN.MARKET_DEPTH_L2, 1, 7, 0, "MM", 1, 0, "99.5", 200]
+    if serverVersion >= 146:
+        depthL2.append(1)
+    msgs.append(make_fields(*depthL2))
+
+    pnl = [IN.PNL, 7, "1.5"]
+    if serverVersion >= 129:
+        pnl.append("2.5")
+    if serverVersion >= MIN_SERVER_VER_REALIZED_PNL:
+        pnl.append("3.5")
+    msgs.append(make_fields(*pnl))
+
+    return msgs
+
+
+class DecodePlanTestCase(unittest.TestCase):
+    def test_plans_match_process_msgs(self):
+        for serverVersion in SERVER_VERSIONS:
+            withPlans = Decoder(RecordingWrapper(), serverVersion)
+            legacy = Decoder(RecordingWrapper(), serverVersion)
+            legacy.msgId2plan = {}
+
+            for fields in sample_msgs(serverVersion):
+                withPlans.interpret(fields)
+                legacy.interpret(fields)
+
+            self.assertEqual(withPlans.wrapper.calls, legacy.wrapper.calls,
+                             "server version %d" % serverVersion)
+            self.assertGreater(len(legacy.wrapper.calls), 10)
+
+
+    def test_compiled_after_server_version(self):
+        decoder = Decoder(RecordingWrapper(), None)
+        self.assertEqual(decoder.msgId2plan, {})
+
+        decoder.serverVersion = 176
+        decoder.compilePlans()
+        self.assertIn(IN.ORDER_STATUS, decoder.msgId2plan)
+        self.assertIn(IN.REAL_TIME_BARS, decoder.msgId2plan)
+        # no measurable gain, left to processTickPriceMsg/processHistoricalDataMsg
+        self.assertNotIn(IN.TICK_PRICE, decoder.msgId2plan)
+        self.assertNotIn(IN.HISTORICAL_DATA, decoder.msgId2plan)
+
+
+    def test_short_message(self):
+        decoder = Decoder(RecordingWrapper(), 176)
+        self.assertRaises(BadMessage, decoder.msgId2plan[IN.ORDER_STATUS],
+                          make_fields(IN.ORDER_STATUS, 11, "Filled"))
+
+
+class SizeModeTestCase(unittest.TestCase):
+    def test_plans_match_process_msgs(self):
+        for sizeMode in (SizeModeEnum.FLOAT, SizeModeEnum.SCALED_INT):
+            withPlans = Decoder(RecordingWrapper(), 176, sizeMode=sizeMode)
+            legacy = Decoder(RecordingWrapper(), 176, sizeMode=sizeMode)
+            legacy.msgId2plan = {}
+
+            for fields in sample_msgs(176):
+                withPlans.interpret(fields)
+                legacy.interpret(fields)
+
+            self.assertEqual(withPlans.wrapper.calls, legacy.wrapper.calls,
+                             SizeModeEnum.to_str(sizeMode))
+
+
+    def test_size_types(self):
+        msgs = (make_fields(IN.TICK_SIZE, 6, 7, 8, "1234567"),
+                make_fields(IN.TICK_SIZE, 6, 7, 8, "0.0125"),
+                make_fields(IN.TICK_SIZE, 6, 7, 8, ""),
+                make_fields(IN.TICK_SIZE, 6, 7, 8, "9223372036854775807"))
+        expected = {
+            SizeModeEnum.DECIMAL: [Decimal(1234567), Decimal("0.0125"), UNSET_DECIMAL,
+                                   UNSET_DECIMAL],
+            SizeModeEnum.FLOAT: [1234567., 0.0125, UNSET_DOUBLE, UNSET_DOUBLE],
+            SizeModeEnum.SCALED_INT: [12345670000, 125, UNSET_LONG, UNSET_LONG],
+        }
+        for (sizeMode, sizes) in expected.items():
+            wrapper = SizeWrapper()
+            decoder = Decoder(wrapper, 176, sizeMode=sizeMode)
+            for fields in msgs:
+                decoder.interpret(fields)
+            got = wrapper.sizes
+            self.assertEqual(got, sizes)
+            self.assertEqual([type(size) for size in got], [type(size) for size in sizes])
+
+
+    def test_quantities_stay_decimal(self):
+        wrapper = RecordingWrapper()
+        decoder = Decoder(wrapper, 176, sizeMode=SizeModeEnum.FLOAT)
+        decoder.interpret(make_fields(IN.ORDER_STATUS, 11, "Filled", 100, 0, "12.5",
+                                      1234, 0, "12.5", 1, "", "0"))
+        self.assertEqual(wrapper.calls[0][3:5], ("100", "0"))
+
+
+    def test_unknown_mode(self):
+        self.assertRaises(ValueError, Decoder, RecordingWrapper(), 176, sizeMode=7)
+
+
+class SignatureDispatchTestCase(unittest.TestCase):
+    def test_converters(self):
+        decoder = Decoder(RecordingWrapper(), 176)
+        decoder.interpret(make_fields(IN.ACCOUNT_SUMMARY, 1, 7, "U123", "NetLiquidation", "1000.5", "EUR"))
+        decoder.interpret(make_fields(IN.TICK_GENERIC, 6, 7, 49, "0.5"))
+        decoder.interpret(make_fields(IN.TICK_STRING, 6, 7, 45, "caf\\u00e9"))
+        decoder.interpret(make_fields(IN.ACCT_VALUE, 2, "CashBalance", "12.5", "USD", "U123"))
+
+        self.assertEqual(decoder.wrapper.calls, [
+            ("accountSummary", "7", "U123", "NetLiquidation", "1000.5", "EUR"),
+            ("tickGeneric", "7", "49", "0.5"),
+            ("tickString", "7", "45", "caf\u00e9"),
+            ("updateAccountValue", "CashBalance", "12.5", "USD", "U123")])
+
+
+    def test_old_server_version(self):
+        decoder = Decoder(RecordingWrapper(), MIN_SERVER_VER_PAST_LIMIT)
+        decoder.interpret(make_fields(IN.TICK_STRING, 6, 7, 45, "caf\\u00e9"))
+        self.assertEqual(decoder.wrapper.calls, [("tickString", "7", "45", "caf\\u00e9")])
+
+
+    def test_field_count_mismatch(self):
+        decoder = Decoder(RecordingWrapper(), 176)
+        decoder.interpret(make_fields(IN.TICK_GENERIC, 6, 7, 49))
+        self.assertEqual(decoder.wrapper.calls, [])
+
+
+if "__main__" == __name__:
+    unittest.main()
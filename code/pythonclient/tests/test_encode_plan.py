@@ -0,0 +1,281 @@
+"""
+Unit tests for the precompiled request encoders of ibapi.encode_plan
+"""
+
+import unittest
+from decimal import Decimal
+
+from ibapi.client import EClient
+from ibapi.common import UNSET_DOUBLE
+from ibapi.contract import ComboLeg, DeltaNeutralContract
+from ibapi.errors import INVALID_SYMBOL, UPDATE_TWS
+from ibapi.order import Order, OrderComboLeg, COMPETE_AGAINST_BEST_OFFSET_UP_TO_MID
+from ibapi.order_condition import PriceCondition, TimeCondition
+from ibapi.server_versions import (MIN_SERVER_VER_ORDER_CONTAINER,
+    MIN_SERVER_VER_DURATION, MIN_SERVER_VER_PEGBEST_PEGMID_OFFSETS)
+from ibapi.tag_value import TagValue
+from ibapi.wrapper import EWrapper
+
+from helpers import stock
+
+
+SERVER_VERSIONS = (MIN_SERVER_VER_ORDER_CONTAINER, MIN_SERVER_VER_DURATION,
+                   MIN_SERVER_VER_PEGBEST_PEGMID_OFFSETS, 176)
+
+
+class SentMsgs:
+    """ stands in for the Connection """
+    def __init__(self):
+        self.msgs = []
+
+    def isConnected(self):
+        return True
+
+    def sendMsg(self, msg):
+        self.msgs.append(msg)
+
+
+class ErrorWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.errors = []
+
+    def error(self, reqId, errorCode, errorString, advancedOrderRejectJson=""):
+        self.errors.append((reqId, errorCode, errorString))
+
+
+def make_client(serverVersion, compiled):
+    client = EClient(ErrorWrapper())
+    client.conn = SentMsgs()
+    client.serverVersion_ = serverVersion
+    client.setConnState(EClient.CONNECTED)
+    if compiled:
+        client.compileEncoders()
+    return client
+
+
+def bag():
+    contract = stock()
+    contract.secType = "BAG"
+    contract.comboLegs = []
+    for (conId, action) in ((265598, "BUY"), (8314, "SELL")):
+        leg = ComboLeg()
+        leg.conId = conId
+        leg.ratio = 1
+        leg.action = action
+        leg.exchange = "SMART"
+        contract.comboLegs.append(leg)
+    return contract
+
+
+def limit_order(qty="100", price=187.25):
+    order = Order()
+    order.action = "BUY"
+    order.totalQuantity = Decimal(qty)
+    order.orderType = "LMT"
+    order.lmtPrice = price
+    order.tif = "DAY"
+    order.transmit = True
+    return order
+
+
+def sample_orders():
+    orders = [(stock(), limit_order()),
+              (stock(), limit_order("0.5", 0.01))]
+
+    order = limit_order()
+    order.orderType = "STP LMT"
+    order.auxPrice = 180.
+    order.algoStrategy = "Adaptive"
+    order.algoParams = [TagValue("adaptivePriority", "Normal")]
+    order.orderMiscOptions = [TagValue("a", "b")]
+    order.outsideRth = True
+    orders.append((stock(), order))
+
+    contract = bag()
+    order = limit_order()
+    order.orderComboLegs = [OrderComboLeg(), OrderComboLeg()]
+    order.orderComboLegs[0].price = 1.5
+    order.smartComboRoutingParams = [TagValue("NonGuaranteed", "1")]
+    orders.append((contract, order))
+
+    contract = stock()
+    contract.deltaNeutralContract = DeltaNeutralContract()
+    contract.deltaNeutralContract.conId = 12
+    contract.deltaNeutralContract.delta = 0.5
+    order = limit_order()
+    order.deltaNeutralOrderType = "LMT"
+    order.deltaNeutralAuxPrice = 1.
+    order.hedgeType = "D"
+    order.hedgeParam = "0.5"
+    order.scalePriceIncrement = 0.05
+    order.scaleInitLevelSize = 100
+    orders.append((contract, order))
+
+    order = limit_order()
+    condition = PriceCondition(PriceCondition.TriggerMethodEnum.Default, 265598,
+                               "SMART", True, 190.)
+    condition.isConjunctionConnection = True
+    timeCondition = TimeCondition(True, "20250101 09:30:00")
+    timeCondition.isConjunctionConnection = False
+    order.conditions = [condition, timeCondition]
+    orders.append((stock(), order))
+
+    order = limit_order()
+    order.orderType = "PEG BENCH"
+    order.referenceContractId = 265598
+    orders.append((stock(), order))
+
+    return orders
+
+
+def peg_orders():
+    contract = stock()
+    contract.exchange = "IBKRATS"
+    order = limit_order()
+    order.orderType = "PEG BEST"
+    order.minTradeQty = 100
+    order.minCompeteSize = 100
+    order.competeAgainstBestOffset = COMPETE_AGAINST_BEST_OFFSET_UP_TO_MID
+    order.midOffsetAtWhole = 0.01
+    order.midOffsetAtHalf = 0.005
+    yield (contract, order)
+
+    order = limit_order()
+    order.orderType = "PEG MID"
+    order.midOffsetAtWhole = 0.01
+    order.midOffsetAtHalf = UNSET_DOUBLE
+    yield (stock(), order)
+
+
+class EncodePlanTestCase(unittest.TestCase):
+    def assert_same(self, call):
+        for serverVersion in SERVER_VERSIONS:
+            legacy = make_client(serverVersion, compiled=False)
+            compiled = make_client(serverVersion, compiled=True)
+            self.assertIsNotNone(compiled.placeOrderEncoder)
+            call(legacy)
+            call(compiled)
+            self.assertEqual(compiled.conn.msgs, legacy.conn.msgs,
+                             "server version %d" % serverVersion)
+            self.assertEqual(compiled.wrapper.errors, legacy.wrapper.errors,
+                             "server version %d" % serverVersion)
+
+    def assert_same_failures(self, calls):
+        """ each call either reports through the wrapper or raises, the
+        same way in both modes """
+        def outcomes(client):
+            result = []
+            for call in calls:
+                try:
+                    call(client)
+                    result.append(None)
+                except Exception as ex:
+                    result.append((type(ex), str(ex)))
+            return result
+
+        for serverVersion in SERVER_VERSIONS:
+            legacy = make_client(serverVersion, compiled=False)
+            compiled = make_client(serverVersion, compiled=True)
+            self.assertEqual(outcomes(compiled), outcomes(legacy),
+                             "server version %d" % serverVersion)
+            self.assertEqual(compiled.conn.msgs, legacy.conn.msgs,
+                             "server version %d" % serverVersion)
+            self.assertEqual(compiled.wrapper.errors, legacy.wrapper.errors,
+                             "server version %d" % serverVersion)
+        return legacy
+
+    def test_place_order(self):
+        def call(client):
+            for (orderId, (contract, order)) in enumerate(sample_orders()):
+                client.placeOrder(orderId, contract, order)
+        self.assert_same(call)
+
+    def test_peg_orders(self):
+        def call(client):
+            for (orderId, (contract, order)) in enumerate(peg_orders()):
+                client.placeOrder(orderId, contract, order)
+        self.assert_same(call)
+
+    def test_place_order_errors(self):
+        def call(client):
+            order = limit_order()
+            order.duration = 60
+            client.placeOrder(1, stock(), order)
+            contract = stock()
+            contract.symbol = "café"
+            client.placeOrder(2, contract, limit_order())
+            contract = stock()
+            contract.localSymbol = "AAPL\0"
+            client.placeOrder(3, contract, limit_order())
+        self.assert_same(call)
+
+        client = make_client(MIN_SERVER_VER_ORDER_CONTAINER, compiled=True)
+        call(client)
+        self.assertEqual([error[1] for error in client.wrapper.errors],
+                         [UPDATE_TWS.code(), INVALID_SYMBOL.code(), INVALID_SYMBOL.code()])
+
+    def test_req_mkt_data(self):
+        def call(client):
+            client.reqMktData(1, stock(), "", False, False, [])
+            client.reqMktData(2, stock(), "233,236", True, True, [])
+            client.reqMktData(3, bag(), "", False, False, [])
+            contract = stock()
+            contract.deltaNeutralContract = DeltaNeutralContract()
+            client.reqMktData(4, contract, "", False, False, [])
+        self.assert_same(call)
+
+    def test_req_mkt_data_errors(self):
+        def contract(symbol="AAPL", comboLegs=()):
+            result = bag() if comboLegs is None else stock()
+            result.symbol = symbol
+            if comboLegs is None:
+                result.comboLegs = None
+            return result
+
+        options = [TagValue("option", "1")]
+        calls = [
+            lambda client: client.reqMktData(1, contract("é"), "", False, False, options),
+            lambda client: client.reqMktData(2, contract("é", None), "", False, False, []),
+            lambda client: client.reqMktData(3, contract(), "é", False, False, options),
+            lambda client: client.reqMktData(4, contract(), "", False, False, options),
+            lambda client: client.reqMktData(5, contract(comboLegs=None), "", False, False, []),
+            lambda client: client.reqMktData(6, contract(None), "", False, False, []),
+        ]
+        legacy = self.assert_same_failures(calls)
+        self.assertEqual(legacy.wrapper.errors, [
+            (reqId, INVALID_SYMBOL.code(), legacy.wrapper.errors[reqId - 1][2])
+            for reqId in (1, 2, 3)])
+
+    def test_place_order_failures(self):
+        def order(**attrs):
+            result = limit_order()
+            for (name, value) in attrs.items():
+                setattr(result, name, value)
+            return result
+
+        def contract(symbol="AAPL"):
+            result = stock()
+            result.symbol = symbol
+            return result
+
+        calls = [
+            lambda client: client.placeOrder(1, contract("é"), order(lmtPrice=None)),
+            lambda client: client.placeOrder(2, contract(), order(lmtPrice=None)),
+            lambda client: client.placeOrder(3, contract(), order(orderRef="é", conditions=None)),
+            lambda client: client.placeOrder(4, contract(), order(conditions=None)),
+        ]
+        legacy = self.assert_same_failures(calls)
+        self.assertEqual([error[:2] for error in legacy.wrapper.errors],
+                         [(1, INVALID_SYMBOL.code()), (3, INVALID_SYMBOL.code())])
+
+    def test_old_server_version(self):
+        client = make_client(MIN_SERVER_VER_ORDER_CONTAINER - 1, compiled=True)
+        self.assertIsNone(client.placeOrderEncoder)
+        self.assertIsNone(client.reqMktDataEncoder)
+        client.placeOrder(1, stock(), limit_order())
+        self.assertEqual(len(client.conn.msgs), 1)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,75 @@
+"""
+Unit tests for ibapi.framing
+"""
+
+import unittest
+from ibapi import comm
+from ibapi.framing import FrameBuffer
+
+
+class FrameBufferTestCase(unittest.TestCase):
+    def setUp(self):
+        self.texts = ["ABCD", "", "1\x002\x00", "X" * 5000]
+        self.burst = b"".join(comm.make_msg(text) for text in self.texts)
+
+
+    def test_extract_all(self):
+        buf = FrameBuffer()
+        buf.write(self.burst)
+
+        msgs = buf.extract()
+
+        self.assertEqual([m.decode() for m in msgs], self.texts)
+        self.assertEqual(len(buf), 0, "there should be no pending bytes")
+
+
+    def test_partial_messages(self):
+        buf = FrameBuffer(capacity=16)
+        msgs = []
+        for i in range(0, len(self.burst), 3):
+            buf.write(self.burst[i:i + 3])
+            msgs.extend(buf.extract())
+
+        self.assertEqual([m.decode() for m in msgs], self.texts)
+        self.assertEqual(len(buf), 0)
+
+
+    def test_pending_tail(self):
+        buf = FrameBuffer()
+        msg = comm.make_msg("ABCD")
+        buf.write(msg + msg[:6])
+
+        self.assertEqual(buf.extract(), [b"ABCD"])
+        self.assertEqual(len(buf), 6)
+        self.assertEqual(buf.extract(), [])
+
+        buf.write(msg[6:])
+        self.assertEqual(buf.extract(), [b"ABCD"])
+
+
+    def test_writable_commit(self):
+        buf = FrameBuffer(capacity=8)
+        view = buf.writable(len(self.burst))
+        view[:] = self.burst
+        view.release()
+        buf.commit(len(self.burst))
+
+        self.assertEqual([m.decode() for m in buf.extract()], self.texts)
+        self.assertRaises(ValueError, buf.commit, buf.capacity() + 1)
+
+
+    def test_same_as_read_msg(self):
+        buf = FrameBuffer()
+        buf.write(self.burst)
+
+        rest = self.burst
+        expected = []
+        while rest:
+            (size, text, rest) = comm.read_msg(rest)
+            expected.append(text)
+
+        self.assertEqual(buf.extract(), expected)
+
+
+if "__main__" == __name__:
+    unittest.main()
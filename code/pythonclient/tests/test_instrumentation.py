@@ -0,0 +1,124 @@
+"""
+Unit tests for ibapi.instrumentation
+"""
+
+import unittest
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.decoder import Decoder
+from ibapi.instrumentation import Histogram, Instrumentation, TimedWrapper
+from ibapi.message import IN
+from ibapi.wrapper import EWrapper
+
+
+class CountingWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.nTicks = 0
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        self.nTicks += 1
+
+    def tickSize(self, reqId, tickType, size):
+        self.nTicks += 1
+
+
+def make_text(*vals):
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))[4:]
+
+
+TICK_PRICE = make_text(IN.TICK_PRICE, 6, 7, 1, "187.25", 300, 3)
+TICK_SIZE = make_text(IN.TICK_SIZE, 6, 7, 8, "1234567")
+ACCT_VALUE = make_text(IN.ACCT_VALUE, 2, "CashBalance", "12.5", "USD", "U123")
+
+
+class HistogramTestCase(unittest.TestCase):
+    def test_quantiles(self):
+        hist = Histogram()
+        for val in range(1, 1001):
+            hist.record(val)
+        summary = hist.summary()
+        self.assertEqual(summary["count"], 1000)
+        self.assertEqual(summary["min"], 1)
+        self.assertEqual(summary["max"], 1000)
+        self.assertAlmostEqual(summary["mean"], 500.5)
+        self.assertEqual(summary["p50"], 511)
+        self.assertEqual(summary["p99"], 1000)
+
+        hist.reset()
+        self.assertEqual(hist.summary()["count"], 0)
+        self.assertEqual(hist.quantile(0.5), 0)
+
+
+class DecoderInstrumentationTestCase(unittest.TestCase):
+    def test_counts_and_times(self):
+        wrapper = CountingWrapper()
+        decoder = Decoder(wrapper, 176)
+        instrumentation = Instrumentation()
+        decoder.setInstrumentation(instrumentation)
+
+        for text in (TICK_PRICE, TICK_PRICE, TICK_SIZE, ACCT_VALUE):
+            decoder.interpret(comm.read_fields(text))
+
+        self.assertEqual(wrapper.nTicks, 5)
+        snapshot = instrumentation.snapshot()
+        messages = snapshot["messages"]
+        self.assertEqual(messages[IN.TICK_PRICE]["name"], "TICK_PRICE")
+        self.assertEqual(messages[IN.TICK_PRICE]["count"], 2)
+        self.assertEqual(messages[IN.TICK_PRICE]["bytes"], 2 * len(TICK_PRICE))
+        self.assertEqual(messages[IN.TICK_SIZE]["bytes"], len(TICK_SIZE))
+        self.assertEqual(messages[IN.ACCT_VALUE]["decodeNs"]["count"], 1)
+        self.assertEqual(snapshot["callbacks"]["tickSize"]["count"], 3)
+        self.assertEqual(snapshot["callbacks"]["updateAccountValue"]["count"], 1)
+
+
+    def test_reset(self):
+        decoder = Decoder(CountingWrapper(), 176)
+        instrumentation = Instrumentation()
+        decoder.setInstrumentation(instrumentation)
+        decoder.interpret(comm.read_fields(TICK_SIZE))
+
+        instrumentation.reset()
+        self.assertEqual(instrumentation.snapshot()["messages"], {})
+        self.assertEqual(instrumentation.snapshot()["callbacks"], {})
+
+        # the callback histograms cached by the TimedWrapper keep counting
+        decoder.interpret(comm.read_fields(TICK_SIZE))
+        self.assertEqual(instrumentation.snapshot()["callbacks"]["tickSize"]["count"], 1)
+
+
+    def test_disable(self):
+        wrapper = CountingWrapper()
+        decoder = Decoder(wrapper, 176)
+        decoder.setInstrumentation(Instrumentation())
+        self.assertIsInstance(decoder.wrapper, TimedWrapper)
+
+        decoder.setInstrumentation(None)
+        self.assertIs(decoder.wrapper, wrapper)
+        self.assertNotIn("interpret", decoder.__dict__)
+        decoder.interpret(comm.read_fields(TICK_SIZE))
+        self.assertEqual(wrapper.nTicks, 1)
+
+
+class ClientInstrumentationTestCase(unittest.TestCase):
+    def test_run_samples_queue(self):
+        wrapper = CountingWrapper()
+        client = EClient(wrapper)
+        client.decoder = Decoder(wrapper, 176)
+        instrumentation = client.setInstrumentation(Instrumentation(queueSampleInterval=10))
+        for _ in range(100):
+            client.msg_queue.put(TICK_SIZE)
+
+        client.run()    # not connected, drains the queue and returns
+
+        self.assertEqual(wrapper.nTicks, 100)
+        snapshot = instrumentation.snapshot()
+        self.assertEqual(snapshot["messages"][IN.TICK_SIZE]["count"], 100)
+        self.assertEqual(snapshot["queueDepth"]["count"], 10)
+        self.assertEqual(snapshot["queueDepth"]["max"], 90)
+        self.assertEqual(len(instrumentation.queueSamples), 10)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,94 @@
+"""
+Unit tests for ibapi.mock_tws, driven by an EClient
+"""
+
+import threading
+import time
+import unittest
+
+from ibapi.message import OUT
+from ibapi.mock_tws import MockTws
+from ibapi.wrapper import EWrapper
+
+from helpers import MockTwsClient, stock
+
+
+class RecordingWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.nextOrderId = None
+        self.accountSummaries = []
+        self.pnls = []
+        self.positions = []
+        self.bars = []
+        self.nTicks = 0
+        self.done = threading.Event()
+
+    def nextValidId(self, orderId):
+        self.nextOrderId = orderId
+
+    def accountSummary(self, reqId, account, tag, value, currency):
+        self.accountSummaries.append((reqId, account, tag))
+
+    def pnl(self, reqId, dailyPnL, unrealizedPnL, realizedPnL):
+        self.pnls.append((reqId, dailyPnL, unrealizedPnL, realizedPnL))
+
+    def position(self, account, contract, position, avgCost):
+        self.positions.append((contract.symbol, position))
+
+    def historicalData(self, reqId, bar):
+        self.bars.append(bar)
+
+    def historicalDataEnd(self, reqId, start, end):
+        self.done.set()
+
+    def tickPrice(self, reqId, tickType, price, attrib):
+        self.nTicks += 1
+
+    def tickSize(self, reqId, tickType, size):
+        self.nTicks += 1
+
+
+class MockTwsTestCase(MockTwsClient, unittest.TestCase):
+    def setUp(self):
+        self.tws = MockTws(accountSummaryRows=5, nPositions=3, historicalBars=30,
+                           tickRate=2000.).start()
+        self.connect(self.tws, RecordingWrapper())
+
+    def tearDown(self):
+        self.disconnect()
+        self.tws.stop()
+
+    def test_requests(self):
+        self.client.reqAccountSummary(1, "All", "NetLiquidation,TotalCashValue")
+        self.client.reqPnL(2, "DU1234567", "")
+        self.client.reqPositions()
+        self.client.reqHistoricalData(3, stock(), "", "1 D", "1 min", "TRADES", 1, 1, False, [])
+        self.assertTrue(self.wrapper.done.wait(5))
+
+        self.assertEqual(self.wrapper.nextOrderId, 1)
+        self.assertEqual([tag for (_, _, tag) in self.wrapper.accountSummaries],
+                         ["NetLiquidation", "TotalCashValue", "NetLiquidation-2",
+                          "TotalCashValue-3", "NetLiquidation-4"])
+        self.assertEqual(self.wrapper.pnls, [(2, 1234.5, 5678.25, -12.75)])
+        self.assertEqual([symbol for (symbol, _) in self.wrapper.positions],
+                         ["SYM0", "SYM1", "SYM2"])
+        self.assertEqual(len(self.wrapper.bars), 30)
+        self.assertEqual(self.wrapper.bars[1].date, "20250102  09:31:00")
+        self.assertEqual(self.tws.requests[OUT.START_API], 1)
+
+    def test_market_data(self):
+        self.client.reqMktData(1, stock(), "", False, False, [])
+        time.sleep(0.5)
+        self.client.cancelMktData(1)
+        time.sleep(0.1)
+        nTicks = self.wrapper.nTicks
+        # half TICK_PRICE (a tickPrice and a tickSize), half TICK_SIZE
+        self.assertGreater(nTicks, 0.5 * 2000 * 1.5 * 0.5)
+        self.assertLess(nTicks, 0.7 * 2000 * 1.5)
+        time.sleep(0.1)
+        self.assertEqual(self.wrapper.nTicks, nTicks)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Unit tests for ibapi.order_book
+"""
+
+import math
+import unittest
+from decimal import Decimal
+
+from ibapi.columnar import np
+from ibapi.common import SIZE_SCALE, UNSET_DOUBLE, UNSET_LONG, SizeModeEnum
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class OrderBookTestCase(unittest.TestCase):
+    def setUp(self):
+        from ibapi.order_book import OrderBook
+        self.tops = []
+        self.book = OrderBook(numRows=3, onTopOfBook=lambda *args: self.tops.append(args))
+
+    def test_insert_update_delete(self):
+        from ibapi.order_book import DEPTH_DELETE, DEPTH_INSERT, DEPTH_UPDATE, SIDE_BID
+        book = self.book
+        book.updateMktDepth(1, 0, DEPTH_INSERT, SIDE_BID, 100., Decimal(10))
+        book.updateMktDepth(1, 1, DEPTH_INSERT, SIDE_BID, 99., Decimal(20))
+        book.updateMktDepth(1, 0, DEPTH_INSERT, SIDE_BID, 101., Decimal(5))
+        book.updateMktDepth(1, 2, DEPTH_UPDATE, SIDE_BID, 99., Decimal(25))
+        snapshot = book.snapshot(1)
+        self.assertEqual(list(snapshot["bidPrice"]), [101., 100., 99.])
+        self.assertEqual(list(snapshot["bidSize"]), [5., 10., 25.])
+        self.assertEqual(len(snapshot["askPrice"]), 0)
+        with self.assertRaises(ValueError):
+            snapshot["bidPrice"][0] = 1.
+
+        book.updateMktDepth(1, 0, DEPTH_DELETE, SIDE_BID, 0., Decimal(0))
+        self.assertEqual(list(book.snapshot(1)["bidPrice"]), [100., 99.])
+        self.assertFalse(book.updateMktDepth(1, 5, DEPTH_DELETE, SIDE_BID, 0., Decimal(0)))
+
+    def test_grows_past_num_rows(self):
+        from ibapi.order_book import DEPTH_INSERT, SIDE_ASK
+        for i in range(5):
+            self.book.updateMktDepthL2(1, i, "MM%d" % i, DEPTH_INSERT, SIDE_ASK,
+                                       100. + i, Decimal(1), True)
+        self.assertEqual(list(self.book.snapshot(1)["askPrice"]), [100., 101., 102., 103., 104.])
+        self.assertEqual(self.book.marketMakers(1, SIDE_ASK), ["MM0", "MM1", "MM2", "MM3", "MM4"])
+
+    def test_snapshot_after_growth(self):
+        from ibapi.order_book import DEPTH_INSERT, DEPTH_UPDATE, SIDE_ASK
+        book = self.book
+        for i in range(3):
+            book.updateMktDepth(1, i, DEPTH_INSERT, SIDE_ASK, 100. + i, Decimal(1))
+        snapshot = book.snapshot(1)
+        kept = snapshot["askPrice"].copy()
+        book.updateMktDepth(1, 0, DEPTH_UPDATE, SIDE_ASK, 99.5, Decimal(1))
+        # updated in place
+        self.assertEqual(list(snapshot["askPrice"]), [99.5, 101., 102.])
+        # the book grows: the view is detached from it
+        book.updateMktDepth(1, 0, DEPTH_INSERT, SIDE_ASK, 99., Decimal(1))
+        book.updateMktDepth(1, 1, DEPTH_UPDATE, SIDE_ASK, 99.25, Decimal(1))
+        self.assertEqual(list(snapshot["askPrice"]), [99.5, 101., 102.])
+        self.assertEqual(list(book.snapshot(1)["askPrice"]), [99., 99.25, 101., 102.])
+        self.assertEqual(list(kept), [100., 101., 102.])
+
+    def check_size_mode(self, sizeMode, size, unset):
+        from ibapi.order_book import DEPTH_INSERT, OrderBook, SIDE_BID
+        book = OrderBook(numRows=3, sizeMode=sizeMode)
+        book.updateMktDepth(1, 0, DEPTH_INSERT, SIDE_BID, 100., size(2.5))
+        book.updateMktDepth(1, 1, DEPTH_INSERT, SIDE_BID, 99., unset)
+        self.assertEqual(list(book.snapshot(1)["bidSize"]), [2.5, 0.])
+
+    def test_float_sizes(self):
+        self.check_size_mode(SizeModeEnum.FLOAT, float, UNSET_DOUBLE)
+
+    def test_scaled_int_sizes(self):
+        self.check_size_mode(SizeModeEnum.SCALED_INT, lambda qty: int(qty * SIZE_SCALE),
+                             UNSET_LONG)
+
+    def test_top_of_book(self):
+        from ibapi.order_book import DEPTH_INSERT, DEPTH_UPDATE, SIDE_ASK, SIDE_BID
+        book = self.book
+        book.updateMktDepth(1, 0, DEPTH_INSERT, SIDE_BID, 100., Decimal(10))
+        book.updateMktDepth(1, 0, DEPTH_INSERT, SIDE_ASK, 100.5, Decimal(7))
+        book.updateMktDepth(1, 1, DEPTH_INSERT, SIDE_ASK, 100.75, Decimal(7))
+        book.updateMktDepth(1, 0, DEPTH_UPDATE, SIDE_ASK, 100.5, Decimal(7))
+        self.assertEqual(len(self.tops), 2)
+        (reqId, bidPrice, bidSize, askPrice, askSize) = self.tops[0]
+        self.assertTrue(math.isnan(askPrice))
+        self.assertEqual(self.tops[1], (1, 100., 10., 100.5, 7.))
+        self.assertEqual(book.top(1), (100., 10., 100.5, 7.))
+
+
+if "__main__" == __name__:
+    unittest.main()
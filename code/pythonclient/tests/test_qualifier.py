@@ -0,0 +1,98 @@
+"""
+Unit tests for ibapi.qualifier
+"""
+
+import time
+import unittest
+
+from ibapi.client import EClient
+from ibapi.contract_cache import ContractCache
+from ibapi.errors import NOT_CONNECTED
+from ibapi.message import OUT
+from ibapi.mock_tws import MockTws
+from ibapi.qualifier import ContractQualifier, NO_ANSWER, QualifyResult
+
+from helpers import MockTwsClient, RecordingWrapper, stock
+
+
+class ContractQualifierTestCase(MockTwsClient, unittest.TestCase):
+    def test_qualify(self):
+        symbols = ["SYM%03d" % i for i in range(200)]
+        symbols[7] = symbols[150] = "BADSYM"
+        with MockTws(contractDetailsDelay=0.05) as tws:
+            self.connect(tws)
+            try:
+                t0 = time.monotonic()
+                results = ContractQualifier(self.client, msgRate=None).qualify(
+                    [stock(symbol) for symbol in symbols], timeout=10)
+                dt = time.monotonic() - t0
+            finally:
+                self.disconnect()
+
+        # 4 rounds of 50 requests in flight, not 200 round trips
+        self.assertLess(dt, 2.)
+        self.assertEqual(tws.requests[OUT.REQ_CONTRACT_DATA], 200)
+        self.assertEqual(self.wrapper.calls, [])
+        for (symbol, result) in zip(symbols, results):
+            self.assertEqual(result.contract.symbol, symbol)
+            if symbol == "BADSYM":
+                self.assertEqual(result.errorCode, 200)
+                self.assertEqual(result.details, [])
+            else:
+                self.assertEqual(result.errorCode, 0)
+                self.assertEqual([d.contract.symbol for d in result.details], [symbol])
+        self.assertEqual(self.client.reqHandlers, {})
+
+    def test_cache(self):
+        with MockTws() as tws:
+            self.connect(tws)
+            try:
+                self.client.setContractCache(ContractCache())
+                qualifier = ContractQualifier(self.client)
+                first = qualifier.qualify([stock("AAPL"), stock("MSFT")], timeout=5)
+                second = qualifier.qualify([stock("MSFT"), stock("IBM")], timeout=5)
+            finally:
+                self.disconnect()
+        self.assertEqual(tws.requests[OUT.REQ_CONTRACT_DATA], 3)
+        self.assertEqual(second[0].details[0].contract.conId,
+                         first[1].details[0].contract.conId)
+        self.assertEqual(second[1].details[0].contract.symbol, "IBM")
+        self.assertEqual(self.wrapper.calls, [])
+
+    def test_timeout(self):
+        with MockTws(contractDetailsDelay=0.5) as tws:
+            self.connect(tws)
+            try:
+                results = ContractQualifier(self.client, maxInFlight=2).qualify(
+                    [stock("AAPL"), stock("MSFT"), stock("IBM")], timeout=0.2)
+                self.assertEqual(len(self.client.reqHandlers), 2)
+                time.sleep(1.)      # the late answers
+            finally:
+                self.disconnect()
+        self.assertEqual([result.errorCode for result in results], [NO_ANSWER.code()] * 3)
+        self.assertEqual(tws.requests[OUT.REQ_CONTRACT_DATA], 2)
+        self.assertEqual(self.wrapper.calls, [])
+        self.assertEqual(self.client.reqHandlers, {})
+
+    def test_warning(self):
+        client = EClient(RecordingWrapper())
+        qualifier = ContractQualifier(client)
+        result = QualifyResult(stock("AAPL"))
+        qualifier.reqId2result[7] = result
+        client.reqHandlers[7] = qualifier
+
+        qualifier.error(7, 2104, "Market data farm connection is OK:usfarm")
+        self.assertIs(client.reqHandlers[7], qualifier)
+        self.assertEqual(result.errorCode, 0)
+        qualifier.error(7, 200, "No security definition has been found for the request")
+        self.assertEqual(client.reqHandlers, {})
+        self.assertEqual(result.errorCode, 200)
+
+    def test_not_connected(self):
+        client = EClient(RecordingWrapper())
+        results = ContractQualifier(client).qualify([stock("AAPL")])
+        self.assertEqual(results[0].errorCode, NOT_CONNECTED.code())
+
+
+if "__main__" == __name__:
+    unittest.main()
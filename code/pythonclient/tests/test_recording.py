@@ -0,0 +1,128 @@
+"""
+Unit tests for ibapi.recording
+"""
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.contract import Contract
+from ibapi.message import IN
+from ibapi.mock_tws import MockTws
+from ibapi.recording import Recorder, Recording, replay
+from ibapi.wrapper import EWrapper
+
+
+def payload(*vals):
+    """ a message as the EReader extracts it, without the size prefix """
+    return "".join(comm.make_field(val) for val in vals).encode()
+
+
+class CallbackWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.calls = []
+        self.done = threading.Event()
+
+    def accountSummary(self, reqId, account, tag, value, currency):
+        self.calls.append(("accountSummary", reqId, tag, value))
+
+    def pnl(self, reqId, dailyPnL, unrealizedPnL, realizedPnL):
+        self.calls.append(("pnl", reqId, dailyPnL))
+
+    def historicalData(self, reqId, bar):
+        self.calls.append(("historicalData", reqId, bar.date, bar.close))
+
+    def historicalDataEnd(self, reqId, start, end):
+        self.calls.append(("historicalDataEnd", reqId))
+        self.done.set()
+
+    def tickSize(self, reqId, tickType, size):
+        self.calls.append(("tickSize", reqId, int(size)))
+
+
+class RecordingTestCase(unittest.TestCase):
+    def setUp(self):
+        (fd, self.path) = tempfile.mkstemp(suffix=".ibrec")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_record_session_and_replay(self):
+        wrapper = CallbackWrapper()
+        client = EClient(wrapper)
+        recorder = client.setRecorder(Recorder(self.path))
+        with MockTws(accountSummaryRows=3, historicalBars=20) as tws:
+            client.connect("127.0.0.1", tws.port, 0)
+            thread = threading.Thread(target=client.run)
+            thread.start()
+            client.reqAccountSummary(1, "All", "NetLiquidation")
+            client.reqPnL(2, "DU1234567", "")
+            contract = Contract()
+            contract.symbol = "AAPL"
+            contract.secType = "STK"
+            client.reqHistoricalData(3, contract, "", "1 D", "1 min", "TRADES", 1, 1, False, [])
+            self.assertTrue(wrapper.done.wait(5))
+            client.disconnect()
+            thread.join()
+
+        recording = Recording(self.path)
+        self.assertEqual(recording.serverVersion, tws.serverVersion)
+        # nextValidId, managedAccounts, 3 + 1 account summary, pnl, historical data
+        self.assertEqual(recorder.nMsgs, 8)
+        self.assertEqual(len(recording.messages()), 8)
+
+        replayed = CallbackWrapper()
+        (nMsgs, _) = replay(recording, recording.makeDecoder(replayed))
+        self.assertEqual(nMsgs, 8)
+        self.assertEqual(replayed.calls, wrapper.calls)
+
+    def test_paced_replay(self):
+        recorder = Recorder(self.path)
+        recorder.begin(176, "20250101 09:30:00 UTC")
+        start = recorder.startNs
+        for i in range(3):
+            recorder.record([payload(IN.TICK_SIZE, 6, 1, 8, i)], start + i * 50000000)
+        recorder.record([payload(IN.TICK_SIZE, 6, 1, 8, 3),
+                         payload(IN.TICK_SIZE, 6, 1, 8, 4)], start + 150000000)
+        recorder.close()
+
+        recording = Recording(self.path)
+        self.assertEqual(recording.connTime, "20250101 09:30:00 UTC")
+        self.assertEqual([ts for (ts, _) in recording],
+                         [0, 50000000, 100000000, 150000000, 150000000])
+
+        wrapper = CallbackWrapper()
+        decoder = recording.makeDecoder(wrapper)
+        (nMsgs, elapsed) = replay(recording, decoder)
+        self.assertEqual(nMsgs, 5)
+        self.assertLess(elapsed, 0.1)
+        (_, elapsed) = replay(recording, decoder, paced=True)
+        self.assertGreaterEqual(elapsed, 0.15)
+        (_, elapsed) = replay(recording, decoder, paced=True, speed=3.)
+        self.assertGreaterEqual(elapsed, 0.05)
+        self.assertLess(elapsed, 0.15)
+        self.assertEqual([call[2] for call in wrapper.calls], list(range(5)) * 3)
+
+    def test_truncated(self):
+        recorder = Recorder(self.path)
+        recorder.begin(176, "")
+        recorder.record([payload(IN.TICK_SIZE, 6, 1, 8, 1)] * 2)
+        recorder.close()
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - 3)
+        self.assertEqual(len(Recording(self.path).messages()), 1)
+
+    def test_not_a_recording(self):
+        with open(self.path, "wb") as f:
+            f.write(b"x" * 100)
+        self.assertRaises(ValueError, Recording, self.path)
+
+
+if "__main__" == __name__:
+    unittest.main()
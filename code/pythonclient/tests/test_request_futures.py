@@ -0,0 +1,112 @@
+"""
+Unit tests for ibapi.request_futures
+"""
+
+import concurrent.futures
+import threading
+import time
+import unittest
+
+from ibapi.client import EClient
+from ibapi.mock_tws import MockTws
+from ibapi.request_futures import RequestError, RequestFutures, gather
+from ibapi.wrapper import EWrapper
+
+
+class RequestFuturesTestCase(unittest.TestCase):
+    def test_resolve(self):
+        futures = RequestFutures()
+        future = futures.expect(1)
+        self.assertIs(futures.expect(1), future)
+        self.assertTrue(futures.resolve(1, "answer"))
+        self.assertFalse(futures.resolve(1, "later update"))
+        self.assertEqual(future.result(0), "answer")
+        self.assertEqual(len(futures), 0)
+
+    def test_error(self):
+        futures = RequestFutures()
+        future = futures.expect(3)
+        self.assertFalse(futures.error(3, 2104, "Market data farm connection is OK"))
+        self.assertFalse(futures.error(-1, 502, "Couldn't connect to TWS"))
+        self.assertTrue(futures.error(3, 321, "Error validating request"))
+        with self.assertRaises(RequestError) as cm:
+            future.result(0)
+        self.assertEqual(cm.exception.errorCode, 321)
+
+    def test_cancel(self):
+        futures = RequestFutures()
+        cancelled = futures.expect(1)
+        cancelled.cancel()
+        self.assertFalse(futures.resolve(1))
+        pending = futures.expect("positionEnd")
+        futures.cancelAll()
+        with self.assertRaises(ConnectionError):
+            pending.result(0)
+
+    def test_gather(self):
+        futures = RequestFutures()
+        (first, second) = (futures.expect(1), futures.expect(2))
+        threading.Timer(0.05, futures.resolve, (2, "b")).start()
+        futures.resolve(1, "a")
+        self.assertEqual(gather([first, second], 5), ["a", "b"])
+        with self.assertRaises(concurrent.futures.TimeoutError):
+            gather([futures.expect(3)], 0.05)
+
+
+class FuturesWrapper(EWrapper):
+    def __init__(self):
+        super().__init__()
+        self.pending = RequestFutures()
+        self.rows = []
+
+    def nextValidId(self, orderId):
+        self.pending.resolve("nextValidId", orderId)
+
+    def accountSummary(self, reqId, account, tag, value, currency):
+        self.rows.append((reqId, tag, value))
+
+    def accountSummaryEnd(self, reqId):
+        self.pending.resolve(reqId, len(self.rows))
+
+    def pnl(self, reqId, dailyPnL, unrealizedPnL, realizedPnL):
+        self.pending.resolve(reqId, dailyPnL)
+
+    def positionEnd(self):
+        self.pending.resolve("positionEnd")
+
+    def connectionClosed(self):
+        self.pending.cancelAll()
+
+
+class ClientRequestFuturesTestCase(unittest.TestCase):
+    def test_concurrent_requests(self):
+        with MockTws(accountSummaryRows=20) as tws:
+            wrapper = FuturesWrapper()
+            client = EClient(wrapper)
+            ready = wrapper.pending.expect("nextValidId")
+            client.connect("127.0.0.1", tws.port, 0)
+            thread = threading.Thread(target=client.run)
+            thread.start()
+            try:
+                self.assertEqual(ready.result(5), 1)
+                t0 = time.monotonic()
+                futures = [wrapper.pending.expect(key) for key in (1, 2, "positionEnd")]
+                client.reqAccountSummary(1, "All", "$LEDGER:BASE")
+                client.reqPnL(2, "DU1234567", "")
+                client.reqPositions()
+                (rows, dailyPnL, _) = gather(futures, 5)
+                dt = time.monotonic() - t0
+                # still pending when the connection goes
+                pnl = wrapper.pending.expect(4)
+            finally:
+                client.disconnect()
+                thread.join()
+        self.assertEqual(rows, 20)
+        self.assertEqual(dailyPnL, 1234.5)
+        self.assertLess(dt, 1.)
+        with self.assertRaises(ConnectionError):
+            pnl.result(0)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Unit tests for ibapi.resampler
+"""
+
+import math
+import unittest
+from decimal import Decimal
+
+from ibapi.columnar import np
+from ibapi.common import SIZE_SCALE, UNSET_DOUBLE, UNSET_LONG, SizeModeEnum
+
+
+T0 = 1699999200     # the start of an hour
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class RealTimeBarResamplerTestCase(unittest.TestCase):
+    def setUp(self):
+        from ibapi.resampler import RealTimeBarResampler
+        self.bars = []
+        self.batches = []
+        self.resampler = RealTimeBarResampler(
+            intervals=(60, 300), nSlots=1,
+            onBar=lambda *bar: self.bars.append(bar),
+            onBatch=lambda interval, batch: self.batches.append((interval, batch)))
+
+    def test_minute(self):
+        for i in range(12):
+            self.resampler.realtimeBar(7, T0 + 5 * i, 100. + i, 101. + i, 99. - i, 100.5 + i,
+                                       Decimal(10), Decimal("100.5"), 3)
+            if i < 11:
+                self.assertEqual(self.bars, [])
+        self.assertEqual(len(self.bars), 1)
+        (reqId, interval, time, open_, high, low, close, volume, wap, count) = self.bars[0]
+        self.assertEqual((reqId, interval, time), (7, 60, T0))
+        self.assertEqual((open_, high, low, close), (100., 112., 88., 111.5))
+        self.assertEqual((volume, count), (120., 36))
+        self.assertAlmostEqual(wap, 100.5)
+        self.assertEqual(self.batches[0][0], 60)
+        self.assertEqual(list(self.batches[0][1]["reqId"]), [7])
+        self.assertIsNone(self.resampler.current(7, 60))
+        self.assertEqual(self.resampler.current(7, 300)[0], T0)
+
+    def test_missing_last_bar(self):
+        resampler = self.resampler
+        resampler.realtimeBar(1, T0, 100., 101., 99., 100., Decimal(1), Decimal(100), 1)
+        resampler.realtimeBar(2, T0, 200., 201., 199., 200., Decimal(1), Decimal(200), 1)
+        resampler.realtimeBar(1, T0 + 60, 100., 101., 99., 100., Decimal(1), Decimal(100), 1)
+        self.assertEqual([bar[:3] for bar in self.bars], [(1, 60, T0)])
+        resampler.flush()
+        self.assertEqual(sorted(bar[:3] for bar in self.bars),
+                         [(1, 60, T0), (1, 60, T0 + 60), (1, 300, T0),
+                          (2, 60, T0), (2, 300, T0)])
+
+    def test_batch_update(self):
+        reqIds = [1, 2, 3]
+        for i in range(12):
+            self.resampler.update(reqIds, T0 + 5 * i, [1., 2., 3.], [1.5, 2.5, 3.5 + i],
+                                  [0.5, 1.5, 2.5], [1., 2., 3.], [Decimal(1)] * 3,
+                                  [Decimal(1), Decimal(2), Decimal(3)], [1, 1, 1])
+        self.assertEqual(len(self.batches), 1)
+        (interval, batch) = self.batches[0]
+        self.assertEqual(interval, 60)
+        self.assertEqual(list(batch["reqId"]), reqIds)
+        self.assertEqual(list(batch["high"]), [1.5, 2.5, 14.5])
+        self.assertEqual(list(batch["volume"]), [12., 12., 12.])
+        self.assertEqual(list(batch["wap"]), [1., 2., 3.])
+        self.assertEqual(list(batch["count"]), [12, 12, 12])
+        self.assertEqual(len(self.bars), 3)
+
+    def test_no_volume(self):
+        self.resampler.realtimeBar(1, T0, 1., 1., 1., 1., Decimal(0), Decimal(0), 0)
+        self.assertTrue(math.isnan(self.resampler.current(1, 60)[6]))
+
+    def check_size_mode(self, sizeMode, size, unset):
+        from ibapi.resampler import RealTimeBarResampler
+        resampler = RealTimeBarResampler(intervals=(60, ), sizeMode=sizeMode)
+        resampler.realtimeBar(1, T0, 1., 1., 1., 1., size(10), Decimal(100), 1)
+        resampler.realtimeBar(1, T0 + 5, 1., 1., 1., 1., unset, Decimal(101), 1)
+        resampler.update([1, 2], T0 + 10, [1., 2.], [1., 2.], [1., 2.], [1., 2.],
+                         [size(30), unset], [Decimal(102)] * 2, [1, 1])
+        self.assertEqual(resampler.current(1, 60)[5:7], (40., 101.5))
+        self.assertEqual(resampler.current(2, 60)[5], 0.)
+
+    def test_float_sizes(self):
+        self.check_size_mode(SizeModeEnum.FLOAT, float, UNSET_DOUBLE)
+
+    def test_scaled_int_sizes(self):
+        self.check_size_mode(SizeModeEnum.SCALED_INT, lambda qty: qty * SIZE_SCALE, UNSET_LONG)
+
+    def test_bad_interval(self):
+        from ibapi.resampler import RealTimeBarResampler
+        with self.assertRaises(ValueError):
+            RealTimeBarResampler(intervals=(62,))
+
+
+if "__main__" == __name__:
+    unittest.main()
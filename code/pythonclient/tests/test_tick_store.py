@@ -0,0 +1,123 @@
+"""
+Unit tests for ibapi.ring and ibapi.tick_store
+"""
+
+import math
+import unittest
+from decimal import Decimal
+
+from ibapi.columnar import np
+from ibapi.common import SIZE_SCALE, UNSET_DECIMAL, UNSET_DOUBLE, UNSET_LONG, SizeModeEnum
+from ibapi.ticktype import TickTypeEnum
+
+from helpers import FakeClock
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class RingTestCase(unittest.TestCase):
+    def setUp(self):
+        from ibapi.ring import Ring
+        self.ring = Ring(4, (("time", np.float64), ("value", np.float64)))
+
+    def test_wrap_around(self):
+        ring = self.ring
+        self.assertIsNone(ring.latest("value"))
+        self.assertEqual(len(ring.tail()["value"]), 0)
+        for i in range(6):
+            ring.append(i, i * 10)
+        self.assertEqual(len(ring), 4)
+        self.assertEqual(ring.latest("value"), 50)
+        self.assertEqual(list(ring.tail()["value"]), [20, 30, 40, 50])
+        self.assertEqual(list(ring.tail(3)["time"]), [3, 4, 5])
+        self.assertEqual(list(ring.since("time", 3.5)["value"]), [40, 50])
+
+    def test_full_without_wrap(self):
+        for i in range(4):
+            self.ring.append(i, i)
+        self.assertEqual(list(self.ring.tail()["value"]), [0, 1, 2, 3])
+        self.assertEqual(list(self.ring.tail(2)["value"]), [2, 3])
+
+
+@unittest.skipIf(np is None, "numpy not installed")
+class TickStoreTestCase(unittest.TestCase):
+    def setUp(self):
+        from ibapi.tick_store import TickStore
+        self.clock = FakeClock()
+        self.store = TickStore(capacity=8, clock=self.clock)
+
+    def trade(self, reqId, price, size):
+        self.store.tickPrice(reqId, TickTypeEnum.LAST, price, None)
+        self.store.tickSize(reqId, TickTypeEnum.LAST_SIZE, Decimal(size))
+        self.clock.now += 1
+
+    def test_latest(self):
+        store = self.store
+        self.assertIsNone(store.latest(1, TickTypeEnum.BID))
+        store.tickPrice(1, TickTypeEnum.BID, 187.2, None)
+        store.tickPrice(1, TickTypeEnum.BID, 187.25, None)
+        store.tickSize(1, TickTypeEnum.BID_SIZE, UNSET_DECIMAL)
+        self.assertEqual(store.latest(1, TickTypeEnum.BID), 187.25)
+        self.assertEqual(store.latestTime(1, TickTypeEnum.BID), 1000.)
+        self.assertTrue(math.isnan(store.latest(1, TickTypeEnum.BID_SIZE)))
+
+    def test_register(self):
+        self.store.register(7, 265598)
+        self.trade(7, 187.5, 100)
+        self.assertEqual(self.store.latest(265598, TickTypeEnum.LAST), 187.5)
+        self.assertIsNone(self.store.latest(7, TickTypeEnum.LAST))
+
+    def test_window_and_vwap(self):
+        self.trade(1, 100., 100)
+        self.trade(1, 101., 300)
+        self.trade(1, 102., 100)
+        window = self.store.window(1, TickTypeEnum.LAST, 2.)
+        self.assertEqual(list(window["value"]), [101., 102.])
+        self.assertEqual(list(self.store.trades(1, 10.)["size"]), [100., 300., 100.])
+        self.assertAlmostEqual(self.store.vwap(1, 10.), (100. + 303. + 102.) / 5)
+        self.assertAlmostEqual(self.store.vwap(1, 2.), (303. + 102.) / 4)
+        self.assertIsNone(self.store.vwap(2, 10.))
+
+    def test_spread_stats(self):
+        store = self.store
+        store.tickPrice(1, TickTypeEnum.BID, 100., None)
+        self.assertIsNone(store.spreadStats(1, 10.))
+        store.tickPrice(1, TickTypeEnum.ASK, 100.5, None)
+        store.tickPrice(1, TickTypeEnum.BID, 100.25, None)
+        stats = store.spreadStats(1, 10.)
+        self.assertEqual(stats["count"], 2)
+        self.assertAlmostEqual(stats["mean"], 0.375)
+        self.assertAlmostEqual(stats["last"], 0.25)
+
+    def check_size_mode(self, sizeMode, size, unset):
+        from ibapi.tick_store import TickStore
+        store = TickStore(capacity=8, clock=self.clock, sizeMode=sizeMode)
+        for (price, qty) in ((100., 100), (101., 300)):
+            store.tickPrice(1, TickTypeEnum.LAST, price, None)
+            store.tickSize(1, TickTypeEnum.LAST_SIZE, size(qty))
+        store.tickPrice(1, TickTypeEnum.LAST, 102., None)
+        store.tickSize(1, TickTypeEnum.LAST_SIZE, unset)
+        store.tickSize(1, TickTypeEnum.VOLUME, size(2.5))
+        self.assertEqual(store.trades(1, 10.)["size"][:2].tolist(), [100., 300.])
+        self.assertTrue(math.isnan(store.latest(1, TickTypeEnum.LAST_SIZE)))
+        self.assertEqual(store.latest(1, TickTypeEnum.VOLUME), 2.5)
+        self.assertAlmostEqual(store.vwap(1, 10.), (100. + 303.) / 4)
+
+    def test_float_sizes(self):
+        self.check_size_mode(SizeModeEnum.FLOAT, float, UNSET_DOUBLE)
+
+    def test_scaled_int_sizes(self):
+        self.check_size_mode(SizeModeEnum.SCALED_INT, lambda qty: int(qty * SIZE_SCALE),
+                             UNSET_LONG)
+
+    def test_bounded_memory(self):
+        for i in range(100):
+            self.trade(1, 100. + i, 1)
+        memory = self.store.memory()
+        for i in range(100):
+            self.trade(1, 100. + i, 1)
+        self.assertEqual(self.store.memory(), memory)
+        self.assertEqual(len(self.store.trades(1, 1e9)["price"]), 8)
+
+
+if "__main__" == __name__:
+    unittest.main()
@@ -0,0 +1,146 @@
+"""
+Unit tests for ibapi.writer
+"""
+
+import threading
+import time
+import unittest
+
+from ibapi import comm
+from ibapi.client import EClient
+from ibapi.common import SendPriorityEnum
+from ibapi.contract import Contract
+from ibapi.message import OUT
+from ibapi.order import Order
+from ibapi.writer import EWriter, msg_priority
+from ibapi.wrapper import EWrapper
+
+
+def make_msg(*vals):
+    return comm.make_msg("".join(comm.make_field(val) for val in vals))
+
+
+class SentData:
+    """ stands in for the Connection """
+    def __init__(self):
+        self.sent = []              # (time, data) of each sendAll()
+        self.connected = True
+        self.lock = threading.Lock()
+
+    def isConnected(self):
+        return self.connected
+
+    def sendAll(self, data):
+        with self.lock:
+            self.sent.append((time.monotonic(), data))
+        return len(data)
+
+    def disconnect(self):
+        self.connected = False
+
+    def msgs(self):
+        data = b"".join(data for (_, data) in self.sent)
+        return [comm.read_fields(msg) for msg in split(data)]
+
+
+def split(data):
+    msgs = []
+    while data:
+        (size, msg, data) = comm.read_msg(data)
+        msgs.append(msg)
+    return msgs
+
+
+class WriterTestCase(unittest.TestCase):
+    def setUp(self):
+        self.conn = SentData()
+
+    def test_priority(self):
+        self.assertEqual(msg_priority(make_msg(OUT.PLACE_ORDER, 1)), SendPriorityEnum.NORMAL)
+        self.assertEqual(msg_priority(make_msg(OUT.REQ_GLOBAL_CANCEL, 1)), SendPriorityEnum.NORMAL)
+        self.assertEqual(msg_priority(make_msg(OUT.REQ_MKT_DATA, 1)), SendPriorityEnum.NORMAL)
+        self.assertEqual(msg_priority(make_msg(OUT.REQ_HISTORICAL_DATA, 1)), SendPriorityEnum.BULK)
+        self.assertEqual(msg_priority(make_msg("x")), SendPriorityEnum.NORMAL)
+
+    def test_bulk_last_coalesced(self):
+        writer = EWriter(self.conn, msgRate=None)
+        for reqId in range(3):
+            writer.put(make_msg(OUT.REQ_HISTORICAL_DATA, reqId))
+        writer.put(make_msg(OUT.CANCEL_ORDER, 10))
+        writer.put(make_msg(OUT.REQ_MKT_DATA, 20))
+        writer.put(make_msg(OUT.PLACE_ORDER, 30))
+        self.assertEqual(writer.snapshot()["depth"], {"NORMAL": 3, "BULK": 3})
+        writer.start()
+        self.assertTrue(writer.flush(5))
+        writer.stop()
+
+        # the order stays behind the earlier cancel
+        self.assertEqual(len(self.conn.sent), 1)
+        self.assertEqual([int(fields[1]) for fields in self.conn.msgs()], [10, 20, 30, 0, 1, 2])
+        snapshot = writer.snapshot()
+        self.assertEqual(snapshot["msgsSent"], 6)
+        self.assertEqual(snapshot["maxDepth"], 6)
+        self.assertEqual(snapshot["batchSize"]["max"], 6)
+        self.assertEqual(snapshot["waitNs"]["count"], 6)
+
+    def test_pacing(self):
+        writer = EWriter(self.conn, msgRate=200., burst=5)
+        writer.start()
+        t0 = time.monotonic()
+        for reqId in range(45):
+            writer.put(make_msg(OUT.REQ_MKT_DATA, reqId))
+        self.assertTrue(writer.flush(5))
+        writer.stop()
+
+        # 5 at once, then the 40 others at 200 per second
+        self.assertGreaterEqual(time.monotonic() - t0, 0.19)
+        self.assertEqual([int(fields[1]) for fields in self.conn.msgs()], list(range(45)))
+        # never more than burst + rate * dt messages in dt
+        sent = []
+        for (t, data) in self.conn.sent:
+            sent += [t] * len(split(data))
+        for (i, t) in enumerate(sent):
+            inWindow = sum(1 for u in sent[i:] if u - t < 0.05)
+            self.assertLessEqual(inWindow, 5 + 200 * 0.05 + 1)
+
+    def test_stop_drops(self):
+        writer = EWriter(self.conn, msgRate=1., burst=1)
+        writer.start()
+        for reqId in range(3):
+            writer.put(make_msg(OUT.REQ_MKT_DATA, reqId))
+        self.assertFalse(writer.flush(0.1))
+        writer.stop()
+        self.assertFalse(writer.is_alive())
+        self.assertEqual(len(self.conn.msgs()), 1)
+        self.assertEqual(writer.put(make_msg(OUT.REQ_MKT_DATA, 4)), 0)
+
+    def test_client(self):
+        client = EClient(EWrapper())
+        client.conn = self.conn
+        client.serverVersion_ = 176
+        client.setConnState(EClient.CONNECTED)
+        client.compileEncoders()
+        client.writer = EWriter(self.conn, msgRate=None)
+
+        contract = Contract()
+        contract.symbol = "AAPL"
+        contract.secType = "STK"
+        contract.exchange = "SMART"
+        contract.currency = "USD"
+        order = Order()
+        order.action = "BUY"
+        order.orderType = "MKT"
+        client.reqHistoricalData(1, contract, "", "1 D", "1 min", "TRADES", 1, 1, False, [])
+        client.reqMktData(2, contract, "", False, False, [])
+        client.placeOrder(3, contract, order)
+        client.writer.start()
+        self.assertTrue(client.flushWriteQueue(5))
+        client.disconnect()
+
+        self.assertEqual([int(fields[0]) for fields in self.conn.msgs()],
+                         [OUT.REQ_MKT_DATA, OUT.PLACE_ORDER, OUT.REQ_HISTORICAL_DATA])
+        self.assertIsNone(client.writer)
+
+
+if "__main__" == __name__:
+    unittest.main()